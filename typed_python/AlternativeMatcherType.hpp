@@ -99,7 +99,7 @@ public:
     void deepcopyConcrete(
         instance_ptr dest,
         instance_ptr src,
-        std::unordered_map<instance_ptr, instance_ptr>& alreadyAllocated,
+        DeepcopyMap& alreadyAllocated,
         Slab* slab
     ) {
         m_alternative->deepcopy(dest, src, alreadyAllocated, slab);
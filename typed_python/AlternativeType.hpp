@@ -186,7 +186,7 @@ public:
     void deepcopyConcrete(
         instance_ptr dest,
         instance_ptr src,
-        std::unordered_map<instance_ptr, instance_ptr>& alreadyAllocated,
+        DeepcopyMap& alreadyAllocated,
         Slab* slab
     ) {
         if (m_all_alternatives_empty) {
@@ -0,0 +1,260 @@
+/******************************************************************************
+   Copyright 2017-2021 typed_python Authors
+
+   Licensed under the Apache License, Version 2.0 (the "License");
+   you may not use this file except in compliance with the License.
+   You may obtain a copy of the License at
+
+       http://www.apache.org/licenses/LICENSE-2.0
+
+   Unless required by applicable law or agreed to in writing, software
+   distributed under the License is distributed on an "AS IS" BASIS,
+   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+   See the License for the specific language governing permissions and
+   limitations under the License.
+******************************************************************************/
+
+#pragma once
+
+#include "Slab.hpp"
+#include "Memory.hpp"
+
+#include <algorithm>
+#include <mutex>
+#include <stdexcept>
+#include <vector>
+
+/****************
+
+Arena:
+
+A scope for scratch allocation. While an Arena is active on a thread, every
+tp_malloc that thread makes (from the interpreter or from compiled code) is
+bump-allocated out of a chain of Slabs owned by the Arena, rather than coming
+from the free store. Each new Slab is twice the size of the last one, up to a
+limit.
+
+Exiting the Arena releases its references to its Slabs. Since each allocation
+holds a reference to its Slab, a Slab whose allocations are all gone is freed
+right away, and one holding an allocation that outlived the Arena (an
+'escaped' allocation) stays alive, in its entirety, until that allocation is
+released. So escaping objects are never invalidated, but they can pin a lot of
+memory: copy anything that needs to outlive the arena out of it first.
+
+Arenas nest: exiting one makes the arena that was active when it was entered
+active again. They must be exited in the reverse order they were entered, on
+the thread that entered them. When a thread ends, any Arenas still active on
+it are exited.
+
+An Arena's owner (the python Arena object) may go away while the Arena is
+active on some thread, which then has no way to exit it. The owner 'orphans'
+it instead of deleting it, and the Arena gets deleted when its thread exits
+it at thread exit.
+
+*****************/
+
+class Arena {
+public:
+    Arena(size_t initialSlabBytes) :
+        mNextSlabBytes(std::max(initialSlabBytes, (size_t)MIN_SLAB_BYTES)),
+        mPrevious(nullptr),
+        mIsActive(false),
+        mIsOrphaned(false),
+        mEscapedAllocCount(0)
+    {
+    }
+
+    ~Arena() {
+        releaseSlabs();
+    }
+
+    // the Arena that tp_malloc allocates from on this thread, if any.
+    static Arena*& current() {
+        static thread_local Arena* arena = nullptr;
+        return arena;
+    }
+
+    bool isActive() const {
+        return mIsActive;
+    }
+
+    void enter() {
+        if (mIsActive) {
+            throw std::runtime_error("This Arena is already active.");
+        }
+
+        exitArenasAtThreadExit();
+
+        std::lock_guard<std::mutex> lock(mMutex);
+
+        mPrevious = current();
+        current() = this;
+        mIsActive = true;
+        mEscapedAllocCount = 0;
+    }
+
+    void exit() {
+        if (!mIsActive) {
+            throw std::runtime_error("This Arena isn't active.");
+        }
+
+        if (current() != this) {
+            throw std::runtime_error(
+                "Arenas must be exited in the reverse order they were entered, "
+                "on the thread that entered them."
+            );
+        }
+
+        std::lock_guard<std::mutex> lock(mMutex);
+
+        exitHoldingLock();
+    }
+
+    // called by our owner when it goes away. If we're inactive, returns false,
+    // and the owner should delete us. Otherwise, we delete ourselves when our
+    // thread exits us, and return true.
+    bool orphan() {
+        std::lock_guard<std::mutex> lock(mMutex);
+
+        if (!mIsActive) {
+            return false;
+        }
+
+        mIsOrphaned = true;
+        return true;
+    }
+
+    // allocate 'bytes' bytes at the end of our last slab, adding a slab if it's full.
+    void* allocate(size_t bytes) {
+        if (mSlabs.empty() || !mSlabs.back()->canAllocate(bytes)) {
+            addSlab(bytesRequiredForAllocation(bytes));
+        }
+
+        return mSlabs.back()->allocate(bytes, nullptr);
+    }
+
+    // call 'f' with this thread allocating wherever it would if this Arena
+    // weren't active (the enclosing Arena, or the free store).
+    template<class func_type>
+    void suspendWhile(const func_type& f) {
+        if (!mIsActive) {
+            f();
+            return;
+        }
+
+        Arena* wasCurrent = current();
+        current() = mPrevious;
+
+        try {
+            f();
+        } catch(...) {
+            current() = wasCurrent;
+            throw;
+        }
+
+        current() = wasCurrent;
+    }
+
+    // the number of allocations made in this Arena that are still alive. Once
+    // the Arena has exited, the number that were alive when it did.
+    size_t liveAllocCount() const {
+        if (!mIsActive) {
+            return mEscapedAllocCount;
+        }
+
+        size_t res = 0;
+
+        // each allocation holds a reference to its slab, and we hold one more.
+        for (Slab* slab: mSlabs) {
+            res += slab->refcount() - 1;
+        }
+
+        return res;
+    }
+
+    // the total size of the slabs we're holding.
+    size_t bytecount() const {
+        size_t res = 0;
+
+        for (Slab* slab: mSlabs) {
+            res += slab->getBytecount();
+        }
+
+        return res;
+    }
+
+private:
+    // make sure that when this thread ends, we exit whatever Arenas are still
+    // active on it, deleting the orphaned ones.
+    static void exitArenasAtThreadExit() {
+        struct ThreadExitHook {
+            ~ThreadExitHook() {
+                while (Arena* arena = current()) {
+                    bool isOrphaned;
+
+                    {
+                        std::lock_guard<std::mutex> lock(arena->mMutex);
+                        arena->exitHoldingLock();
+                        isOrphaned = arena->mIsOrphaned;
+                    }
+
+                    // if we're not orphaned, our owner may delete us as soon as
+                    // we release the lock.
+                    if (isOrphaned) {
+                        delete arena;
+                    }
+                }
+            }
+        };
+
+        static thread_local ThreadExitHook hook;
+        (void)hook;
+    }
+
+    void exitHoldingLock() {
+        mEscapedAllocCount = liveAllocCount();
+
+        current() = mPrevious;
+        mPrevious = nullptr;
+        mIsActive = false;
+
+        releaseSlabs();
+    }
+
+    void addSlab(size_t minBytes) {
+        mSlabs.push_back(new Slab(false, std::max(mNextSlabBytes, minBytes)));
+
+        mNextSlabBytes = std::min(mNextSlabBytes * 2, (size_t)MAX_SLAB_BYTES);
+    }
+
+    void releaseSlabs() {
+        for (Slab* slab: mSlabs) {
+            slab->decref();
+        }
+
+        mSlabs.clear();
+    }
+
+    static constexpr size_t MIN_SLAB_BYTES = 4096;
+
+    static constexpr size_t MAX_SLAB_BYTES = 64 * 1024 * 1024;
+
+    std::vector<Slab*> mSlabs;
+
+    // the size of the next slab we'll add
+    size_t mNextSlabBytes;
+
+    // the Arena that was current when we were entered
+    Arena* mPrevious;
+
+    bool mIsActive;
+
+    // if true, our owner is gone, and we delete ourselves once we're exited
+    bool mIsOrphaned;
+
+    // guards mIsActive and mIsOrphaned against our owner going away on
+    // another thread just as our thread exits us.
+    std::mutex mMutex;
+
+    size_t mEscapedAllocCount;
+};
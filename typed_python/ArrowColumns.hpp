@@ -0,0 +1,382 @@
+/******************************************************************************
+   Copyright 2017-2021 typed_python Authors
+
+   Licensed under the Apache License, Version 2.0 (the "License");
+   you may not use this file except in compliance with the License.
+   You may obtain a copy of the License at
+
+       http://www.apache.org/licenses/LICENSE-2.0
+
+   Unless required by applicable law or agreed to in writing, software
+   distributed under the License is distributed on an "AS IS" BASIS,
+   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+   See the License for the specific language governing permissions and
+   limitations under the License.
+******************************************************************************/
+
+#pragma once
+
+#include <limits>
+#include <string>
+#include <vector>
+
+#include "AllTypes.hpp"
+#include "Unicode.hpp"
+
+/****************
+
+ArrowColumn:
+
+Describes how one column of a ListOf or TupleOf maps onto Apache Arrow's
+columnar memory layout, and moves the data between the two.
+
+A ListOf(NamedTuple(...)) has one column per field. A ListOf of anything else
+has a single column holding the elements themselves. Columns may hold
+
+    Bool                    -> 'bool', one bit per value
+    (U)Int8 ... (U)Int64    -> 'int8' ... 'uint64'
+    Float32, Float64        -> 'float32', 'float64'
+    str                     -> 'utf8', int32 offsets and utf8 data
+    bytes                   -> 'binary', int32 offsets and data
+    OneOf(None, T)          -> T, with a validity bitmap marking the Nones
+
+Each column is (up to) three buffers, laid out the way Arrow lays them out:
+a validity bitmap (one bit per value, set for non-null values), an offsets
+buffer for variable-width values, and the values themselves. A column read
+back in may start 'offset' values into its buffers, which is how Arrow
+represents a slice of an array.
+
+*****************/
+
+class ArrowColumn {
+public:
+    // the buffers making up a column being exported
+    class Buffers {
+    public:
+        Buffers() : nullCount(0) {}
+
+        int64_t nullCount;
+        std::vector<uint8_t> validity;
+        std::vector<uint8_t> offsets;
+        std::vector<uint8_t> data;
+    };
+
+    // the buffers of a column being imported. 'validity' and 'offsets' may be
+    // null, with 'validityBytecount' and 'offsetsBytecount' zero.
+    class SourceBuffers {
+    public:
+        int64_t offset;
+        const uint8_t* validity;
+        size_t validityBytecount;
+        const uint8_t* offsets;
+        size_t offsetsBytecount;
+        const uint8_t* data;
+        size_t dataBytecount;
+    };
+
+    ArrowColumn(std::string name, Type* columnType, size_t byteOffset) :
+            mName(name),
+            mColumnType(columnType),
+            mValueType(columnType),
+            mByteOffset(byteOffset),
+            mIsNullable(false),
+            mNoneIndex(0),
+            mValueIndex(0)
+    {
+        if (columnType->getTypeCategory() == Type::TypeCategory::catOneOf) {
+            const std::vector<Type*>& types = ((OneOfType*)columnType)->getTypes();
+
+            if (types.size() == 2 && (types[0]->isNone() || types[1]->isNone())) {
+                mIsNullable = true;
+                mNoneIndex = types[0]->isNone() ? 0 : 1;
+                mValueIndex = 1 - mNoneIndex;
+                mValueType = types[mValueIndex];
+            }
+        }
+
+        mArrowType = arrowTypeNameFor(mValueType);
+
+        if (mArrowType.empty()) {
+            throw std::runtime_error(
+                "Can't represent " + columnType->name() + " as an Arrow column. Columns must be "
+                "Bool, an integer or float type, str, bytes, or OneOf(None, T) of one of those."
+            );
+        }
+    }
+
+    // the columns of a ListOf or TupleOf of 'eltType'
+    static std::vector<ArrowColumn> columnsFor(Type* eltType) {
+        std::vector<ArrowColumn> columns;
+
+        if (eltType->getTypeCategory() == Type::TypeCategory::catNamedTuple) {
+            NamedTuple* tupType = (NamedTuple*)eltType;
+
+            for (long k = 0; k < tupType->getTypes().size(); k++) {
+                columns.push_back(
+                    ArrowColumn(tupType->getNames()[k], tupType->getTypes()[k], tupType->getOffsets()[k])
+                );
+            }
+        } else {
+            columns.push_back(ArrowColumn("values", eltType, 0));
+        }
+
+        return columns;
+    }
+
+    // the Arrow name of the type we store 'valueType' as, or the empty string
+    // if we can't.
+    static std::string arrowTypeNameFor(Type* valueType) {
+        switch (valueType->getTypeCategory()) {
+            case Type::TypeCategory::catBool: return "bool";
+            case Type::TypeCategory::catInt8: return "int8";
+            case Type::TypeCategory::catInt16: return "int16";
+            case Type::TypeCategory::catInt32: return "int32";
+            case Type::TypeCategory::catInt64: return "int64";
+            case Type::TypeCategory::catUInt8: return "uint8";
+            case Type::TypeCategory::catUInt16: return "uint16";
+            case Type::TypeCategory::catUInt32: return "uint32";
+            case Type::TypeCategory::catUInt64: return "uint64";
+            case Type::TypeCategory::catFloat32: return "float32";
+            case Type::TypeCategory::catFloat64: return "float64";
+            case Type::TypeCategory::catString: return "utf8";
+            case Type::TypeCategory::catBytes: return "binary";
+            default: return "";
+        }
+    }
+
+    const std::string& name() const {
+        return mName;
+    }
+
+    const std::string& arrowType() const {
+        return mArrowType;
+    }
+
+    bool isNullable() const {
+        return mIsNullable;
+    }
+
+    // write the column out of 'count' elements, 'stride' bytes apart, starting at 'elements'
+    Buffers exportColumn(instance_ptr elements, size_t stride, int64_t count) const {
+        Buffers result;
+
+        if (mIsNullable) {
+            result.validity.resize((count + 7) / 8);
+        }
+
+        if (isVariableWidth()) {
+            result.offsets.resize(sizeof(int32_t) * (count + 1));
+        } else if (isBitPacked()) {
+            result.data.resize((count + 7) / 8);
+        } else {
+            result.data.resize(mValueType->bytecount() * count);
+        }
+
+        int32_t* offsets = (int32_t*)result.offsets.data();
+        if (isVariableWidth()) {
+            offsets[0] = 0;
+        }
+
+        for (int64_t i = 0; i < count; i++) {
+            instance_ptr value = elements + stride * i + mByteOffset;
+
+            if (mIsNullable) {
+                if (*(uint8_t*)value == mNoneIndex) {
+                    result.nullCount++;
+
+                    if (isVariableWidth()) {
+                        offsets[i + 1] = offsets[i];
+                    }
+                    continue;
+                }
+
+                setBit(&result.validity[0], i);
+                value += 1;
+            }
+
+            if (isVariableWidth()) {
+                size_t priorBytecount = result.data.size();
+
+                appendVariableWidthValue(value, result.data);
+
+                if (result.data.size() > std::numeric_limits<int32_t>::max()) {
+                    throw std::runtime_error(
+                        "Column '" + mName + "' has more than 2GB of data, which doesn't fit in an Arrow "
+                        + mArrowType + " array."
+                    );
+                }
+
+                offsets[i + 1] = offsets[i] + (result.data.size() - priorBytecount);
+            } else if (isBitPacked()) {
+                if (*(bool*)value) {
+                    setBit(&result.data[0], i);
+                }
+            } else {
+                memcpy(&result.data[0] + mValueType->bytecount() * i, value, mValueType->bytecount());
+            }
+        }
+
+        if (result.nullCount == 0) {
+            result.validity.clear();
+        }
+
+        return result;
+    }
+
+    // check that 'buffers' hold 'count' values of this column, so that 'importValue'
+    // can't fail partway through an element.
+    void validate(const SourceBuffers& buffers, int64_t count) const {
+        auto fail = [&](std::string msg) {
+            throw std::runtime_error("Arrow column '" + mName + "' is invalid: " + msg);
+        };
+
+        if (buffers.offset < 0) {
+            fail("negative offset");
+        }
+
+        int64_t end = buffers.offset + count;
+
+        if (buffers.validity && buffers.validityBytecount * 8 < end) {
+            fail("validity bitmap is too short");
+        }
+
+        if (buffers.validity && !mIsNullable) {
+            for (int64_t i = 0; i < count; i++) {
+                if (!getBit(buffers.validity, buffers.offset + i)) {
+                    fail("it contains nulls, but " + mColumnType->name() + " can't hold None");
+                }
+            }
+        }
+
+        if (isVariableWidth()) {
+            if (!buffers.offsets || buffers.offsetsBytecount < sizeof(int32_t) * (end + 1)) {
+                fail("offsets buffer is too short");
+            }
+
+            const int32_t* offsets = (const int32_t*)buffers.offsets;
+
+            for (int64_t i = buffers.offset; i < end; i++) {
+                if (offsets[i] < 0 || offsets[i] > offsets[i + 1] || offsets[i + 1] > buffers.dataBytecount) {
+                    fail("offsets are out of bounds");
+                }
+            }
+        } else if (isBitPacked()) {
+            if (buffers.dataBytecount * 8 < end) {
+                fail("data buffer is too short");
+            }
+        } else {
+            if (buffers.dataBytecount < mValueType->bytecount() * end) {
+                fail("data buffer is too short");
+            }
+        }
+    }
+
+    // construct value 'i' of the column from 'buffers' at 'element', the start
+    // of the element holding it.
+    void importValue(instance_ptr element, const SourceBuffers& buffers, int64_t i) const {
+        instance_ptr value = element + mByteOffset;
+        int64_t ix = buffers.offset + i;
+
+        if (mIsNullable) {
+            if (buffers.validity && !getBit(buffers.validity, ix)) {
+                // POD OneOfs compare bytewise, so don't leave the value bytes uninitialized
+                memset(value, 0, mColumnType->bytecount());
+                *(uint8_t*)value = mNoneIndex;
+                return;
+            }
+
+            *(uint8_t*)value = mValueIndex;
+            value += 1;
+        }
+
+        if (isVariableWidth()) {
+            const int32_t* offsets = (const int32_t*)buffers.offsets;
+            const uint8_t* start = buffers.data + offsets[ix];
+            size_t bytecount = offsets[ix + 1] - offsets[ix];
+
+            if (mValueType->getTypeCategory() == Type::TypeCategory::catString) {
+                *(StringType::layout**)value = StringType::createFromUtf8(
+                    (const char*)start,
+                    StringType::countUtf8Codepoints(start, bytecount)
+                );
+            } else {
+                // the empty bytes object is a null layout
+                *(BytesType::layout**)value = bytecount ? BytesType::createFromPtr((const char*)start, bytecount) : nullptr;
+            }
+        } else if (isBitPacked()) {
+            *(bool*)value = getBit(buffers.data, ix);
+        } else {
+            memcpy(value, buffers.data + mValueType->bytecount() * ix, mValueType->bytecount());
+        }
+    }
+
+private:
+    bool isVariableWidth() const {
+        return mValueType->getTypeCategory() == Type::TypeCategory::catString
+            || mValueType->getTypeCategory() == Type::TypeCategory::catBytes;
+    }
+
+    bool isBitPacked() const {
+        return mValueType->getTypeCategory() == Type::TypeCategory::catBool;
+    }
+
+    static void setBit(uint8_t* bits, int64_t i) {
+        bits[i / 8] |= (1 << (i % 8));
+    }
+
+    static bool getBit(const uint8_t* bits, int64_t i) {
+        return bits[i / 8] & (1 << (i % 8));
+    }
+
+    void appendVariableWidthValue(instance_ptr value, std::vector<uint8_t>& data) const {
+        if (mValueType->getTypeCategory() == Type::TypeCategory::catBytes) {
+            BytesType* bytesType = BytesType::Make();
+            int64_t bytecount = bytesType->count(value);
+
+            if (bytecount) {
+                data.insert(data.end(), bytesType->eltPtr(value, 0), bytesType->eltPtr(value, 0) + bytecount);
+            }
+            return;
+        }
+
+        StringType* stringType = StringType::Make();
+        int64_t codepoints = stringType->count(value);
+
+        if (!codepoints) {
+            return;
+        }
+
+        size_t priorBytecount = data.size();
+        instance_ptr codepointData = stringType->eltPtr(value, 0);
+
+        if (stringType->bytes_per_codepoint(value) == 1) {
+            data.resize(priorBytecount + countUtf8BytesRequiredFor((uint8_t*)codepointData, codepoints));
+            encodeUtf8((uint8_t*)codepointData, codepoints, &data[priorBytecount]);
+        } else if (stringType->bytes_per_codepoint(value) == 2) {
+            data.resize(priorBytecount + countUtf8BytesRequiredFor((uint16_t*)codepointData, codepoints));
+            encodeUtf8((uint16_t*)codepointData, codepoints, &data[priorBytecount]);
+        } else {
+            data.resize(priorBytecount + countUtf8BytesRequiredFor((uint32_t*)codepointData, codepoints));
+            encodeUtf8((uint32_t*)codepointData, codepoints, &data[priorBytecount]);
+        }
+    }
+
+    std::string mName;
+
+    std::string mArrowType;
+
+    // the type of the field (or element) holding the column
+    Type* mColumnType;
+
+    // the type of its non-null values
+    Type* mValueType;
+
+    // where the column's value lives within each element
+    size_t mByteOffset;
+
+    bool mIsNullable;
+
+    // if nullable, which OneOf index holds None, and which holds values
+    uint8_t mNoneIndex;
+    uint8_t mValueIndex;
+};
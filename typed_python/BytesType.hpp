@@ -46,6 +46,15 @@ public:
 
     template<class buf_t>
     void serialize(instance_ptr self, buf_t& buffer, size_t fieldNumber) {
+        if (buffer.isDedupEnabled() && count(self) >= buffer.DEDUP_MIN_BYTECOUNT) {
+            if (buffer.writeDedupReference(
+                    buffer.dedupIndexForContent(TypeCategory::catBytes, 1, eltPtr(self, 0), count(self)),
+                    fieldNumber
+                )) {
+                return;
+            }
+        }
+
         buffer.writeBeginBytes(fieldNumber, count(self));
         buffer.write_bytes(eltPtr(self, 0), count(self));
     }
@@ -53,7 +62,7 @@ public:
     void deepcopyConcrete(
         instance_ptr dest,
         instance_ptr src,
-        std::unordered_map<instance_ptr, instance_ptr>& alreadyAllocated,
+        DeepcopyMap& alreadyAllocated,
         Slab* slab
     ) {
         layout_ptr& destLayout = *(layout**)dest;
@@ -104,21 +113,23 @@ public:
 
     template<class buf_t>
     void deserialize(instance_ptr self, buf_t& buffer, size_t wireType) {
-        if (wireType != WireType::BYTES) {
-            throw std::runtime_error("Corrupt data (expected BYTES wire type)");
-        }
+        buffer.template readPossiblyDeduped<layout>(self, wireType, this, [&](size_t wireType) {
+            if (wireType != WireType::BYTES) {
+                throw std::runtime_error("Corrupt data (expected BYTES wire type)");
+            }
 
-        size_t ct = buffer.readUnsignedVarint();
+            size_t ct = buffer.readUnsignedVarint();
 
-        if (!buffer.canConsume(ct)) {
-            throw std::runtime_error("Corrupt data (not enough data in the stream)");
-        }
+            if (!buffer.canConsume(ct)) {
+                throw std::runtime_error("Corrupt data (not enough data in the stream)");
+            }
 
-        constructor(self, ct, nullptr);
+            constructor(self, ct, nullptr);
 
-        if (ct) {
-            buffer.read_bytes(eltPtr(self,0), ct);
-        }
+            if (ct) {
+                buffer.read_bytes(eltPtr(self,0), ct);
+            }
+        });
     }
 
     //return an increffed concatenated layout of lhs and rhs
@@ -193,7 +193,7 @@ public:
     void deepcopyConcrete(
         instance_ptr dest,
         instance_ptr src,
-        std::unordered_map<instance_ptr, instance_ptr>& alreadyAllocated,
+        DeepcopyMap& alreadyAllocated,
         Slab* slab
     ) {
         //layout_ptr& destRecordPtr = *(layout**)dest;
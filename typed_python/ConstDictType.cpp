@@ -84,17 +84,20 @@ void ConstDictType::repr(instance_ptr self, ReprAccumulator& stream, bool isStr)
 
     stream << "{";
 
-    int32_t ct = count(self);
+    bool isFirst = true;
 
-    for (long k = 0; k < ct;k++) {
-        if (k > 0) {
+    visitKeyValuePairsSeparately(self, [&](instance_ptr key, instance_ptr value) {
+        if (!isFirst) {
             stream << ", ";
         }
+        isFirst = false;
 
-        m_key->repr(kvPairPtrKey(self,k),stream, false);
+        m_key->repr(key, stream, false);
         stream << ": ";
-        m_value->repr(kvPairPtrValue(self,k),stream, false);
-    }
+        m_value->repr(value, stream, false);
+
+        return true;
+    });
 
     stream << "}";
 }
@@ -109,15 +112,18 @@ void ConstDictType::repr_keys(instance_ptr self, ReprAccumulator& stream) {
 
     stream << "const_dict_keys([";
 
-    int32_t ct = count(self);
+    bool isFirst = true;
 
-    for (long k = 0; k < ct;k++) {
-        if (k > 0) {
+    visitKeyValuePairsSeparately(self, [&](instance_ptr key, instance_ptr value) {
+        if (!isFirst) {
             stream << ", ";
         }
+        isFirst = false;
 
-        m_key->repr(kvPairPtrKey(self,k),stream, false);
-    }
+        m_key->repr(key, stream, false);
+
+        return true;
+    });
 
     stream << "])";
 }
@@ -132,19 +138,22 @@ void ConstDictType::repr_items(instance_ptr self, ReprAccumulator& stream) {
 
     stream << "const_dict_items([";
 
-    int32_t ct = count(self);
+    bool isFirst = true;
 
-    for (long k = 0; k < ct;k++) {
-        if (k > 0) {
+    visitKeyValuePairsSeparately(self, [&](instance_ptr key, instance_ptr value) {
+        if (!isFirst) {
             stream << ", ";
         }
+        isFirst = false;
 
         stream << "(";
-        m_key->repr(kvPairPtrKey(self,k), stream, false);
+        m_key->repr(key, stream, false);
         stream << ", ";
-        m_value->repr(kvPairPtrValue(self,k), stream, false);
+        m_value->repr(value, stream, false);
         stream << ")";
-    }
+
+        return true;
+    });
 
     stream << "])";
 }
@@ -159,15 +168,18 @@ void ConstDictType::repr_values(instance_ptr self, ReprAccumulator& stream) {
 
     stream << "const_dict_values([";
 
-    int32_t ct = count(self);
+    bool isFirst = true;
 
-    for (long k = 0; k < ct;k++) {
-        if (k > 0) {
+    visitKeyValuePairsSeparately(self, [&](instance_ptr key, instance_ptr value) {
+        if (!isFirst) {
             stream << ", ";
         }
+        isFirst = false;
 
-        m_value->repr(kvPairPtrValue(self,k), stream, false);
-    }
+        m_value->repr(value, stream, false);
+
+        return true;
+    });
 
     stream << "])";
 }
@@ -182,10 +194,12 @@ typed_python_hash_type ConstDictType::hash(instance_ptr left) {
 
         int32_t count = size(left);
         acc.add(count);
-        for (long k = 0; k < count;k++) {
-            acc.add(m_key->hash(kvPairPtrKey(left,k)));
-            acc.add(m_value->hash(kvPairPtrValue(left,k)));
-        }
+
+        visitKeyValuePairsSeparately(left, [&](instance_ptr key, instance_ptr value) {
+            acc.add(m_key->hash(key));
+            acc.add(m_value->hash(value));
+            return true;
+        });
 
         (*(layout**)left)->hash_cache = acc.get();
         if ((*(layout**)left)->hash_cache == -1) {
@@ -213,12 +227,21 @@ bool ConstDictType::cmp(instance_ptr left, instance_ptr right, int pyComparisonO
         return cmpResultToBoolForPyOrdering(pyComparisonOp, 0);
     }
 
-    int ct = count(left);
+    // gather the pairs up front, since either side may be a tree
+    std::vector<instance_ptr> leftPairs;
+    std::vector<instance_ptr> rightPairs;
+
+    visitKeyValuePairs(left, [&](instance_ptr pair) { leftPairs.push_back(pair); return true; });
+    visitKeyValuePairs(right, [&](instance_ptr pair) { rightPairs.push_back(pair); return true; });
+
+    int64_t ct = leftPairs.size();
 
     if (pyComparisonOp == Py_EQ) {
         for (long k = 0; k < ct; k++) {
-            if (m_key->cmp(kvPairPtrKey(left,k), kvPairPtrKey(right,k), Py_NE, true) ||
-                    (compareValues && m_value->cmp( kvPairPtrValue(left,k), kvPairPtrValue(right,k), Py_NE, true))) {
+            if (m_key->cmp(leftPairs[k], rightPairs[k], Py_NE, true) ||
+                    (compareValues && m_value->cmp(
+                        leftPairs[k] + m_bytes_per_key, rightPairs[k] + m_bytes_per_key, Py_NE, true
+                    ))) {
                 return false;
             }
         }
@@ -226,8 +249,8 @@ bool ConstDictType::cmp(instance_ptr left, instance_ptr right, int pyComparisonO
         return true;
     } else {
         for (long k = 0; k < ct; k++) {
-            if (m_key->cmp(kvPairPtrKey(left,k), kvPairPtrKey(right,k), Py_NE, true)) {
-                if (m_key->cmp(kvPairPtrKey(left,k), kvPairPtrKey(right,k), Py_LT, true)) {
+            if (m_key->cmp(leftPairs[k], rightPairs[k], Py_NE, true)) {
+                if (m_key->cmp(leftPairs[k], rightPairs[k], Py_LT, true)) {
                     return cmpResultToBoolForPyOrdering(pyComparisonOp, -1);
                 }
                 return cmpResultToBoolForPyOrdering(pyComparisonOp, 1);
@@ -236,8 +259,11 @@ bool ConstDictType::cmp(instance_ptr left, instance_ptr right, int pyComparisonO
 
         if (compareValues) {
             for (long k = 0; k < ct; k++) {
-                if (m_value->cmp(kvPairPtrValue(left,k), kvPairPtrValue(right,k), Py_NE, true)) {
-                    if (m_value->cmp(kvPairPtrValue(left,k), kvPairPtrValue(right,k), Py_LT, true)) {
+                instance_ptr leftValue = leftPairs[k] + m_bytes_per_key;
+                instance_ptr rightValue = rightPairs[k] + m_bytes_per_key;
+
+                if (m_value->cmp(leftValue, rightValue, Py_NE, true)) {
+                    if (m_value->cmp(leftValue, rightValue, Py_LT, true)) {
                         return cmpResultToBoolForPyOrdering(pyComparisonOp, -1);
                     }
                     return cmpResultToBoolForPyOrdering(pyComparisonOp, 1);
@@ -250,62 +276,462 @@ bool ConstDictType::cmp(instance_ptr left, instance_ptr right, int pyComparisonO
 }
 
 void ConstDictType::addDicts(instance_ptr lhs, instance_ptr rhs, instance_ptr output) {
+    int64_t lhsCount = size(lhs);
+    int64_t rhsCount = size(rhs);
+
+    // adding a few keys to a large dict: update it in place, so that the
+    // result shares all but the updated paths with 'lhs'.
+    if (lhsCount > LEAF_CAPACITY && rhsCount * 16 < lhsCount) {
+        copy_constructor(output, lhs);
+
+        visitKeyValuePairsSeparately(rhs, [&](instance_ptr key, instance_ptr value) {
+            layout* updated;
+            insertKey(output, key, value, (instance_ptr)&updated);
+            destroy(output);
+            *(layout**)output = updated;
+            return true;
+        });
+
+        return;
+    }
+
     std::vector<instance_ptr> keep;
+    std::vector<instance_ptr> added;
+
+    visitKeyValuePairs(lhs, [&](instance_ptr lhsPair) {
+        if (!lookupValueByKey(rhs, lhsPair)) {
+            keep.push_back(lhsPair);
+        }
+        return true;
+    });
+
+    visitKeyValuePairs(rhs, [&](instance_ptr rhsPair) {
+        added.push_back(rhsPair);
+        return true;
+    });
 
-    int64_t lhsCount = count(lhs);
-    int64_t rhsCount = count(rhs);
+    // both sides are already sorted, so we can just merge them.
+    std::vector<instance_ptr> merged;
+    merged.reserve(keep.size() + added.size());
 
-    for (long k = 0; k < lhsCount; k++) {
-        instance_ptr lhsVal = kvPairPtrKey(lhs, k);
+    std::merge(
+        keep.begin(), keep.end(),
+        added.begin(), added.end(),
+        std::back_inserter(merged),
+        [&](instance_ptr l, instance_ptr r) { return m_key->cmp(l, r, Py_LT, true); }
+    );
+
+    constructLeaf(output, merged);
+}
 
-        if (!lookupValueByKey(rhs, lhsVal)) {
-            keep.push_back(lhsVal);
+void ConstDictType::subtractTupleOfKeysFromDict(instance_ptr lhs, instance_ptr rhs, instance_ptr output) {
+    TupleOfType* tupleType = tupleOfKeysType();
+
+    int64_t lhsCount = size(lhs);
+    int64_t rhsCount = tupleType->count(rhs);
+
+    // removing a few keys from a large dict: update it in place, so that the
+    // result shares all but the updated paths with 'lhs'.
+    if (lhsCount > LEAF_CAPACITY && rhsCount * 16 < lhsCount) {
+        copy_constructor(output, lhs);
+
+        for (long k = 0; k < rhsCount; k++) {
+            layout* updated;
+
+            if (removeKey(output, tupleType->eltPtr(rhs, k), (instance_ptr)&updated)) {
+                destroy(output);
+                *(layout**)output = updated;
+            } else {
+                destroy((instance_ptr)&updated);
+            }
         }
+
+        return;
     }
 
-    constructor(output, rhsCount + keep.size(), false);
+    std::set<instance_ptr> remove;
 
     for (long k = 0; k < rhsCount; k++) {
-        m_key->copy_constructor(kvPairPtrKey(output,k), kvPairPtrKey(rhs, k));
-        m_value->copy_constructor(kvPairPtrValue(output,k), kvPairPtrValue(rhs, k));
+        instance_ptr value = lookupValueByKey(lhs, tupleType->eltPtr(rhs, k));
+        if (value) {
+            remove.insert(value - m_bytes_per_key);
+        }
+    }
+
+    std::vector<instance_ptr> pairs;
+
+    visitKeyValuePairs(lhs, [&](instance_ptr pair) {
+        if (remove.find(pair) == remove.end()) {
+            pairs.push_back(pair);
+        }
+        return true;
+    });
+
+    constructLeaf(output, pairs);
+}
+
+void ConstDictType::insertKey(instance_ptr self, instance_ptr key, instance_ptr value, instance_ptr output) {
+    std::vector<uint8_t> pair(m_bytes_per_key_value_pair);
+
+    m_key->copy_constructor(pair.data(), key);
+    m_value->copy_constructor(pair.data() + m_bytes_per_key, value);
+
+    layout* root;
+    copy_constructor((instance_ptr)&root, self);
+
+    if (root && !root->subpointers && root->count > LEAF_CAPACITY) {
+        layout* tree;
+        constructTreeFromLeaf((instance_ptr)&tree, (instance_ptr)&root);
+        destroy((instance_ptr)&root);
+        root = tree;
+    }
+
+    if (!root) {
+        constructLeaf(output, std::vector<instance_ptr>({pair.data()}));
+    } else {
+        layout* halves[2] = {nullptr, nullptr};
+
+        if (insertIntoNode((instance_ptr)&root, pair.data(), (instance_ptr)&halves[0], (instance_ptr)&halves[1])) {
+            constructBranch(output, std::vector<instance_ptr>({(instance_ptr)&halves[0], (instance_ptr)&halves[1]}));
+            destroy((instance_ptr)&halves[0]);
+            destroy((instance_ptr)&halves[1]);
+        } else {
+            *(layout**)output = halves[0];
+        }
     }
-    for (long k = 0; k < keep.size(); k++) {
-        m_key->copy_constructor(kvPairPtrKey(output,k + rhsCount), keep[k]);
-        m_value->copy_constructor(kvPairPtrValue(output,k + rhsCount), keep[k] + m_bytes_per_key);
+
+    destroy((instance_ptr)&root);
+
+    m_key->destroy(pair.data());
+    m_value->destroy(pair.data() + m_bytes_per_key);
+}
+
+bool ConstDictType::removeKey(instance_ptr self, instance_ptr key, instance_ptr output) {
+    if (!lookupValueByKey(self, key)) {
+        copy_constructor(output, self);
+        return false;
+    }
+
+    layout* root;
+    copy_constructor((instance_ptr)&root, self);
+
+    if (root->subpointers == 0 && root->count > LEAF_CAPACITY) {
+        layout* tree;
+        constructTreeFromLeaf((instance_ptr)&tree, (instance_ptr)&root);
+        destroy((instance_ptr)&root);
+        root = tree;
     }
-    incKvPairCount(output, keep.size() + rhsCount);
 
-    sortKvPairs(output);
+    removeFromNode((instance_ptr)&root, key, output);
+
+    destroy((instance_ptr)&root);
+
+    // an interior node with one subtree is just that subtree
+    while (*(layout**)output && (*(layout**)output)->subpointers == 1) {
+        layout* subtree;
+        copy_constructor((instance_ptr)&subtree, kdPairPtrDict(output, 0));
+        destroy(output);
+        *(layout**)output = subtree;
+    }
+
+    return true;
 }
 
-void ConstDictType::subtractTupleOfKeysFromDict(instance_ptr lhs, instance_ptr rhs, instance_ptr output) {
-    TupleOfType* tupleType = tupleOfKeysType();
+int64_t ConstDictType::nodeEntryCount(instance_ptr self) {
+    layout* record = *(layout**)self;
 
-    int64_t lhsCount = count(lhs);
-    int64_t rhsCount = tupleType->count(rhs);
+    if (!record) {
+        return 0;
+    }
 
-    std::set<int> remove;
+    return record->subpointers ? record->subpointers : record->count;
+}
 
-    for (long k = 0; k < rhsCount; k++) {
-        int64_t index = lookupIndexByKey(lhs, tupleType->eltPtr(rhs, k));
-        if (index != -1) {
-            remove.insert(index);
+int64_t ConstDictType::subtreeIndexForKey(instance_ptr self, instance_ptr key) {
+    layout& record = **(layout**)self;
+
+    // find the first subtree whose smallest key is greater than 'key'
+    long low = 0;
+    long high = record.subpointers;
+
+    while (low < high) {
+        long mid = (low + high) / 2;
+
+        if (m_key->cmp(key, kdPairPtrKey(self, mid), Py_LT, true)) {
+            high = mid;
+        } else {
+            low = mid + 1;
+        }
+    }
+
+    return low - 1;
+}
+
+void ConstDictType::constructLeaf(instance_ptr self, const std::vector<instance_ptr>& pairs) {
+    constructor(self, pairs.size(), false);
+
+    for (long k = 0; k < pairs.size(); k++) {
+        m_key->copy_constructor(kvPairPtrKey(self, k), pairs[k]);
+        m_value->copy_constructor(kvPairPtrValue(self, k), pairs[k] + m_bytes_per_key);
+    }
+
+    incKvPairCount(self, pairs.size());
+}
+
+void ConstDictType::constructBranch(instance_ptr self, const std::vector<instance_ptr>& subtrees) {
+    constructor(self, subtrees.size(), true);
+
+    layout& record = **(layout**)self;
+
+    int64_t total = 0;
+
+    for (long k = 0; k < subtrees.size(); k++) {
+        // each subtree is keyed by its smallest key
+        m_key->copy_constructor(kdPairPtrKey(self, k), kvPairPtrKey(subtrees[k], 0));
+        copy_constructor(kdPairPtrDict(self, k), subtrees[k]);
+
+        total += size(subtrees[k]);
+    }
+
+    record.subpointers = subtrees.size();
+    record.count = total;
+}
+
+bool ConstDictType::constructNodes(
+    const std::vector<instance_ptr>& entries,
+    bool isBranch,
+    instance_ptr out,
+    instance_ptr outSplit
+) {
+    auto construct = [&](instance_ptr tgt, const std::vector<instance_ptr>& nodeEntries) {
+        if (isBranch) {
+            constructBranch(tgt, nodeEntries);
+        } else {
+            constructLeaf(tgt, nodeEntries);
+        }
+    };
+
+    if (entries.size() <= (isBranch ? BRANCH_CAPACITY : LEAF_CAPACITY)) {
+        construct(out, entries);
+        return false;
+    }
+
+    size_t half = entries.size() / 2;
+
+    construct(out, std::vector<instance_ptr>(entries.begin(), entries.begin() + half));
+    construct(outSplit, std::vector<instance_ptr>(entries.begin() + half, entries.end()));
+
+    return true;
+}
+
+void ConstDictType::constructTreeFromLeaf(instance_ptr self, instance_ptr leaf) {
+    // fill nodes 3/4 of the way, so they have room to grow before splitting
+    auto chunkBoundaries = [&](int64_t count, int64_t capacity) {
+        int64_t chunks = (count + capacity * 3 / 4 - 1) / (capacity * 3 / 4);
+
+        std::vector<int64_t> boundaries;
+        for (long k = 0; k <= chunks; k++) {
+            boundaries.push_back(count * k / chunks);
         }
+
+        return boundaries;
+    };
+
+    std::vector<layout*> nodes;
+
+    std::vector<int64_t> boundaries = chunkBoundaries(count(leaf), LEAF_CAPACITY);
+
+    for (long k = 0; k + 1 < boundaries.size(); k++) {
+        std::vector<instance_ptr> pairs;
+
+        for (long i = boundaries[k]; i < boundaries[k + 1]; i++) {
+            pairs.push_back(kvPairPtrKey(leaf, i));
+        }
+
+        nodes.push_back(nullptr);
+        constructLeaf((instance_ptr)&nodes.back(), pairs);
+    }
+
+    while (nodes.size() > 1) {
+        std::vector<layout*> parents;
+
+        boundaries = chunkBoundaries(nodes.size(), BRANCH_CAPACITY);
+
+        for (long k = 0; k + 1 < boundaries.size(); k++) {
+            std::vector<instance_ptr> subtrees;
+
+            for (long i = boundaries[k]; i < boundaries[k + 1]; i++) {
+                subtrees.push_back((instance_ptr)&nodes[i]);
+            }
+
+            parents.push_back(nullptr);
+            constructBranch((instance_ptr)&parents.back(), subtrees);
+        }
+
+        for (auto& node: nodes) {
+            destroy((instance_ptr)&node);
+        }
+
+        nodes.swap(parents);
+    }
+
+    *(layout**)self = nodes[0];
+}
+
+bool ConstDictType::insertIntoNode(instance_ptr self, instance_ptr pair, instance_ptr out, instance_ptr outSplit) {
+    layout& record = **(layout**)self;
+
+    if (!record.subpointers) {
+        // find the first key that's not less than the new one
+        long low = 0;
+        long high = record.count;
+
+        while (low < high) {
+            long mid = (low + high) / 2;
+
+            if (m_key->cmp(kvPairPtrKey(self, mid), pair, Py_LT, true)) {
+                low = mid + 1;
+            } else {
+                high = mid;
+            }
+        }
+
+        bool replacesExisting = low < record.count && m_key->cmp(kvPairPtrKey(self, low), pair, Py_EQ, true);
+
+        std::vector<instance_ptr> pairs;
+
+        for (long k = 0; k < record.count; k++) {
+            if (k == low) {
+                pairs.push_back(pair);
+            }
+            if (k != low || !replacesExisting) {
+                pairs.push_back(kvPairPtrKey(self, k));
+            }
+        }
+
+        if (low == record.count) {
+            pairs.push_back(pair);
+        }
+
+        return constructNodes(pairs, false, out, outSplit);
+    }
+
+    // a key smaller than any in the tree goes in the first subtree
+    int64_t index = std::max<int64_t>(0, subtreeIndexForKey(self, pair));
+
+    layout* newSubtrees[2] = {nullptr, nullptr};
+
+    bool subtreeSplit = insertIntoNode(
+        kdPairPtrDict(self, index),
+        pair,
+        (instance_ptr)&newSubtrees[0],
+        (instance_ptr)&newSubtrees[1]
+    );
+
+    std::vector<instance_ptr> subtrees;
+
+    for (long k = 0; k < record.subpointers; k++) {
+        if (k == index) {
+            subtrees.push_back((instance_ptr)&newSubtrees[0]);
+            if (subtreeSplit) {
+                subtrees.push_back((instance_ptr)&newSubtrees[1]);
+            }
+        } else {
+            subtrees.push_back(kdPairPtrDict(self, k));
+        }
+    }
+
+    bool split = constructNodes(subtrees, true, out, outSplit);
+
+    destroy((instance_ptr)&newSubtrees[0]);
+    destroy((instance_ptr)&newSubtrees[1]);
+
+    return split;
+}
+
+bool ConstDictType::removeFromNode(instance_ptr self, instance_ptr key, instance_ptr out) {
+    layout& record = **(layout**)self;
+
+    if (!record.subpointers) {
+        int64_t index = lookupIndexByKey(self, key);
+
+        if (index == -1) {
+            return false;
+        }
+
+        std::vector<instance_ptr> pairs;
+
+        for (long k = 0; k < record.count; k++) {
+            if (k != index) {
+                pairs.push_back(kvPairPtrKey(self, k));
+            }
+        }
+
+        constructLeaf(out, pairs);
+
+        return true;
     }
 
-    constructor(output, lhsCount - remove.size(), false);
+    int64_t index = subtreeIndexForKey(self, key);
 
-    long written = 0;
-    for (long k = 0; k < lhsCount; k++) {
-        if (remove.find(k) == remove.end()) {
-            m_key->copy_constructor(kvPairPtrKey(output,written), kvPairPtrKey(lhs, k));
-            m_value->copy_constructor(kvPairPtrValue(output,written), kvPairPtrValue(lhs, k));
+    if (index == -1) {
+        return false;
+    }
+
+    layout* newSubtree;
 
-            written++;
+    if (!removeFromNode(kdPairPtrDict(self, index), key, (instance_ptr)&newSubtree)) {
+        return false;
+    }
+
+    std::vector<instance_ptr> subtrees;
+
+    for (long k = 0; k < record.subpointers; k++) {
+        subtrees.push_back(k == index ? (instance_ptr)&newSubtree : kdPairPtrDict(self, k));
+    }
+
+    // all of our subtrees are at the same depth, so if the new subtree has
+    // gotten small we can merge it with a neighbor.
+    layout* merged = nullptr;
+
+    if (!newSubtree) {
+        subtrees.erase(subtrees.begin() + index);
+    } else {
+        bool isBranch = newSubtree->subpointers != 0;
+        int64_t capacity = isBranch ? BRANCH_CAPACITY : LEAF_CAPACITY;
+
+        if (nodeEntryCount((instance_ptr)&newSubtree) < capacity / 4 && subtrees.size() > 1) {
+            int64_t left = index > 0 ? index - 1 : index;
+
+            if (nodeEntryCount(subtrees[left]) + nodeEntryCount(subtrees[left + 1]) <= capacity) {
+                std::vector<instance_ptr> entries;
+
+                for (long side = 0; side < 2; side++) {
+                    instance_ptr node = subtrees[left + side];
+
+                    for (long k = 0; k < nodeEntryCount(node); k++) {
+                        entries.push_back(isBranch ? kdPairPtrDict(node, k) : kvPairPtrKey(node, k));
+                    }
+                }
+
+                constructNodes(entries, isBranch, (instance_ptr)&merged, nullptr);
+
+                subtrees.erase(subtrees.begin() + left + 1);
+                subtrees[left] = (instance_ptr)&merged;
+            }
         }
     }
 
-    incKvPairCount(output, written);
+    if (subtrees.size()) {
+        constructBranch(out, subtrees);
+    } else {
+        constructor(out, 0, false);
+    }
+
+    destroy((instance_ptr)&newSubtree);
+    destroy((instance_ptr)&merged);
+
+    return true;
 }
 
 instance_ptr ConstDictType::kdPairPtrKey(instance_ptr self, int64_t i) {
@@ -333,6 +759,8 @@ instance_ptr ConstDictType::kvPairPtrKey(instance_ptr self, int64_t i) {
         return self;
     }
 
+    self = leafForIndex(self, i);
+
     layout& record = **(layout**)self;
 
     return record.data + m_bytes_per_key_value_pair * i;
@@ -343,6 +771,8 @@ instance_ptr ConstDictType::kvPairPtrValue(instance_ptr self, int64_t i) {
         return self;
     }
 
+    self = leafForIndex(self, i);
+
     layout& record = **(layout**)self;
 
     return record.data + m_bytes_per_key_value_pair * i + m_bytes_per_key;
@@ -415,7 +845,7 @@ instance_ptr ConstDictType::keyTreePtr(instance_ptr self, int64_t i) {
 
 bool ConstDictType::instanceIsSubtrees(instance_ptr self) {
     if (!(*(layout**)self)) {
-        return self;
+        return false;
     }
 
     layout& record = **(layout**)self;
@@ -438,13 +868,7 @@ int64_t ConstDictType::count(instance_ptr self) {
         return 0;
     }
 
-    layout& record = **(layout**)self;
-
-    if (record.subpointers) {
-        return record.subpointers;
-    }
-
-    return record.count;
+    return (*(layout**)self)->count;
 }
 
 int64_t ConstDictType::size(instance_ptr self) {
@@ -482,12 +906,47 @@ int64_t ConstDictType::lookupIndexByKey(instance_ptr self, instance_ptr key) {
     return -1;
 }
 
+instance_ptr ConstDictType::leafForKey(instance_ptr self, instance_ptr key) {
+    while (instanceIsSubtrees(self)) {
+        int64_t index = subtreeIndexForKey(self, key);
+
+        if (index == -1) {
+            return nullptr;
+        }
+
+        self = kdPairPtrDict(self, index);
+    }
+
+    return self;
+}
+
+instance_ptr ConstDictType::leafForIndex(instance_ptr self, int64_t& i) {
+    while (instanceIsSubtrees(self)) {
+        layout& record = **(layout**)self;
+
+        long k = 0;
+        while (k + 1 < record.subpointers && i >= size(kdPairPtrDict(self, k))) {
+            i -= size(kdPairPtrDict(self, k));
+            k++;
+        }
+
+        self = kdPairPtrDict(self, k);
+    }
+
+    return self;
+}
+
 instance_ptr ConstDictType::lookupValueByKey(instance_ptr self, instance_ptr key) {
-    int64_t offset = lookupIndexByKey(self, key);
+    instance_ptr leaf = leafForKey(self, key);
+    if (!leaf) {
+        return 0;
+    }
+
+    int64_t offset = lookupIndexByKey(leaf, key);
     if (offset == -1) {
         return 0;
     }
-    return kvPairPtrValue(self, offset);
+    return kvPairPtrValue(leaf, offset);
 }
 
 void ConstDictType::constructor(instance_ptr self, int64_t space, bool isPointerTree) {
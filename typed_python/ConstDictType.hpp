@@ -79,51 +79,49 @@ public:
     // each value. if it returns 'false', exit early.
     template<class visitor_type>
     void visitValues(instance_ptr self, visitor_type visitor) {
-        size_t ct = count(self);
-
-        for (long k = 0; k < ct; k++) {
-            if (!visitor(kvPairPtrValue(self, k))) {
-                return;
-            }
-        }
+        visitLeafEntries(self, [&](instance_ptr key) {
+            return visitor(key + m_bytes_per_key);
+        });
     }
 
     // hand 'visitor' each key and value instance_ptr as a single tuple.
     // if it returns 'false', exit early.
     template<class visitor_type>
     void visitKeyValuePairs(instance_ptr self, visitor_type visitor) {
-        size_t ct = count(self);
-
-        for (long k = 0; k < ct; k++) {
-            if (!visitor(kvPairPtrKey(self, k))) {
-                return;
-            }
-        }
+        visitLeafEntries(self, [&](instance_ptr key) {
+            return visitor(key);
+        });
     }
 
     // hand 'visitor' each key and value instance_ptr as two separate arguments.
     // if it returns 'false', exit early.
     template<class visitor_type>
     void visitKeyValuePairsSeparately(instance_ptr self, visitor_type visitor) {
-        size_t ct = count(self);
-
-        for (long k = 0; k < ct; k++) {
-            if (!visitor(kvPairPtrKey(self, k), kvPairPtrValue(self, k))) {
-                return;
-            }
-        }
+        visitLeafEntries(self, [&](instance_ptr key) {
+            return visitor(key, key + m_bytes_per_key);
+        });
     }
 
     template<class buf_t>
     void serialize(instance_ptr self, buf_t& buffer, size_t fieldNumber) {
-        size_t ct = count(self);
+        size_t ct = size(self);
 
+        if (buffer.isDedupEnabled() && *(layout**)self && buffer.writeDedupReference(
+                buffer.dedupIndexForIdentity(*(void**)self, this),
+                fieldNumber
+            )) {
+            return;
+        }
+
+        // trees are written out as a flat list of pairs, which is what they
+        // deserialize back into.
         buffer.writeBeginCompound(fieldNumber);
         buffer.writeUnsignedVarintObject(0, ct);
-        for (long k = 0; k < ct;k++) {
-            m_key->serialize(kvPairPtrKey(self,k),buffer, 0);
-            m_value->serialize(kvPairPtrValue(self,k),buffer, 0);
-        }
+        visitKeyValuePairsSeparately(self, [&](instance_ptr key, instance_ptr value) {
+            m_key->serialize(key, buffer, 0);
+            m_value->serialize(value, buffer, 0);
+            return true;
+        });
 
         buffer.writeEndCompound();
     }
@@ -131,7 +129,7 @@ public:
     void deepcopyConcrete(
         instance_ptr dest,
         instance_ptr src,
-        std::unordered_map<instance_ptr, instance_ptr>& alreadyAllocated,
+        DeepcopyMap& alreadyAllocated,
         Slab* slab
     ) {
         layout_ptr& destRecordPtr = *(layout**)dest;
@@ -217,10 +215,12 @@ public:
         }
 
         size_t res = bytesRequiredForAllocation(
-            sizeof(layout)
-            + l->subpointers * m_bytes_per_key_subtree_pair
-            + l->count * m_bytes_per_key_value_pair
-            );
+            sizeof(layout) + (
+                l->subpointers ?
+                    l->subpointers * m_bytes_per_key_subtree_pair
+                :   l->count * m_bytes_per_key_value_pair
+            )
+        );
 
         if (l->subpointers) {
             for (long k = 0; k < l->subpointers; k++) {
@@ -239,6 +239,13 @@ public:
 
     template<class buf_t>
     void deserialize(instance_ptr self, buf_t& buffer, size_t wireType) {
+        buffer.template readPossiblyDeduped<layout>(self, wireType, this, [&](size_t wireType) {
+            deserializeValue(self, buffer, wireType);
+        });
+    }
+
+    template<class buf_t>
+    void deserializeValue(instance_ptr self, buf_t& buffer, size_t wireType) {
         int32_t ct = -1;
 
         size_t valuesRead = buffer.consumeCompoundMessageWithImpliedFieldNumbers(wireType,
@@ -287,6 +294,14 @@ public:
 
     void subtractTupleOfKeysFromDict(instance_ptr lhs, instance_ptr rhs, instance_ptr output);
 
+    // construct in 'output' a copy of 'self' with 'key' set to 'value'. This
+    // only copies the nodes on the path to 'key', sharing the rest with 'self'.
+    void insertKey(instance_ptr self, instance_ptr key, instance_ptr value, instance_ptr output);
+
+    // construct in 'output' a copy of 'self' without 'key'. Returns false
+    // (and copies 'self') if 'key' isn't present.
+    bool removeKey(instance_ptr self, instance_ptr key, instance_ptr output);
+
     instance_ptr kdPairPtrKey(instance_ptr self, int64_t i);
 
     instance_ptr kdPairPtrDict(instance_ptr self, int64_t i);
@@ -309,8 +324,15 @@ public:
 
     int64_t size(instance_ptr self);
 
+    // the index of 'key' in 'self', which must be a leaf (not a tree of subtrees)
     int64_t lookupIndexByKey(instance_ptr self, instance_ptr key);
 
+    // the leaf of 'self' that would contain 'key'. This is 'self' unless its a tree.
+    instance_ptr leafForKey(instance_ptr self, instance_ptr key);
+
+    // the leaf of 'self' containing the i'th key, updating 'i' to be the index within that leaf.
+    instance_ptr leafForIndex(instance_ptr self, int64_t& i);
+
     instance_ptr lookupValueByKey(instance_ptr self, instance_ptr key);
 
     void constructor(instance_ptr self, int64_t space, bool isPointerTree);
@@ -345,7 +367,81 @@ public:
     Type* keyType() const { return m_key; }
     Type* valueType() const { return m_value; }
 
+    // the number of pairs held directly in a leaf of a tree. ConstDicts
+    // constructed in bulk are a single leaf of any size, but we break them
+    // up into a tree of leaves this size the first time they're updated
+    // incrementally, so that subsequent updates can share most of the tree.
+    static const int64_t LEAF_CAPACITY = 64;
+
+    // the number of subtrees held by an interior node of a tree.
+    static const int64_t BRANCH_CAPACITY = 32;
+
 private:
+    // call 'visitor' with a pointer to each key in order. The value is laid out
+    // directly after it. Returns false if the visitor exited early.
+    template<class visitor_type>
+    bool visitLeafEntries(instance_ptr self, const visitor_type& visitor) {
+        layout* record = *(layout**)self;
+
+        if (!record) {
+            return true;
+        }
+
+        if (record->subpointers) {
+            for (long k = 0; k < record->subpointers; k++) {
+                if (!visitLeafEntries(kdPairPtrDict(self, k), visitor)) {
+                    return false;
+                }
+            }
+        } else {
+            for (long k = 0; k < record->count; k++) {
+                if (!visitor(record->data + m_bytes_per_key_value_pair * k)) {
+                    return false;
+                }
+            }
+        }
+
+        return true;
+    }
+
+    // the number of entries directly in this node: subtrees for an interior
+    // node and pairs for a leaf.
+    int64_t nodeEntryCount(instance_ptr self);
+
+    // the index of the subtree of interior node 'self' that would contain 'key',
+    // or -1 if 'key' is smaller than every key in the node.
+    int64_t subtreeIndexForKey(instance_ptr self, instance_ptr key);
+
+    // construct a leaf out of 'pairs', which point at sorted (key, value) pairs.
+    void constructLeaf(instance_ptr self, const std::vector<instance_ptr>& pairs);
+
+    // construct an interior node out of 'subtrees', which must be nonempty
+    // and in order.
+    void constructBranch(instance_ptr self, const std::vector<instance_ptr>& subtrees);
+
+    // construct one or two nodes in 'out' (and 'outSplit') holding the
+    // entries in 'entries', splitting them if there are more than 'capacity'.
+    // Returns whether it split.
+    bool constructNodes(
+        const std::vector<instance_ptr>& entries,
+        bool isBranch,
+        instance_ptr out,
+        instance_ptr outSplit
+    );
+
+    // construct a tree out of a large single-leaf dict.
+    void constructTreeFromLeaf(instance_ptr self, instance_ptr leaf);
+
+    // construct in 'out' a copy of node 'self' with 'pair' (a key followed
+    // by its value) inserted into it. If the node overflows, its split in
+    // half and the second half goes in 'outSplit'. Returns whether it split.
+    bool insertIntoNode(instance_ptr self, instance_ptr pair, instance_ptr out, instance_ptr outSplit);
+
+    // construct in 'out' a copy of node 'self' without 'key', merging small
+    // subtrees with their neighbors. Returns false, and doesn't construct
+    // anything, if 'key' isn't present.
+    bool removeFromNode(instance_ptr self, instance_ptr key, instance_ptr out);
+
     Type* m_key;
     Type* m_value;
     size_t m_bytes_per_key;
@@ -0,0 +1,149 @@
+/******************************************************************************
+   Copyright 2017-2021 typed_python Authors
+
+   Licensed under the Apache License, Version 2.0 (the "License");
+   you may not use this file except in compliance with the License.
+   You may obtain a copy of the License at
+
+       http://www.apache.org/licenses/LICENSE-2.0
+
+   Unless required by applicable law or agreed to in writing, software
+   distributed under the License is distributed on an "AS IS" BASIS,
+   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+   See the License for the specific language governing permissions and
+   limitations under the License.
+******************************************************************************/
+
+#pragma once
+
+#include <cstdint>
+#include <cstdlib>
+#include <cstring>
+#include <new>
+#include <stdexcept>
+#include <utility>
+
+/****************
+
+DeepcopyMap:
+
+Maps each object the deepcopier has already visited to its copy, so that
+objects referenced from several places in the graph are copied once.
+
+Every node of the graph gets looked up, so this is an open-addressing table
+with linear probing rather than a std::unordered_map: a lookup is a hash and a
+short scan of one contiguous array, instead of a walk through a heap-allocated
+bucket chain. Keys must be non-null.
+
+It supports the parts of the std::unordered_map interface the deepcopiers use:
+'find' (comparing against 'end'), 'it->second', and 'operator[]'.
+
+*****************/
+
+class DeepcopyMap {
+public:
+    typedef uint8_t* key_type;
+    typedef std::pair<key_type, key_type> value_type;
+    typedef value_type* iterator;
+
+    DeepcopyMap() :
+        mSlots(nullptr),
+        mCapacity(0),
+        mSize(0)
+    {
+    }
+
+    ~DeepcopyMap() {
+        ::free(mSlots);
+    }
+
+    DeepcopyMap(const DeepcopyMap&) = delete;
+    DeepcopyMap& operator=(const DeepcopyMap&) = delete;
+
+    size_t size() const {
+        return mSize;
+    }
+
+    iterator end() const {
+        return nullptr;
+    }
+
+    iterator find(key_type key) const {
+        if (!mSize) {
+            return end();
+        }
+
+        value_type* slot = slotFor(key);
+
+        return slot->first ? slot : end();
+    }
+
+    // return the copy of 'key', inserting a null one if there isn't one yet.
+    key_type& operator[](key_type key) {
+        if (!key) {
+            throw std::runtime_error("DeepcopyMap keys can't be null.");
+        }
+
+        // keep the load factor under 1/2 so probe sequences stay short
+        if ((mSize + 1) * 2 > mCapacity) {
+            grow();
+        }
+
+        value_type* slot = slotFor(key);
+
+        if (!slot->first) {
+            slot->first = key;
+            mSize++;
+        }
+
+        return slot->second;
+    }
+
+private:
+    static size_t hashKey(key_type key) {
+        // the keys are objects at least 16 bytes long, so the low bits carry
+        // little information. Fibonacci hashing spreads the rest over the table.
+        return ((uint64_t)(uintptr_t)key >> 4) * 11400714819323198485ull;
+    }
+
+    // the slot holding 'key', or the empty slot where it would go.
+    value_type* slotFor(key_type key) const {
+        size_t mask = mCapacity - 1;
+        size_t ix = (hashKey(key) >> 32) & mask;
+
+        while (mSlots[ix].first && mSlots[ix].first != key) {
+            ix = (ix + 1) & mask;
+        }
+
+        return &mSlots[ix];
+    }
+
+    void grow() {
+        value_type* oldSlots = mSlots;
+        size_t oldCapacity = mCapacity;
+
+        mCapacity = oldCapacity ? oldCapacity * 2 : 64;
+        mSlots = (value_type*)::calloc(mCapacity, sizeof(value_type));
+
+        if (!mSlots) {
+            mSlots = oldSlots;
+            mCapacity = oldCapacity;
+            throw std::bad_alloc();
+        }
+
+        for (size_t k = 0; k < oldCapacity; k++) {
+            if (oldSlots[k].first) {
+                *slotFor(oldSlots[k].first) = oldSlots[k];
+            }
+        }
+
+        ::free(oldSlots);
+    }
+
+    value_type* mSlots;
+
+    // always zero or a power of two
+    size_t mCapacity;
+
+    size_t mSize;
+};
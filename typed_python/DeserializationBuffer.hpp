@@ -18,6 +18,7 @@
 
 #include "Type.hpp"
 #include "WireType.hpp"
+#include "Slab.hpp"
 #include <stdexcept>
 #include <stdlib.h>
 #include <vector>
@@ -34,13 +35,27 @@ public:
             m_size(0),
             m_compressed_blocks(ptr),
             m_compressed_block_data_remaining(sz),
-            m_pos(0)
+            m_pos(0),
+            m_pod_slab(nullptr),
+            m_pod_data(nullptr),
+            m_pod_bytecount(0)
     {
     }
 
     ~DeserializationBuffer() {
-        PyEnsureGilAcquired acquireTheGil;
+        // only take the GIL if we have something to release, so that
+        // deserializers running without it can call 'releaseHeldObjects' first.
+        if (m_needs_decref.size() || m_pyobj_needs_decref.size()) {
+            PyEnsureGilAcquired acquireTheGil;
+
+            releaseHeldObjects();
+        }
+    }
 
+    // release the references we hold to the objects we've read. Callers may
+    // do this without the GIL only if none of the types they deserialized can
+    // hold python objects.
+    void releaseHeldObjects() {
         for (auto& typeAndList: m_needs_decref) {
             typeAndList.first->check([&](auto& concreteType) {
                 for (auto ptr: typeAndList.second) {
@@ -52,6 +67,9 @@ public:
         for (auto p: m_pyobj_needs_decref) {
             decref(p);
         }
+
+        m_needs_decref.clear();
+        m_pyobj_needs_decref.clear();
     }
 
     DeserializationBuffer(const DeserializationBuffer&) = delete;
@@ -306,7 +324,7 @@ public:
     }
 
     std::string readStringObject() {
-        int32_t sz = readUnsignedVarint();
+        size_t sz = readUnsignedVarint();
         return read_bytes_fun(sz, [&](uint8_t* ptr) {
             return std::string(ptr, ptr + sz);
         });
@@ -330,10 +348,104 @@ public:
         return m_pos;
     }
 
+    // append 'bytecount' bytes of uncompressed data to what's left to read. This
+    // lets one buffer, and its memo, read a stream that arrives in pieces.
+    void appendData(uint8_t* data, size_t bytecount) {
+        appendDecompressed(data, data + bytecount);
+    }
+
     const SerializationContext& getContext() const {
         return m_context;
     }
 
+    // read the element data of POD containers that were written with a pod buffer
+    // (see SerializationBuffer::writePodData) in place, out of the 'bytecount' bytes
+    // at 'data'. 'slab' must wrap that memory: each container's data becomes one of
+    // its allocations.
+    void setPodBuffer(Slab* slab, uint8_t* data, size_t bytecount) {
+        m_pod_slab = slab;
+        m_pod_data = data;
+        m_pod_bytecount = bytecount;
+    }
+
+    // return the 'bytecount' bytes of element data at 'offset' in the pod buffer as
+    // an allocation belonging to the pod buffer's Slab.
+    uint8_t* adoptPodData(size_t offset, size_t bytecount) {
+        if (!m_pod_slab) {
+            throw std::runtime_error("Corrupt data: this data refers to a pod buffer, but none was given.");
+        }
+
+        if (offset < sizeof(std::max_align_t) || offset > m_pod_bytecount || bytecount > m_pod_bytecount - offset) {
+            throw std::runtime_error("Corrupt data: pod buffer offset is out of bounds.");
+        }
+
+        if ((size_t)(m_pod_data + offset) % sizeof(void*)) {
+            throw std::runtime_error("The pod buffer is not aligned to a word boundary.");
+        }
+
+        return (uint8_t*)m_pod_slab->adoptAllocation(m_pod_data + offset);
+    }
+
+    // reserve the next dedup index for an object we're about to read. See
+    // SerializationBuffer::isDedupEnabled. We reserve it before reading the
+    // object's contents because the writer numbered it before writing them.
+    size_t reserveDedupIndex() {
+        m_deduped_objects.push_back(nullptr);
+        return m_deduped_objects.size() - 1;
+    }
+
+    // record the object for a reserved dedup index. 'ptr' must be the natural
+    // layout of a refcounted object of type 't'. We own one reference to it,
+    // which we release when the buffer is destroyed.
+    void setDedupedObject(size_t index, void* ptr, Type* t) {
+        if (!ptr) {
+            throw std::runtime_error("Corrupt data: can't dedup an empty object.");
+        }
+
+        m_deduped_objects[index] = ptr;
+        m_needs_decref[t].push_back(ptr);
+    }
+
+    // the object the writer gave dedup index 'index'. Callers take their own
+    // reference to it.
+    void* lookupDedupedObject(size_t index) {
+        if (index >= m_deduped_objects.size() || !m_deduped_objects[index]) {
+            throw std::runtime_error("Corrupt data: invalid dedup index.");
+        }
+
+        return m_deduped_objects[index];
+    }
+
+    // read a refcounted object whose natural layout is a 'layout_type*' at 'self',
+    // and which the writer may have deduplicated. 'readValue(wireType)' reads it
+    // from a regular message.
+    template<class layout_type, class read_fun>
+    void readPossiblyDeduped(instance_ptr self, size_t wireType, Type* t, const read_fun& readValue) {
+        if (wireType == WireType::VARINT) {
+            *(layout_type**)self = (layout_type*)lookupDedupedObject(readUnsignedVarint());
+            (*(layout_type**)self)->refcount++;
+            return;
+        }
+
+        if (wireType == WireType::SINGLE) {
+            size_t index = reserveDedupIndex();
+
+            auto fieldAndWire = readFieldNumberAndWireType();
+
+            if (fieldAndWire.first) {
+                throw std::runtime_error("Corrupt data: invalid deduplicated object.");
+            }
+
+            readValue(fieldAndWire.second);
+
+            setDedupedObject(index, *(void**)self, t);
+            (*(layout_type**)self)->refcount++;
+            return;
+        }
+
+        readValue(wireType);
+    }
+
     void* lookupCachedPointer(int32_t which) {
         if (which < 0) {
             throw std::runtime_error("corrupt data: invalid cache lookup");
@@ -547,13 +659,17 @@ private:
     }
 
     void pushDecompressedBuffer(std::shared_ptr<ByteBuffer> buf) {
+        appendDecompressed(buf->range().first, buf->range().second);
+    }
+
+    void appendDecompressed(uint8_t* begin, uint8_t* end) {
         m_decompressed_buffer.erase(m_decompressed_buffer.begin(), m_decompressed_buffer.begin() + m_read_head_offset);
         m_read_head_offset = 0;
 
-        m_decompressed_buffer.insert(m_decompressed_buffer.end(), buf->range().first, buf->range().second);
-        m_size += buf->range().second - buf->range().first;
+        m_decompressed_buffer.insert(m_decompressed_buffer.end(), begin, end);
+        m_size += end - begin;
 
-        m_read_head = &m_decompressed_buffer[0];
+        m_read_head = m_decompressed_buffer.data();
     }
 
     const SerializationContext& m_context;
@@ -578,4 +694,10 @@ private:
     std::map<Type*, std::vector<void*> > m_needs_decref;
 
     std::vector<PyObject*> m_pyobj_needs_decref;
+
+    std::vector<void*> m_deduped_objects;
+
+    Slab* m_pod_slab;
+    uint8_t* m_pod_data;
+    size_t m_pod_bytecount;
 };
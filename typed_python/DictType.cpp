@@ -268,7 +268,7 @@ instance_ptr DictType::lookupValueByKey(instance_ptr self, instance_ptr key) con
 
     typed_python_hash_type keyHash = m_key->hash(key);
 
-    int32_t index = record.find(m_bytes_per_key_value_pair, keyHash, [&](instance_ptr ptr) {
+    int64_t index = record.find(m_bytes_per_key_value_pair, keyHash, [&](instance_ptr ptr) {
         return m_key->cmp(key, ptr, Py_EQ, false);
     });
 
@@ -279,12 +279,38 @@ instance_ptr DictType::lookupValueByKey(instance_ptr self, instance_ptr key) con
     return 0;
 }
 
+void DictType::lookupValuesByKeys(instance_ptr self, instance_ptr keys, size_t count, instance_ptr* outValues) const {
+    hash_table_layout& record = **(hash_table_layout**)self;
+
+    std::vector<int64_t> slots(count);
+
+    record.findMany(
+        m_bytes_per_key_value_pair,
+        count,
+        [&](size_t k) { return m_key->hash(keys + k * m_bytes_per_key); },
+        [&](size_t k, instance_ptr ptr) { return m_key->cmp(keys + k * m_bytes_per_key, ptr, Py_EQ, false); },
+        slots.data()
+    );
+
+    for (size_t k = 0; k < count; k++) {
+        outValues[k] = slots[k] >= 0 ?
+            record.items + slots[k] * m_bytes_per_key_value_pair + m_bytes_per_key
+            : nullptr;
+    }
+}
+
+void DictType::reserve(instance_ptr self, size_t extra) const {
+    hash_table_layout& record = **(hash_table_layout**)self;
+
+    record.reserve(m_bytes_per_key_value_pair, extra);
+}
+
 bool DictType::deleteKey(instance_ptr self, instance_ptr key) const {
     hash_table_layout& record = **(hash_table_layout**)self;
 
     typed_python_hash_type keyHash = m_key->hash(key);
 
-    int32_t index = record.remove(m_bytes_per_key_value_pair, keyHash, [&](instance_ptr ptr) {
+    int64_t index = record.remove(m_bytes_per_key_value_pair, keyHash, [&](instance_ptr ptr) {
         return m_key->cmp(key, ptr, Py_EQ, false);
     });
 
@@ -317,7 +343,7 @@ bool DictType::deleteKeyWithUninitializedValue(instance_ptr self, instance_ptr k
 
     typed_python_hash_type keyHash = m_key->hash(key);
 
-    int32_t index = record.remove(m_bytes_per_key_value_pair, keyHash, [&](instance_ptr ptr) {
+    int64_t index = record.remove(m_bytes_per_key_value_pair, keyHash, [&](instance_ptr ptr) {
         return m_key->cmp(key, ptr, Py_EQ, false);
     });
 
@@ -333,7 +359,7 @@ instance_ptr DictType::insertKey(instance_ptr self, instance_ptr key) const {
 
     typed_python_hash_type keyHash = m_key->hash(key);
 
-    int32_t slot = record.allocateNewSlot(m_bytes_per_key_value_pair);
+    int64_t slot = record.allocateNewSlot(m_bytes_per_key_value_pair);
 
     record.add(keyHash, slot);
 
@@ -368,7 +394,8 @@ void DictType::destroy(instance_ptr self) {
         tp_free(record.items);
         tp_free(record.items_populated);
         tp_free(record.hash_table_slots);
-        tp_free(record.hash_table_hashes);
+        tp_free(record.hash_table_ctrl);
+        tp_free(record.items_hashes);
         tp_free(&record);
     }
 }
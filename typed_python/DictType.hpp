@@ -115,7 +115,7 @@ public:
     void deepcopyConcrete(
         instance_ptr dest,
         instance_ptr src,
-        std::unordered_map<instance_ptr, instance_ptr>& alreadyAllocated,
+        DeepcopyMap& alreadyAllocated,
         Slab* slab
     ) {
         hash_table_layout_ptr& destRecordPtr = *(hash_table_layout**)dest;
@@ -159,7 +159,11 @@ public:
         res += bytesRequiredForAllocation(l.items_reserved * m_bytes_per_key_value_pair);
 
         // count the hashtable
-        res += bytesRequiredForAllocation(sizeof(int32_t) * l.hash_table_size) * 2;
+        res += bytesRequiredForAllocation(sizeof(typed_python_hash_type) * l.items_reserved);
+        if (l.hash_table_slots) {
+            res += bytesRequiredForAllocation(sizeof(int64_t) * l.hash_table_size);
+            res += bytesRequiredForAllocation(l.ctrlBytecount());
+        }
 
         if (!m_key->isPOD()) {
             for (long k = 0; k < l.items_reserved; k++) {
@@ -302,6 +306,14 @@ public:
 
     instance_ptr lookupValueByKey(instance_ptr self, instance_ptr key) const;
 
+    // look up 'count' keys laid out contiguously at 'keys', writing a pointer
+    // to each one's value (or nullptr) into 'outValues'.
+    void lookupValuesByKeys(instance_ptr self, instance_ptr keys, size_t count, instance_ptr* outValues) const;
+
+    // make room for 'extra' more keys, so that inserting them doesn't grow
+    // the table along the way.
+    void reserve(instance_ptr self, size_t extra) const;
+
     // insert a new key, copy constructing 'key' but returning an uninitialized value pointer.
     instance_ptr insertKey(instance_ptr self, instance_ptr key) const;
 
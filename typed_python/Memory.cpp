@@ -1,22 +1,360 @@
 #include "Memory.hpp"
 #include "Slab.hpp"
+#include "Arena.hpp"
 
+#include <algorithm>
+#include <atomic>
 #include <cstddef>
+#include <cstring>
+#include <mutex>
+#include <unordered_set>
 
 static_assert(sizeof(Slab*) <= sizeof(std::max_align_t), "Can't fit a Slab* in the max_align_t?");
 
+namespace {
+
+const size_t kHeaderBytes = sizeof(std::max_align_t);
+
+const size_t kSizeClassBytes = 16;
+
+const size_t kSizeClassCount = TP_MAX_POOLED_BYTES / kSizeClassBytes;
+
+// how many bytes of free blocks a thread may cache for each size class
+// before returning half of them to the shared pool
+const size_t kThreadCacheBytes = 32 * 1024;
+
+// how many bytes of free blocks the shared pool may hold for each size class
+// before handing the rest back to malloc
+const size_t kSharedPoolBytes = 256 * 1024;
+
+bool isPooled(size_t s) {
+    return s <= TP_MAX_POOLED_BYTES;
+}
+
+size_t sizeClassFor(size_t s) {
+    return (s - 1) / kSizeClassBytes;
+}
+
+// the bytes backing a pooled block, including its header
+size_t blockBytesForClass(size_t sizeClass) {
+    return (sizeClass + 1) * kSizeClassBytes + kHeaderBytes;
+}
+
+// the bytes we account for an allocation of 's' bytes
+size_t bytesBackingAllocation(size_t s) {
+    if (isPooled(s)) {
+        return blockBytesForClass(sizeClassFor(s));
+    }
+
+    return s + kHeaderBytes;
+}
+
+size_t threadCacheLimit(size_t sizeClass) {
+    return std::max<size_t>(kThreadCacheBytes / blockBytesForClass(sizeClass), 8);
+}
+
+size_t sharedPoolLimit(size_t sizeClass) {
+    return kSharedPoolBytes / blockBytesForClass(sizeClass);
+}
+
+// free blocks are chained through their first word, which holds the
+// allocation header while the block is in use.
+struct FreeBlock {
+    FreeBlock* next;
+};
+
+// a list of free blocks of one size class.
+class FreeList {
+public:
+    FreeList() : mHead(nullptr), mCount(0) {}
+
+    bool empty() const {
+        return !mHead;
+    }
+
+    size_t size() const {
+        return mCount;
+    }
+
+    void push(FreeBlock* block) {
+        block->next = mHead;
+        mHead = block;
+        mCount++;
+    }
+
+    FreeBlock* pop() {
+        FreeBlock* res = mHead;
+        mHead = res->next;
+        mCount--;
+        return res;
+    }
+
+    // move up to 'count' blocks from the front of this list onto 'other'
+    void transferTo(FreeList& other, size_t count) {
+        while (count-- && mHead) {
+            other.push(pop());
+        }
+    }
+
+private:
+    FreeBlock* mHead;
+    size_t mCount;
+};
+
+// the pool of free blocks shared by all threads. Threads move blocks in and
+// out of it in batches, so its locks are taken rarely. Each block is its own
+// malloc allocation, so once the pool holds more than 'sharedPoolLimit' blocks
+// of a size class it can free the excess, and memory that a burst of threads
+// allocated and released doesn't stay with the pool forever.
+class SharedPool {
+public:
+    // move 'count' blocks of 'sizeClass' onto 'out', allocating new ones if
+    // we don't have enough.
+    void take(size_t sizeClass, FreeList& out, size_t count) {
+        size_t had = out.size();
+
+        {
+            std::lock_guard<std::mutex> lock(mMutexes[sizeClass]);
+
+            mBlocks[sizeClass].transferTo(out, count);
+        }
+
+        size_t blockBytes = blockBytesForClass(sizeClass);
+
+        for (size_t k = out.size() - had; k < count; k++) {
+            FreeBlock* block = (FreeBlock*)malloc(blockBytes);
+
+            if (!block) {
+                throw std::bad_alloc();
+            }
+
+            out.push(block);
+        }
+    }
+
+    // move 'count' blocks from 'in' into the pool, freeing any that take it
+    // over its limit.
+    void give(size_t sizeClass, FreeList& in, size_t count) {
+        FreeList excess;
+
+        {
+            std::lock_guard<std::mutex> lock(mMutexes[sizeClass]);
+
+            FreeList& blocks = mBlocks[sizeClass];
+
+            in.transferTo(blocks, count);
+
+            if (blocks.size() > sharedPoolLimit(sizeClass)) {
+                blocks.transferTo(excess, blocks.size() - sharedPoolLimit(sizeClass));
+            }
+        }
+
+        while (!excess.empty()) {
+            free(excess.pop());
+        }
+    }
+
+    static SharedPool& get() {
+        // never destroyed, since threads may still free memory during shutdown
+        static SharedPool* pool = new SharedPool();
+        return *pool;
+    }
+
+private:
+    std::mutex mMutexes[kSizeClassCount];
+
+    FreeList mBlocks[kSizeClassCount];
+};
+
+class ThreadCache;
+
+// the byte counters of every live thread, plus what exited threads counted.
+class ByteCounts {
+public:
+    ByteCounts() : mRetiredBytes(0) {}
+
+    void add(ThreadCache* cache) {
+        std::lock_guard<std::mutex> lock(mMutex);
+        mThreads.insert(cache);
+    }
+
+    void remove(ThreadCache* cache, int64_t bytes) {
+        std::lock_guard<std::mutex> lock(mMutex);
+        mThreads.erase(cache);
+        mRetiredBytes += bytes;
+    }
+
+    // account for bytes allocated or freed by a thread without a cache
+    void addRetired(int64_t bytes) {
+        mRetiredBytes += bytes;
+    }
+
+    int64_t total();
+
+    static ByteCounts& get() {
+        static ByteCounts* counts = new ByteCounts();
+        return *counts;
+    }
+
+private:
+    std::mutex mMutex;
+
+    std::unordered_set<ThreadCache*> mThreads;
+
+    std::atomic<int64_t> mRetiredBytes;
+};
+
+// each thread's free blocks and byte count. On thread exit, the blocks go
+// back to the shared pool and the count moves into ByteCounts.
+class ThreadCache {
+public:
+    ThreadCache() : mBytes(0) {
+        ByteCounts::get().add(this);
+    }
+
+    ~ThreadCache() {
+        for (size_t sizeClass = 0; sizeClass < kSizeClassCount; sizeClass++) {
+            SharedPool::get().give(sizeClass, mBlocks[sizeClass], mBlocks[sizeClass].size());
+        }
+
+        ByteCounts::get().remove(this, mBytes.load(std::memory_order_relaxed));
+
+        sDestroyed = true;
+    }
+
+    void* allocate(size_t sizeClass) {
+        FreeList& blocks = mBlocks[sizeClass];
+
+        if (blocks.empty()) {
+            SharedPool::get().take(sizeClass, blocks, threadCacheLimit(sizeClass) / 2);
+        }
+
+        return blocks.pop();
+    }
+
+    void release(size_t sizeClass, void* block) {
+        FreeList& blocks = mBlocks[sizeClass];
+
+        blocks.push((FreeBlock*)block);
+
+        if (blocks.size() > threadCacheLimit(sizeClass)) {
+            SharedPool::get().give(sizeClass, blocks, blocks.size() / 2);
+        }
+    }
+
+    // only this thread writes mBytes, so we don't need an atomic add. The
+    // atomic just lets other threads read it while summing.
+    void account(int64_t bytes) {
+        mBytes.store(mBytes.load(std::memory_order_relaxed) + bytes, std::memory_order_relaxed);
+    }
+
+    int64_t bytes() const {
+        return mBytes.load(std::memory_order_relaxed);
+    }
+
+    // the calling thread's cache, or nullptr if the thread is exiting and
+    // its cache was already destroyed.
+    static ThreadCache* get() {
+        if (sDestroyed) {
+            return nullptr;
+        }
+
+        static thread_local ThreadCache cache;
+
+        return &cache;
+    }
+
+private:
+    static thread_local bool sDestroyed;
+
+    FreeList mBlocks[kSizeClassCount];
+
+    std::atomic<int64_t> mBytes;
+};
+
+thread_local bool ThreadCache::sDestroyed = false;
+
+int64_t ByteCounts::total() {
+    std::lock_guard<std::mutex> lock(mMutex);
+
+    int64_t res = mRetiredBytes;
+
+    for (ThreadCache* cache: mThreads) {
+        res += cache->bytes();
+    }
+
+    return res;
+}
+
+void accountBytes(int64_t bytes) {
+    ThreadCache* cache = ThreadCache::get();
+
+    if (cache) {
+        cache->account(bytes);
+    } else {
+        ByteCounts::get().addRetired(bytes);
+    }
+}
+
+uint8_t* allocatePooled(size_t s) {
+    size_t sizeClass = sizeClassFor(s);
+
+    ThreadCache* cache = ThreadCache::get();
+
+    if (cache) {
+        return (uint8_t*)cache->allocate(sizeClass);
+    }
+
+    FreeList blocks;
+    SharedPool::get().take(sizeClass, blocks, 1);
+    return (uint8_t*)blocks.pop();
+}
+
+void freePooled(size_t s, uint8_t* m) {
+    size_t sizeClass = sizeClassFor(s);
+
+    ThreadCache* cache = ThreadCache::get();
+
+    if (cache) {
+        cache->release(sizeClass, m);
+        return;
+    }
+
+    FreeList blocks;
+    blocks.push((FreeBlock*)m);
+    SharedPool::get().give(sizeClass, blocks, 1);
+}
+
+} // anonymous namespace
+
+int64_t tpBytesAllocatedOnFreeStore() {
+    return ByteCounts::get().total();
+}
+
 void* tp_malloc(size_t s) {
     if (s == 0) {
         return nullptr;
     }
 
-    uint8_t* m = (uint8_t*)malloc(s + sizeof(std::max_align_t));
+    Arena* arena = Arena::current();
+
+    if (arena) {
+        return arena->allocate(s);
+    }
+
+    uint8_t* m;
+
+    if (isPooled(s)) {
+        m = allocatePooled(s);
+    } else {
+        m = (uint8_t*)malloc(s + kHeaderBytes);
+    }
 
     ((int64_t*)m)[0] = -(int64_t)s;
 
-    tpBytesAllocatedOnFreeStore() += s + sizeof(std::max_align_t);
+    accountBytes(bytesBackingAllocation(s));
 
-    return m + sizeof(std::max_align_t);
+    return m + kHeaderBytes;
 }
 
 void tp_free(void* p) {
@@ -24,13 +362,21 @@ void tp_free(void* p) {
         return;
     }
 
-    uint8_t* m = (uint8_t*)p - sizeof(std::max_align_t);
+    uint8_t* m = (uint8_t*)p - kHeaderBytes;
 
     int64_t sizeOrSlab = ((int64_t*)m)[0];
 
     if (sizeOrSlab <= 0) {
-        tpBytesAllocatedOnFreeStore() += sizeOrSlab - sizeof(std::max_align_t);
-        free(m);
+        size_t s = -sizeOrSlab;
+
+        accountBytes(-(int64_t)bytesBackingAllocation(s));
+
+        if (isPooled(s)) {
+            freePooled(s, m);
+        } else {
+            free(m);
+        }
+
         return;
     }
 
@@ -48,18 +394,34 @@ void* tp_realloc(void* p, size_t oldSize, size_t newSize) {
         return nullptr;
     }
 
-    uint8_t* m = (uint8_t*)p - sizeof(std::max_align_t);
+    uint8_t* m = (uint8_t*)p - kHeaderBytes;
 
     int64_t sizeOrSlab = ((int64_t*)m)[0];
 
     if (sizeOrSlab <= 0) {
-        tpBytesAllocatedOnFreeStore() += (int64_t)newSize - (int64_t)oldSize;
+        size_t s = -sizeOrSlab;
+
+        if (!isPooled(s) && !isPooled(newSize)) {
+            accountBytes((int64_t)newSize - (int64_t)s);
+
+            uint8_t* res = (uint8_t*)realloc(m, newSize + kHeaderBytes);
+
+            *(int64_t*)res = -(int64_t)newSize;
 
-        uint8_t* res = (uint8_t*)realloc(m, newSize + sizeof(std::max_align_t));
+            return res + kHeaderBytes;
+        }
 
-        *(int64_t*)res = -(int64_t)newSize;
+        if (isPooled(s) && isPooled(newSize) && sizeClassFor(s) == sizeClassFor(newSize)) {
+            // the block is already big enough
+            *(int64_t*)m = -(int64_t)newSize;
+            return p;
+        }
 
-        return res + sizeof(std::max_align_t);
+        void* newData = tp_malloc(newSize);
+        memcpy(newData, p, std::min(newSize, s));
+        tp_free(p);
+
+        return newData;
     } else {
         Slab* slab = ((Slab**)m)[0];
 
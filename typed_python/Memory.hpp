@@ -21,19 +21,37 @@
 Memory:
 
 This file defines the typed-python memory allocation model. In order to
-track memory usage and to allow memory to be allocated in slabs (and eventually
-maybe to allow explicit arena management for large applications), our
+track memory usage and to allow memory to be allocated in slabs (including
+explicitly managed arenas), our
 memory management routines pack an extra word at the beginning of every
 allocation.
 
 The word can either be the bytecount of the allocation with the top bit set,
-indicating that this is a direct allocation from malloc, or it can be a pointer
+indicating that this is an allocation from the free store, or it can be a pointer
 to a Slab object which we decref when the allocation is released.
 
+Free store allocations of up to TP_MAX_POOLED_BYTES come from pools of fixed
+size blocks, one per multiple of 16 bytes. Each thread keeps a cache of free
+blocks for each size class and only touches the shared pool (under a lock)
+to refill or drain that cache in batches, so small allocations and frees
+don't synchronize with other threads. A block freed on a different thread
+than the one that allocated it simply joins the freeing thread's cache.
+Both the thread caches and the shared pool hold a bounded number of blocks:
+a cache over its limit drains half its blocks into the shared pool, an
+exiting thread drains all of them, and the shared pool frees whatever takes
+it over its own limit. Larger allocations go directly to malloc.
+
+While an Arena (see Arena.hpp) is active on a thread, that thread's
+allocations come from the Arena's Slabs instead.
+
+Each thread also counts the bytes it allocates and frees in its own counter,
+so that the accounting doesn't contend on a shared atomic. The counters are
+summed when tpBytesAllocatedOnFreeStore is called.
+
 ***************/
 
 #include <cstddef>
-#include <atomic>
+#include <cstdint>
 
 extern "C" {
 
@@ -43,10 +61,13 @@ void tp_free(void* ptr);
 
 }
 
-inline std::atomic<size_t>& tpBytesAllocatedOnFreeStore() {
-   static std::atomic<size_t> allocatedCount;
-   return allocatedCount;
-}
+// allocations of at most this many bytes are served from per-thread pools
+#define TP_MAX_POOLED_BYTES 512
+
+// the total number of bytes currently allocated by tp_malloc, including
+// allocation headers and the padding of pooled blocks. This sums the
+// counters of every thread, so it's not meant to be called in a tight loop.
+int64_t tpBytesAllocatedOnFreeStore();
 
 // how many bytes are required to back an allocation of size 's'
 // accounts for alignment and extra pointers.
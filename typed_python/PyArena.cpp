@@ -0,0 +1,290 @@
+/******************************************************************************
+   Copyright 2017-2021 typed_python Authors
+
+   Licensed under the Apache License, Version 2.0 (the "License");
+   you may not use this file except in compliance with the License.
+   You may obtain a copy of the License at
+
+       http://www.apache.org/licenses/LICENSE-2.0
+
+   Unless required by applicable law or agreed to in writing, software
+   distributed under the License is distributed on an "AS IS" BASIS,
+   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+   See the License for the specific language governing permissions and
+   limitations under the License.
+******************************************************************************/
+
+#include "PyArena.hpp"
+#include "PythonObjectOfTypeType.hpp"
+
+
+PyDoc_STRVAR(PyArena_doc,
+    "Arena(initialBytecount=65536)\n\n"
+    "A scope for cheap scratch allocation. Inside 'with Arena():', every\n"
+    "typed_python allocation the current thread makes, including from compiled\n"
+    "code, is bump-allocated out of a growable chain of Slabs, the first of\n"
+    "which holds 'initialBytecount' bytes. Leaving the block releases all of\n"
+    "that memory at once.\n\n"
+    "Objects that outlive the block keep the Slab they were allocated in alive,\n"
+    "so they stay valid, but they pin the whole Slab. Use 'copyOut' to copy\n"
+    "anything you want to keep out of the arena, and 'liveAllocCount' to\n"
+    "check that nothing else escaped.\n\n"
+    "Arenas nest, and must be exited in the reverse order they were entered,\n"
+    "on the thread that entered them. Compiled code can enter and exit an\n"
+    "Arena without the GIL."
+);
+
+PyDoc_STRVAR(PyArena_isActive_doc,
+    "Arena.isActive() -> bool\n\n"
+    "Return True if the arena has been entered and not yet exited."
+);
+
+PyDoc_STRVAR(PyArena_bytecount_doc,
+    "Arena.bytecount() -> int\n\n"
+    "Return the total number of bytes in the arena's Slabs. This is 0 once\n"
+    "the arena has exited."
+);
+
+PyDoc_STRVAR(PyArena_liveAllocCount_doc,
+    "Arena.liveAllocCount() -> int\n\n"
+    "Return the number of allocations made in the arena that haven't been\n"
+    "released. Once the arena has exited, return the number that were still\n"
+    "alive when it did, which is the number of allocations that escaped it."
+);
+
+PyDoc_STRVAR(PyArena_copyOut_doc,
+    "Arena.copyOut(o) -> object\n\n"
+    "Return a deep copy of 'o' (see typed_python.deepcopy) allocated wherever\n"
+    "it would be if this arena weren't active, so that it can outlive the\n"
+    "arena without keeping its memory alive."
+);
+
+PyMethodDef PyArenaInstance_methods[] = {
+    {"__enter__", (PyCFunction)PyArenaObject::enter, METH_VARARGS | METH_KEYWORDS, NULL},
+    {"__exit__", (PyCFunction)PyArenaObject::exit, METH_VARARGS | METH_KEYWORDS, NULL},
+    {"isActive", (PyCFunction)PyArenaObject::isActive, METH_VARARGS | METH_KEYWORDS, PyArena_isActive_doc},
+    {"bytecount", (PyCFunction)PyArenaObject::bytecount, METH_VARARGS | METH_KEYWORDS, PyArena_bytecount_doc},
+    {"liveAllocCount", (PyCFunction)PyArenaObject::liveAllocCount, METH_VARARGS | METH_KEYWORDS, PyArena_liveAllocCount_doc},
+    {"copyOut", (PyCFunction)PyArenaObject::copyOut, METH_VARARGS | METH_KEYWORDS, PyArena_copyOut_doc},
+    {NULL}  /* Sentinel */
+};
+
+PyObject* PyArenaObject::enter(PyArenaObject* self, PyObject* args, PyObject* kwargs)
+{
+    static const char *kwlist[] = {NULL};
+
+    if (!PyArg_ParseTupleAndKeywords(args, kwargs, "", (char**)kwlist)) {
+        return NULL;
+    }
+
+    try {
+        self->mArena->enter();
+    } catch(std::exception& e) {
+        PyErr_SetString(PyExc_RuntimeError, e.what());
+        return NULL;
+    }
+
+    return incref((PyObject*)self);
+}
+
+PyObject* PyArenaObject::exit(PyArenaObject* self, PyObject* args, PyObject* kwargs)
+{
+    static const char *kwlist[] = {"exc_type", "exc_value", "traceback", NULL};
+
+    PyObject* excType;
+    PyObject* excValue;
+    PyObject* traceback;
+
+    if (!PyArg_ParseTupleAndKeywords(args, kwargs, "OOO", (char**)kwlist, &excType, &excValue, &traceback)) {
+        return NULL;
+    }
+
+    try {
+        self->mArena->exit();
+    } catch(std::exception& e) {
+        PyErr_SetString(PyExc_RuntimeError, e.what());
+        return NULL;
+    }
+
+    return incref(Py_False);
+}
+
+PyObject* PyArenaObject::isActive(PyArenaObject* self, PyObject* args, PyObject* kwargs)
+{
+    static const char *kwlist[] = {NULL};
+
+    if (!PyArg_ParseTupleAndKeywords(args, kwargs, "", (char**)kwlist)) {
+        return NULL;
+    }
+
+    return incref(self->mArena->isActive() ? Py_True : Py_False);
+}
+
+PyObject* PyArenaObject::bytecount(PyArenaObject* self, PyObject* args, PyObject* kwargs)
+{
+    static const char *kwlist[] = {NULL};
+
+    if (!PyArg_ParseTupleAndKeywords(args, kwargs, "", (char**)kwlist)) {
+        return NULL;
+    }
+
+    return PyLong_FromLong(self->mArena->bytecount());
+}
+
+PyObject* PyArenaObject::liveAllocCount(PyArenaObject* self, PyObject* args, PyObject* kwargs)
+{
+    static const char *kwlist[] = {NULL};
+
+    if (!PyArg_ParseTupleAndKeywords(args, kwargs, "", (char**)kwlist)) {
+        return NULL;
+    }
+
+    return PyLong_FromLong(self->mArena->liveAllocCount());
+}
+
+PyObject* PyArenaObject::copyOut(PyArenaObject* self, PyObject* args, PyObject* kwargs)
+{
+    static const char *kwlist[] = {"o", NULL};
+
+    PyObject* o;
+
+    if (!PyArg_ParseTupleAndKeywords(args, kwargs, "O", (char**)kwlist, &o)) {
+        return NULL;
+    }
+
+    return translateExceptionToPyObject([&]() {
+        PyObject* res = nullptr;
+
+        self->mArena->suspendWhile([&]() {
+            // this is the 'free store' slab, which allocates with tp_malloc
+            Slab* slab = new Slab(true, 0);
+
+            DeepcopyMap alreadyCopied;
+
+            try {
+                res = PythonObjectOfType::deepcopyPyObject(o, alreadyCopied, slab);
+            } catch(...) {
+                slab->decref();
+                throw;
+            }
+
+            slab->decref();
+        });
+
+        return res;
+    });
+}
+
+/* static */
+void PyArenaObject::dealloc(PyArenaObject *self)
+{
+    if (self->mArena) {
+        if (Arena::current() == self->mArena) {
+            self->mArena->exit();
+            delete self->mArena;
+        } else if (!self->mArena->orphan()) {
+            delete self->mArena;
+        }
+
+        // otherwise, some thread still allocates from it, and the Arena
+        // deletes itself once that thread exits it.
+    }
+
+    Py_TYPE(self)->tp_free((PyObject*)self);
+}
+
+/* static */
+PyObject* PyArenaObject::new_(PyTypeObject *type, PyObject *args, PyObject *kwargs)
+{
+    PyArenaObject* self;
+
+    self = (PyArenaObject*)type->tp_alloc(type, 0);
+
+    if (self != NULL) {
+        self->mArena = nullptr;
+    }
+
+    return (PyObject*)self;
+}
+
+/* static */
+int PyArenaObject::init(PyArenaObject *self, PyObject *args, PyObject *kwargs)
+{
+    static const char *kwlist[] = {"initialBytecount", NULL};
+
+    long initialBytecount = 65536;
+
+    if (!PyArg_ParseTupleAndKeywords(args, kwargs, "|l", (char**)kwlist, &initialBytecount)) {
+        return -1;
+    }
+
+    if (initialBytecount < 0) {
+        PyErr_Format(PyExc_ValueError, "initialBytecount can't be negative");
+        return -1;
+    }
+
+    if (self->mArena) {
+        PyErr_Format(PyExc_RuntimeError, "Arena is already initialized");
+        return -1;
+    }
+
+    self->mArena = new Arena(initialBytecount);
+
+    return 0;
+}
+
+
+PyTypeObject PyType_Arena = {
+    PyVarObject_HEAD_INIT(NULL, 0)
+    .tp_name = "Arena",
+    .tp_basicsize = sizeof(PyArenaObject),
+    .tp_itemsize = 0,
+    .tp_dealloc = (destructor) PyArenaObject::dealloc,
+    #if PY_MINOR_VERSION < 8
+    .tp_print = 0,
+    #else
+    .tp_vectorcall_offset = 0,                  // printfunc  (Changed to tp_vectorcall_offset in Python 3.8)
+    #endif
+    .tp_getattr = 0,
+    .tp_setattr = 0,
+    .tp_as_async = 0,
+    .tp_repr = 0,
+    .tp_as_number = 0,
+    .tp_as_sequence = 0,
+    .tp_as_mapping = 0,
+    .tp_hash = 0,
+    .tp_call = 0,
+    .tp_str = 0,
+    .tp_getattro = 0,
+    .tp_setattro = 0,
+    .tp_as_buffer = 0,
+    .tp_flags = Py_TPFLAGS_DEFAULT,
+    .tp_doc = PyArena_doc,
+    .tp_traverse = 0,
+    .tp_clear = 0,
+    .tp_richcompare = 0,
+    .tp_weaklistoffset = 0,
+    .tp_iter = 0,
+    .tp_iternext = 0,
+    .tp_methods = PyArenaInstance_methods,
+    .tp_members = 0,
+    .tp_getset = 0,
+    .tp_base = 0,
+    .tp_dict = 0,
+    .tp_descr_get = 0,
+    .tp_descr_set = 0,
+    .tp_dictoffset = 0,
+    .tp_init = (initproc) PyArenaObject::init,
+    .tp_alloc = 0,
+    .tp_new = PyArenaObject::new_,
+    .tp_free = 0,
+    .tp_is_gc = 0,
+    .tp_bases = 0,
+    .tp_mro = 0,
+    .tp_cache = 0,
+    .tp_subclasses = 0,
+    .tp_weaklist = 0,
+    .tp_del = 0,
+    .tp_version_tag = 0,
+    .tp_finalize = 0,
+};
@@ -0,0 +1,47 @@
+/******************************************************************************
+   Copyright 2017-2021 typed_python Authors
+
+   Licensed under the Apache License, Version 2.0 (the "License");
+   you may not use this file except in compliance with the License.
+   You may obtain a copy of the License at
+
+       http://www.apache.org/licenses/LICENSE-2.0
+
+   Unless required by applicable law or agreed to in writing, software
+   distributed under the License is distributed on an "AS IS" BASIS,
+   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+   See the License for the specific language governing permissions and
+   limitations under the License.
+******************************************************************************/
+
+#pragma once
+
+#include "PyInstance.hpp"
+#include "Arena.hpp"
+
+class PyArenaObject {
+public:
+    PyObject_HEAD
+
+    Arena* mArena;
+
+    static void dealloc(PyArenaObject *self);
+
+    static PyObject *new_(PyTypeObject *type, PyObject *args, PyObject *kwargs);
+
+    static int init(PyArenaObject *self, PyObject *args, PyObject *kwargs);
+
+    static PyObject* enter(PyArenaObject* self, PyObject* args, PyObject* kwargs);
+
+    static PyObject* exit(PyArenaObject* self, PyObject* args, PyObject* kwargs);
+
+    static PyObject* isActive(PyArenaObject* self, PyObject* args, PyObject* kwargs);
+
+    static PyObject* bytecount(PyArenaObject* self, PyObject* args, PyObject* kwargs);
+
+    static PyObject* liveAllocCount(PyArenaObject* self, PyObject* args, PyObject* kwargs);
+
+    static PyObject* copyOut(PyArenaObject* self, PyObject* args, PyObject* kwargs);
+};
+
+extern PyTypeObject PyType_Arena;
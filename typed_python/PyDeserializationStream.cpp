@@ -0,0 +1,219 @@
+/******************************************************************************
+   Copyright 2017-2021 typed_python Authors
+
+   Licensed under the Apache License, Version 2.0 (the "License");
+   you may not use this file except in compliance with the License.
+   You may obtain a copy of the License at
+
+       http://www.apache.org/licenses/LICENSE-2.0
+
+   Unless required by applicable law or agreed to in writing, software
+   distributed under the License is distributed on an "AS IS" BASIS,
+   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+   See the License for the specific language governing permissions and
+   limitations under the License.
+******************************************************************************/
+
+#include "PyDeserializationStream.hpp"
+#include "NullSerializationContext.hpp"
+#include "PythonSerializationContext.hpp"
+
+
+PyDoc_STRVAR(PyDeserializationStream_doc,
+    "DeserializationStream(T, context=None)\n\n"
+    "Decode a stream written by 'serializeStream(T, ...)' that arrives in\n"
+    "pieces. Values later in a stream can refer back to objects written\n"
+    "earlier in it, so we read every piece with the same memo, which holds\n"
+    "a reference to each such object for as long as the stream is alive."
+);
+
+PyDoc_STRVAR(PyDeserializationStream_read_doc,
+    "DeserializationStream.read(data) -> TupleOf(T)\n\n"
+    "Decode the uncompressed bytes 'data', which must hold a whole number of\n"
+    "top-level messages (see completeMessagesBytecount), and return the\n"
+    "values they hold."
+);
+
+PyMethodDef PyDeserializationStreamInstance_methods[] = {
+    {"read", (PyCFunction)PyDeserializationStream::read, METH_VARARGS | METH_KEYWORDS, PyDeserializationStream_read_doc},
+    {NULL}  /* Sentinel */
+};
+
+PyObject* PyDeserializationStream::read(PyDeserializationStream* self, PyObject* args, PyObject* kwargs)
+{
+    static const char *kwlist[] = {"data", NULL};
+
+    Py_buffer data;
+
+    if (!PyArg_ParseTupleAndKeywords(args, kwargs, "y*", (char**)kwlist, &data)) {
+        return NULL;
+    }
+
+    if (!self->mBuffer) {
+        PyBuffer_Release(&data);
+        PyErr_Format(PyExc_RuntimeError, "DeserializationStream is not initialized");
+        return NULL;
+    }
+
+    PyObject* res = translateExceptionToPyObject([&]() {
+        DeserializationBuffer& buf = *self->mBuffer;
+
+        buf.appendData((uint8_t*)data.buf, data.len);
+
+        TupleOfType* tupType = TupleOfType::Make(self->mType);
+
+        tupType->assertForwardsResolved();
+
+        Instance i = Instance::createAndInitialize(tupType, [&](instance_ptr p) {
+            PyEnsureGilReleased releaseTheGil;
+
+            tupType->constructorUnbounded(p, [&](instance_ptr tupElt, int index) {
+                if (buf.isDone()) {
+                    return false;
+                }
+
+                auto fieldAndWireType = buf.readFieldNumberAndWireType();
+                self->mType->deserialize(tupElt, buf, fieldAndWireType.second);
+
+                return true;
+            });
+        });
+
+        return PyInstance::extractPythonObject(i.data(), i.type());
+    });
+
+    PyBuffer_Release(&data);
+
+    return res;
+}
+
+/* static */
+void PyDeserializationStream::dealloc(PyDeserializationStream *self)
+{
+    // the buffer refers to the context, so it has to go first
+    delete self->mBuffer;
+    delete self->mContext;
+
+    Py_XDECREF(self->mContextObj);
+
+    Py_TYPE(self)->tp_free((PyObject*)self);
+}
+
+/* static */
+PyObject* PyDeserializationStream::new_(PyTypeObject *type, PyObject *args, PyObject *kwargs)
+{
+    PyDeserializationStream* self;
+
+    self = (PyDeserializationStream*)type->tp_alloc(type, 0);
+
+    if (self != NULL) {
+        self->mType = nullptr;
+        self->mContextObj = nullptr;
+        self->mContext = nullptr;
+        self->mBuffer = nullptr;
+    }
+
+    return (PyObject*)self;
+}
+
+/* static */
+int PyDeserializationStream::init(PyDeserializationStream *self, PyObject *args, PyObject *kwargs)
+{
+    static const char *kwlist[] = {"T", "context", NULL};
+
+    PyObject* typeArg;
+    PyObject* contextArg = Py_None;
+
+    if (!PyArg_ParseTupleAndKeywords(args, kwargs, "O|O", (char**)kwlist, &typeArg, &contextArg)) {
+        return -1;
+    }
+
+    if (self->mBuffer) {
+        PyErr_Format(PyExc_RuntimeError, "DeserializationStream is already initialized");
+        return -1;
+    }
+
+    Type* t = PyInstance::unwrapTypeArgToTypePtr(typeArg);
+
+    if (!t) {
+        PyErr_Format(PyExc_TypeError, "first argument to DeserializationStream must be a type object, not %S", typeArg);
+        return -1;
+    }
+
+    return translateExceptionToPyObjectReturningInt([&]() {
+        t->assertForwardsResolved();
+
+        self->mType = t;
+
+        if (contextArg != Py_None) {
+            self->mContextObj = incref(contextArg);
+            self->mContext = new PythonSerializationContext(contextArg);
+
+            if (self->mContext->isCompressionEnabled()) {
+                throw std::runtime_error("DeserializationStream reads uncompressed data, so its context can't compress.");
+            }
+        } else {
+            self->mContext = new NullSerializationContext();
+        }
+
+        self->mBuffer = new DeserializationBuffer(nullptr, 0, *self->mContext);
+
+        return 0;
+    });
+}
+
+
+PyTypeObject PyType_DeserializationStream = {
+    PyVarObject_HEAD_INIT(NULL, 0)
+    .tp_name = "DeserializationStream",
+    .tp_basicsize = sizeof(PyDeserializationStream),
+    .tp_itemsize = 0,
+    .tp_dealloc = (destructor) PyDeserializationStream::dealloc,
+    #if PY_MINOR_VERSION < 8
+    .tp_print = 0,
+    #else
+    .tp_vectorcall_offset = 0,                  // printfunc  (Changed to tp_vectorcall_offset in Python 3.8)
+    #endif
+    .tp_getattr = 0,
+    .tp_setattr = 0,
+    .tp_as_async = 0,
+    .tp_repr = 0,
+    .tp_as_number = 0,
+    .tp_as_sequence = 0,
+    .tp_as_mapping = 0,
+    .tp_hash = 0,
+    .tp_call = 0,
+    .tp_str = 0,
+    .tp_getattro = 0,
+    .tp_setattro = 0,
+    .tp_as_buffer = 0,
+    .tp_flags = Py_TPFLAGS_DEFAULT,
+    .tp_doc = PyDeserializationStream_doc,
+    .tp_traverse = 0,
+    .tp_clear = 0,
+    .tp_richcompare = 0,
+    .tp_weaklistoffset = 0,
+    .tp_iter = 0,
+    .tp_iternext = 0,
+    .tp_methods = PyDeserializationStreamInstance_methods,
+    .tp_members = 0,
+    .tp_getset = 0,
+    .tp_base = 0,
+    .tp_dict = 0,
+    .tp_descr_get = 0,
+    .tp_descr_set = 0,
+    .tp_dictoffset = 0,
+    .tp_init = (initproc) PyDeserializationStream::init,
+    .tp_alloc = 0,
+    .tp_new = PyDeserializationStream::new_,
+    .tp_free = 0,
+    .tp_is_gc = 0,
+    .tp_bases = 0,
+    .tp_mro = 0,
+    .tp_cache = 0,
+    .tp_subclasses = 0,
+    .tp_weaklist = 0,
+    .tp_del = 0,
+    .tp_version_tag = 0,
+    .tp_finalize = 0,
+};
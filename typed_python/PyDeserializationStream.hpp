@@ -0,0 +1,46 @@
+/******************************************************************************
+   Copyright 2017-2021 typed_python Authors
+
+   Licensed under the Apache License, Version 2.0 (the "License");
+   you may not use this file except in compliance with the License.
+   You may obtain a copy of the License at
+
+       http://www.apache.org/licenses/LICENSE-2.0
+
+   Unless required by applicable law or agreed to in writing, software
+   distributed under the License is distributed on an "AS IS" BASIS,
+   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+   See the License for the specific language governing permissions and
+   limitations under the License.
+******************************************************************************/
+
+#pragma once
+
+#include "PyInstance.hpp"
+#include "DeserializationBuffer.hpp"
+#include "SerializationContext.hpp"
+
+class PyDeserializationStream {
+public:
+    PyObject_HEAD
+
+    Type* mType;
+
+    // the python SerializationContext, if any. We hold a reference to it
+    // because mContext doesn't.
+    PyObject* mContextObj;
+
+    SerializationContext* mContext;
+
+    DeserializationBuffer* mBuffer;
+
+    static void dealloc(PyDeserializationStream *self);
+
+    static PyObject *new_(PyTypeObject *type, PyObject *args, PyObject *kwargs);
+
+    static int init(PyDeserializationStream *self, PyObject *args, PyObject *kwargs);
+
+    static PyObject* read(PyDeserializationStream* self, PyObject* args, PyObject* kwargs);
+};
+
+extern PyTypeObject PyType_DeserializationStream;
@@ -217,6 +217,209 @@ PyObject* PyDictInstance::dictClear(PyObject* o) {
     return incref(Py_None);
 }
 
+// convert 'arg' to an instance of 'listT', sharing it if it already is one.
+static Instance listOfFromPython(ListOfType* listT, PyObject* arg) {
+    return Instance(listT, [&](instance_ptr data) {
+        PyInstance::copyConstructFromPythonInstance(listT, data, arg, ConversionLevel::ImplicitContainers);
+    });
+}
+
+// static
+PyDoc_STRVAR(dictGetMany_doc,
+    "D.getMany(keys) -> ListOf(OneOf(None, V)) holding D.get(k) for each k in keys."
+    );
+PyObject* PyDictInstance::dictGetMany(PyObject* o, PyObject* args) {
+    PyDictInstance* self_w = (PyDictInstance*)o;
+
+    if (self_w->mIteratorOffset != -1) {
+        PyErr_SetString(PyExc_TypeError, "dict iterators don't support 'getMany'");
+        return NULL;
+    }
+
+    if (PyTuple_Size(args) != 1) {
+        PyErr_SetString(PyExc_TypeError, "Dict.getMany takes one argument");
+        return NULL;
+    }
+
+    return translateExceptionToPyObject([&]() {
+        DictType* dictT = self_w->type();
+        ListOfType* keysT = ListOfType::Make(dictT->keyType());
+
+        Instance keys = listOfFromPython(keysT, PyTuple_GetItem(args, 0));
+
+        int64_t count = keysT->count(keys.data());
+
+        std::vector<instance_ptr> values(count);
+        dictT->lookupValuesByKeys(self_w->dataPtr(), keysT->eltPtr(keys.data(), 0), count, values.data());
+
+        OneOfType* resultEltT = OneOfType::Make({NoneType::Make(), dictT->valueType()});
+        ListOfType* resultT = ListOfType::Make(resultEltT);
+
+        // the index of 'concreteT' within the result's OneOf
+        auto whichIndex = [&](Type* concreteT) {
+            const std::vector<Type*>& types = resultEltT->getTypes();
+            return (uint8_t)(std::find(types.begin(), types.end(), concreteT) - types.begin());
+        };
+
+        Instance result(resultT, [&](instance_ptr data) {
+            resultT->constructor(data, count, [&](instance_ptr eltPtr, int64_t k) {
+                if (!values[k]) {
+                    *(uint8_t*)eltPtr = whichIndex(NoneType::Make());
+                    return;
+                }
+
+                Type* valueT = dictT->valueType();
+                instance_ptr valuePtr = values[k];
+
+                if (valueT->getTypeCategory() == Type::TypeCategory::catOneOf) {
+                    valueT = ((OneOfType*)valueT)->getTypes()[*(uint8_t*)valuePtr];
+                    valuePtr += 1;
+                }
+
+                *(uint8_t*)eltPtr = whichIndex(valueT);
+                valueT->copy_constructor(eltPtr + 1, valuePtr);
+            });
+        });
+
+        return extractPythonObject(result);
+    });
+}
+
+// static
+PyDoc_STRVAR(dictContainsMany_doc,
+    "D.containsMany(keys) -> ListOf(bool) containing 'k in D' for each k in keys."
+    );
+PyObject* PyDictInstance::dictContainsMany(PyObject* o, PyObject* args) {
+    PyDictInstance* self_w = (PyDictInstance*)o;
+
+    if (self_w->mIteratorOffset != -1) {
+        PyErr_SetString(PyExc_TypeError, "dict iterators don't support 'containsMany'");
+        return NULL;
+    }
+
+    if (PyTuple_Size(args) != 1) {
+        PyErr_SetString(PyExc_TypeError, "Dict.containsMany takes one argument");
+        return NULL;
+    }
+
+    return translateExceptionToPyObject([&]() {
+        DictType* dictT = self_w->type();
+        ListOfType* keysT = ListOfType::Make(dictT->keyType());
+
+        Instance keys = listOfFromPython(keysT, PyTuple_GetItem(args, 0));
+
+        int64_t count = keysT->count(keys.data());
+
+        std::vector<instance_ptr> values(count);
+        dictT->lookupValuesByKeys(self_w->dataPtr(), keysT->eltPtr(keys.data(), 0), count, values.data());
+
+        ListOfType* resultT = ListOfType::Make(Bool::Make());
+
+        Instance result(resultT, [&](instance_ptr data) {
+            resultT->constructor(data, count, [&](instance_ptr eltPtr, int64_t k) {
+                *(bool*)eltPtr = values[k] != nullptr;
+            });
+        });
+
+        return extractPythonObject(result);
+    });
+}
+
+// static
+void PyDictInstance::setManyConcrete(DictType* dictT, instance_ptr self, PyObject* pyKeys, PyObject* pyValues) {
+    ListOfType* keysT = ListOfType::Make(dictT->keyType());
+    ListOfType* valuesT = ListOfType::Make(dictT->valueType());
+
+    Instance keys = listOfFromPython(keysT, pyKeys);
+    Instance values = listOfFromPython(valuesT, pyValues);
+
+    int64_t count = keysT->count(keys.data());
+
+    if (valuesT->count(values.data()) != count) {
+        PyErr_SetString(PyExc_ValueError, "setMany needs the same number of keys and values");
+        throw PythonExceptionSet();
+    }
+
+    // an empty dict ends up with at least as many items as we have keys.
+    if (!dictT->size(self)) {
+        dictT->reserve(self, count);
+    }
+
+    for (int64_t k = 0; k < count; k++) {
+        instance_ptr key = keysT->eltPtr(keys.data(), k);
+        instance_ptr value = valuesT->eltPtr(values.data(), k);
+
+        instance_ptr existingLoc = dictT->lookupValueByKey(self, key);
+        if (existingLoc) {
+            dictT->valueType()->assign(existingLoc, value);
+        } else {
+            dictT->valueType()->copy_constructor(dictT->insertKey(self, key), value);
+        }
+    }
+}
+
+// static
+PyDoc_STRVAR(dictSetMany_doc,
+    "D.setMany(keys, values) -> None.  Set D[keys[i]] = values[i] for each i."
+    );
+PyObject* PyDictInstance::dictSetMany(PyObject* o, PyObject* args) {
+    PyDictInstance* self_w = (PyDictInstance*)o;
+
+    if (self_w->mIteratorOffset != -1) {
+        PyErr_SetString(PyExc_TypeError, "dict iterators don't support 'setMany'");
+        return NULL;
+    }
+
+    if (PyTuple_Size(args) != 2) {
+        PyErr_SetString(PyExc_TypeError, "Dict.setMany takes two arguments");
+        return NULL;
+    }
+
+    return translateExceptionToPyObject([&]() {
+        setManyConcrete(self_w->type(), self_w->dataPtr(), PyTuple_GetItem(args, 0), PyTuple_GetItem(args, 1));
+
+        return incref(Py_None);
+    });
+}
+
+// static
+PyDoc_STRVAR(dictFromColumns_doc,
+    "Dict(K, V).fromColumns(keys, values) -> a Dict mapping keys[i] to values[i].\n"
+    "\n"
+    "The dict is sized for all of the keys up front, rather than growing as\n"
+    "they're inserted.\n"
+    );
+PyObject* PyDictInstance::dictFromColumns(PyObject* cls, PyObject* args) {
+    Type* selfType = PyInstance::unwrapTypeArgToTypePtr(cls);
+
+    if (!selfType || selfType->getTypeCategory() != Type::TypeCategory::catDict) {
+        PyErr_Format(PyExc_TypeError, "Expected cls to be a Dict type");
+        return NULL;
+    }
+
+    if (PyTuple_Size(args) != 2) {
+        PyErr_SetString(PyExc_TypeError, "Dict.fromColumns takes two arguments");
+        return NULL;
+    }
+
+    DictType* dictT = (DictType*)selfType;
+
+    return translateExceptionToPyObject([&]() {
+        Instance result(dictT, [&](instance_ptr data) {
+            dictT->constructor(data);
+
+            try {
+                setManyConcrete(dictT, data, PyTuple_GetItem(args, 0), PyTuple_GetItem(args, 1));
+            } catch(...) {
+                dictT->destroy(data);
+                throw;
+            }
+        });
+
+        return extractPythonObject(result);
+    });
+}
+
 PyObject* PyDictInstance::tp_iter_concrete() {
     return createIteratorToSelf(mIteratorFlag, type()->size(dataPtr()));
 }
@@ -261,7 +464,7 @@ PyObject* PyDictInstance::tp_iternext_concrete() {
         return NULL;
     }
 
-    int32_t curSlot = mIteratorOffset;
+    int64_t curSlot = mIteratorOffset;
 
     mIteratorOffset++;
     while (mIteratorOffset < type()->slotCount(dataPtr()) && !type()->slotPopulated(dataPtr(), mIteratorOffset)) {
@@ -842,7 +1045,7 @@ PyObject* PyDictInstance::tp_repr_concrete() {
 }
 
 PyMethodDef* PyDictInstance::typeMethodsConcrete(Type* t) {
-    return new PyMethodDef [9] {
+    return new PyMethodDef [13] {
         {"get", (PyCFunction)PyDictInstance::dictGet, METH_VARARGS, dictGet_doc},
         {"clear", (PyCFunction)PyDictInstance::dictClear, METH_NOARGS, dictClear_doc},
         {"update", (PyCFunction)PyDictInstance::dictUpdate, METH_VARARGS, dictUpdate_doc},
@@ -851,6 +1054,10 @@ PyMethodDef* PyDictInstance::typeMethodsConcrete(Type* t) {
         {"values", (PyCFunction)PyDictInstance::dictValues, METH_NOARGS, dictValues_doc},
         {"setdefault", (PyCFunction)PyDictInstance::setDefault, METH_VARARGS, setDefault_doc},
         {"pop", (PyCFunction)PyDictInstance::pop, METH_VARARGS, pop_doc},
+        {"getMany", (PyCFunction)PyDictInstance::dictGetMany, METH_VARARGS, dictGetMany_doc},
+        {"setMany", (PyCFunction)PyDictInstance::dictSetMany, METH_VARARGS, dictSetMany_doc},
+        {"containsMany", (PyCFunction)PyDictInstance::dictContainsMany, METH_VARARGS, dictContainsMany_doc},
+        {"fromColumns", (PyCFunction)PyDictInstance::dictFromColumns, METH_VARARGS | METH_CLASS, dictFromColumns_doc},
         {NULL, NULL}
     };
 }
@@ -56,6 +56,16 @@ public:
 
     static PyObject* dictClear(PyObject* o);
 
+    static PyObject* dictGetMany(PyObject* o, PyObject* args);
+
+    static PyObject* dictSetMany(PyObject* o, PyObject* args);
+
+    static PyObject* dictContainsMany(PyObject* o, PyObject* args);
+
+    static PyObject* dictFromColumns(PyObject* cls, PyObject* args);
+
+    static void setManyConcrete(DictType* dictT, instance_ptr self, PyObject* keys, PyObject* values);
+
     static PyMethodDef* typeMethodsConcrete(Type* t);
 
     static void mirrorTypeInformationIntoPyTypeConcrete(DictType* dictT, PyTypeObject* pyType);
@@ -975,6 +975,80 @@ PyObject* PySetInstance::setUpdate(PyObject* o, PyObject* args) {
     Py_RETURN_NONE;
 }
 
+PyDoc_STRVAR(setUpdateFrom_doc,
+    "s.updateFrom(items) -> None, and each element of items is added to s\n"
+    "\n"
+    "items is converted to a ListOf the set's element type first. If s is\n"
+    "empty, it's sized to hold all of items up front.\n"
+    );
+PyObject* PySetInstance::setUpdateFrom(PyObject* o, PyObject* args) {
+    PySetInstance* self_w = (PySetInstance*)o;
+    if (PyTuple_Size(args) != 1) {
+        PyErr_SetString(PyExc_TypeError, "Set.updateFrom takes one argument");
+        return NULL;
+    }
+
+    return translateExceptionToPyObject([&]() {
+        SetType* setT = self_w->type();
+        ListOfType* keysT = ListOfType::Make(setT->keyType());
+
+        Instance keys(keysT, [&](instance_ptr data) {
+            copyConstructFromPythonInstance(keysT, data, PyTuple_GetItem(args, 0), ConversionLevel::ImplicitContainers);
+        });
+
+        int64_t count = keysT->count(keys.data());
+
+        if (!setT->size(self_w->dataPtr())) {
+            setT->reserve(self_w->dataPtr(), count);
+        }
+
+        for (int64_t k = 0; k < count; k++) {
+            instance_ptr key = keysT->eltPtr(keys.data(), k);
+
+            if (!setT->lookupKey(self_w->dataPtr(), key)) {
+                setT->insertKey(self_w->dataPtr(), key);
+            }
+        }
+
+        return incref(Py_None);
+    });
+}
+
+PyDoc_STRVAR(setContainsMany_doc,
+    "s.containsMany(items) -> ListOf(bool) containing 'k in s' for each k in items"
+    );
+PyObject* PySetInstance::setContainsMany(PyObject* o, PyObject* args) {
+    PySetInstance* self_w = (PySetInstance*)o;
+    if (PyTuple_Size(args) != 1) {
+        PyErr_SetString(PyExc_TypeError, "Set.containsMany takes one argument");
+        return NULL;
+    }
+
+    return translateExceptionToPyObject([&]() {
+        SetType* setT = self_w->type();
+        ListOfType* keysT = ListOfType::Make(setT->keyType());
+
+        Instance keys(keysT, [&](instance_ptr data) {
+            copyConstructFromPythonInstance(keysT, data, PyTuple_GetItem(args, 0), ConversionLevel::ImplicitContainers);
+        });
+
+        int64_t count = keysT->count(keys.data());
+
+        std::vector<instance_ptr> found(count);
+        setT->lookupKeys(self_w->dataPtr(), keysT->eltPtr(keys.data(), 0), count, found.data());
+
+        ListOfType* resultT = ListOfType::Make(Bool::Make());
+
+        Instance result(resultT, [&](instance_ptr data) {
+            resultT->constructor(data, count, [&](instance_ptr eltPtr, int64_t k) {
+                *(bool*)eltPtr = found[k] != nullptr;
+            });
+        });
+
+        return extractPythonObject(result);
+    });
+}
+
 int PySetInstance::sq_contains_concrete(PyObject* item) {
     Type* item_type = extractTypeFrom(Py_TYPE(item));
 
@@ -1092,7 +1166,7 @@ PyObject* PySetInstance::tp_iternext_concrete() {
         return NULL;
     }
 
-    int32_t curSlot = mIteratorOffset;
+    int64_t curSlot = mIteratorOffset;
 
     mIteratorOffset++;
     while (mIteratorOffset < type()->slotCount(dataPtr())
@@ -1397,7 +1471,7 @@ bool PySetInstance::pyValCouldBeOfTypeConcrete(modeled_type* type, PyObject* pyR
 }
 
 PyMethodDef* PySetInstance::typeMethodsConcrete(Type* t) {
-    return new PyMethodDef[18]{{"add", (PyCFunction)PySetInstance::setAdd, METH_VARARGS, setAdd_doc},
+    return new PyMethodDef[20]{{"add", (PyCFunction)PySetInstance::setAdd, METH_VARARGS, setAdd_doc},
                               {"pop", (PyCFunction)PySetInstance::setPop, METH_VARARGS, setPop_doc},
                               {"discard", (PyCFunction)PySetInstance::setDiscard, METH_VARARGS, setDiscard_doc},
                               {"remove", (PyCFunction)PySetInstance::setRemove, METH_VARARGS, setRemove_doc},
@@ -1414,5 +1488,7 @@ PyMethodDef* PySetInstance::typeMethodsConcrete(Type* t) {
                               {"issubset", (PyCFunction)PySetInstance::setIsSubset, METH_VARARGS, setIsSubset_doc},
                               {"issuperset", (PyCFunction)PySetInstance::setIsSuperset, METH_VARARGS, setIsSuperset_doc},
                               {"isdisjoint", (PyCFunction)PySetInstance::setIsDisjoint, METH_VARARGS, setIsDisjoint_doc},
+                              {"updateFrom", (PyCFunction)PySetInstance::setUpdateFrom, METH_VARARGS, setUpdateFrom_doc},
+                              {"containsMany", (PyCFunction)PySetInstance::setContainsMany, METH_VARARGS, setContainsMany_doc},
                               {NULL, NULL}};
 }
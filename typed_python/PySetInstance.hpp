@@ -42,6 +42,8 @@ class PySetInstance : public PyInstance {
     static PyObject* setIsSubset(PyObject* o, PyObject* args);
     static PyObject* setIsSuperset(PyObject* o, PyObject* args);
     static PyObject* setIsDisjoint(PyObject* o, PyObject* args);
+    static PyObject* setUpdateFrom(PyObject* o, PyObject* args);
+    static PyObject* setContainsMany(PyObject* o, PyObject* args);
     Py_ssize_t mp_and_sq_length_concrete();
     int sq_contains_concrete(PyObject* item);
     PyObject* tp_iter_concrete();
@@ -350,6 +350,24 @@ void PyTupleOrListOfInstance::copyConstructFromPythonInstanceConcrete(TupleOrLis
         return;
     }
 
+    if (PyTuple_Check(pyRepresentation) || PyList_Check(pyRepresentation)) {
+        // we know the size up front, so the elements can go straight into
+        // the container's inline storage instead of a growing buffer.
+        tupT->constructor(tgt, PySequence_Fast_GET_SIZE(pyRepresentation),
+            [&](uint8_t* eltPtr, int64_t k) {
+                // converting an element can run arbitrary python code
+                if (k >= PySequence_Fast_GET_SIZE(pyRepresentation)) {
+                    throw std::runtime_error("list changed size during conversion");
+                }
+
+                PyObjectHolder item(PySequence_Fast_GET_ITEM(pyRepresentation, k));
+
+                PyInstance::copyConstructFromPythonInstance(tupT->getEltType(), eltPtr, item, childLevel);
+            });
+
+        return;
+    }
+
     PyObjectStealer iterator(PyObject_GetIter(pyRepresentation));
 
     if (iterator) {
@@ -451,6 +469,78 @@ PyObject* PyTupleOrListOfInstance::fromBytes(PyObject* o, PyObject* args, PyObje
     return PyInstance::fromInstance(outConverted);
 }
 
+PyObject* PyTupleOrListOfInstance::fromMappedFile(PyObject* o, PyObject* args, PyObject* kwds) {
+    static const char *kwlist[] = {"fileno", "offset", "count", "readOnly", NULL};
+
+    int fileno;
+    long long offset;
+    long long count;
+    int readOnly = 0;
+
+    if (!PyArg_ParseTupleAndKeywords(args, kwds, "iLL|p", (char**)kwlist, &fileno, &offset, &count, &readOnly)) {
+        return nullptr;
+    }
+
+    Type* selfType = PyInstance::unwrapTypeArgToTypePtr(o);
+
+    if (!selfType || !selfType->isTupleOrListOf()) {
+        PyErr_Format(PyExc_TypeError, "Expected cls to be a Type");
+        return nullptr;
+    }
+
+    TupleOrListOfType* tupT = (TupleOrListOfType*)selfType;
+
+    if (!tupT->getEltType()->isPOD()) {
+        PyErr_Format(
+            PyExc_TypeError,
+            "Can't map %s from a file because internals are not POD",
+            tupT->name().c_str()
+        );
+        return nullptr;
+    }
+
+    if (readOnly && !tupT->isTupleOf()) {
+        PyErr_Format(
+            PyExc_TypeError,
+            "Can't map %s read-only because it's mutable. Use a TupleOf.",
+            tupT->name().c_str()
+        );
+        return nullptr;
+    }
+
+    if (offset < 0 || count < 0) {
+        PyErr_Format(PyExc_ValueError, "Invalid offset or element count for a mapped file.");
+        return nullptr;
+    }
+
+    return translateExceptionToPyObject([&]() {
+        if (count == 0) {
+            return PyInstance::fromInstance(Instance(selfType, [&](instance_ptr data) {
+                tupT->constructor(data);
+            }));
+        }
+
+        Slab* slab = Slab::mapFile(fileno, offset, count * tupT->getEltType()->bytecount(), readOnly);
+
+        Instance outMapped(selfType, [&](instance_ptr data) {
+            TupleOrListOfType::layout_ptr& self_layout = *(TupleOrListOfType::layout_ptr*)data;
+
+            self_layout = (TupleOrListOfType::layout_ptr)tp_malloc(sizeof(TupleOrListOfType::layout));
+            self_layout->refcount = 1;
+            self_layout->hash_cache = -1;
+            self_layout->count = count;
+            self_layout->reserved = count;
+            self_layout->data = (uint8_t*)slab->mappedData();
+        });
+
+        // the data allocation holds its own reference to the slab, so when the
+        // container releases it, the file gets unmapped.
+        slab->decref();
+
+        return PyInstance::fromInstance(outMapped);
+    });
+}
+
 PyDoc_STRVAR(TupleOf_toArray_doc,
     "t.toarray() -> numpy array\n"
     "\n"
@@ -639,6 +729,17 @@ const char* TUPLE_FROM_BYTES_DOCSTRING =
     "NamedTuple."
 ;
 
+const char* TUPLE_FROM_MAPPED_FILE_DOCSTRING =
+    "TupleOf(T).fromMappedFile(fileno, offset, count, readOnly=False) -> TupleOf(T)\n\n"
+    "Construct a TupleOf(T) whose elements are the 'count' values stored in the open\n"
+    "file 'fileno', starting at byte 'offset' (which must be page-aligned).\n\n"
+    "The file is memory-mapped rather than read, so this takes constant time and\n"
+    "pages are loaded as they're touched. Processes mapping the same file share its\n"
+    "memory. If 'readOnly' the file is mapped without write permission. Otherwise,\n"
+    "the mapping is copy-on-write, and changes are never written back. The file\n"
+    "descriptor may be closed once this returns. T must be POD."
+;
+
 PyDoc_STRVAR(tuplePointerUnsafe_doc,
     "tup.pointerUnsafe(i) -> pointer to element i of tup\n"
     "\n"
@@ -667,10 +768,11 @@ PyObject* PyTupleOrListOfInstance::pointerUnsafe(PyObject* o, PyObject* args) {
 
 
 PyMethodDef* PyTupleOfInstance::typeMethodsConcrete(Type* t) {
-    return new PyMethodDef [6] {
+    return new PyMethodDef [7] {
         {"toArray", (PyCFunction)PyTupleOrListOfInstance::toArray, METH_VARARGS, TupleOf_toArray_doc},
         {"toBytes", (PyCFunction)PyTupleOrListOfInstance::toBytes, METH_VARARGS, TUPLE_TO_BYTES_DOCSTRING},
         {"fromBytes", (PyCFunction)PyTupleOrListOfInstance::fromBytes, METH_VARARGS | METH_KEYWORDS | METH_CLASS, TUPLE_FROM_BYTES_DOCSTRING},
+        {"fromMappedFile", (PyCFunction)PyTupleOrListOfInstance::fromMappedFile, METH_VARARGS | METH_KEYWORDS | METH_CLASS, TUPLE_FROM_MAPPED_FILE_DOCSTRING},
         {"pointerUnsafe", (PyCFunction)PyTupleOrListOfInstance::pointerUnsafe, METH_VARARGS, tuplePointerUnsafe_doc},
         {NULL, NULL}
     };
@@ -1120,11 +1222,23 @@ PyDoc_STRVAR(
     "NamedTuple."
 );
 
+PyDoc_STRVAR(
+    LIST_FROM_MAPPED_FILE_DOCSTRING,
+    "ListOf(T).fromMappedFile(fileno, offset, count) -> ListOf(T)\n\n"
+    "Construct a ListOf(T) whose elements are the 'count' values stored in the open\n"
+    "file 'fileno', starting at byte 'offset' (which must be page-aligned).\n\n"
+    "The file is memory-mapped copy-on-write rather than read, so this takes constant\n"
+    "time, pages are loaded as they're touched, and processes mapping the same file\n"
+    "share its memory until they write to it. Changes are never written back to the\n"
+    "file. Growing the list copies it out of the mapping. T must be POD."
+);
+
 PyMethodDef* PyListOfInstance::typeMethodsConcrete(Type* t) {
-    return new PyMethodDef [14] {
+    return new PyMethodDef [15] {
         {"toArray", (PyCFunction)PyTupleOrListOfInstance::toArray, METH_VARARGS, ListOf_toArray_doc},
         {"toBytes", (PyCFunction)PyTupleOrListOfInstance::toBytes, METH_VARARGS, LIST_TO_BYTES_DOCSTRING},
         {"fromBytes", (PyCFunction)PyTupleOrListOfInstance::fromBytes, METH_VARARGS | METH_KEYWORDS | METH_CLASS, LIST_FROM_BYTES_DOCSTRING},
+        {"fromMappedFile", (PyCFunction)PyTupleOrListOfInstance::fromMappedFile, METH_VARARGS | METH_KEYWORDS | METH_CLASS, LIST_FROM_MAPPED_FILE_DOCSTRING},
         {"append", (PyCFunction)PyListOfInstance::listAppend, METH_VARARGS, listAppend_doc},
         {"extend", (PyCFunction)PyListOfInstance::listExtend, METH_VARARGS, listExtend_doc},
         {"clear", (PyCFunction)PyListOfInstance::listClear, METH_VARARGS, listClear_doc},
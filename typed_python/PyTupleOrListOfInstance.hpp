@@ -50,6 +50,8 @@ public:
 
     static PyObject* fromBytes(PyObject* o, PyObject* args, PyObject* kwds);
 
+    static PyObject* fromMappedFile(PyObject* o, PyObject* args, PyObject* kwds);
+
     static bool pyValCouldBeOfTypeConcrete(modeled_type* type, PyObject* pyRepresentation, ConversionLevel level);
 
     static void mirrorTypeInformationIntoPyTypeConcrete(TupleOrListOfType* inType, PyTypeObject* pyType);
@@ -46,6 +46,29 @@ void PythonSerializationContext::setFlags() {
     }
 
     mSerializeHashSequence = ((PyObject*)serializeHashSequence) == Py_True;
+
+    PyObjectStealer dedupEnabled(PyObject_GetAttrString(mContextObj, "dedupEnabled"));
+
+    if (!dedupEnabled) {
+        throw PythonExceptionSet();
+    }
+
+    mDedupEnabled = ((PyObject*)dedupEnabled) == Py_True;
+
+    // contexts that don't come from SerializationContext may not have this
+    PyObjectStealer compressionThreads(PyObject_GetAttrString(mContextObj, "compressionThreads"));
+
+    if (!compressionThreads) {
+        PyErr_Clear();
+    } else {
+        long threads = PyLong_AsLong(compressionThreads);
+
+        if (threads == -1 && PyErr_Occurred()) {
+            throw PythonExceptionSet();
+        }
+
+        mCompressesInParallel = mCompressionEnabled && threads > 1;
+    }
 }
 
 std::shared_ptr<ByteBuffer> PythonSerializationContext::compress(uint8_t* begin, uint8_t* end) const {
@@ -118,7 +118,9 @@ public:
     PythonSerializationContext(PyObject* typeSetObj) :
             mContextObj(typeSetObj),
             mCompressionEnabled(false),
-            mSerializeHashSequence(false)
+            mSerializeHashSequence(false),
+            mDedupEnabled(false),
+            mCompressesInParallel(false)
     {
         setFlags();
     }
@@ -129,6 +131,17 @@ public:
         return mCompressionEnabled;
     }
 
+    bool isDedupEnabled() const {
+        return mDedupEnabled;
+    }
+
+    // does the context compress on several threads? If so, it has to see the
+    // whole stream at once, so 'serialize' and 'deserialize' hand the call to
+    // the context's own 'serialize' and 'deserialize' methods.
+    bool compressesInParallel() const {
+        return mCompressesInParallel;
+    }
+
     // should we serialize an integer in the order of the
     // hash sequence rather than the hash itself?
     bool shouldSerializeHashSequence() const {
@@ -229,4 +242,8 @@ private:
     bool mInternalizeTypeGroups;
 
     bool mSerializeHashSequence;
+
+    bool mDedupEnabled;
+
+    bool mCompressesInParallel;
 };
@@ -32,20 +32,34 @@ public:
     SerializationBuffer(const SerializationContext& context) :
             m_context(context),
             m_wants_compress(context.isCompressionEnabled()),
+            m_wants_dedup(context.isDedupEnabled()),
             m_buffer(nullptr),
             m_size(0),
             m_reserved(0),
-            m_last_compression_point(0)
+            m_last_compression_point(0),
+            m_pod_buffer(nullptr),
+            m_dedup_count(0)
     {
     }
 
     ~SerializationBuffer() {
-        PyEnsureGilAcquired acquireTheGil;
-
         if (m_buffer) {
             ::free(m_buffer);
         }
 
+        // only take the GIL if we have something to release, so that
+        // serializers running without it can call 'releaseHeldObjects' first.
+        if (m_pointersNeedingDecref.size() || m_pyObjectsNeedingDecref.size()) {
+            PyEnsureGilAcquired acquireTheGil;
+
+            releaseHeldObjects();
+        }
+    }
+
+    // release the references we hold to the objects we've cached. Callers may
+    // do this without the GIL only if none of the types they serialized can
+    // hold python objects.
+    void releaseHeldObjects() {
         for (auto& typeAndList: m_pointersNeedingDecref) {
             if (typeAndList.first) {
                 typeAndList.first->check([&](auto& concreteType) {
@@ -59,6 +73,9 @@ public:
         for (auto p: m_pyObjectsNeedingDecref) {
             decref(p);
         }
+
+        m_pointersNeedingDecref.clear();
+        m_pyObjectsNeedingDecref.clear();
     }
 
     SerializationBuffer(const SerializationBuffer&) = delete;
@@ -348,6 +365,104 @@ public:
         m_size += sizeof(i);
     }
 
+    // Deduplication: when the context asks for it, the first time we write a
+    // string, bytes, TupleOf or ConstDict we wrap it in a SINGLE message, which
+    // tells the reader to give it the next dedup index. Afterwards, we write
+    // the index as a VARINT instead of the value. Strings and bytes are
+    // matched by content, TupleOfs and ConstDicts by identity.
+    bool isDedupEnabled() const {
+        return m_wants_dedup;
+    }
+
+    // get the dedup index of the 'bytecount' bytes at 'data', tagged with 'kind'
+    // and 'elementWidth' so that different types (or strings of different
+    // widths) with the same bytes don't collide. Returns the index and whether
+    // this is the first time we've seen the data.
+    std::pair<size_t, bool> dedupIndexForContent(uint8_t kind, uint8_t elementWidth, uint8_t* data, size_t bytecount) {
+        std::string key;
+        key.reserve(bytecount + 2);
+        key.push_back(kind);
+        key.push_back(elementWidth);
+        key.append((const char*)data, bytecount);
+
+        auto it = m_dedup_content.find(key);
+
+        if (it != m_dedup_content.end()) {
+            return std::make_pair(it->second, false);
+        }
+
+        m_dedup_content[std::move(key)] = m_dedup_count;
+
+        return std::make_pair(m_dedup_count++, true);
+    }
+
+    // get the dedup index of the object at 'identity', whose pointer-layout type
+    // is 'objType'. Returns the index and whether this is the first time we've
+    // seen the object. Like 'cachePointer', we hold a reference to the object
+    // until the buffer is destroyed, so that its address can't be reused by
+    // another object while we're serializing.
+    std::pair<size_t, bool> dedupIndexForIdentity(void* identity, Type* objType) {
+        auto it = m_dedup_identity.find(identity);
+
+        if (it != m_dedup_identity.end()) {
+            return std::make_pair(it->second, false);
+        }
+
+        void* heldPointer;
+        objType->copy_constructor((instance_ptr)&heldPointer, (instance_ptr)&identity);
+        m_pointersNeedingDecref[objType].push_back(heldPointer);
+
+        m_dedup_identity[identity] = m_dedup_count;
+
+        return std::make_pair(m_dedup_count++, true);
+    }
+
+    // given the result of 'dedupIndexForContent' or 'dedupIndexForIdentity', either
+    // write a reference to an object we've already written and return true, or
+    // begin the SINGLE message wrapping its first occurrence, in which case the
+    // caller writes the object as field 'fieldNumber', which we set to 0.
+    bool writeDedupReference(std::pair<size_t, bool> indexAndIsNew, size_t& fieldNumber) {
+        if (!indexAndIsNew.second) {
+            writeUnsignedVarintObject(fieldNumber, indexAndIsNew.first);
+            return true;
+        }
+
+        writeBeginSingle(fieldNumber);
+        fieldNumber = 0;
+
+        return false;
+    }
+
+    // strings and bytes shorter than this aren't worth deduplicating
+    static const size_t DEDUP_MIN_BYTECOUNT = 4;
+
+    // if 'podBuffer' is not null, containers of POD elements write their element
+    // data into it instead of into the stream, so that a reader can use the data
+    // in place. See 'writePodData'.
+    void setPodBuffer(std::vector<uint8_t>* podBuffer) {
+        m_pod_buffer = podBuffer;
+    }
+
+    bool hasPodBuffer() const {
+        return m_pod_buffer != nullptr;
+    }
+
+    // append 'bytecount' bytes of raw element data to the pod buffer and return
+    // its offset. Every block starts on a POD_BUFFER_ALIGNMENT boundary and has at
+    // least POD_BUFFER_ALIGNMENT bytes of padding in front of it, which the reader
+    // uses for the allocation header that ties the block to its Slab.
+    size_t writePodData(uint8_t* data, size_t bytecount) {
+        size_t offset = m_pod_buffer->size() + POD_BUFFER_ALIGNMENT;
+        offset += (POD_BUFFER_ALIGNMENT - offset % POD_BUFFER_ALIGNMENT) % POD_BUFFER_ALIGNMENT;
+
+        m_pod_buffer->resize(offset);
+        m_pod_buffer->insert(m_pod_buffer->end(), data, data + bytecount);
+
+        return offset;
+    }
+
+    static const size_t POD_BUFFER_ALIGNMENT = 64;
+
     void startSerializing(Type* nativeType) {
         if (m_types_being_serialized.find(nativeType) != m_types_being_serialized.end()) {
             throw std::runtime_error("Can't serialize recursive unnamed types.");
@@ -393,6 +508,16 @@ private:
     std::set<Type*> m_types_being_serialized;
 
     std::unordered_map<MutuallyRecursiveTypeGroup*, int> m_group_counter;
+
+    std::vector<uint8_t>* m_pod_buffer;
+
+    bool m_wants_dedup;
+
+    size_t m_dedup_count;
+
+    std::unordered_map<std::string, size_t> m_dedup_content;
+
+    std::unordered_map<void*, size_t> m_dedup_identity;
 };
 
 class MarkTypeBeingSerialized {
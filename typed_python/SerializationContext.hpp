@@ -67,6 +67,10 @@ public:
     virtual Type* deserializeNativeType(DeserializationBuffer& b, size_t wireType) const = 0;
 
     virtual bool isCompressionEnabled() const = 0;
+
+    // should repeated strings, bytes, TupleOfs and ConstDicts be written once
+    // and referred to by index afterwards?
+    virtual bool isDedupEnabled() const = 0;
     virtual std::shared_ptr<ByteBuffer> compress(uint8_t* begin, uint8_t* end) const = 0;
     virtual std::shared_ptr<ByteBuffer> decompress(uint8_t* begin, uint8_t* end) const = 0;
 };
@@ -28,10 +28,13 @@ import sys
 import datetime
 import lz4.frame
 import importlib
+import copy
+import struct
 import threading
 import types
 import traceback
 import logging
+from concurrent.futures import ThreadPoolExecutor
 
 # a lock to guard the calls to importlib below. It we don't have this,
 # then two threads trying to deserialize at the same time can conflict
@@ -43,6 +46,49 @@ _importlibLock = threading.Lock()
 _badModuleCache = set()
 
 
+def _lz4Compress(data, level):
+    return lz4.frame.compress(data, compression_level=level or 0)
+
+
+def _zstdCompress(data, level):
+    import zstandard
+
+    return zstandard.ZstdCompressor(level=3 if level is None else level).compress(data)
+
+
+def _zstdDecompress(data):
+    import zstandard
+
+    return zstandard.ZstdDecompressor().decompress(data)
+
+
+# codec name -> (compress(data, level), decompress(data)). The codecs
+# release the GIL while they work, so blocks compress in parallel.
+_CODECS = {
+    "lz4": (_lz4Compress, lz4.frame.decompress),
+    "zstd": (_zstdCompress, _zstdDecompress),
+}
+
+# the size of the blocks we compress on separate threads. This matches how
+# often SerializationBuffer compresses when it does so inline.
+_COMPRESSION_BLOCK_SIZE = 10 * 1024 * 1024
+
+# the pools that compress and decompress blocks, one per thread count, kept
+# for the life of the process so each call doesn't start new threads.
+_compressionPools = {}
+_compressionPoolsLock = threading.Lock()
+
+
+def _compressionPool(threadCount):
+    with _compressionPoolsLock:
+        if threadCount not in _compressionPools:
+            _compressionPools[threadCount] = ThreadPoolExecutor(
+                threadCount, thread_name_prefix="typed_python_compression"
+            )
+
+        return _compressionPools[threadCount]
+
+
 def createFunctionWithLocalsAndGlobals(code, globals):
     if globals is None:
         globals = {}
@@ -123,11 +169,15 @@ class SerializationContext:
         self,
         nameToObjectOverride=None,
         compressionEnabled=True,
+        compressionCodec="lz4",
+        compressionLevel=None,
+        compressionThreads=1,
         encodeLineInformationForCode=True,
         objectToNameOverride=None,
         internalizeTypeGroups=True,
         serializeFunctionGlobalsAsIs=False,
-        serializeHashSequence=False
+        serializeHashSequence=False,
+        dedupEnabled=False
     ):
         super().__init__()
 
@@ -137,11 +187,18 @@ class SerializationContext:
             if objectToNameOverride is not None else
             {id(v): n for n, v in self.nameToObjectOverride.items()}
         )
+        if compressionCodec not in _CODECS:
+            raise ValueError(f"Unknown compression codec {compressionCodec!r}. Use one of {sorted(_CODECS)}")
+
         self.compressionEnabled = compressionEnabled
+        self.compressionCodec = compressionCodec
+        self.compressionLevel = compressionLevel
+        self.compressionThreads = compressionThreads
         self.encodeLineInformationForCode = encodeLineInformationForCode
         self.internalizeTypeGroups = internalizeTypeGroups
         self.serializeFunctionGlobalsAsIs = serializeFunctionGlobalsAsIs
         self.serializeHashSequence = serializeHashSequence
+        self.dedupEnabled = dedupEnabled
 
     def addNamedObject(self, name, obj):
         self.nameToObjectOverride[name] = obj
@@ -155,14 +212,13 @@ class SerializationContext:
 
     def compress(self, bytes):
         if self.compressionEnabled:
-            res = lz4.frame.compress(bytes)
-            return res
+            return _CODECS[self.compressionCodec][0](bytes, self.compressionLevel)
         else:
             return bytes
 
     def decompress(self, bytes):
         if self.compressionEnabled:
-            return lz4.frame.decompress(bytes)
+            return _CODECS[self.compressionCodec][1](bytes)
         else:
             return bytes
 
@@ -185,11 +241,15 @@ class SerializationContext:
         return SerializationContext(
             nameToObjectOverride=self.nameToObjectOverride,
             compressionEnabled=self.compressionEnabled,
+            compressionCodec=self.compressionCodec,
+            compressionLevel=self.compressionLevel,
+            compressionThreads=self.compressionThreads,
             encodeLineInformationForCode=self.encodeLineInformationForCode,
             objectToNameOverride=self.objectToNameOverride,
             internalizeTypeGroups=self.internalizeTypeGroups,
             serializeFunctionGlobalsAsIs=True,
-            serializeHashSequence=self.serializeHashSequence
+            serializeHashSequence=self.serializeHashSequence,
+            dedupEnabled=self.dedupEnabled
         )
 
     def withoutInternalizingTypeGroups(self):
@@ -204,11 +264,15 @@ class SerializationContext:
         return SerializationContext(
             nameToObjectOverride=self.nameToObjectOverride,
             compressionEnabled=self.compressionEnabled,
+            compressionCodec=self.compressionCodec,
+            compressionLevel=self.compressionLevel,
+            compressionThreads=self.compressionThreads,
             encodeLineInformationForCode=self.encodeLineInformationForCode,
             objectToNameOverride=self.objectToNameOverride,
             internalizeTypeGroups=False,
             serializeFunctionGlobalsAsIs=self.serializeFunctionGlobalsAsIs,
-            serializeHashSequence=self.serializeHashSequence
+            serializeHashSequence=self.serializeHashSequence,
+            dedupEnabled=self.dedupEnabled
         )
 
     def withoutLineInfoEncoded(self):
@@ -218,11 +282,15 @@ class SerializationContext:
         return SerializationContext(
             nameToObjectOverride=self.nameToObjectOverride,
             compressionEnabled=self.compressionEnabled,
+            compressionCodec=self.compressionCodec,
+            compressionLevel=self.compressionLevel,
+            compressionThreads=self.compressionThreads,
             encodeLineInformationForCode=False,
             objectToNameOverride=self.objectToNameOverride,
             internalizeTypeGroups=self.internalizeTypeGroups,
             serializeFunctionGlobalsAsIs=self.serializeFunctionGlobalsAsIs,
-            serializeHashSequence=self.serializeHashSequence
+            serializeHashSequence=self.serializeHashSequence,
+            dedupEnabled=self.dedupEnabled
         )
 
     def withoutCompression(self):
@@ -232,11 +300,15 @@ class SerializationContext:
         return SerializationContext(
             nameToObjectOverride=self.nameToObjectOverride,
             compressionEnabled=False,
+            compressionCodec=self.compressionCodec,
+            compressionLevel=self.compressionLevel,
+            compressionThreads=self.compressionThreads,
             encodeLineInformationForCode=self.encodeLineInformationForCode,
             objectToNameOverride=self.objectToNameOverride,
             internalizeTypeGroups=self.internalizeTypeGroups,
             serializeFunctionGlobalsAsIs=self.serializeFunctionGlobalsAsIs,
-            serializeHashSequence=self.serializeHashSequence
+            serializeHashSequence=self.serializeHashSequence,
+            dedupEnabled=self.dedupEnabled
         )
 
     def withCompression(self):
@@ -246,11 +318,38 @@ class SerializationContext:
         return SerializationContext(
             nameToObjectOverride=self.nameToObjectOverride,
             compressionEnabled=True,
+            compressionCodec=self.compressionCodec,
+            compressionLevel=self.compressionLevel,
+            compressionThreads=self.compressionThreads,
+            encodeLineInformationForCode=self.encodeLineInformationForCode,
+            objectToNameOverride=self.objectToNameOverride,
+            internalizeTypeGroups=self.internalizeTypeGroups,
+            serializeFunctionGlobalsAsIs=self.serializeFunctionGlobalsAsIs,
+            serializeHashSequence=self.serializeHashSequence,
+            dedupEnabled=self.dedupEnabled
+        )
+
+    def withCompressionCodec(self, codec, level=None, threads=1):
+        """Compress with 'codec' ('lz4' or 'zstd') at 'level', using 'threads' threads.
+
+        'level' of None means the codec's default. With more than one thread,
+        'serialize' and 'deserialize' compress and decompress large messages in
+        blocks on a pool of worker threads. The output is framed exactly as it
+        is with one thread, so either can read what the other wrote, but the
+        reader must use the same codec as the writer.
+        """
+        return SerializationContext(
+            nameToObjectOverride=self.nameToObjectOverride,
+            compressionEnabled=True,
+            compressionCodec=codec,
+            compressionLevel=level,
+            compressionThreads=threads,
             encodeLineInformationForCode=self.encodeLineInformationForCode,
             objectToNameOverride=self.objectToNameOverride,
             internalizeTypeGroups=self.internalizeTypeGroups,
             serializeFunctionGlobalsAsIs=self.serializeFunctionGlobalsAsIs,
-            serializeHashSequence=self.serializeHashSequence
+            serializeHashSequence=self.serializeHashSequence,
+            dedupEnabled=self.dedupEnabled
         )
 
     def withSerializeHashSequence(self):
@@ -260,11 +359,41 @@ class SerializationContext:
         return SerializationContext(
             nameToObjectOverride=self.nameToObjectOverride,
             compressionEnabled=self.compressionEnabled,
+            compressionCodec=self.compressionCodec,
+            compressionLevel=self.compressionLevel,
+            compressionThreads=self.compressionThreads,
             encodeLineInformationForCode=self.encodeLineInformationForCode,
             objectToNameOverride=self.objectToNameOverride,
             internalizeTypeGroups=self.internalizeTypeGroups,
             serializeFunctionGlobalsAsIs=self.serializeFunctionGlobalsAsIs,
-            serializeHashSequence=True
+            serializeHashSequence=True,
+            dedupEnabled=self.dedupEnabled
+        )
+
+    def withDedup(self):
+        """Write repeated values once, and refer back to them after that.
+
+        Strings and bytes objects with the same contents, and references to the
+        same TupleOf or ConstDict instance, are serialized the first time we
+        see them and written as a small index afterwards. Deserialized values
+        share a single copy. Any context can read the result, whether or not
+        it has dedup enabled.
+        """
+        if self.dedupEnabled:
+            return self
+
+        return SerializationContext(
+            nameToObjectOverride=self.nameToObjectOverride,
+            compressionEnabled=self.compressionEnabled,
+            compressionCodec=self.compressionCodec,
+            compressionLevel=self.compressionLevel,
+            compressionThreads=self.compressionThreads,
+            encodeLineInformationForCode=self.encodeLineInformationForCode,
+            objectToNameOverride=self.objectToNameOverride,
+            internalizeTypeGroups=self.internalizeTypeGroups,
+            serializeFunctionGlobalsAsIs=self.serializeFunctionGlobalsAsIs,
+            serializeHashSequence=self.serializeHashSequence,
+            dedupEnabled=True
         )
 
     def nameForObject(self, t):
@@ -461,11 +590,61 @@ class SerializationContext:
         return sha_hash(self.serialize(o))
 
     def serialize(self, instance, serializeType=object):
+        if self.compressionEnabled and self.compressionThreads > 1:
+            return self._compressInParallel(serialize(serializeType, instance, self._uncompressed()))
+
         return serialize(serializeType, instance, self)
 
     def deserialize(self, bytes, serializeType=object):
+        if self.compressionEnabled and self.compressionThreads > 1:
+            return deserialize(serializeType, self._decompressInParallel(bytes), self._uncompressed())
+
         return deserialize(serializeType, bytes, self)
 
+    def _uncompressed(self):
+        # a copy (preserving any subclass) that reads and writes the raw stream
+        res = copy.copy(self)
+        res.compressionEnabled = False
+        return res
+
+    def _compressInParallel(self, data):
+        """Compress the raw stream 'data' into the block format SerializationBuffer writes.
+
+        Each block is a 4 byte length followed by that many bytes of
+        compressed data.
+        """
+        data = memoryview(data)
+        blocks = [data[i:i + _COMPRESSION_BLOCK_SIZE] for i in range(0, len(data), _COMPRESSION_BLOCK_SIZE)]
+
+        compressed = list(_compressionPool(self.compressionThreads).map(self.compress, blocks))
+
+        return b"".join(
+            piece
+            for block in compressed
+            for piece in (struct.pack("=I", len(block)), block)
+        )
+
+    def _decompressInParallel(self, data):
+        """Decompress every block of 'data' and return the raw stream."""
+        data = memoryview(data)
+        blocks = []
+        pos = 0
+
+        while pos < len(data):
+            if pos + 4 > len(data):
+                raise TypeError("Corrupt data: truncated compressed block header")
+
+            blockSize = struct.unpack_from("=I", data, pos)[0]
+            pos += 4
+
+            if pos + blockSize > len(data):
+                raise TypeError("Corrupt data: can't decompress this large of a block")
+
+            blocks.append(data[pos:pos + blockSize])
+            pos += blockSize
+
+        return b"".join(_compressionPool(self.compressionThreads).map(self.decompress, blocks))
+
     def representationFor(self, inst):
         ''' Return the representation of a given instance or None.
 
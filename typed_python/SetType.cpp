@@ -20,7 +20,7 @@ SetType* SetType::Make(Type* eltype, SetType* knownType) {
 bool SetType::discard(instance_ptr self, instance_ptr key) {
     hash_table_layout& record = **(hash_table_layout**)self;
     typed_python_hash_type keyHash = m_key_type->hash(key);
-    int32_t index = record.remove(m_bytes_per_el, keyHash, [&](instance_ptr ptr) {
+    int64_t index = record.remove(m_bytes_per_el, keyHash, [&](instance_ptr ptr) {
         return m_key_type->cmp(key, ptr, Py_EQ);
     });
     if (index >= 0) {
@@ -43,7 +43,7 @@ void SetType::clear(instance_ptr self) {
 instance_ptr SetType::insertKey(instance_ptr self, instance_ptr key) {
     hash_table_layout& record = **(hash_table_layout**)self;
     typed_python_hash_type keyHash = m_key_type->hash(key);
-    int32_t slot = record.allocateNewSlot(m_bytes_per_el);
+    int64_t slot = record.allocateNewSlot(m_bytes_per_el);
     record.add(keyHash, slot);
     m_key_type->copy_constructor(record.items + slot * m_bytes_per_el, key);
     return record.items + slot * m_bytes_per_el;
@@ -52,7 +52,7 @@ instance_ptr SetType::insertKey(instance_ptr self, instance_ptr key) {
 instance_ptr SetType::lookupKey(instance_ptr self, instance_ptr key) const {
     hash_table_layout& record = **(hash_table_layout**)self;
     typed_python_hash_type keyHash = m_key_type->hash(key);
-    int32_t index = record.find(m_bytes_per_el, keyHash,
+    int64_t index = record.find(m_bytes_per_el, keyHash,
                                 [&](instance_ptr ptr) { return m_key_type->cmp(key, ptr, Py_EQ); });
     if (index >= 0) {
         return record.items + index * m_bytes_per_el;
@@ -60,6 +60,26 @@ instance_ptr SetType::lookupKey(instance_ptr self, instance_ptr key) const {
     return 0;
 }
 
+void SetType::lookupKeys(instance_ptr self, instance_ptr keys, size_t count, instance_ptr* outKeys) const {
+    hash_table_layout& record = **(hash_table_layout**)self;
+    std::vector<int64_t> slots(count);
+    record.findMany(
+        m_bytes_per_el,
+        count,
+        [&](size_t k) { return m_key_type->hash(keys + k * m_bytes_per_el); },
+        [&](size_t k, instance_ptr ptr) { return m_key_type->cmp(keys + k * m_bytes_per_el, ptr, Py_EQ); },
+        slots.data()
+    );
+    for (size_t k = 0; k < count; k++) {
+        outKeys[k] = slots[k] >= 0 ? record.items + slots[k] * m_bytes_per_el : nullptr;
+    }
+}
+
+void SetType::reserve(instance_ptr self, size_t extra) {
+    hash_table_layout& record = **(hash_table_layout**)self;
+    record.reserve(m_bytes_per_el, extra);
+}
+
 int64_t SetType::size(instance_ptr self) const {
     hash_table_layout& record = **(hash_table_layout**)self;
     return record.hash_table_count;
@@ -106,7 +126,8 @@ void SetType::destroy(instance_ptr self) {
         tp_free(record.items);
         tp_free(record.items_populated);
         tp_free(record.hash_table_slots);
-        tp_free(record.hash_table_hashes);
+        tp_free(record.hash_table_ctrl);
+        tp_free(record.items_hashes);
         tp_free(&record);
     }
 }
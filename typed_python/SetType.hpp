@@ -51,6 +51,8 @@ class SetType : public Type {
 
     instance_ptr insertKey(instance_ptr self, instance_ptr key);
     instance_ptr lookupKey(instance_ptr self, instance_ptr key) const;
+    void lookupKeys(instance_ptr self, instance_ptr keys, size_t count, instance_ptr* outKeys) const;
+    void reserve(instance_ptr self, size_t extra);
     bool discard(instance_ptr self, instance_ptr key);
     void clear(instance_ptr self);
     void constructor(instance_ptr self);
@@ -88,7 +90,7 @@ class SetType : public Type {
 void deepcopyConcrete(
         instance_ptr dest,
         instance_ptr src,
-        std::unordered_map<instance_ptr, instance_ptr>& alreadyAllocated,
+        DeepcopyMap& alreadyAllocated,
         Slab* slab
     ) {
         hash_table_layout_ptr& destRecordPtr = *(hash_table_layout**)dest;
@@ -132,7 +134,11 @@ void deepcopyConcrete(
         res += bytesRequiredForAllocation(l.items_reserved);
 
         // count the hashtable
-        res += bytesRequiredForAllocation(sizeof(int32_t) * l.hash_table_size) * 2;
+        res += bytesRequiredForAllocation(sizeof(typed_python_hash_type) * l.items_reserved);
+        if (l.hash_table_slots) {
+            res += bytesRequiredForAllocation(sizeof(int64_t) * l.hash_table_size);
+            res += bytesRequiredForAllocation(l.ctrlBytecount());
+        }
 
         if (!m_key_type->isPOD()) {
             for (long k = 0; k < l.items_reserved; k++) {
@@ -1,5 +1,10 @@
 #include "Slab.hpp"
-#include "Type.hpp"
+#include "AllTypes.hpp"
+
+#include <cerrno>
+#include <cstring>
+#include <chrono>
+#include <sys/stat.h>
 
 
 void Slab::free(void* data) {
@@ -25,6 +30,408 @@ void Slab::free(void* data) {
             mAliveAllocs.erase(data);
         }
 
+        if (mIsExternalBuffer) {
+            // the buffer outlives us, so clear the header to let 'adoptAllocation'
+            // hand the memory out again.
+            ((Slab**)((uint8_t*)data - sizeof(std::max_align_t)))[0] = nullptr;
+        }
+
         decref();
     }
 }
+
+Slab* Slab::mapFile(int fd, size_t fileOffset, size_t dataBytecount, bool readOnly) {
+    size_t pageSize = ::getpagesize();
+
+    if (fileOffset % pageSize) {
+        throw std::runtime_error("Mapped file offsets must be a multiple of the page size.");
+    }
+
+    size_t dataPages = (dataBytecount + pageSize - 1) / pageSize;
+
+    // reserve one extra page in front of the data, so that the word immediately
+    // preceding the data (which tp_free uses to find the owning Slab) is writable
+    // even when the file itself is mapped read-only.
+    size_t regionBytecount = (dataPages + 1) * pageSize;
+
+    instance_ptr region = (instance_ptr)::mmap(
+        NULL,
+        regionBytecount,
+        PROT_READ | PROT_WRITE,
+        MAP_ANONYMOUS | MAP_PRIVATE,
+        -1,
+        0
+    );
+
+    if (region == MAP_FAILED) {
+        throw std::runtime_error("Failed to reserve address space for a mapped file.");
+    }
+
+    if (dataPages) {
+        void* mapped = ::mmap(
+            region + pageSize,
+            dataPages * pageSize,
+            readOnly ? PROT_READ : PROT_READ | PROT_WRITE,
+            (readOnly ? MAP_SHARED : MAP_PRIVATE) | MAP_FIXED,
+            fd,
+            fileOffset
+        );
+
+        if (mapped == MAP_FAILED) {
+            ::munmap(region, regionBytecount);
+            throw std::runtime_error("Failed to map file: " + std::string(strerror(errno)));
+        }
+    }
+
+    return new Slab(region, regionBytecount, true);
+}
+
+void* Slab::mappedData() {
+    if (!mIsMappedFile) {
+        throw std::runtime_error("Slab is not a mapped file.");
+    }
+
+    instance_ptr data = mSlabData + ::getpagesize();
+
+    ((Slab**)(data - sizeof(std::max_align_t)))[0] = this;
+
+    incref();
+
+    return data;
+}
+
+Slab* Slab::wrapBuffer(PyObject* owner, size_t dataBytecount) {
+    Slab* res = new Slab(nullptr, dataBytecount, false);
+
+    res->setTag(owner);
+
+    return res;
+}
+
+void* Slab::adoptAllocation(instance_ptr data) {
+    if (!mIsExternalBuffer) {
+        throw std::runtime_error("Slab doesn't wrap a buffer.");
+    }
+
+    Slab*& header = ((Slab**)(data - sizeof(std::max_align_t)))[0];
+
+    // the header of memory that was never adopted is zero. If it's set, some
+    // other Slab wrapping the same buffer still owns the allocation, and taking it
+    // over would leave that Slab's containers pointing at us.
+    if (header) {
+        throw std::runtime_error(
+            "This buffer is already in use by containers deserialized from it earlier."
+        );
+    }
+
+    header = this;
+
+    incref();
+
+    return data;
+}
+
+namespace {
+
+// the front of a file written by Slab::writeShared. The Slab object follows it,
+// and the Slab's allocations start on the next page after that.
+struct SharedSlabHeader {
+    char magic[8];
+
+    // the address the file has to be mapped at
+    uint64_t baseAddress;
+
+    // the size of the file, and of the mapping
+    uint64_t regionBytecount;
+
+    // a random number identifying this particular write of the file
+    uint64_t generation;
+
+    // the identity hash of the type of the root instance
+    uint32_t typeHash[5];
+
+    // where the root instance lives, as an offset from baseAddress
+    uint64_t rootOffset;
+
+    // how many allocations the Slab holds
+    uint64_t allocCount;
+};
+
+const char kSharedSlabMagic[8] = {'T', 'P', 'S', 'H', 'A', 'R', 'E', '1'};
+
+// writers pick a random, 2MB-aligned address in this range, which is far from
+// where the kernel puts the heap, shared libraries, and ordinary mappings, so
+// it's very likely to be free in other processes as well.
+const uint64_t kSharedRegionLow = 0x100000000000;
+const uint64_t kSharedRegionHigh = 0x600000000000;
+const uint64_t kSharedRegionAlignment = 2 * 1024 * 1024;
+
+// splitmix64, seeded from the clock and our pid, so that processes writing
+// shared slabs at the same time pick different addresses.
+uint64_t randomWord() {
+    static uint64_t state = std::chrono::high_resolution_clock::now().time_since_epoch().count()
+        ^ ((uint64_t)::getpid() << 32);
+
+    uint64_t z = (state += 0x9e3779b97f4a7c15ull);
+    z = (z ^ (z >> 30)) * 0xbf58476d1ce4e5b9ull;
+    z = (z ^ (z >> 27)) * 0x94d049bb133111ebull;
+    return z ^ (z >> 31);
+}
+
+size_t sharedSlabDataOffset() {
+    size_t pageSize = ::getpagesize();
+
+    size_t bytes = sizeof(SharedSlabHeader) + sizeof(std::max_align_t) + sizeof(Slab);
+
+    return (bytes + pageSize - 1) / pageSize * pageSize;
+}
+
+Slab* sharedSlabAt(instance_ptr base) {
+    size_t slabOffset = sizeof(SharedSlabHeader);
+
+    if (slabOffset % sizeof(std::max_align_t)) {
+        slabOffset += sizeof(std::max_align_t) - slabOffset % sizeof(std::max_align_t);
+    }
+
+    return (Slab*)(base + slabOffset);
+}
+
+// map 'bytecount' bytes of 'fd' at exactly 'address', or return false if
+// something else is already there.
+bool mapFileAt(instance_ptr address, size_t bytecount, int fd, int flags) {
+#ifdef MAP_FIXED_NOREPLACE
+    flags |= MAP_FIXED_NOREPLACE;
+#endif
+
+    void* res = ::mmap(address, bytecount, PROT_READ | PROT_WRITE, flags, fd, 0);
+
+    if (res == MAP_FAILED) {
+        return false;
+    }
+
+    // without MAP_FIXED_NOREPLACE, the address is only a hint
+    if (res != address) {
+        ::munmap(res, bytecount);
+        return false;
+    }
+
+    return true;
+}
+
+bool typeIsShareable(Type* t, std::set<Type*>& visited) {
+    if (visited.find(t) != visited.end()) {
+        return true;
+    }
+
+    visited.insert(t);
+
+    auto allShareable = [&](const std::vector<Type*>& types) {
+        for (Type* sub: types) {
+            if (!typeIsShareable(sub, visited)) {
+                return false;
+            }
+        }
+        return true;
+    };
+
+    switch (t->getTypeCategory()) {
+        case Type::TypeCategory::catNone:
+        case Type::TypeCategory::catBool:
+        case Type::TypeCategory::catUInt8:
+        case Type::TypeCategory::catUInt16:
+        case Type::TypeCategory::catUInt32:
+        case Type::TypeCategory::catUInt64:
+        case Type::TypeCategory::catInt8:
+        case Type::TypeCategory::catInt16:
+        case Type::TypeCategory::catInt32:
+        case Type::TypeCategory::catInt64:
+        case Type::TypeCategory::catFloat32:
+        case Type::TypeCategory::catFloat64:
+        case Type::TypeCategory::catString:
+        case Type::TypeCategory::catBytes:
+        case Type::TypeCategory::catValue:
+            return true;
+        case Type::TypeCategory::catListOf:
+        case Type::TypeCategory::catTupleOf:
+            return typeIsShareable(((TupleOrListOfType*)t)->getEltType(), visited);
+        case Type::TypeCategory::catDict:
+            return typeIsShareable(((DictType*)t)->keyType(), visited)
+                && typeIsShareable(((DictType*)t)->valueType(), visited);
+        case Type::TypeCategory::catConstDict:
+            return typeIsShareable(((ConstDictType*)t)->keyType(), visited)
+                && typeIsShareable(((ConstDictType*)t)->valueType(), visited);
+        case Type::TypeCategory::catSet:
+            return typeIsShareable(((SetType*)t)->keyType(), visited);
+        case Type::TypeCategory::catTuple:
+        case Type::TypeCategory::catNamedTuple:
+            return allShareable(((CompositeType*)t)->getTypes());
+        case Type::TypeCategory::catOneOf:
+            return allShareable(((OneOfType*)t)->getTypes());
+        case Type::TypeCategory::catAlternative:
+            for (auto& nameAndType: ((Alternative*)t)->subtypes()) {
+                if (!typeIsShareable(nameAndType.second, visited)) {
+                    return false;
+                }
+            }
+            return true;
+        case Type::TypeCategory::catConcreteAlternative:
+            return typeIsShareable(((ConcreteAlternative*)t)->getAlternative(), visited);
+        default:
+            return false;
+    }
+}
+
+} // anonymous namespace
+
+bool Slab::typeIsShareable(Type* t) {
+    std::set<Type*> visited;
+    return ::typeIsShareable(t, visited);
+}
+
+void Slab::writeShared(int fd, Type* t, instance_ptr data) {
+    if (!typeIsShareable(t)) {
+        throw std::runtime_error(
+            "Can't put instances of " + t->name() + " in a shared Slab, because they can hold "
+            "python objects, classes, functions, or pointers."
+        );
+    }
+
+    std::unordered_set<void*> visited;
+
+    size_t dataOffset = sharedSlabDataOffset();
+
+    size_t regionBytecount = roundUpToPage(
+        dataOffset
+        + bytesRequiredForAllocation(std::max<size_t>(t->bytecount(), 1))
+        + t->deepBytecount(data, visited, nullptr)
+    );
+
+    if (::ftruncate(fd, regionBytecount)) {
+        throw std::runtime_error("Failed to resize the shared Slab's file: " + std::string(strerror(errno)));
+    }
+
+    instance_ptr base = nullptr;
+
+    for (long attempt = 0; attempt < 16 && !base; attempt++) {
+        uint64_t slots = (kSharedRegionHigh - kSharedRegionLow - regionBytecount) / kSharedRegionAlignment;
+
+        instance_ptr candidate = (instance_ptr)(kSharedRegionLow + randomWord() % slots * kSharedRegionAlignment);
+
+        if (mapFileAt(candidate, regionBytecount, fd, MAP_SHARED)) {
+            base = candidate;
+        }
+    }
+
+    if (!base) {
+        throw std::runtime_error("Failed to find an address to build the shared Slab at.");
+    }
+
+    Slab* slab = new (sharedSlabAt(base)) Slab(
+        base + dataOffset,
+        regionBytecount - dataOffset,
+        base + dataOffset,
+        0
+    );
+
+    // the graph lives on in the file, so we tear down our Slab object without
+    // releasing anything in it.
+    auto detach = [&]() {
+        {
+            std::lock_guard<std::mutex> guard(aliveSlabsMutex());
+            aliveSlabs().erase(slab);
+        }
+
+        slab->~Slab();
+
+        ::munmap(base, regionBytecount);
+    };
+
+    try {
+        instance_ptr root = (instance_ptr)slab->allocate(std::max<size_t>(t->bytecount(), 1), t);
+
+        DeepcopyMap alreadyCopied;
+        t->deepcopy(root, data, alreadyCopied, slab);
+
+        SharedSlabHeader* header = (SharedSlabHeader*)base;
+
+        memcpy(header->magic, kSharedSlabMagic, sizeof(kSharedSlabMagic));
+        header->baseAddress = (uint64_t)base;
+        header->regionBytecount = regionBytecount;
+        header->generation = randomWord();
+
+        ShaHash typeHash = t->identityHash();
+        for (long k = 0; k < 5; k++) {
+            header->typeHash[k] = typeHash[k];
+        }
+
+        header->rootOffset = root - base;
+        header->allocCount = slab->refcount() - 1;
+    } catch(...) {
+        detach();
+        throw;
+    }
+
+    detach();
+}
+
+instance_ptr Slab::attachShared(int fd, Type* t) {
+    SharedSlabHeader header;
+
+    if (::pread(fd, &header, sizeof(header), 0) != sizeof(header)
+            || memcmp(header.magic, kSharedSlabMagic, sizeof(kSharedSlabMagic))) {
+        throw std::runtime_error("File is not a shared Slab.");
+    }
+
+    ShaHash typeHash = t->identityHash();
+    for (long k = 0; k < 5; k++) {
+        if (header.typeHash[k] != typeHash[k]) {
+            throw std::runtime_error("Shared Slab doesn't hold an instance of " + t->name() + ".");
+        }
+    }
+
+    struct stat fileStat;
+    if (::fstat(fd, &fileStat) || (uint64_t)fileStat.st_size < header.regionBytecount) {
+        throw std::runtime_error("Shared Slab's file is truncated.");
+    }
+
+    static std::mutex attachedMutex;
+    std::lock_guard<std::mutex> lock(attachedMutex);
+
+    instance_ptr base = (instance_ptr)header.baseAddress;
+
+    // slabs we've attached, by base address. They're never detached.
+    static std::map<instance_ptr, uint64_t> attachedGenerations;
+
+    auto it = attachedGenerations.find(base);
+
+    if (it != attachedGenerations.end()) {
+        if (it->second != header.generation) {
+            throw std::runtime_error(
+                "Can't attach the shared Slab because a different one is already attached at its address."
+            );
+        }
+
+        return base + header.rootOffset;
+    }
+
+    if (!mapFileAt(base, header.regionBytecount, fd, MAP_PRIVATE)) {
+        throw std::runtime_error(
+            "Can't attach the shared Slab because the address it was built at is in use in this process."
+        );
+    }
+
+    size_t dataOffset = sharedSlabDataOffset();
+
+    // replace the writer's Slab object (which isn't valid in this process) with
+    // one of our own. This only copies the first page.
+    new (sharedSlabAt(base)) Slab(
+        base + dataOffset,
+        header.regionBytecount - dataOffset,
+        base + header.regionBytecount,
+        header.allocCount
+    );
+
+    attachedGenerations[base] = header.generation;
+
+    return base + header.rootOffset;
+}
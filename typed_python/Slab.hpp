@@ -17,11 +17,14 @@
 #pragma once
 
 #include <Python.h>
+#include <algorithm>
 #include <vector>
 #include <atomic>
 #include <cstddef>
 #include <map>
 
+#include "Memory.hpp"
+
 class Type;
 
 typedef uint8_t* instance_ptr;
@@ -43,6 +46,9 @@ Models a contiguous block of memory with an embedded
 typed python object graph. Objects within the graph cannot be modified, and are
 released when no references are held to the slab.
 
+A 'growable' Slab is instead a chain of blocks ('chunks'): when an allocation
+doesn't fit in the last chunk, it adds one.
+
 If you release the reference to the slab and there are still external references to
 any of the internal objects, then undefined behavior will result (probably a crash)
 so don't do that. We will attempt to warn you by throwing an exception (and leaking the
@@ -61,26 +67,19 @@ public:
         mSlabData(nullptr),
         mAllocationPoint(nullptr),
         mIsFreeStore(isFreeStoreSlab),
+        mIsMappedFile(false),
+        mIsExternalBuffer(false),
+        mIsSharedSegment(false),
+        mIsGrowable(false),
+        mFullChunksBytecount(0),
         mRefcount(1),
         mTrackAllocTypes(false),
         mTag(nullptr)
     {
         if (!mIsFreeStore) {
-            if (slabSize > 1024 * 128 && HAVE_MMAP) {
-                size_t pageSize = ::getpagesize();
-                // round up to a page.
-                if (slabSize % pageSize) {
-                    slabSize = slabSize + (pageSize - slabSize % pageSize);
-                }
-
-                mSlabData = (instance_ptr)::mmap(NULL, slabSize, PROT_READ | PROT_WRITE, MAP_ANONYMOUS | MAP_PRIVATE, -1, 0);
-            } else {
-                mSlabData = (instance_ptr)::malloc(slabSize);
-            }
-
-            mAllocationPoint = mSlabData;
             mSlabBytecount = slabSize;
-            totalBytesAllocatedInSlabs().fetch_add(slabSize);
+            mSlabData = allocateChunk(mSlabBytecount);
+            mAllocationPoint = mSlabData;
         } else {
             if (slabSize > 0) {
                 throw std::runtime_error("Allocate the free-store slab with 0 bytecount please.");
@@ -91,6 +90,68 @@ public:
         aliveSlabs().insert(this);
     }
 
+    // construct a growable Slab whose first chunk holds 'initialChunkBytes'. Each
+    // chunk it adds is twice the size of the last, or big enough for the allocation
+    // that didn't fit, whichever is larger. This lets us copy an object graph into a
+    // Slab without knowing its size up front.
+    static Slab* growable(size_t initialChunkBytes) {
+        Slab* res = new Slab(false, initialChunkBytes);
+        res->mIsGrowable = true;
+        return res;
+    }
+
+    // deepcopy the instance 'data' of type 't' into a new Slab built inside the
+    // file 'fd', which we resize to fit. The file holds the Slab object itself as
+    // well as the object graph, and records the address it was built at, so that
+    // any process that maps it at that same address (see 'attachShared') can use
+    // the graph without relocating any pointers. 't' must be 'shareable': see
+    // 'typeIsShareable'.
+    static void writeShared(int fd, Type* t, instance_ptr data);
+
+    // map a file written by 'writeShared' copy-on-write at the address it was
+    // built at, and return a pointer to the instance of 't' stored in it. Pages
+    // are shared with every other process mapping the file until this process
+    // writes to them (which includes changing a refcount).
+    //
+    // The mapping stays attached for the life of the process, since we can't
+    // know when the last reference into it goes away. Attaching the same file
+    // again returns the existing mapping.
+    static instance_ptr attachShared(int fd, Type* t);
+
+    // can instances of 't' live in a shared Slab? Their layouts can't hold
+    // anything that only means something in the process that wrote them: python
+    // objects, vtables, functions, or pointers to arbitrary memory.
+    static bool typeIsShareable(Type* t);
+
+    // construct a Slab whose single allocation is 'dataBytecount' bytes of the file
+    // 'fd', starting at 'fileOffset' (which must be page-aligned). The file is mapped
+    // lazily: pages are faulted in as they're touched, and processes that map the same
+    // file share the physical pages until they write to them. If 'readOnly', the data
+    // is mapped shared and without write permission. Otherwise it's copy-on-write, and
+    // modifications are never written back to the file.
+    //
+    // Use 'mappedData' to get the allocation.
+    static Slab* mapFile(int fd, size_t fileOffset, size_t dataBytecount, bool readOnly);
+
+    // for a slab created with 'mapFile', the pointer to the mapped data. This is a
+    // regular slab allocation: it holds a reference to the slab until it's tp_free'd.
+    void* mappedData();
+
+    // construct a Slab whose allocations live in 'dataBytecount' bytes of memory it
+    // doesn't own, exported by the python object 'owner'. The slab holds 'owner' as
+    // its tag, so the memory stays alive until the last allocation is released.
+    //
+    // Use 'adoptAllocation' to turn pointers into the memory into allocations.
+    static Slab* wrapBuffer(PyObject* owner, size_t dataBytecount);
+
+    // for a slab created with 'wrapBuffer', make 'data' an allocation of this slab
+    // by writing the allocation header into the sizeof(std::max_align_t) bytes in
+    // front of it, which must be writable and not part of any other allocation.
+    // The allocation holds a reference to the slab until it's tp_free'd, which
+    // zeroes the header again. Throws if the header is already set, i.e. if
+    // another slab wrapping the same memory still owns the allocation.
+    void* adoptAllocation(instance_ptr data);
+
     void enableTrackAllocTypes() {
         mTrackAllocTypes = true;
     }
@@ -109,15 +170,16 @@ public:
     }
 
     ~Slab() {
-        if (!mIsFreeStore) {
-            if (mSlabData) {
-                if (mSlabBytecount > 1024 * 128 && HAVE_MMAP) {
-                    ::munmap(mSlabData, mSlabBytecount);
-                } else {
-                    ::free(mSlabData);
-                }
+        if (mIsMappedFile) {
+            ::munmap(mSlabData, mSlabBytecount);
+        } else if (mIsExternalBuffer || mIsSharedSegment) {
+            // the memory belongs to mTag
+        } else if (!mIsFreeStore) {
+            releaseChunk(mSlabData, mSlabBytecount);
+
+            for (auto& chunk: mFullChunks) {
+                releaseChunk(chunk.first, chunk.second);
             }
-            totalBytesAllocatedInSlabs().fetch_sub(mSlabBytecount);
         }
 
         if (mTag) {
@@ -165,7 +227,7 @@ public:
     }
 
     size_t getBytecount() {
-        return mSlabBytecount;
+        return mSlabBytecount + mFullChunksBytecount;
     }
 
     static std::atomic<int64_t>& totalBytesAllocatedInSlabs() {
@@ -181,7 +243,11 @@ public:
                 return nullptr;
             }
 
-            if (mAllocationPoint + bytes > mSlabData + mSlabBytecount) {
+            if (mIsGrowable) {
+                if (!canAllocate(bytes)) {
+                    addChunk(bytesRequiredForAllocation(bytes));
+                }
+            } else if (mAllocationPoint + bytes > mSlabData + mSlabBytecount) {
                 throw std::runtime_error("Slab ran out of data.");
             }
 
@@ -202,6 +268,40 @@ public:
         }
     }
 
+    // is there room left in the slab to 'allocate' another 'bytes' bytes?
+    bool canAllocate(size_t bytes) {
+        return !mIsFreeStore && mSlabData
+            && bytesRequiredForAllocation(bytes) <= (size_t)(mSlabData + mSlabBytecount - mAllocationPoint);
+    }
+
+    // for a growable slab we're done allocating into, give back the whole pages at
+    // the end of the last chunk that we never used. The slab can still grow after
+    // this, but it'll need a new chunk to do it.
+    void releaseUnusedPages() {
+        if (!mIsGrowable || !isMappedChunk(mSlabBytecount)) {
+            return;
+        }
+
+        size_t pageSize = ::getpagesize();
+
+        size_t usedBytes = mAllocationPoint - mSlabData;
+
+        // keep the chunk big enough that 'releaseChunk' still knows it was mapped
+        size_t keptBytes = std::max(
+            (usedBytes + pageSize - 1) / pageSize * pageSize,
+            roundUpToPage(1024 * 128 + 1)
+        );
+
+        if (keptBytes >= mSlabBytecount) {
+            return;
+        }
+
+        ::munmap(mSlabData + keptBytes, mSlabBytecount - keptBytes);
+
+        totalBytesAllocatedInSlabs().fetch_sub(mSlabBytecount - keptBytes);
+        mSlabBytecount = keptBytes;
+    }
+
     // if mTrackAllocTypes is enabled
     size_t allocCount() {
         return mAllocs.size();
@@ -262,7 +362,110 @@ public:
     }
 
 private:
-    // how many bytes we allocated
+    // chunks bigger than this come straight from mmap, and are a whole number of pages
+    static bool isMappedChunk(size_t bytecount) {
+        return bytecount > 1024 * 128 && HAVE_MMAP;
+    }
+
+    static size_t roundUpToPage(size_t bytecount) {
+        size_t pageSize = ::getpagesize();
+
+        if (bytecount % pageSize) {
+            bytecount = bytecount + (pageSize - bytecount % pageSize);
+        }
+
+        return bytecount;
+    }
+
+    // allocate a chunk of 'bytecount' bytes, rounding 'bytecount' up to
+    // whatever we actually allocated.
+    static instance_ptr allocateChunk(size_t& bytecount) {
+        instance_ptr res;
+
+        if (isMappedChunk(bytecount)) {
+            bytecount = roundUpToPage(bytecount);
+
+            res = (instance_ptr)::mmap(NULL, bytecount, PROT_READ | PROT_WRITE, MAP_ANONYMOUS | MAP_PRIVATE, -1, 0);
+        } else {
+            res = (instance_ptr)::malloc(bytecount);
+        }
+
+        totalBytesAllocatedInSlabs().fetch_add(bytecount);
+
+        return res;
+    }
+
+    static void releaseChunk(instance_ptr data, size_t bytecount) {
+        if (data) {
+            if (isMappedChunk(bytecount)) {
+                ::munmap(data, bytecount);
+            } else {
+                ::free(data);
+            }
+        }
+
+        totalBytesAllocatedInSlabs().fetch_sub(bytecount);
+    }
+
+    // retire the current chunk and start a new one with room for at least 'minBytes'
+    void addChunk(size_t minBytes) {
+        size_t chunkBytes = std::max(
+            std::min(mSlabBytecount * 2, (size_t)MAX_CHUNK_BYTES),
+            minBytes
+        );
+
+        instance_ptr chunk = allocateChunk(chunkBytes);
+
+        mFullChunks.push_back(std::make_pair(mSlabData, mSlabBytecount));
+        mFullChunksBytecount += mSlabBytecount;
+
+        mSlabData = chunk;
+        mSlabBytecount = chunkBytes;
+        mAllocationPoint = mSlabData;
+    }
+
+    static constexpr size_t MAX_CHUNK_BYTES = 64 * 1024 * 1024;
+
+    Slab(instance_ptr mappedRegion, size_t mappedBytecount, bool isMappedFile) :
+        mSlabBytecount(mappedBytecount),
+        mSlabData(mappedRegion),
+        mAllocationPoint(mappedRegion),
+        mIsFreeStore(false),
+        mIsMappedFile(isMappedFile),
+        mIsExternalBuffer(!isMappedFile),
+        mIsSharedSegment(false),
+        mIsGrowable(false),
+        mFullChunksBytecount(0),
+        mRefcount(1),
+        mTrackAllocTypes(false),
+        mTag(nullptr)
+    {
+        std::lock_guard<std::mutex> guard(aliveSlabsMutex());
+        aliveSlabs().insert(this);
+    }
+
+    // construct a Slab, inside a shared segment, whose allocations are the
+    // 'allocCount' allocations in the 'dataBytecount' bytes at 'data', followed
+    // by free space starting at 'allocationPoint'. See 'writeShared'.
+    Slab(instance_ptr data, size_t dataBytecount, instance_ptr allocationPoint, size_t allocCount) :
+        mSlabBytecount(dataBytecount),
+        mSlabData(data),
+        mAllocationPoint(allocationPoint),
+        mIsFreeStore(false),
+        mIsMappedFile(false),
+        mIsExternalBuffer(false),
+        mIsSharedSegment(true),
+        mIsGrowable(false),
+        mFullChunksBytecount(0),
+        mRefcount(1 + allocCount),
+        mTrackAllocTypes(false),
+        mTag(nullptr)
+    {
+        std::lock_guard<std::mutex> guard(aliveSlabsMutex());
+        aliveSlabs().insert(this);
+    }
+
+    // how many bytes we allocated (for a growable slab, in the current chunk)
     size_t mSlabBytecount;
 
     std::atomic<int64_t> mRefcount;
@@ -275,6 +478,24 @@ private:
 
     bool mIsFreeStore;
 
+    // if true, mSlabData is a region we mapped in 'mapFile', and the first
+    // page is an anonymous page holding the header of the data allocation.
+    bool mIsMappedFile;
+
+    // if true, mSlabData is memory owned by mTag. See 'wrapBuffer'.
+    bool mIsExternalBuffer;
+
+    // if true, this Slab object and its data live inside a mapped file. See 'writeShared'.
+    bool mIsSharedSegment;
+
+    // if true, we add chunks when we run out of room. See 'growable'.
+    bool mIsGrowable;
+
+    // for a growable slab, the chunks before the current one, and their sizes.
+    std::vector<std::pair<instance_ptr, size_t> > mFullChunks;
+
+    size_t mFullChunksBytecount;
+
     bool mTrackAllocTypes;
 
     std::mutex mAllocMutex;
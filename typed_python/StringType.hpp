@@ -130,7 +130,7 @@ public:
     void deepcopyConcrete(
         instance_ptr dest,
         instance_ptr src,
-        std::unordered_map<instance_ptr, instance_ptr>& alreadyAllocated,
+        DeepcopyMap& alreadyAllocated,
         Slab* slab
     ) {
         layout_ptr& destLayout = *(layout**)dest;
@@ -184,6 +184,22 @@ public:
 
     template<class buf_t>
     void serialize(instance_ptr self, buf_t& buffer, size_t fieldNumber) {
+        if (buffer.isDedupEnabled()) {
+            size_t rawBytecount = count(self) * bytes_per_codepoint(self);
+
+            if (rawBytecount >= buffer.DEDUP_MIN_BYTECOUNT && buffer.writeDedupReference(
+                    buffer.dedupIndexForContent(
+                        TypeCategory::catString,
+                        bytes_per_codepoint(self),
+                        (uint8_t*)eltPtr(self, 0),
+                        rawBytecount
+                    ),
+                    fieldNumber
+                )) {
+                return;
+            }
+        }
+
         if (bytes_per_codepoint(self) == 1) {
             size_t bytecount = countUtf8BytesRequiredFor((uint8_t*)eltPtr(self, 0), count(self));
 
@@ -240,13 +256,15 @@ public:
 
     template<class buf_t>
     void deserialize(instance_ptr self, buf_t& buffer, size_t wireType) {
-        assertWireTypesEqual(wireType, WireType::BYTES);
+        buffer.template readPossiblyDeduped<layout>(self, wireType, this, [&](size_t wireType) {
+            assertWireTypesEqual(wireType, WireType::BYTES);
 
-        int32_t ct = buffer.readUnsignedVarint();
+            int32_t ct = buffer.readUnsignedVarint();
 
-        buffer.read_bytes_fun(ct, [&](const uint8_t* bytes) {
-            size_t codepointCount = countUtf8Codepoints(bytes, ct);
-            *(layout**)self = createFromUtf8((const char*)bytes, codepointCount);
+            buffer.read_bytes_fun(ct, [&](const uint8_t* bytes) {
+                size_t codepointCount = countUtf8Codepoints(bytes, ct);
+                *(layout**)self = createFromUtf8((const char*)bytes, codepointCount);
+            });
         });
     }
 
@@ -16,6 +16,12 @@
 
 #include "AllTypes.hpp"
 
+// compiled code allocates list layouts itself (see tuple_of_wrapper.py)
+static_assert(
+    sizeof(TupleOrListOfType::layout) == 40,
+    "LAYOUT_BYTECOUNT in tuple_of_wrapper.py needs to match TupleOrListOfType::layout"
+);
+
 bool TupleOrListOfType::isBinaryCompatibleWithConcrete(Type* other) {
     if (other->getTypeCategory() != m_typeCategory) {
         return false;
@@ -56,7 +62,7 @@ void TupleOrListOfType::repr(instance_ptr self, ReprAccumulator& stream, bool is
 
     stream << (m_is_tuple ? "(" : "[");
 
-    int32_t ct = count(self);
+    int64_t ct = count(self);
 
     for (long k = 0; k < ct;k++) {
         if (k > 0) {
@@ -77,7 +83,7 @@ typed_python_hash_type TupleOrListOfType::hash(instance_ptr left) {
     if ((*(layout**)left)->hash_cache == -1) {
         HashAccumulator acc(0);
 
-        int32_t ct = count(left);
+        int64_t ct = count(left);
 
         for (long k = 0; k < ct;k++) {
             acc.add(m_element_type->hash(eltPtr(left, k)));
@@ -224,8 +230,7 @@ void TupleOrListOfType::destroy(instance_ptr selfPtr) {
 
     if (self->refcount.fetch_sub(1) == 1) {
         m_element_type->destroy(self->count, [&](int64_t k) {return eltPtr(self,k);});
-        tp_free(self->data);
-        tp_free(self);
+        freeLayout(self);
     }
 }
 
@@ -264,12 +269,7 @@ void TupleOrListOfType::reserve(instance_ptr self, size_t target) {
         target = self_layout->count;
     }
 
-    self_layout->data = (uint8_t*)tp_realloc(
-        self_layout->data,
-        getEltType()->bytecount() * self_layout->reserved,
-        getEltType()->bytecount() * target
-    );
-    self_layout->reserved = target;
+    reserveLayout(self_layout, getEltType()->bytecount(), target);
 }
 
 void TupleOrListOfType::reverse(instance_ptr self) {
@@ -307,24 +307,13 @@ void ListOfType::append(instance_ptr self, instance_ptr other) {
     layout_ptr& self_layout = *(layout_ptr*)self;
 
     if (!self_layout) {
-        self_layout = (layout_ptr)tp_malloc(sizeof(layout));
-        self_layout->data = (uint8_t*)tp_malloc(getEltType()->bytecount());
-
+        self_layout = allocateLayout(getEltType()->bytecount(), 1);
         self_layout->count = 1;
-        self_layout->refcount = 1;
-        self_layout->reserved = 1;
-        self_layout->hash_cache = -1;
 
         getEltType()->copy_constructor(eltPtr(self, 0), other);
     } else {
         if (self_layout->count == self_layout->reserved) {
-            int64_t new_reserved = self_layout->reserved * 1.25 + 1;
-            self_layout->data = (uint8_t*)tp_realloc(
-                self_layout->data,
-                getEltType()->bytecount() * self_layout->reserved,
-                getEltType()->bytecount() * new_reserved
-            );
-            self_layout->reserved = new_reserved;
+            reserveLayout(self_layout, getEltType()->bytecount(), self_layout->reserved * 1.25 + 1);
         }
 
         getEltType()->copy_constructor(eltPtr(self, self_layout->count), other);
@@ -17,6 +17,7 @@
 #pragma once
 
 #include "Type.hpp"
+#include <limits>
 
 class TupleOrListOfType : public Type {
 public:
@@ -24,9 +25,21 @@ public:
     public:
         std::atomic<int64_t> refcount;
         typed_python_hash_type hash_cache;
-        int32_t count;
-        int32_t reserved;
+        int64_t count;
+        int64_t reserved;
         uint8_t* data;
+
+        // containers whose size is known when they're created keep their
+        // elements in the same allocation, directly after the layout, so
+        // that short lists and tuples only cost one allocation. 'data' moves
+        // out to its own allocation if the container grows past that.
+        uint8_t* inlineData() {
+            return (uint8_t*)(this + 1);
+        }
+
+        bool hasInlineData() {
+            return data == inlineData();
+        }
     };
 
     typedef layout* layout_ptr;
@@ -64,7 +77,7 @@ public:
     //serialize, but don't write a count
     template<class buf_t>
     void serializeStream(instance_ptr self, buf_t& buffer) {
-        int32_t ct = count(self);
+        int64_t ct = count(self);
         m_element_type->check([&](auto& concrete_type) {
             for (long k = 0; k < ct;k++) {
                 concrete_type.serialize(this->eltPtr(self,k), buffer, 0);
@@ -75,7 +88,7 @@ public:
     void deepcopyConcrete(
         instance_ptr dest,
         instance_ptr src,
-        std::unordered_map<instance_ptr, instance_ptr>& alreadyAllocated,
+        DeepcopyMap& alreadyAllocated,
         Slab* slab
     ) {
         layout_ptr& destLayout = *(layout**)dest;
@@ -88,13 +101,15 @@ public:
 
         auto it = alreadyAllocated.find((instance_ptr)srcLayout);
         if (it == alreadyAllocated.end()) {
-            destLayout = (layout_ptr)slab->allocate(sizeof(layout), this);
+            destLayout = (layout_ptr)slab->allocate(
+                sizeof(layout) + getEltType()->bytecount() * srcLayout->count,
+                this
+            );
             destLayout->hash_cache = srcLayout->hash_cache;
             destLayout->refcount = 0;
             destLayout->reserved = srcLayout->count;
             destLayout->count = srcLayout->count;
-
-            destLayout->data = (instance_ptr)slab->allocate(getEltType()->bytecount() * srcLayout->count, nullptr);
+            destLayout->data = destLayout->inlineData();
 
             if (destLayout->count) {
                 if (getEltType()->isPOD()) {
@@ -137,13 +152,21 @@ public:
             return 0;
         }
 
-        size_t res = (
-            bytesRequiredForAllocation(sizeof(layout)) +
-            bytesRequiredForAllocation(self_layout->reserved * getEltType()->bytecount())
-        );
+        size_t res;
+
+        if (self_layout->hasInlineData()) {
+            res = bytesRequiredForAllocation(
+                sizeof(layout) + self_layout->reserved * getEltType()->bytecount()
+            );
+        } else {
+            res = (
+                bytesRequiredForAllocation(sizeof(layout)) +
+                bytesRequiredForAllocation(self_layout->reserved * getEltType()->bytecount())
+            );
+        }
 
         if (!getEltType()->isPOD()) {
-            int32_t ct = count(instance);
+            int64_t ct = count(instance);
 
             for (long k = 0; k < ct; k++) {
                 res += m_element_type->deepBytecount(eltPtr(instance, k), alreadyVisited, outSlabs);
@@ -191,13 +214,8 @@ public:
             return;
         }
 
-        self = (layout*)tp_malloc(sizeof(layout));
-
+        self = allocateLayout(getEltType()->bytecount(), std::max<int64_t>(1, count));
         self->count = count;
-        self->refcount = 1;
-        self->reserved = std::max<int32_t>(1, count);
-        self->hash_cache = -1;
-        self->data = (uint8_t*)tp_malloc(getEltType()->bytecount() * self->reserved);
 
         for (int64_t k = 0; k < count; k++) {
             try {
@@ -206,8 +224,7 @@ public:
                 for (long k2 = k-1; k2 >= 0; k2--) {
                     m_element_type->destroy(eltPtr(self,k2));
                 }
-                tp_free(self->data);
-                tp_free(self);
+                freeLayout(self);
                 throw;
             }
         }
@@ -218,21 +235,14 @@ public:
     void constructorUnbounded(instance_ptr selfPtr, const sub_constructor& allocator) {
         layout_ptr& self = *(layout_ptr*)selfPtr;
 
-        self = (layout*)tp_malloc(sizeof(layout));
-
-        self->count = 0;
-        self->refcount = 1;
-        self->reserved = 1;
-        self->hash_cache = -1;
-        self->data = (uint8_t*)tp_malloc(getEltType()->bytecount() * self->reserved);
+        self = allocateLayout(getEltType()->bytecount(), 1);
 
         while(true) {
             try {
                 if (!allocator(eltPtr(self, self->count), self->count)) {
                     if (m_is_tuple && self->count == 0) {
                         //tuples need to be the nullptr
-                        tp_free(self->data);
-                        tp_free(self);
+                        freeLayout(self);
                         self = nullptr;
                     }
                     return;
@@ -246,13 +256,106 @@ public:
                 for (long k2 = (long)self->count-1; k2 >= 0; k2--) {
                     m_element_type->destroy(eltPtr(self,k2));
                 }
-                tp_free(self->data);
-                tp_free(self);
+                freeLayout(self);
                 throw;
             }
         }
     }
 
+    // allocate an empty layout with inline room for 'reserved' elements
+    static layout_ptr allocateLayout(size_t eltBytecount, int64_t reserved) {
+        layout_ptr self = (layout_ptr)tp_malloc(sizeof(layout) + eltBytecount * reserved);
+
+        self->refcount = 1;
+        self->hash_cache = -1;
+        self->count = 0;
+        self->reserved = reserved;
+        self->data = self->inlineData();
+
+        return self;
+    }
+
+    // release a layout's memory. Its elements must already be destroyed.
+    static void freeLayout(layout_ptr self) {
+        if (!self->hasInlineData()) {
+            tp_free(self->data);
+        }
+
+        tp_free(self);
+    }
+
+    // resize the element buffer of 'self' to hold 'target' elements, which
+    // must be at least its count.
+    static void reserveLayout(layout_ptr self, size_t eltBytecount, int64_t target) {
+        if (self->hasInlineData()) {
+            // the inline buffer can't move or grow, but we can keep using it
+            if (target <= self->reserved) {
+                return;
+            }
+
+            uint8_t* newData = (uint8_t*)tp_malloc(eltBytecount * target);
+            memcpy(newData, self->data, eltBytecount * self->count);
+            self->data = newData;
+        } else {
+            self->data = (uint8_t*)tp_realloc(
+                self->data,
+                eltBytecount * self->reserved,
+                eltBytecount * target
+            );
+        }
+
+        self->reserved = target;
+    }
+
+    // if 'buffer' has a pod buffer and our elements are POD, write the element
+    // data of 'self', which has 'ct' > 0 elements, to the pod buffer and its
+    // offset to the stream as field 1. Returns false if the caller needs to write
+    // the elements to the stream itself.
+    template<class buf_t>
+    bool serializeToPodBuffer(instance_ptr self, buf_t& buffer, size_t ct) {
+        if (!buffer.hasPodBuffer() || !m_element_type->isPOD() || !m_element_type->bytecount()) {
+            return false;
+        }
+
+        buffer.writeUnsignedVarintObject(
+            1,
+            buffer.writePodData(eltPtr(self, 0), ct * m_element_type->bytecount())
+        );
+
+        return true;
+    }
+
+    // construct a container at 'self' with 'ct' elements whose data is in the
+    // pod buffer of 'buffer', at the offset written by 'serializeToPodBuffer'.
+    // The elements aren't copied: the container's data points into the buffer.
+    template<class buf_t>
+    void deserializeFromPodBuffer(instance_ptr self, buf_t& buffer, size_t ct, size_t wireType) {
+        assertWireTypesEqual(wireType, WireType::VARINT);
+
+        size_t eltBytecount = m_element_type->bytecount();
+
+        if (!m_element_type->isPOD() || !eltBytecount || ct > std::numeric_limits<size_t>::max() / eltBytecount) {
+            throw std::runtime_error("Corrupt data (pod buffer)");
+        }
+
+        size_t offset = buffer.readUnsignedVarint();
+
+        layout_ptr& self_layout = *(layout_ptr*)self;
+
+        self_layout = (layout_ptr)tp_malloc(sizeof(layout));
+        self_layout->refcount = 1;
+        self_layout->hash_cache = -1;
+        self_layout->count = ct;
+        self_layout->reserved = ct;
+
+        try {
+            self_layout->data = buffer.adoptPodData(offset, ct * eltBytecount);
+        } catch(...) {
+            tp_free(self_layout);
+            throw;
+        }
+    }
+
     void constructor(instance_ptr self);
 
     void destroy(instance_ptr self);
@@ -349,6 +452,11 @@ public:
         buffer.writeUnsignedVarintObject(0, id);
         buffer.writeUnsignedVarintObject(0, ct);
 
+        if (ct && serializeToPodBuffer(self, buffer, ct)) {
+            buffer.writeEndCompound();
+            return;
+        }
+
         m_element_type->check([&](auto& concrete_type) {
             for (long k = 0; k < ct; k++) {
                 concrete_type.serialize(this->eltPtr(self,k), buffer, 0);
@@ -380,13 +488,24 @@ public:
             (*(layout**)self)->refcount++;
             buffer.addCachedPointer(id, *((layout**)self), this);
         } else {
-            constructor(self, ct, [&](instance_ptr tgt, int k) {
+            auto fieldAndWire = buffer.readFieldNumberAndWireType();
+
+            if (fieldAndWire.first == 1) {
+                deserializeFromPodBuffer(self, buffer, ct, fieldAndWire.second);
+                buffer.addCachedPointer(id, *((layout**)self), this);
+                (*(layout**)self)->refcount++;
+                buffer.finishCompoundMessage(wireType);
+                return;
+            }
+
+            constructor(self, ct, [&](instance_ptr tgt, int64_t k) {
                 if (k == 0) {
                     buffer.addCachedPointer(id, *((layout**)self), this);
                     (*(layout**)self)->refcount++;
+                } else {
+                    fieldAndWire = buffer.readFieldNumberAndWireType();
                 }
 
-                auto fieldAndWire = buffer.readFieldNumberAndWireType();
                 if (fieldAndWire.first) {
                     throw std::runtime_error("Corrupt data (count)");
                 }
@@ -428,10 +547,22 @@ public:
             return;
         }
 
+        if (buffer.isDedupEnabled() && buffer.writeDedupReference(
+                buffer.dedupIndexForIdentity(*(void**)self, this),
+                fieldNumber
+            )) {
+            return;
+        }
+
         buffer.writeBeginCompound(fieldNumber);
 
         buffer.writeUnsignedVarintObject(0, ct);
 
+        if (serializeToPodBuffer(self, buffer, ct)) {
+            buffer.writeEndCompound();
+            return;
+        }
+
         m_element_type->check([&](auto& concrete_type) {
             for (long k = 0; k < ct; k++) {
                 concrete_type.serialize(this->eltPtr(self,k), buffer, 0);
@@ -444,6 +575,13 @@ public:
 
     template<class buf_t>
     void deserialize(instance_ptr self, buf_t& buffer, size_t wireType) {
+        buffer.template readPossiblyDeduped<layout>(self, wireType, this, [&](size_t wireType) {
+            deserializeValue(self, buffer, wireType);
+        });
+    }
+
+    template<class buf_t>
+    void deserializeValue(instance_ptr self, buf_t& buffer, size_t wireType) {
         if (wireType == WireType::EMPTY) {
             *(layout**)self = nullptr;
             return;
@@ -453,8 +591,25 @@ public:
 
         size_t ct = buffer.readUnsignedVarintObject();
 
-        constructor(self, ct, [&](instance_ptr tgt, int k) {
-            auto fieldAndWire = buffer.readFieldNumberAndWireType();
+        if (ct == 0) {
+            *(layout**)self = nullptr;
+            buffer.finishCompoundMessage(wireType);
+            return;
+        }
+
+        auto fieldAndWire = buffer.readFieldNumberAndWireType();
+
+        if (fieldAndWire.first == 1) {
+            deserializeFromPodBuffer(self, buffer, ct, fieldAndWire.second);
+            buffer.finishCompoundMessage(wireType);
+            return;
+        }
+
+        constructor(self, ct, [&](instance_ptr tgt, int64_t k) {
+            if (k) {
+                fieldAndWire = buffer.readFieldNumberAndWireType();
+            }
+
             if (fieldAndWire.first) {
                 throw std::runtime_error("Corrupt data (count)");
             }
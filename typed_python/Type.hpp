@@ -38,6 +38,7 @@
 #include "util.hpp"
 #include "MutuallyRecursiveTypeGroup.hpp"
 #include "Slab.hpp"
+#include "DeepcopyMap.hpp"
 
 class SerializationBuffer;
 class DeserializationBuffer;
@@ -332,7 +333,7 @@ public:
     void deepcopy(
         instance_ptr dest,
         instance_ptr src,
-        std::unordered_map<instance_ptr, instance_ptr>& alreadyAllocated,
+        DeepcopyMap& alreadyAllocated,
         Slab* slab
     ) {
         this->check([&](auto& subtype) {
@@ -343,7 +344,7 @@ public:
     void deepcopyConcrete(
         instance_ptr dest,
         instance_ptr src,
-        std::unordered_map<instance_ptr, instance_ptr>& alreadyAllocated,
+        DeepcopyMap& alreadyAllocated,
         Slab* slab
     ) {
         throw std::runtime_error(
@@ -40,6 +40,7 @@ from typed_python.module import Module
 from typed_python.type_function import TypeFunction
 from typed_python.hash import sha_hash
 from typed_python.SerializationContext import SerializationContext
+from typed_python.stream_deserializer import Deserializer
 from typed_python.type_filter import TypeFilter
 from typed_python._types import (
     Forward, TupleOf, ListOf, Tuple, NamedTuple, OneOf, ConstDict,
@@ -48,7 +49,7 @@ from typed_python._types import (
     getOrSetTypeResolver, Set, Class, Type, BoundMethod,
     TypedCell, pointerTo, refTo, copy, identityHash,
     deepBytecount, deepcopy, deepcopyContiguous, totalBytesAllocatedInSlabs,
-    deepBytecountAndSlabs, Slab,
+    deepBytecountAndSlabs, Slab, Arena,
     totalBytesAllocatedOnFreeStore
 )
 import typed_python._types as _types
@@ -75,6 +76,7 @@ from typed_python.generator import Generator  # noqa
 from typed_python.lib.map import map  # noqa
 from typed_python.lib.pmap import pmap  # noqa
 from typed_python.lib.reduce import reduce  # noqa
+from typed_python.lib.delta import serializeDelta, applyDelta  # noqa
 
 _types.initializeGlobalStatics()
 
@@ -10,6 +10,10 @@
 #include "BytesType.hpp"
 #include "hash_table_layout.hpp"
 #include "PyInstance.hpp"
+#include "NullSerializationContext.hpp"
+#include "SerializationBuffer.hpp"
+#include "DeserializationBuffer.hpp"
+#include "PyArena.hpp"
 
 #include <pythread.h>
 
@@ -49,6 +53,35 @@ PyObject* getRuntimeSingleton() {
     return singleton;
 }
 
+// A 64 bit hash of a run of bytes, for compiled code that needs more bits than
+// 'typed_python_hash_type' holds. It's deliberately unrelated to HashAccumulator,
+// so that callers can combine the two as independent hashes of the same value.
+static uint64_t hash64OfBytes(const uint8_t* data, size_t bytecount) {
+    const uint64_t multiplier = 0x9E3779B97F4A7C15ULL;
+
+    uint64_t h = bytecount * multiplier;
+
+    size_t i = 0;
+
+    for (; i + 8 <= bytecount; i += 8) {
+        uint64_t word;
+        memcpy(&word, data + i, 8);
+
+        h = (h ^ word) * multiplier;
+        h ^= h >> 29;
+    }
+
+    if (i < bytecount) {
+        uint64_t word = 0;
+        memcpy(&word, data + i, bytecount - i);
+
+        h = (h ^ word) * multiplier;
+        h ^= h >> 29;
+    }
+
+    return h;
+}
+
 // Note: extern C identifiers are distinguished only up to 32 characters
 // nativepython_runtime_12345678901
 extern "C" {
@@ -688,6 +721,41 @@ extern "C" {
         return StringType::createFromUtf8(utf8_str, len);
     }
 
+    // the number of bytes 'nativepython_runtime_string_encode_utf8' writes for 'l'
+    int64_t nativepython_runtime_string_utf8_bytecount(StringType::layout* l) {
+        if (!l) {
+            return 0;
+        }
+
+        if (l->bytes_per_codepoint == 1) {
+            return countUtf8BytesRequiredFor((uint8_t*)l->data, l->pointcount);
+        }
+        if (l->bytes_per_codepoint == 2) {
+            return countUtf8BytesRequiredFor((uint16_t*)l->data, l->pointcount);
+        }
+        return countUtf8BytesRequiredFor((uint32_t*)l->data, l->pointcount);
+    }
+
+    // write 'l' to 'out' as utf-8. 'out' must have room for
+    // 'nativepython_runtime_string_utf8_bytecount(l)' bytes.
+    void nativepython_runtime_string_encode_utf8(StringType::layout* l, uint8_t* out) {
+        if (!l) {
+            return;
+        }
+
+        if (l->bytes_per_codepoint == 1) {
+            encodeUtf8((uint8_t*)l->data, l->pointcount, out);
+        } else if (l->bytes_per_codepoint == 2) {
+            encodeUtf8((uint16_t*)l->data, l->pointcount, out);
+        } else {
+            encodeUtf8((uint32_t*)l->data, l->pointcount, out);
+        }
+    }
+
+    StringType::layout* nativepython_runtime_string_decode_utf8(const uint8_t* data, int64_t bytecount) {
+        return StringType::createFromUtf8((const char*)data, StringType::countUtf8Codepoints(data, bytecount));
+    }
+
     BytesType::layout* nativepython_runtime_bytes_getslice_int64(BytesType::layout* lhs, int64_t start, int64_t stop) {
         if (!lhs) {
             return nullptr;
@@ -1803,7 +1871,7 @@ extern "C" {
         return result;
     }
 
-    int32_t nativepython_tableAllocateNewSlot(hash_table_layout* layout, size_t kvPairSize) {
+    int64_t nativepython_tableAllocateNewSlot(hash_table_layout* layout, size_t kvPairSize) {
         return layout->allocateNewSlot(kvPairSize);
     }
 
@@ -1842,6 +1910,35 @@ extern "C" {
         layout->compressItemTable(kvPairSize);
     }
 
+    void nativepython_tableReserve(hash_table_layout* layout, size_t kvPairSize, int64_t extra) {
+        layout->reserve(kvPairSize, extra);
+    }
+
+    // the (key, value) pair at 'index' in a ConstDict that's stored as a
+    // tree of subtrees.
+    instance_ptr nativepython_constDictKvPairPtr(void* constDictLayout, ConstDictType* tp, int64_t index) {
+        return tp->kvPairPtrKey((instance_ptr)&constDictLayout, index);
+    }
+
+    // the first (key, value) pair of the leaf of a ConstDict that holds the pair
+    // at 'index'. The leaf holds the pairs from 'outLeafStart' to 'outLeafEnd'.
+    instance_ptr nativepython_constDictLeafForIndex(
+        void* constDictLayout,
+        ConstDictType* tp,
+        int64_t index,
+        int64_t* outLeafStart,
+        int64_t* outLeafEnd
+    ) {
+        int64_t indexInLeaf = index;
+
+        instance_ptr leaf = tp->leafForIndex((instance_ptr)&constDictLayout, indexInLeaf);
+
+        *outLeafStart = index - indexInLeaf;
+        *outLeafEnd = *outLeafStart + tp->size(leaf);
+
+        return tp->kvPairPtrKey(leaf, 0);
+    }
+
     int32_t nativepython_hash_float32(float val) {
         HashAccumulator acc;
 
@@ -1882,6 +1979,22 @@ extern "C" {
         return BytesType::Make()->hash((instance_ptr)&s);
     }
 
+    uint64_t nativepython_hash64_string(StringType::layout* s) {
+        if (!s) {
+            return 0;
+        }
+
+        return hash64OfBytes(s->data, s->bytes_per_codepoint * s->pointcount);
+    }
+
+    uint64_t nativepython_hash64_bytes(BytesType::layout* s) {
+        if (!s) {
+            return 0;
+        }
+
+        return hash64OfBytes(s->data, s->bytecount);
+    }
+
     int32_t nativepython_hash_alternative(Alternative::layout* s, Alternative* tp) {
         // TODO: assert tp is an Alternative
         //if (tp->getTypeCategory() != Type::TypeCategory::catAlternative)
@@ -2365,6 +2478,31 @@ extern "C" {
         return false; // __exit__ returning false means don't suppress exceptions
     }
 
+    // enter and exit a typed_python.Arena held in 'arenaPtr'. These only
+    // touch the Arena and this thread's current-arena pointer, so they don't
+    // need the GIL unless they fail.
+    void np_pyobj_arena_enter(PythonObjectOfType::layout_type* arenaPtr) {
+        try {
+            ((PyArenaObject*)arenaPtr->pyObj)->mArena->enter();
+        } catch(std::exception& e) {
+            PyEnsureGilAcquired getTheGil;
+            PyErr_SetString(PyExc_RuntimeError, e.what());
+            throw PythonExceptionSet();
+        }
+    }
+
+    bool np_pyobj_arena_exit(PythonObjectOfType::layout_type* arenaPtr) {
+        try {
+            ((PyArenaObject*)arenaPtr->pyObj)->mArena->exit();
+        } catch(std::exception& e) {
+            PyEnsureGilAcquired getTheGil;
+            PyErr_SetString(PyExc_RuntimeError, e.what());
+            throw PythonExceptionSet();
+        }
+
+        return false; // __exit__ returning false means don't suppress exceptions
+    }
+
     double np_pyobj_ceil(PythonObjectOfType::layout_type* obj) {
         PyEnsureGilAcquired acquireTheGil;
 
@@ -2607,6 +2745,66 @@ extern "C" {
         return res;
     }
 
+    // release the memory of a list or tuple whose elements are already destroyed
+    void tp_list_or_tuple_of_free(TupleOrListOfType::layout* obj) {
+        TupleOrListOfType::freeLayout(obj);
+    }
+
+    // resize the element buffer of a list to hold 'target' elements
+    void tp_list_or_tuple_of_reserve(TupleOrListOfType::layout* obj, int64_t eltBytecount, int64_t target) {
+        TupleOrListOfType::reserveLayout(obj, eltBytecount, target);
+    }
+
+    // serialize the value of type 'typeObj' at 'data' the way 'serialize(T, value)'
+    // would. The compiler only calls this for types that can't hold python
+    // objects, so we never need the GIL except to report an error.
+    BytesType::layout* np_serialize_no_gil(instance_ptr data, Type* typeObj) {
+        static NullSerializationContext context;
+
+        try {
+            SerializationBuffer buffer(context);
+
+            typeObj->serialize(data, buffer, 0);
+            buffer.finalize();
+            buffer.releaseHeldObjects();
+
+            return BytesType::createFromPtr((const char*)buffer.buffer(), buffer.size());
+        } catch(std::exception& e) {
+            PyEnsureGilAcquired getTheGil;
+            PyErr_SetString(PyExc_TypeError, e.what());
+            throw PythonExceptionSet();
+        }
+    }
+
+    // deserialize a value of type 'typeObj' from 'bytes' into the uninitialized
+    // memory at 'out', the way 'deserialize(T, bytes)' would. As with
+    // 'np_serialize_no_gil', 'typeObj' can't hold python objects.
+    void np_deserialize_no_gil(BytesType::layout* bytes, Type* typeObj, instance_ptr out) {
+        static NullSerializationContext context;
+
+        try {
+            DeserializationBuffer buffer(
+                bytes ? bytes->data : nullptr,
+                bytes ? bytes->bytecount : 0,
+                context
+            );
+
+            try {
+                auto fieldAndWireType = buffer.readFieldNumberAndWireType();
+                typeObj->deserialize(out, buffer, fieldAndWireType.second);
+            } catch(...) {
+                buffer.releaseHeldObjects();
+                throw;
+            }
+
+            buffer.releaseHeldObjects();
+        } catch(std::exception& e) {
+            PyEnsureGilAcquired getTheGil;
+            PyErr_SetString(PyExc_TypeError, e.what());
+            throw PythonExceptionSet();
+        }
+    }
+
     bool np_pyobj_to_bool(PythonObjectOfType::layout_type* obj) {
         PyEnsureGilAcquired getTheGil;
 
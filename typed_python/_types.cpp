@@ -35,6 +35,9 @@
 #include "PythonSerializationContext.hpp"
 #include "UnicodeProps.hpp"
 #include "PySlab.hpp"
+#include "PyArena.hpp"
+#include "PyDeserializationStream.hpp"
+#include "ArrowColumns.hpp"
 #include "_types.hpp"
 
 PyObject *MakeTupleOrListOfType(PyObject* nullValue, PyObject* args, bool isTuple) {
@@ -1460,7 +1463,7 @@ PyObject* deepcopy(PyObject* nullValue, PyObject* args) {
     // this is the 'free store' slab
     Slab* slab = new Slab(true, 0);
 
-    std::unordered_map<instance_ptr, instance_ptr> alreadyCopied;
+    DeepcopyMap alreadyCopied;
 
     try {
         PyObject* res = PythonObjectOfType::deepcopyPyObject(arg, alreadyCopied, slab);
@@ -1499,13 +1502,9 @@ PyObject* deepcopyContiguous(PyObject* nullValue, PyObject* args, PyObject* kwar
         return NULL;
     }
 
-    std::unordered_set<void*> visited;
-    size_t bytecount = PythonObjectOfType::deepBytecountForPyObj(arg, visited, nullptr);
-
-    // add some space to deal with the front python object we may need
-    bytecount += 128;
-
-    Slab* slab = new Slab(false, bytecount);
+    // copy in a single pass, letting the slab grow as it fills up, rather than
+    // walking the graph once to size the slab and again to copy it.
+    Slab* slab = Slab::growable(1024);
 
     if (tag) {
         slab->setTag(tag);
@@ -1515,10 +1514,11 @@ PyObject* deepcopyContiguous(PyObject* nullValue, PyObject* args, PyObject* kwar
         slab->enableTrackAllocTypes();
     }
 
-    std::unordered_map<instance_ptr, instance_ptr> alreadyCopied;
+    DeepcopyMap alreadyCopied;
 
     try {
         PyObject* res = PythonObjectOfType::deepcopyPyObject(arg, alreadyCopied, slab);
+        slab->releaseUnusedPages();
         slab->decref();
         return res;
     } catch(PythonExceptionSet& e) {
@@ -1684,6 +1684,10 @@ PyObject *serialize(PyObject* nullValue, PyObject* args) {
         return NULL;
     }
 
+    if (a3 && a3 != Py_None && ((PythonSerializationContext&)*context).compressesInParallel()) {
+        return PyObject_CallMethod(a3, "serialize", "OO", (PyObject*)a2, (PyObject*)a1);
+    }
+
     SerializationBuffer b(*context);
 
     try{
@@ -1998,6 +2002,10 @@ PyObject *deserialize(PyObject* nullValue, PyObject* args) {
     std::shared_ptr<SerializationContext> context(new NullSerializationContext());
     if (a3 && a3 != Py_None) {
         context.reset(new PythonSerializationContext(a3));
+
+        if (((PythonSerializationContext&)*context).compressesInParallel()) {
+            return PyObject_CallMethod(a3, "deserialize", "OO", (PyObject*)a2, (PyObject*)a1);
+        }
     }
 
     return translateExceptionToPyObject([&]() {
@@ -2015,6 +2023,229 @@ PyObject *deserialize(PyObject* nullValue, PyObject* args) {
     });
 }
 
+PyDoc_STRVAR(serializeWithPodBuffer_doc,
+    "serializeWithPodBuffer(T, value, context=None) -> (bytes, bytes)\n"
+    "\n"
+    "Serialize 'value' as a T, like 'serialize', but write the element data of\n"
+    "every ListOf or TupleOf of POD values to a separate 'pod buffer' instead of\n"
+    "the stream. Each block of element data is aligned to 64 bytes. Returns the\n"
+    "stream and the pod buffer.\n"
+    );
+PyObject *serializeWithPodBuffer(PyObject* nullValue, PyObject* args) {
+    PyObject* a1;
+    PyObject* a2;
+    PyObject* a3 = nullptr;
+
+    if (!PyArg_ParseTuple(args, "OO|O", &a1, &a2, &a3)) {
+        return NULL;
+    }
+
+    Type* serializeType = PyInstance::unwrapTypeArgToTypePtr(a1);
+
+    if (!serializeType) {
+        PyErr_Format(
+            PyExc_TypeError,
+            "first argument to serializeWithPodBuffer must be a type object, not %S",
+            a1
+        );
+        return NULL;
+    }
+
+    serializeType->assertForwardsResolved();
+
+    std::shared_ptr<SerializationContext> context(new NullSerializationContext());
+
+    try {
+        if (a3 && a3 != Py_None) {
+            context.reset(new PythonSerializationContext(a3));
+        }
+    } catch (std::exception& e) {
+        PyErr_SetString(PyExc_TypeError, e.what());
+        return NULL;
+    } catch(PythonExceptionSet& e) {
+        return NULL;
+    }
+
+    SerializationBuffer b(*context);
+    std::vector<uint8_t> podBuffer;
+
+    b.setPodBuffer(&podBuffer);
+
+    try {
+        Instance i = Instance::createAndInitialize(serializeType, [&](instance_ptr p) {
+            PyInstance::copyConstructFromPythonInstance(serializeType, p, a2, ConversionLevel::New);
+        });
+
+        {
+            PyEnsureGilReleased releaseTheGil;
+
+            i.type()->serialize(i.data(), b, 0);
+        }
+
+        b.finalize();
+    } catch (std::exception& e) {
+        PyErr_SetString(PyExc_TypeError, e.what());
+        return NULL;
+    } catch(PythonExceptionSet& e) {
+        return NULL;
+    }
+
+    PyObjectStealer stream(PyBytes_FromStringAndSize((const char*)b.buffer(), b.size()));
+    PyObjectStealer pod(PyBytes_FromStringAndSize((const char*)podBuffer.data(), podBuffer.size()));
+
+    if (!stream || !pod) {
+        return NULL;
+    }
+
+    return PyTuple_Pack(2, (PyObject*)stream, (PyObject*)pod);
+}
+
+PyDoc_STRVAR(deserializeWithPodBuffer_doc,
+    "deserializeWithPodBuffer(T, data, podBuffer, context=None) -> T\n"
+    "\n"
+    "Deserialize a stream written by 'serializeWithPodBuffer'. 'podBuffer' is any\n"
+    "writable, contiguous buffer (a bytearray, an mmap, ...) holding the pod\n"
+    "buffer. The POD containers in the result point directly into it rather than\n"
+    "copying their elements out, and hold a Slab that keeps 'podBuffer' alive.\n"
+    "The padding in front of each block of element data gets overwritten, so a\n"
+    "buffer can't be deserialized again while containers read from it earlier\n"
+    "are still alive.\n"
+    );
+PyObject *deserializeWithPodBuffer(PyObject* nullValue, PyObject* args) {
+    PyObject* a1;
+    PyObject* a2;
+    PyObject* a3;
+    PyObject* a4 = nullptr;
+
+    if (!PyArg_ParseTuple(args, "OOO|O", &a1, &a2, &a3, &a4)) {
+        return NULL;
+    }
+
+    Type* serializeType = PyInstance::unwrapTypeArgToTypePtr(a1);
+
+    if (!serializeType) {
+        PyErr_SetString(PyExc_TypeError, "first argument to deserializeWithPodBuffer must be a type object");
+        return NULL;
+    }
+
+    if (!PyBytes_Check(a2)) {
+        PyErr_SetString(PyExc_TypeError, "second argument to deserializeWithPodBuffer must be a bytes object");
+        return NULL;
+    }
+
+    PyObjectStealer podView(PyMemoryView_FromObject(a3));
+
+    if (!podView) {
+        return NULL;
+    }
+
+    Py_buffer* podBuffer = PyMemoryView_GET_BUFFER((PyObject*)podView);
+
+    if (podBuffer->readonly || !PyBuffer_IsContiguous(podBuffer, 'C')) {
+        PyErr_SetString(PyExc_TypeError, "podBuffer must be a writable, contiguous buffer");
+        return NULL;
+    }
+
+    std::shared_ptr<SerializationContext> context(new NullSerializationContext());
+    if (a4 && a4 != Py_None) {
+        context.reset(new PythonSerializationContext(a4));
+    }
+
+    return translateExceptionToPyObject([&]() {
+        // the containers we read hold their own references to the slab
+        std::shared_ptr<Slab> slab(
+            Slab::wrapBuffer(podView, podBuffer->len),
+            [](Slab* s) { s->decref(); }
+        );
+
+        DeserializationBuffer buf((uint8_t*)PyBytes_AsString(a2), PyBytes_GET_SIZE(a2), *context);
+
+        buf.setPodBuffer(&*slab, (uint8_t*)podBuffer->buf, podBuffer->len);
+
+        serializeType->assertForwardsResolved();
+
+        Instance i = Instance::createAndInitialize(serializeType, [&](instance_ptr p) {
+            PyEnsureGilReleased releaseTheGil;
+            auto fieldAndWireType = buf.readFieldNumberAndWireType();
+            serializeType->deserialize(p, buf, fieldAndWireType.second);
+        });
+
+        return PyInstance::extractPythonObject(i.data(), i.type());
+    });
+}
+
+PyDoc_STRVAR(writeSharedSlab_doc,
+    "writeSharedSlab(T, value, fileno)\n"
+    "\n"
+    "Deepcopy 'value', as a T, into the file open as 'fileno', resizing it to fit.\n"
+    "The file holds a Slab built at a fixed address, which 'attachSharedSlab' can\n"
+    "map back in, in any process, without deserializing anything. T can't hold\n"
+    "python objects, Classes, functions, or pointers.\n"
+    );
+PyObject *writeSharedSlab(PyObject* nullValue, PyObject* args) {
+    PyObject* a1;
+    PyObject* a2;
+    int fileno;
+
+    if (!PyArg_ParseTuple(args, "OOi", &a1, &a2, &fileno)) {
+        return NULL;
+    }
+
+    Type* sharedType = PyInstance::unwrapTypeArgToTypePtr(a1);
+
+    if (!sharedType) {
+        PyErr_Format(PyExc_TypeError, "first argument to writeSharedSlab must be a type object, not %S", a1);
+        return NULL;
+    }
+
+    return translateExceptionToPyObject([&]() {
+        sharedType->assertForwardsResolved();
+
+        Instance i = Instance::createAndInitialize(sharedType, [&](instance_ptr p) {
+            PyInstance::copyConstructFromPythonInstance(sharedType, p, a2, ConversionLevel::New);
+        });
+
+        {
+            PyEnsureGilReleased releaseTheGil;
+            Slab::writeShared(fileno, sharedType, i.data());
+        }
+
+        return incref(Py_None);
+    });
+}
+
+PyDoc_STRVAR(attachSharedSlab_doc,
+    "attachSharedSlab(T, fileno) -> T\n"
+    "\n"
+    "Map the file open as 'fileno', written by 'writeSharedSlab', copy-on-write at\n"
+    "the address it was built at, and return the T it holds. The mapping stays\n"
+    "attached for the life of the process, and attaching the same file again\n"
+    "reuses it.\n"
+    );
+PyObject *attachSharedSlab(PyObject* nullValue, PyObject* args) {
+    PyObject* a1;
+    int fileno;
+
+    if (!PyArg_ParseTuple(args, "Oi", &a1, &fileno)) {
+        return NULL;
+    }
+
+    Type* sharedType = PyInstance::unwrapTypeArgToTypePtr(a1);
+
+    if (!sharedType) {
+        PyErr_Format(PyExc_TypeError, "first argument to attachSharedSlab must be a type object, not %S", a1);
+        return NULL;
+    }
+
+    return translateExceptionToPyObject([&]() {
+        sharedType->assertForwardsResolved();
+
+        instance_ptr root = Slab::attachShared(fileno, sharedType);
+
+        return PyInstance::extractPythonObject(root, sharedType);
+    });
+}
+
 PyObject *decodeSerializedObject(PyObject* nullValue, PyObject* args) {
     if (PyTuple_Size(args) != 1) {
         PyErr_SetString(PyExc_TypeError, "validateSerializedObject takes 1 bytes argument");
@@ -2176,6 +2407,286 @@ PyObject *validateSerializedObjectStream(PyObject* nullValue, PyObject* args) {
     });
 }
 
+PyDoc_STRVAR(completeMessagesBytecount_doc,
+    "completeMessagesBytecount(data) -> int\n"
+    "\n"
+    "Return the number of bytes at the start of the uncompressed buffer 'data'\n"
+    "that hold complete top-level messages of a serialized stream, without\n"
+    "decoding them. Whatever follows is the beginning of an incomplete message.\n"
+    "Raises if 'data' is corrupt.\n"
+    );
+PyObject *completeMessagesBytecount(PyObject* nullValue, PyObject* args) {
+    PyObject* a1;
+
+    if (!PyArg_ParseTuple(args, "O", &a1)) {
+        return NULL;
+    }
+
+    Py_buffer data;
+
+    if (PyObject_GetBuffer(a1, &data, PyBUF_SIMPLE) == -1) {
+        return NULL;
+    }
+
+    std::shared_ptr<SerializationContext> context(new NullSerializationContext());
+
+    PyObject* res = translateExceptionToPyObject([&](){
+        DeserializationBuffer buf((uint8_t*)data.buf, data.len, *context);
+
+        size_t complete = 0;
+
+        try {
+            PyEnsureGilReleased releaseTheGil;
+
+            while (!buf.isDone()) {
+                buf.readMessageAndDiscard();
+                complete = buf.pos();
+            }
+        } catch(std::runtime_error& e) {
+            if (std::string(e.what()) != "out of data") {
+                throw;
+            }
+        }
+
+        return PyLong_FromSize_t(complete);
+    });
+
+    PyBuffer_Release(&data);
+
+    return res;
+}
+
+// unwrap 'arg' as a ListOf or TupleOf type for the arrow functions
+static TupleOrListOfType* unwrapArrowContainerType(PyObject* arg, const char* funcName) {
+    Type* t = PyInstance::unwrapTypeArgToTypePtr(arg);
+
+    if (!t || !t->isTupleOrListOf()) {
+        PyErr_Format(PyExc_TypeError, "first argument to %s must be a ListOf or TupleOf type, not %S", funcName, arg);
+        return nullptr;
+    }
+
+    t->assertForwardsResolved();
+
+    return (TupleOrListOfType*)t;
+}
+
+PyDoc_STRVAR(arrowSchema_doc,
+    "arrowSchema(T) -> ((name, arrowType, nullable), ...)\n"
+    "\n"
+    "Describe the Arrow columns that 'toArrowColumns' produces for the ListOf or\n"
+    "TupleOf type T: one per field of a NamedTuple element type, or a single\n"
+    "column named 'values' otherwise. 'arrowType' is one of 'bool', 'int8' ...\n"
+    "'uint64', 'float32', 'float64', 'utf8' or 'binary'.\n"
+    );
+PyObject *arrowSchema(PyObject* nullValue, PyObject* args) {
+    PyObject* a1;
+
+    if (!PyArg_ParseTuple(args, "O", &a1)) {
+        return NULL;
+    }
+
+    TupleOrListOfType* containerType = unwrapArrowContainerType(a1, "arrowSchema");
+
+    if (!containerType) {
+        return NULL;
+    }
+
+    return translateExceptionToPyObject([&]() {
+        std::vector<ArrowColumn> columns = ArrowColumn::columnsFor(containerType->getEltType());
+
+        PyObjectStealer res(PyTuple_New(columns.size()));
+
+        for (long k = 0; k < columns.size(); k++) {
+            PyTuple_SetItem(
+                res,
+                k,
+                Py_BuildValue(
+                    "(ssO)",
+                    columns[k].name().c_str(),
+                    columns[k].arrowType().c_str(),
+                    columns[k].isNullable() ? Py_True : Py_False
+                )
+            );
+        }
+
+        return incref(res);
+    });
+}
+
+PyDoc_STRVAR(toArrowColumns_doc,
+    "toArrowColumns(T, values) -> ((nullCount, validity, offsets, data), ...)\n"
+    "\n"
+    "Convert 'values', a T (a ListOf or TupleOf), to Arrow's columnar layout, one\n"
+    "entry per column of 'arrowSchema(T)'. Each is the column's null count and its\n"
+    "validity bitmap, offsets and data buffers as bytes. 'validity' is None if\n"
+    "there are no nulls, and 'offsets' is None for fixed-width columns.\n"
+    );
+PyObject *toArrowColumns(PyObject* nullValue, PyObject* args) {
+    PyObject* a1;
+    PyObject* a2;
+
+    if (!PyArg_ParseTuple(args, "OO", &a1, &a2)) {
+        return NULL;
+    }
+
+    TupleOrListOfType* containerType = unwrapArrowContainerType(a1, "toArrowColumns");
+
+    if (!containerType) {
+        return NULL;
+    }
+
+    return translateExceptionToPyObject([&]() {
+        std::vector<ArrowColumn> columns = ArrowColumn::columnsFor(containerType->getEltType());
+
+        Instance values = Instance::createAndInitialize(containerType, [&](instance_ptr p) {
+            PyInstance::copyConstructFromPythonInstance(containerType, p, a2, ConversionLevel::New);
+        });
+
+        int64_t count = containerType->count(values.data());
+        instance_ptr elements = count ? containerType->eltPtr(values.data(), 0) : nullptr;
+
+        std::vector<ArrowColumn::Buffers> buffers;
+
+        {
+            PyEnsureGilReleased releaseTheGil;
+
+            for (auto& column: columns) {
+                buffers.push_back(
+                    column.exportColumn(elements, containerType->getEltType()->bytecount(), count)
+                );
+            }
+        }
+
+        auto toBytes = [&](const std::vector<uint8_t>& data) {
+            return PyBytes_FromStringAndSize((const char*)data.data(), data.size());
+        };
+
+        PyObjectStealer res(PyTuple_New(columns.size()));
+
+        for (long k = 0; k < columns.size(); k++) {
+            PyObjectStealer validity(buffers[k].nullCount ? toBytes(buffers[k].validity) : incref(Py_None));
+            PyObjectStealer offsets(buffers[k].offsets.size() ? toBytes(buffers[k].offsets) : incref(Py_None));
+            PyObjectStealer data(toBytes(buffers[k].data));
+
+            if (!validity || !offsets || !data) {
+                throw PythonExceptionSet();
+            }
+
+            PyTuple_SetItem(
+                res,
+                k,
+                Py_BuildValue("(LOOO)", (long long)buffers[k].nullCount, (PyObject*)validity, (PyObject*)offsets, (PyObject*)data)
+            );
+        }
+
+        return incref(res);
+    });
+}
+
+PyDoc_STRVAR(fromArrowColumns_doc,
+    "fromArrowColumns(T, count, columns) -> T\n"
+    "\n"
+    "Build a T (a ListOf or TupleOf) of 'count' elements out of Arrow columns laid\n"
+    "out as 'toArrowColumns' produces them, one per column of 'arrowSchema(T)'.\n"
+    "Each column is (offset, validity, offsets, data), where 'offset' is the index\n"
+    "of its first value in the buffers, the buffers are any objects supporting\n"
+    "the buffer protocol, and 'validity' and 'offsets' may be None.\n"
+    );
+PyObject *fromArrowColumns(PyObject* nullValue, PyObject* args) {
+    PyObject* a1;
+    long long count;
+    PyObject* a3;
+
+    if (!PyArg_ParseTuple(args, "OLO", &a1, &count, &a3)) {
+        return NULL;
+    }
+
+    TupleOrListOfType* containerType = unwrapArrowContainerType(a1, "fromArrowColumns");
+
+    if (!containerType) {
+        return NULL;
+    }
+
+    // the buffers we hold views of, three per column, released when we exit
+    std::vector<Py_buffer> views;
+    std::vector<int64_t> columnOffsets;
+
+    PyObject* res = translateExceptionToPyObject([&]() {
+        std::vector<ArrowColumn> columns = ArrowColumn::columnsFor(containerType->getEltType());
+
+        if (count < 0) {
+            throw std::runtime_error("count can't be negative");
+        }
+
+        iterate(a3, [&](PyObject* column) {
+            long long offset;
+            PyObject* buffers[3];
+
+            if (!PyArg_ParseTuple(column, "LOOO", &offset, &buffers[0], &buffers[1], &buffers[2])) {
+                throw PythonExceptionSet();
+            }
+
+            columnOffsets.push_back(offset);
+
+            for (PyObject* buf: buffers) {
+                views.push_back(Py_buffer());
+                views.back().obj = nullptr;
+
+                if (buf != Py_None && PyObject_GetBuffer(buf, &views.back(), PyBUF_SIMPLE) == -1) {
+                    views.back().obj = nullptr;
+                    throw PythonExceptionSet();
+                }
+            }
+        });
+
+        if (columnOffsets.size() != columns.size()) {
+            throw std::runtime_error(
+                "Expected " + std::to_string(columns.size()) + " columns but got "
+                + std::to_string(columnOffsets.size())
+            );
+        }
+
+        std::vector<ArrowColumn::SourceBuffers> sources;
+
+        for (long k = 0; k < columns.size(); k++) {
+            Py_buffer* b = &views[k * 3];
+
+            sources.push_back(ArrowColumn::SourceBuffers());
+            sources.back().offset = columnOffsets[k];
+            sources.back().validity = b[0].obj ? (const uint8_t*)b[0].buf : nullptr;
+            sources.back().validityBytecount = b[0].obj ? b[0].len : 0;
+            sources.back().offsets = b[1].obj ? (const uint8_t*)b[1].buf : nullptr;
+            sources.back().offsetsBytecount = b[1].obj ? b[1].len : 0;
+            sources.back().data = b[2].obj ? (const uint8_t*)b[2].buf : nullptr;
+            sources.back().dataBytecount = b[2].obj ? b[2].len : 0;
+        }
+
+        Instance result = Instance::createAndInitialize(containerType, [&](instance_ptr p) {
+            PyEnsureGilReleased releaseTheGil;
+
+            for (long k = 0; k < columns.size(); k++) {
+                columns[k].validate(sources[k], count);
+            }
+
+            containerType->constructor(p, count, [&](instance_ptr element, int64_t i) {
+                for (long k = 0; k < columns.size(); k++) {
+                    columns[k].importValue(element, sources[k], i);
+                }
+            });
+        });
+
+        return PyInstance::extractPythonObject(result.data(), result.type());
+    });
+
+    for (auto& view: views) {
+        if (view.obj) {
+            PyBuffer_Release(&view);
+        }
+    }
+
+    return res;
+}
+
 PyObject *deserializeStream(PyObject* nullValue, PyObject* args) {
     if (PyTuple_Size(args) != 2 && PyTuple_Size(args) != 3) {
         PyErr_SetString(PyExc_TypeError, "deserialize takes 2 or 3 positional arguments");
@@ -2890,7 +3401,15 @@ static PyMethodDef module_methods[] = {
     {"validateSerializedObject", (PyCFunction)validateSerializedObject, METH_VARARGS, NULL},
     {"validateSerializedObjectStream", (PyCFunction)validateSerializedObjectStream, METH_VARARGS, NULL},
     {"identityHash", (PyCFunction)identityHash, METH_VARARGS, NULL},
+    {"serializeWithPodBuffer", (PyCFunction)serializeWithPodBuffer, METH_VARARGS, serializeWithPodBuffer_doc},
+    {"deserializeWithPodBuffer", (PyCFunction)deserializeWithPodBuffer, METH_VARARGS, deserializeWithPodBuffer_doc},
+    {"writeSharedSlab", (PyCFunction)writeSharedSlab, METH_VARARGS, writeSharedSlab_doc},
+    {"attachSharedSlab", (PyCFunction)attachSharedSlab, METH_VARARGS, attachSharedSlab_doc},
     {"serializeStream", (PyCFunction)serializeStream, METH_VARARGS, NULL},
+    {"completeMessagesBytecount", (PyCFunction)completeMessagesBytecount, METH_VARARGS, completeMessagesBytecount_doc},
+    {"arrowSchema", (PyCFunction)arrowSchema, METH_VARARGS, arrowSchema_doc},
+    {"toArrowColumns", (PyCFunction)toArrowColumns, METH_VARARGS, toArrowColumns_doc},
+    {"fromArrowColumns", (PyCFunction)fromArrowColumns, METH_VARARGS, fromArrowColumns_doc},
     {"deserializeStream", (PyCFunction)deserializeStream, METH_VARARGS, NULL},
     {"is_default_constructible", (PyCFunction)is_default_constructible, METH_VARARGS, NULL},
     {"buildPyFunctionObject", (PyCFunction)buildPyFunctionObject, METH_VARARGS | METH_KEYWORDS, NULL},
@@ -3022,5 +3541,17 @@ PyInit__types(void)
 
     PyModule_AddObject(module, "Slab", (PyObject*)incref(&PyType_Slab));
 
+    if (PyType_Ready(&PyType_Arena) < 0) {
+        return NULL;
+    }
+
+    PyModule_AddObject(module, "Arena", (PyObject*)incref(&PyType_Arena));
+
+    if (PyType_Ready(&PyType_DeserializationStream) < 0) {
+        return NULL;
+    }
+
+    PyModule_AddObject(module, "DeserializationStream", (PyObject*)incref(&PyType_DeserializationStream));
+
     return module;
 }
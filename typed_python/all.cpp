@@ -68,4 +68,6 @@ compile the entire group all at once.
 #include "TypeOrPyobj.cpp"
 #include "Memory.cpp"
 #include "PySlab.cpp"
+#include "PyArena.cpp"
+#include "PyDeserializationStream.cpp"
 #include "Slab.cpp"
@@ -0,0 +1,210 @@
+#   Copyright 2017-2021 typed_python Authors
+#
+#   Licensed under the Apache License, Version 2.0 (the "License");
+#   you may not use this file except in compliance with the License.
+#   You may obtain a copy of the License at
+#
+#       http://www.apache.org/licenses/LICENSE-2.0
+#
+#   Unless required by applicable law or agreed to in writing, software
+#   distributed under the License is distributed on an "AS IS" BASIS,
+#   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#   See the License for the specific language governing permissions and
+#   limitations under the License.
+
+import threading
+import time
+
+import pytest
+
+from typed_python import (
+    Arena, Dict, Entrypoint, ListOf, totalBytesAllocatedInSlabs, totalBytesAllocatedOnFreeStore
+)
+
+
+def makeScratch(n):
+    d = Dict(str, ListOf(int))()
+
+    for i in range(n):
+        d[str(i)] = ListOf(int)(range(i % 10))
+
+    return d
+
+
+def test_arena_allocations_are_released_together():
+    slabBytes0 = totalBytesAllocatedInSlabs()
+    freeStoreBytes0 = totalBytesAllocatedOnFreeStore()
+
+    with Arena(1024) as a:
+        assert a.isActive()
+
+        makeScratch(1000)
+
+        # the memory stays in the arena even though the objects are gone
+        assert a.bytecount() > 1024
+        assert totalBytesAllocatedInSlabs() == slabBytes0 + a.bytecount()
+        assert totalBytesAllocatedOnFreeStore() == freeStoreBytes0
+        assert a.liveAllocCount() == 0
+
+    assert not a.isActive()
+    assert a.bytecount() == 0
+    assert a.liveAllocCount() == 0
+    assert totalBytesAllocatedInSlabs() == slabBytes0
+
+
+def test_escaping_objects_stay_valid():
+    slabBytes0 = totalBytesAllocatedInSlabs()
+
+    with Arena() as a:
+        kept = makeScratch(100)
+        assert a.liveAllocCount() > 0
+
+    assert a.liveAllocCount() > 0
+    assert totalBytesAllocatedInSlabs() > slabBytes0
+    assert kept["99"] == list(range(9))
+
+    kept = None
+
+    assert totalBytesAllocatedInSlabs() == slabBytes0
+
+
+def test_copy_out_of_arena():
+    slabBytes0 = totalBytesAllocatedInSlabs()
+
+    with Arena() as a:
+        result = a.copyOut(makeScratch(100))
+
+    assert a.liveAllocCount() == 0
+    assert totalBytesAllocatedInSlabs() == slabBytes0
+    assert result == makeScratch(100)
+
+
+def test_nested_arenas():
+    with Arena() as outer:
+        with Arena() as inner:
+            x = ListOf(int)(range(100))
+
+            assert inner.liveAllocCount() > 0
+            assert outer.liveAllocCount() == 0
+
+            y = inner.copyOut(x)
+
+            assert outer.liveAllocCount() > 0
+
+        x = None
+        assert inner.liveAllocCount() > 0
+
+        with pytest.raises(RuntimeError, match="already active"):
+            outer.__enter__()
+
+        inner.__enter__()
+
+        with pytest.raises(RuntimeError, match="reverse order"):
+            outer.__exit__(None, None, None)
+
+        inner.__exit__(None, None, None)
+
+        y = None  # noqa
+        assert outer.liveAllocCount() == 0
+
+    with pytest.raises(RuntimeError, match="isn't active"):
+        outer.__exit__(None, None, None)
+
+
+def test_arenas_are_per_thread():
+    freeStoreBytes0 = totalBytesAllocatedOnFreeStore()
+
+    result = []
+
+    with Arena() as a:
+        t = threading.Thread(target=lambda: result.append(ListOf(int)(range(100))))
+        t.start()
+        t.join()
+
+        assert a.liveAllocCount() == 0
+
+    assert totalBytesAllocatedOnFreeStore() > freeStoreBytes0
+
+    result.clear()
+
+    assert totalBytesAllocatedOnFreeStore() == freeStoreBytes0
+
+
+def test_arena_in_compiled_code():
+    @Entrypoint
+    def countDigits(a: Arena, n: int):
+        with a:
+            strings = ListOf(str)()
+
+            for i in range(n):
+                strings.append(str(i))
+
+            total = 0
+            for s in strings:
+                total += len(s)
+
+        return total
+
+    @Entrypoint
+    def failInside(a: Arena):
+        with a:
+            raise Exception("boom")
+
+    a = Arena()
+
+    # compile first, since the compiler allocates things that live forever
+    countDigits(a, 1)
+
+    slabBytes0 = totalBytesAllocatedInSlabs()
+    freeStoreBytes0 = totalBytesAllocatedOnFreeStore()
+
+    assert countDigits(a, 1000) == sum(len(str(i)) for i in range(1000))
+    assert not a.isActive()
+
+    # 'strings' outlived the arena, but only until the function returned
+    assert totalBytesAllocatedInSlabs() == slabBytes0
+    assert totalBytesAllocatedOnFreeStore() == freeStoreBytes0
+
+    with pytest.raises(Exception, match="boom"):
+        failInside(a)
+
+    assert not a.isActive()
+
+
+def test_arena_freed_while_active_on_another_thread():
+    slabBytes0 = totalBytesAllocatedInSlabs()
+
+    arenas = [Arena()]
+    entered = threading.Event()
+    released = threading.Event()
+    results = []
+
+    def worker():
+        a = arenas[0]
+        a.__enter__()
+        a = None
+
+        entered.set()
+        released.wait()
+
+        # the python object is gone, but we're still allocating from the arena
+        results.append(sum(ListOf(int)(range(1000))))
+
+    t = threading.Thread(target=worker)
+    t.start()
+
+    entered.wait()
+    arenas.clear()
+    released.set()
+
+    t.join()
+
+    assert results == [sum(range(1000))]
+
+    # the thread exits the arena on its way out, which deletes it. 'join'
+    # can return just before that happens, so give it a moment.
+    deadline = time.time() + 5
+    while totalBytesAllocatedInSlabs() != slabBytes0 and time.time() < deadline:
+        time.sleep(.01)
+
+    assert totalBytesAllocatedInSlabs() == slabBytes0
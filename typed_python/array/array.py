@@ -19,7 +19,21 @@ from typed_python import (
     Entrypoint
 )
 
-from typed_python.array.fortran import axpy, gemv, gemm, getri, getrf
+from typed_python.array import native_gemm
+
+try:
+    from typed_python.array.fortran import axpy, gemv, gemm, getri, getrf
+    blasAvailable = True
+except Exception:
+    # there's no BLAS we can bind to. Matrix products fall back to the
+    # compiled implementations in 'native_gemm'.
+    axpy = gemv = gemm = getri = getrf = None
+    blasAvailable = False
+
+
+# products with fewer than this many multiply-adds use 'native_gemm' even
+# when BLAS is available, since the FFI overhead dominates.
+NATIVE_GEMM_THRESHOLD = 32 ** 3
 
 
 def min(a, b):
@@ -80,7 +94,7 @@ def Array(T):
         def __iadd__(self, other):
             self._inplaceBinopCheck(other)
 
-            if (T is float or T is Float32) and isinstance(other, Array(T)):
+            if blasAvailable and (T is float or T is Float32) and isinstance(other, Array(T)):
                 p = self._vals.pointerUnsafe(self._offset)
                 p2 = other._vals.pointerUnsafe(other._offset)
                 axpy(self._shape, 1.0, p2, self._stride, p, other._stride)
@@ -331,7 +345,7 @@ def Matrix(T):
         dimensions = 2
 
         def __init__(self, vals, offset, stride, shape):
-            self._vals = ListOf(T)(vals)
+            self._vals = vals
             self._offset = offset
             self._stride = stride
             self._shape = shape
@@ -644,13 +658,27 @@ def Matrix(T):
             if self._shape[1] != other._shape[0]:
                 raise Exception("Size mismatch")
 
-            if self._stride[1] != 1:
-                self = self.clone()
+            result = Matrix(T).zeros(self._shape[0], other._shape[1])
 
-            if other._stride[1] != 1:
-                other = other.clone()
+            if not self._shouldUseBlas(other):
+                native_gemm.gemm(
+                    self._shape[0],
+                    other._shape[1],
+                    self._shape[1],
+                    1,
+                    self._vals.pointerUnsafe(self._offset),
+                    self._stride[0],
+                    self._stride[1],
+                    other._vals.pointerUnsafe(other._offset),
+                    other._stride[0],
+                    other._stride[1],
+                    0,
+                    result._vals.pointerUnsafe(result._offset),
+                    result._stride[0],
+                    result._stride[1],
+                )
 
-            result = Matrix(T).zeros(self._shape[0], other._shape[1])
+                return result
 
             gemm(
                 'N',
@@ -670,6 +698,21 @@ def Matrix(T):
 
             return result
 
+        def _shouldUseBlas(self, other: Matrix(T)) -> bool:
+            """Decide whether 'self @ other' should go to the external BLAS.
+
+            We only hand BLAS row-major operands of a type it understands, and
+            only when the product is big enough to amortize the call overhead.
+            Everything else goes to 'native_gemm', which handles any strides.
+            """
+            if not blasAvailable or not (T is float or T is Float32):
+                return False
+
+            if self._stride[1] != 1 or other._stride[1] != 1:
+                return False
+
+            return self._shape[0] * self._shape[1] * other._shape[1] >= NATIVE_GEMM_THRESHOLD
+
         def flatten(self):
             return Array(T)(self.toList())
 
@@ -680,6 +723,9 @@ def Matrix(T):
             if self._shape[0] == 0:
                 raise Exception("Can't invert an empty matrix")
 
+            if not blasAvailable:
+                raise Exception("Can't invert a matrix without a LAPACK implementation")
+
             selfT = self.transpose().clone()
 
             ipiv = ListOf(Int32)()
@@ -732,15 +778,28 @@ def Matrix(T):
             return selfT.transpose()
 
         def __matmul__(self, other: Array(T)):  # noqa
-            # ensures that this is a simply-strided (row-major) matrix
-            if self._stride[1] != 1:
-                self = self.clone()
+            if self._shape[1] != other._shape:
+                raise Exception("Size mismatch")
 
             result = ListOf(T)()
             result.resize(self._shape[0])
 
-            if self._shape[1] != other._shape:
-                raise Exception("Size mismatch")
+            if not blasAvailable or not (T is float or T is Float32) or self._stride[1] != 1:
+                native_gemm.gemv(
+                    self._shape[0],
+                    self._shape[1],
+                    1,
+                    self._vals.pointerUnsafe(self._offset),
+                    self._stride[0],
+                    self._stride[1],
+                    other._vals.pointerUnsafe(other._offset),
+                    other._stride,
+                    0,
+                    result.pointerUnsafe(0),
+                    1
+                )
+
+                return Array(T)(result)
 
             gemv(
                 'T',
@@ -759,14 +818,29 @@ def Matrix(T):
             return Array(T)(result)
 
         def __rmatmul__(self, other: Array(T)):
-            if self._stride[1] != 1:
-                self = self.clone()
+            if self._shape[0] != other._shape:
+                raise Exception(f"Size mismatch: {self._shape[1]} != {other._shape}")
 
             result = ListOf(T)()
             result.resize(self._shape[1])
 
-            if self._shape[0] != other._shape:
-                raise Exception(f"Size mismatch: {self._shape[1]} != {other._shape}")
+            if not blasAvailable or not (T is float or T is Float32) or self._stride[1] != 1:
+                # 'other @ self' is the transpose of self, applied to 'other'
+                native_gemm.gemv(
+                    self._shape[1],
+                    self._shape[0],
+                    1,
+                    self._vals.pointerUnsafe(self._offset),
+                    self._stride[1],
+                    self._stride[0],
+                    other._vals.pointerUnsafe(other._offset),
+                    other._stride,
+                    0,
+                    result.pointerUnsafe(0),
+                    1
+                )
+
+                return Array(T)(result)
 
             gemv(
                 'N',
@@ -20,6 +20,7 @@ import os
 
 from typed_python.test_util import estimateFunctionMultithreadSlowdown
 from typed_python.array.array import Array, Matrix
+from typed_python.array import native_gemm
 from typed_python import Entrypoint
 
 
@@ -294,3 +295,54 @@ def test_assign_matrix_row():
 
     m.transpose()[4] = m.transpose()[3]
     assert m.get(4, 4) == m.get(3, 4)
+
+
+def test_matrix_multiply_strided_operands():
+    m = Matrix(float).make(5, 7, lambda r, c: r * 7 + c)
+    m2 = Matrix(float).make(5, 3, lambda r, c: r - c * 2)
+
+    m_numpy = numpy.array(m.toList()).reshape(5, 7)
+    m2_numpy = numpy.array(m2.toList()).reshape(5, 3)
+
+    # both operands are transposed views, which native_gemm handles without cloning
+    res = m.transpose() @ m2
+    expected = m_numpy.T @ m2_numpy
+
+    assert res.shape == (7, 3)
+    assert numpy.abs(numpy.array(res.toList()).reshape(7, 3) - expected).max() < 1e-10
+
+    res = m2.transpose() @ m
+    expected = m2_numpy.T @ m_numpy
+
+    assert numpy.abs(numpy.array(res.toList()).reshape(3, 7) - expected).max() < 1e-10
+
+
+@pytest.mark.parametrize('sz', [1, 3, 4, 8, 13, 70])
+def test_native_gemm_matches_numpy(sz):
+    m = Matrix(float).make(sz, sz + 1, lambda r, c: (r * 31 + c * 17) % 11 - 5.0)
+    m2 = Matrix(float).make(sz + 1, sz, lambda r, c: (r * 13 + c * 7) % 5 - 2.0)
+
+    expected = (
+        numpy.array(m.toList()).reshape(sz, sz + 1)
+        @ numpy.array(m2.toList()).reshape(sz + 1, sz)
+    )
+
+    res = Matrix(float).zeros(sz, sz)
+
+    native_gemm.gemm(
+        sz, sz, sz + 1, 1.0,
+        m._vals.pointerUnsafe(0), m._stride[0], m._stride[1],
+        m2._vals.pointerUnsafe(0), m2._stride[0], m2._stride[1],
+        0.0,
+        res._vals.pointerUnsafe(0), res._stride[0], res._stride[1]
+    )
+
+    assert numpy.abs(numpy.array(res.toList()).reshape(sz, sz) - expected).max() < 1e-10
+    assert numpy.abs(numpy.array((m @ m2).toList()).reshape(sz, sz) - expected).max() < 1e-10
+
+
+def test_integer_matrix_multiply():
+    m = Matrix(int).make(4, 4, lambda r, c: r + c)
+
+    assert (m @ m).get(1, 2) == sum((1 + k) * (k + 2) for k in range(4))
+    assert (m @ Array(int)([1, 0, 0, 0])).toList() == [0, 1, 2, 3]
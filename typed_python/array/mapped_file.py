@@ -0,0 +1,237 @@
+#   Copyright 2017-2020 typed_python Authors
+#
+#   Licensed under the Apache License, Version 2.0 (the "License");
+#   you may not use this file except in compliance with the License.
+#   You may obtain a copy of the License at
+#
+#       http://www.apache.org/licenses/LICENSE-2.0
+#
+#   Unless required by applicable law or agreed to in writing, software
+#   distributed under the License is distributed on an "AS IS" BASIS,
+#   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#   See the License for the specific language governing permissions and
+#   limitations under the License.
+
+"""Persistent, memory-mapped storage for ListOf, TupleOf, Array and Matrix.
+
+'saveMapped' writes a container of POD values to a file with an explicit
+header describing the element type, the kind of container, and its shape
+and strides. 'openMapped' maps that file back in without reading it: it
+takes constant time regardless of the file size, pages are faulted in as
+they're touched, and every process that opens the same file shares one
+physical copy of the data until it writes to it.
+
+The file layout is a fixed-size header, padded to a page boundary, followed
+by the raw element data:
+
+    magic         8 bytes   b'TPMAPPED'
+    version       uint32
+    ndim          uint32    1 for lists and Arrays, 2 for Matrix
+    kind          16 bytes  'ListOf', 'TupleOf', 'Array' or 'Matrix'
+    elementType   32 bytes  the name of a primitive typed_python type
+    elementSize   uint64
+    dataOffset    uint64    byte offset of the data in the file
+    count         uint64    number of elements stored
+    offset        int64     element offset of the [0, ...] element
+    shape         ndim x int64
+    strides       ndim x int64, in elements
+"""
+
+import mmap
+import os
+import struct
+
+from typed_python import (
+    ListOf, TupleOf, Tuple, Int8, Int16, Int32, UInt8, UInt16, UInt32, UInt64, Float32, bytecount
+)
+from typed_python.type_function import isTypeFunctionType
+from typed_python.array.array import Array, Matrix
+
+
+MAGIC = b'TPMAPPED'
+VERSION = 1
+
+_HEADER = struct.Struct('<8sII16s32sQQQq')
+
+_ELEMENT_TYPES = {
+    T.__name__: T for T in [bool, int, float, Int8, Int16, Int32, UInt8, UInt16, UInt32, UInt64, Float32]
+}
+
+
+class MappedFileHeader:
+    def __init__(self, kind, elementType, count, offset, shape, strides, dataOffset):
+        self.kind = kind
+        self.elementType = elementType
+        self.count = count
+        self.offset = offset
+        self.shape = tuple(shape)
+        self.strides = tuple(strides)
+        self.dataOffset = dataOffset
+
+    @staticmethod
+    def headerBytecount(ndim):
+        return _HEADER.size + 16 * ndim
+
+    def toBytes(self):
+        ndim = len(self.shape)
+
+        return (
+            _HEADER.pack(
+                MAGIC,
+                VERSION,
+                ndim,
+                self.kind.encode('ascii'),
+                self.elementType.__name__.encode('ascii'),
+                bytecount(self.elementType),
+                self.dataOffset,
+                self.count,
+                self.offset
+            )
+            + struct.pack(f'<{ndim}q', *self.shape)
+            + struct.pack(f'<{ndim}q', *self.strides)
+        )
+
+    @staticmethod
+    def fromFile(f):
+        headerBytes = f.read(_HEADER.size)
+
+        if len(headerBytes) != _HEADER.size:
+            raise ValueError("File is too short to be a mapped typed_python container.")
+
+        magic, version, ndim, kind, eltName, eltSize, dataOffset, count, offset = _HEADER.unpack(headerBytes)
+
+        if magic != MAGIC:
+            raise ValueError("File is not a mapped typed_python container.")
+
+        if version != VERSION:
+            raise ValueError(f"Can't read version {version} of the mapped file format.")
+
+        eltName = eltName.rstrip(b'\0').decode('ascii')
+
+        if eltName not in _ELEMENT_TYPES:
+            raise ValueError(f"Unknown element type {eltName}")
+
+        elementType = _ELEMENT_TYPES[eltName]
+
+        if bytecount(elementType) != eltSize:
+            raise ValueError(f"Element type {eltName} should have size {bytecount(elementType)}, not {eltSize}")
+
+        dims = f.read(16 * ndim)
+
+        if len(dims) != 16 * ndim:
+            raise ValueError("File is too short to be a mapped typed_python container.")
+
+        shape = struct.unpack(f'<{ndim}q', dims[:8 * ndim])
+        strides = struct.unpack(f'<{ndim}q', dims[8 * ndim:])
+
+        return MappedFileHeader(
+            kind.rstrip(b'\0').decode('ascii'), elementType, count, offset, shape, strides, dataOffset
+        )
+
+
+def _containerKindAndElementType(value):
+    for kind, containerType in [('ListOf', ListOf), ('TupleOf', TupleOf)]:
+        if isinstance(value, containerType):
+            return kind, type(value).ElementType
+
+    typeFunctionAndArgs = isTypeFunctionType(type(value))
+
+    if typeFunctionAndArgs is not None:
+        typeFunction, args, kwargs = typeFunctionAndArgs
+
+        if typeFunction is Array:
+            return 'Array', args[0]
+
+        if typeFunction is Matrix:
+            return 'Matrix', args[0]
+
+    raise TypeError(f"Can't save a {type(value)} to a mapped file.")
+
+
+def saveMapped(path, value):
+    """Write 'value' to 'path' in a form that 'openMapped' can map back in.
+
+    Args:
+        path - the file to write. It's overwritten if it exists.
+        value - a ListOf(T), TupleOf(T), Array(T) or Matrix(T) where T is one
+            of the primitive numeric types or bool.
+    """
+    kind, T = _containerKindAndElementType(value)
+
+    if T.__name__ not in _ELEMENT_TYPES or _ELEMENT_TYPES[T.__name__] is not T:
+        raise TypeError(f"Can't save elements of type {T} to a mapped file.")
+
+    if kind in ('ListOf', 'TupleOf'):
+        data = value
+        shape = (len(value),)
+        strides = (1,)
+    elif kind == 'Array':
+        data = value.toList()
+        shape = (len(value),)
+        strides = (1,)
+    else:
+        data = value.toList()
+        shape = (value.shape[0], value.shape[1])
+        strides = (value.shape[1], 1)
+
+    dataOffset = MappedFileHeader.headerBytecount(len(shape))
+    dataOffset += -dataOffset % mmap.PAGESIZE
+
+    header = MappedFileHeader(kind, T, len(data), 0, shape, strides, dataOffset)
+
+    with open(path, 'wb') as f:
+        headerBytes = header.toBytes()
+        f.write(headerBytes)
+        f.write(b'\0' * (dataOffset - len(headerBytes)))
+        f.write(data.toBytes())
+
+
+def openMapped(path, mode='c'):
+    """Map a container written by 'saveMapped' back into memory.
+
+    This takes constant time: the data isn't read until it's accessed, and
+    the result shares its memory with every other process mapping 'path'.
+
+    Args:
+        path - the file to open.
+        mode - 'c' to map the data copy-on-write: the result may be modified,
+            but changes are private to this process and never written back.
+            'r' to map the data read-only, which is only allowed for TupleOf
+            containers, since they can't be modified.
+
+    Returns:
+        a ListOf(T), TupleOf(T), Array(T) or Matrix(T), depending on what was
+        saved.
+    """
+    if mode not in ('r', 'c'):
+        raise ValueError(f"Invalid mode {mode}: expected 'r' or 'c'")
+
+    with open(path, 'rb') as f:
+        header = MappedFileHeader.fromFile(f)
+
+        if mode == 'r' and header.kind != 'TupleOf':
+            raise ValueError(f"Can't map a mutable {header.kind} read-only. Use mode='c'.")
+
+        T = header.elementType
+
+        if os.fstat(f.fileno()).st_size < header.dataOffset + header.count * bytecount(T):
+            raise ValueError("Mapped file is truncated.")
+
+        containerType = TupleOf(T) if header.kind == 'TupleOf' else ListOf(T)
+
+        vals = containerType.fromMappedFile(
+            f.fileno(), header.dataOffset, header.count, readOnly=(mode == 'r')
+        )
+
+    if header.kind in ('ListOf', 'TupleOf'):
+        return vals
+
+    if header.kind == 'Array':
+        return Array(T)(vals, header.offset, header.strides[0], header.shape[0])
+
+    if header.kind == 'Matrix':
+        return Matrix(T)(
+            vals, header.offset, Tuple(int, int)(header.strides), Tuple(int, int)(header.shape)
+        )
+
+    raise ValueError(f"Unknown container kind {header.kind}")
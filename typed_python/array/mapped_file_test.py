@@ -0,0 +1,146 @@
+#   Copyright 2017-2020 typed_python Authors
+#
+#   Licensed under the Apache License, Version 2.0 (the "License");
+#   you may not use this file except in compliance with the License.
+#   You may obtain a copy of the License at
+#
+#       http://www.apache.org/licenses/LICENSE-2.0
+#
+#   Unless required by applicable law or agreed to in writing, software
+#   distributed under the License is distributed on an "AS IS" BASIS,
+#   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#   See the License for the specific language governing permissions and
+#   limitations under the License.
+
+import os
+import tempfile
+
+import pytest
+
+from typed_python import ListOf, TupleOf, Float32, UInt8, Entrypoint
+from typed_python._types import getAllSlabs
+from typed_python.array.array import Array, Matrix
+from typed_python.array.mapped_file import saveMapped, openMapped
+
+
+@pytest.fixture
+def mappedPath():
+    with tempfile.TemporaryDirectory() as tempDir:
+        yield os.path.join(tempDir, "mapped.dat")
+
+
+def test_mapped_list_roundtrip(mappedPath):
+    saveMapped(mappedPath, ListOf(int)(range(100000)))
+
+    aList = openMapped(mappedPath)
+
+    assert type(aList) is ListOf(int)
+    assert len(aList) == 100000
+    assert aList[99999] == 99999
+
+    @Entrypoint
+    def sumList(x: ListOf(int)):
+        res = 0
+        for v in x:
+            res += v
+        return res
+
+    assert sumList(aList) == sum(range(100000))
+
+
+def test_mapped_list_is_copy_on_write(mappedPath):
+    saveMapped(mappedPath, ListOf(float)([1.0, 2.0, 3.0]))
+
+    aList = openMapped(mappedPath)
+    aList[0] = 10.0
+
+    assert aList[0] == 10.0
+    assert openMapped(mappedPath)[0] == 1.0
+
+    # growing the list copies it out of the mapping
+    aList.append(4.0)
+    assert aList == [10.0, 2.0, 3.0, 4.0]
+
+
+def test_mapped_list_releases_mapping(mappedPath):
+    saveMapped(mappedPath, ListOf(int)(range(1000)))
+
+    slabCount = len(getAllSlabs())
+
+    aList = openMapped(mappedPath)
+    assert len(getAllSlabs()) == slabCount + 1
+
+    aList2 = aList
+    del aList
+    assert len(getAllSlabs()) == slabCount + 1
+
+    del aList2
+    assert len(getAllSlabs()) == slabCount
+
+
+def test_mapped_tuple_read_only(mappedPath):
+    saveMapped(mappedPath, TupleOf(Float32)([1, 2, 3]))
+
+    assert openMapped(mappedPath, 'r') == (1, 2, 3)
+
+    saveMapped(mappedPath, ListOf(Float32)([1, 2, 3]))
+
+    with pytest.raises(ValueError):
+        openMapped(mappedPath, 'r')
+
+
+def test_mapped_empty_list(mappedPath):
+    saveMapped(mappedPath, ListOf(int)())
+
+    assert openMapped(mappedPath) == ListOf(int)()
+
+
+def test_mapped_array_and_matrix(mappedPath):
+    saveMapped(mappedPath, Array(int)([1, 2, 3]))
+
+    anArray = openMapped(mappedPath)
+    assert type(anArray) is Array(int)
+    assert anArray.toList() == [1, 2, 3]
+
+    m = Matrix(float).make(3, 4, lambda r, c: r * 10 + c)
+
+    # strided views get written out in row-major order
+    saveMapped(mappedPath, m.transpose())
+
+    m2 = openMapped(mappedPath)
+    assert type(m2) is Matrix(float)
+    assert m2.shape == (4, 3)
+    assert m2.toList() == m.transpose().toList()
+    assert (m2 @ m).shape == (4, 4)
+
+
+def test_mapped_file_rejects_bad_input(mappedPath):
+    with pytest.raises(TypeError):
+        saveMapped(mappedPath, ListOf(str)(["hi"]))
+
+    with open(mappedPath, "wb") as f:
+        f.write(b"not a mapped file" * 10)
+
+    with pytest.raises(ValueError):
+        openMapped(mappedPath)
+
+
+def test_mapped_list_longer_than_int32(mappedPath):
+    count = 2 ** 31 + 10
+
+    # a sparse file, so this doesn't actually need 2GB of disk or memory
+    with open(mappedPath, "wb") as f:
+        f.truncate(count)
+
+    with open(mappedPath, "rb") as f:
+        aList = TupleOf(UInt8).fromMappedFile(f.fileno(), 0, count, readOnly=True)
+
+    assert len(aList) == count
+    assert aList[count - 1] == 0
+    assert aList[-1] == 0
+
+    @Entrypoint
+    def lastItem(x: TupleOf(UInt8)):
+        return x[len(x) - 1]
+
+    assert lastItem(aList) == 0
@@ -0,0 +1,264 @@
+#   Copyright 2017-2020 typed_python Authors
+#
+#   Licensed under the Apache License, Version 2.0 (the "License");
+#   you may not use this file except in compliance with the License.
+#   You may obtain a copy of the License at
+#
+#       http://www.apache.org/licenses/LICENSE-2.0
+#
+#   Unless required by applicable law or agreed to in writing, software
+#   distributed under the License is distributed on an "AS IS" BASIS,
+#   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#   See the License for the specific language governing permissions and
+#   limitations under the License.
+
+"""Compiled matrix multiplication that doesn't depend on an external BLAS.
+
+Matrices are described by a pointer to their first element and an explicit
+(row, column) stride pair, so transposed or otherwise strided views can be
+multiplied in place without first cloning them into row-major form.
+
+The work is split into cache-sized blocks over all three dimensions, and
+each block is computed with an unrolled 4x4 register-blocked microkernel.
+Matrices that fit in a single 8x8 tile skip the blocking entirely, which
+makes small products considerably cheaper than a round-trip through BLAS.
+"""
+
+from typed_python import Entrypoint
+
+
+# block sizes (in elements) along the row, column, and inner dimensions.
+# A KC x MC panel of 'A' and a KC x NC panel of 'B' should fit in L2.
+MC = 64
+NC = 256
+KC = 256
+
+# products with all dimensions at or below this size skip the blocking loops.
+SMALL_KERNEL_SIZE = 8
+
+
+def _min(a, b):
+    return a if a < b else b
+
+
+def _scale(M, N, beta, C, cRs, cCs):
+    """Set C := beta * C. If beta is zero, C is cleared without reading it."""
+    T = type(C).ElementType
+
+    if beta == 1:
+        return
+
+    for i in range(M):
+        pC = C + i * cRs
+
+        if beta == 0:
+            for j in range(N):
+                pC.set(T())
+                pC += cCs
+        else:
+            for j in range(N):
+                pC.set(pC.get() * beta)
+                pC += cCs
+
+
+def _kernel4x4(K, alpha, A, aRs, aCs, B, bRs, bCs, C, cRs, cCs):
+    """Compute C[0:4, 0:4] += alpha * A[0:4, 0:K] @ B[0:K, 0:4], fully unrolled."""
+    T = type(C).ElementType
+
+    c00 = T()
+    c01 = T()
+    c02 = T()
+    c03 = T()
+    c10 = T()
+    c11 = T()
+    c12 = T()
+    c13 = T()
+    c20 = T()
+    c21 = T()
+    c22 = T()
+    c23 = T()
+    c30 = T()
+    c31 = T()
+    c32 = T()
+    c33 = T()
+
+    pA = A
+    pB = B
+
+    for k in range(K):
+        a0 = pA.get()
+        a1 = (pA + aRs).get()
+        a2 = (pA + 2 * aRs).get()
+        a3 = (pA + 3 * aRs).get()
+
+        b0 = pB.get()
+        b1 = (pB + bCs).get()
+        b2 = (pB + 2 * bCs).get()
+        b3 = (pB + 3 * bCs).get()
+
+        c00 += a0 * b0
+        c01 += a0 * b1
+        c02 += a0 * b2
+        c03 += a0 * b3
+        c10 += a1 * b0
+        c11 += a1 * b1
+        c12 += a1 * b2
+        c13 += a1 * b3
+        c20 += a2 * b0
+        c21 += a2 * b1
+        c22 += a2 * b2
+        c23 += a2 * b3
+        c30 += a3 * b0
+        c31 += a3 * b1
+        c32 += a3 * b2
+        c33 += a3 * b3
+
+        pA += aCs
+        pB += bRs
+
+    pC = C
+    pC.set(pC.get() + alpha * c00)
+    (pC + cCs).set((pC + cCs).get() + alpha * c01)
+    (pC + 2 * cCs).set((pC + 2 * cCs).get() + alpha * c02)
+    (pC + 3 * cCs).set((pC + 3 * cCs).get() + alpha * c03)
+
+    pC += cRs
+    pC.set(pC.get() + alpha * c10)
+    (pC + cCs).set((pC + cCs).get() + alpha * c11)
+    (pC + 2 * cCs).set((pC + 2 * cCs).get() + alpha * c12)
+    (pC + 3 * cCs).set((pC + 3 * cCs).get() + alpha * c13)
+
+    pC += cRs
+    pC.set(pC.get() + alpha * c20)
+    (pC + cCs).set((pC + cCs).get() + alpha * c21)
+    (pC + 2 * cCs).set((pC + 2 * cCs).get() + alpha * c22)
+    (pC + 3 * cCs).set((pC + 3 * cCs).get() + alpha * c23)
+
+    pC += cRs
+    pC.set(pC.get() + alpha * c30)
+    (pC + cCs).set((pC + cCs).get() + alpha * c31)
+    (pC + 2 * cCs).set((pC + 2 * cCs).get() + alpha * c32)
+    (pC + 3 * cCs).set((pC + 3 * cCs).get() + alpha * c33)
+
+
+def _kernelEdge(M, N, K, alpha, A, aRs, aCs, B, bRs, bCs, C, cRs, cCs):
+    """Compute C[0:M, 0:N] += alpha * A[0:M, 0:K] @ B[0:K, 0:N] for ragged tiles."""
+    T = type(C).ElementType
+
+    for i in range(M):
+        for j in range(N):
+            acc = T()
+            pA = A + i * aRs
+            pB = B + j * bCs
+
+            for k in range(K):
+                acc += pA.get() * pB.get()
+                pA += aCs
+                pB += bRs
+
+            pC = C + i * cRs + j * cCs
+            pC.set(pC.get() + alpha * acc)
+
+
+def _gemmBlock(M, N, K, alpha, A, aRs, aCs, B, bRs, bCs, C, cRs, cCs):
+    """Accumulate a single cache block by tiling it into 4x4 microkernel calls."""
+    M4 = M - M % 4
+    N4 = N - N % 4
+
+    for i in range(0, M4, 4):
+        for j in range(0, N4, 4):
+            _kernel4x4(
+                K, alpha,
+                A + i * aRs, aRs, aCs,
+                B + j * bCs, bRs, bCs,
+                C + i * cRs + j * cCs, cRs, cCs
+            )
+
+        if N4 < N:
+            _kernelEdge(
+                4, N - N4, K, alpha,
+                A + i * aRs, aRs, aCs,
+                B + N4 * bCs, bRs, bCs,
+                C + i * cRs + N4 * cCs, cRs, cCs
+            )
+
+    if M4 < M:
+        _kernelEdge(
+            M - M4, N, K, alpha,
+            A + M4 * aRs, aRs, aCs,
+            B, bRs, bCs,
+            C + M4 * cRs, cRs, cCs
+        )
+
+
+@Entrypoint
+def gemm(M, N, K, alpha, A, aRowStride, aColStride, B, bRowStride, bColStride, beta, C, cRowStride, cColStride):
+    """Compute C := alpha * A @ B + beta * C.
+
+    Args:
+        M, N, K - 'A' is M x K, 'B' is K x N, and 'C' is M x N.
+        alpha, beta - scalars, convertible to the element type.
+        A, B, C - a PointerTo(T) for the [0, 0] element of each matrix. 'C'
+            must not overlap 'A' or 'B'.
+        xRowStride, xColStride - the distance, in elements, between adjacent
+            rows and adjacent columns of matrix 'x'. Any stride is allowed,
+            including transposed and non-contiguous views.
+    """
+    T = type(C).ElementType
+
+    alphaT = T(alpha)
+
+    _scale(M, N, T(beta), C, cRowStride, cColStride)
+
+    if M == 0 or N == 0 or K == 0 or alphaT == 0:
+        return
+
+    if M == 4 and N == 4:
+        _kernel4x4(K, alphaT, A, aRowStride, aColStride, B, bRowStride, bColStride, C, cRowStride, cColStride)
+        return
+
+    if M <= SMALL_KERNEL_SIZE and N <= SMALL_KERNEL_SIZE and K <= SMALL_KERNEL_SIZE:
+        _gemmBlock(M, N, K, alphaT, A, aRowStride, aColStride, B, bRowStride, bColStride, C, cRowStride, cColStride)
+        return
+
+    for k0 in range(0, K, KC):
+        kb = _min(KC, K - k0)
+
+        for i0 in range(0, M, MC):
+            mb = _min(MC, M - i0)
+
+            for j0 in range(0, N, NC):
+                nb = _min(NC, N - j0)
+
+                _gemmBlock(
+                    mb, nb, kb, alphaT,
+                    A + i0 * aRowStride + k0 * aColStride, aRowStride, aColStride,
+                    B + k0 * bRowStride + j0 * bColStride, bRowStride, bColStride,
+                    C + i0 * cRowStride + j0 * cColStride, cRowStride, cColStride
+                )
+
+
+@Entrypoint
+def gemv(M, N, alpha, A, aRowStride, aColStride, X, xStride, beta, Y, yStride):
+    """Compute Y := alpha * A @ X + beta * Y, where 'A' is an M x N strided matrix.
+
+    Like 'gemm', every operand is a PointerTo(T) with explicit strides.
+    """
+    T = type(Y).ElementType
+
+    alphaT = T(alpha)
+
+    _scale(M, 1, T(beta), Y, yStride, 1)
+
+    for i in range(M):
+        acc = T()
+        pA = A + i * aRowStride
+        pX = X
+
+        for j in range(N):
+            acc += pA.get() * pX.get()
+            pA += aColStride
+            pX += xStride
+
+        pY = Y + i * yStride
+        pY.set(pY.get() + alphaT * acc)
@@ -0,0 +1,461 @@
+#   Copyright 2017-2020 typed_python Authors
+#
+#   Licensed under the Apache License, Version 2.0 (the "License");
+#   you may not use this file except in compliance with the License.
+#   You may obtain a copy of the License at
+#
+#       http://www.apache.org/licenses/LICENSE-2.0
+#
+#   Unless required by applicable law or agreed to in writing, software
+#   distributed under the License is distributed on an "AS IS" BASIS,
+#   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#   See the License for the specific language governing permissions and
+#   limitations under the License.
+
+"""Compressed sparse matrices.
+
+A SparseMatrix(T) holds its nonzero entries in three ListOf buffers, in the
+usual compressed form: for each 'major' index (a row, in CSR form, or a
+column, in CSC form), 'indptr[m]:indptr[m + 1]' is the range of entries in
+'indices' (the minor index of each entry) and 'values'. Within each major
+index, entries are sorted by minor index and contain no duplicates.
+
+Because the CSR form of a matrix has exactly the same buffers as the CSC
+form of its transpose, 'transpose' is O(1). Use 'toCSR' or 'toCSC' to
+actually reorganize the data.
+
+Build matrices either from a dense Matrix with 'fromDense', from parallel
+coordinate lists with 'fromCOO', or incrementally with a
+SparseMatrixBuilder(T).
+"""
+
+from typed_python import Class, Member, ListOf, Final, TypeFunction, Tuple, Entrypoint, NotCompiled
+from typed_python.array.array import Array, Matrix
+from typed_python.lib.pmap import pmap
+
+
+# rows per job in 'parallelMatVec'
+PARALLEL_ROW_BLOCK = 4096
+
+
+def _compress(T, majorCount, minorCount, majors, minors, values):
+    """Convert parallel coordinate lists into sorted, deduplicated compressed form.
+
+    Duplicate coordinates are summed. Sorting is two stable counting sorts,
+    first by minor index and then by major index, so it takes time linear in
+    the number of entries and the size of the matrix.
+
+    Returns:
+        a Tuple(ListOf(int), ListOf(int), ListOf(T)) of (indptr, indices, values)
+    """
+    nnz = len(values)
+
+    # order the entries by minor index
+    minorPtr = ListOf(int)()
+    minorPtr.resize(minorCount + 1, 0)
+
+    for i in range(nnz):
+        m = minors[i]
+        if m < 0 or m >= minorCount:
+            raise IndexError(f"Index {m} is out of bounds [0, {minorCount})")
+        minorPtr[m + 1] += 1
+
+    for m in range(minorCount):
+        minorPtr[m + 1] += minorPtr[m]
+
+    byMinor = ListOf(int)()
+    byMinor.resize(nnz, 0)
+
+    for i in range(nnz):
+        m = minors[i]
+        byMinor[minorPtr[m]] = i
+        minorPtr[m] += 1
+
+    indptr = ListOf(int)()
+    indptr.resize(majorCount + 1, 0)
+
+    for i in range(nnz):
+        m = majors[i]
+        if m < 0 or m >= majorCount:
+            raise IndexError(f"Index {m} is out of bounds [0, {majorCount})")
+        indptr[m + 1] += 1
+
+    for m in range(majorCount):
+        indptr[m + 1] += indptr[m]
+
+    # scatter each entry into its major index's segment. We visit them in
+    # minor index order, so each segment comes out sorted.
+    writePos = ListOf(int)(indptr)
+    outIndices = ListOf(int)()
+    outIndices.resize(nnz, 0)
+    outValues = ListOf(T)()
+    outValues.resize(nnz, T())
+
+    for k in range(nnz):
+        i = byMinor[k]
+        m = majors[i]
+        pos = writePos[m]
+        outIndices[pos] = minors[i]
+        outValues[pos] = values[i]
+        writePos[m] = pos + 1
+
+    # merge duplicates within each segment, compacting as we go
+    writeIx = 0
+    segmentStart = 0
+
+    for m in range(majorCount):
+        segmentEnd = indptr[m + 1]
+
+        newStart = writeIx
+
+        for i in range(segmentStart, segmentEnd):
+            if writeIx > newStart and outIndices[writeIx - 1] == outIndices[i]:
+                outValues[writeIx - 1] += outValues[i]
+            else:
+                outIndices[writeIx] = outIndices[i]
+                outValues[writeIx] = outValues[i]
+                writeIx += 1
+
+        segmentStart = segmentEnd
+        indptr[m + 1] = writeIx
+
+    outIndices.resize(writeIx)
+    outValues.resize(writeIx)
+
+    return Tuple(ListOf(int), ListOf(int), ListOf(T))((indptr, outIndices, outValues))
+
+
+@TypeFunction
+def SparseMatrix(T):
+    class SparseMatrix_(Class, Final):
+        """A sparse matrix in compressed-sparse-row (CSR) or column (CSC) form."""
+        # rows, then columns
+        _shape = Member(Tuple(int, int))
+
+        # if True, the major index is the row (CSR). Otherwise, it's the column (CSC).
+        _isCSR = Member(bool)
+
+        _indptr = Member(ListOf(int))
+        _indices = Member(ListOf(int))
+        _values = Member(ListOf(T))
+
+        ElementType = T
+
+        def __init__(self, shape, isCSR, indptr, indices, values):
+            self._shape = shape
+            self._isCSR = isCSR
+            self._indptr = indptr
+            self._indices = indices
+            self._values = values
+
+        @property
+        def shape(self):
+            return self._shape
+
+        @property
+        def isCSR(self):
+            return self._isCSR
+
+        @property
+        def nnz(self):
+            return len(self._values)
+
+        @property
+        def _majorCount(self):
+            return self._shape[0] if self._isCSR else self._shape[1]
+
+        @Entrypoint
+        @staticmethod
+        def fromCOO(
+            rows: ListOf(int),
+            columns: ListOf(int),
+            values: ListOf(T),
+            rowCount: int,
+            columnCount: int,
+            isCSR=True
+        ):
+            """Build a matrix from parallel lists of coordinates and values.
+
+            Entries with the same coordinates are summed.
+            """
+            if len(rows) != len(values) or len(columns) != len(values):
+                raise ValueError("Coordinate and value lists must have the same length.")
+
+            if rowCount < 0 or columnCount < 0:
+                raise ValueError("Matrix dimensions can't be negative")
+
+            for i in range(len(values)):
+                if rows[i] < 0 or rows[i] >= rowCount:
+                    raise IndexError(f"Row {rows[i]} is out of bounds [0, {rowCount})")
+                if columns[i] < 0 or columns[i] >= columnCount:
+                    raise IndexError(f"Column {columns[i]} is out of bounds [0, {columnCount})")
+
+            if isCSR:
+                compressed = _compress(T, rowCount, columnCount, rows, columns, values)
+            else:
+                compressed = _compress(T, columnCount, rowCount, columns, rows, values)
+
+            return SparseMatrix(T)(
+                Tuple(int, int)((rowCount, columnCount)),
+                isCSR,
+                compressed[0],
+                compressed[1],
+                compressed[2]
+            )
+
+        @Entrypoint
+        @staticmethod
+        def fromDense(m: Matrix(T), isCSR=True):
+            """Build a matrix holding the nonzero entries of the dense matrix 'm'."""
+            majorCount = m.shape[0] if isCSR else m.shape[1]
+            minorCount = m.shape[1] if isCSR else m.shape[0]
+
+            indptr = ListOf(int)()
+            indptr.reserve(majorCount + 1)
+            indptr.append(0)
+
+            indices = ListOf(int)()
+            values = ListOf(T)()
+
+            for major in range(majorCount):
+                for minor in range(minorCount):
+                    val = m.get(major, minor) if isCSR else m.get(minor, major)
+
+                    if val != T():
+                        indices.append(minor)
+                        values.append(val)
+
+                indptr.append(len(values))
+
+            return SparseMatrix(T)(m.shape, isCSR, indptr, indices, values)
+
+        @Entrypoint
+        def toDense(self) -> Matrix(T):
+            res = Matrix(T).zeros(self._shape[0], self._shape[1])
+
+            for major in range(self._majorCount):
+                for i in range(self._indptr[major], self._indptr[major + 1]):
+                    if self._isCSR:
+                        res.set(major, self._indices[i], self._values[i])
+                    else:
+                        res.set(self._indices[i], major, self._values[i])
+
+            return res
+
+        def transpose(self):
+            """Return the transpose of this matrix. This shares our buffers, and is O(1)."""
+            return SparseMatrix(T)(
+                Tuple(int, int)((self._shape[1], self._shape[0])),
+                not self._isCSR,
+                self._indptr,
+                self._indices,
+                self._values
+            )
+
+        def toCSR(self):
+            if self._isCSR:
+                return self
+
+            return self._recompressed()
+
+        def toCSC(self):
+            if not self._isCSR:
+                return self
+
+            return self._recompressed()
+
+        @Entrypoint
+        def _recompressed(self):
+            """Return the same matrix with the major and minor indices swapped."""
+            majors = ListOf(int)()
+            majors.reserve(self.nnz)
+
+            for major in range(self._majorCount):
+                for i in range(self._indptr[major], self._indptr[major + 1]):
+                    majors.append(major)
+
+            minorCount = self._shape[1] if self._isCSR else self._shape[0]
+
+            compressed = _compress(T, minorCount, self._majorCount, self._indices, majors, self._values)
+
+            return SparseMatrix(T)(
+                self._shape,
+                not self._isCSR,
+                compressed[0],
+                compressed[1],
+                compressed[2]
+            )
+
+        @Entrypoint
+        def get(self, row: int, column: int) -> T:
+            if row < 0 or row >= self._shape[0] or column < 0 or column >= self._shape[1]:
+                raise IndexError(f"Index ({row}, {column}) is out of bounds for shape {self._shape}")
+
+            major = row if self._isCSR else column
+            minor = column if self._isCSR else row
+
+            # binary search for 'minor' in the segment
+            low = self._indptr[major]
+            high = self._indptr[major + 1]
+
+            while low < high:
+                mid = (low + high) // 2
+                if self._indices[mid] < minor:
+                    low = mid + 1
+                else:
+                    high = mid
+
+            if low < self._indptr[major + 1] and self._indices[low] == minor:
+                return self._values[low]
+
+            return T()
+
+        @Entrypoint
+        def _rowsDot(self, rowStart: int, rowEnd: int, x: Array(T), out: ListOf(T)) -> None:
+            """Compute out[row] = self[row] @ x for 'row' in [rowStart, rowEnd). Requires CSR."""
+            pIndptr = self._indptr.pointerUnsafe(0)
+            pIndices = self._indices.pointerUnsafe(0)
+            pValues = self._values.pointerUnsafe(0)
+            pX = x._vals.pointerUnsafe(x._offset)
+            xStride = x._stride
+
+            for row in range(rowStart, rowEnd):
+                acc = T()
+
+                for i in range(pIndptr[row], pIndptr[row + 1]):
+                    acc += pValues[i] * pX[pIndices[i] * xStride]
+
+                out[row] = acc
+
+        @Entrypoint
+        def __matmul__(self, other: Array(T)) -> Array(T):
+            if self._shape[1] != len(other):
+                raise Exception(f"Size mismatch: {self._shape[1]} != {len(other)}")
+
+            out = ListOf(T)()
+            out.resize(self._shape[0], T())
+
+            if self._isCSR:
+                self._rowsDot(0, self._shape[0], other, out)
+            else:
+                # each column scatters into the output
+                for column in range(self._shape[1]):
+                    xVal = other[column]
+
+                    if xVal != T():
+                        for i in range(self._indptr[column], self._indptr[column + 1]):
+                            out[self._indices[i]] += self._values[i] * xVal
+
+            return Array(T)(out)
+
+        @Entrypoint  # noqa
+        def __matmul__(self, other: Matrix(T)) -> Matrix(T):  # noqa
+            if self._shape[1] != other.shape[0]:
+                raise Exception(f"Size mismatch: {self._shape[1]} != {other.shape[0]}")
+
+            res = Matrix(T).zeros(self._shape[0], other.shape[1])
+            columns = other.shape[1]
+
+            pOther = other._vals.pointerUnsafe(other._offset)
+            otherRowStride = other._stride[0]
+            otherColStride = other._stride[1]
+            pRes = res._vals.pointerUnsafe(0)
+
+            # for each entry (row, k, val), accumulate val * other[k, :] into res[row, :]
+            for major in range(self._majorCount):
+                for i in range(self._indptr[major], self._indptr[major + 1]):
+                    row = major if self._isCSR else self._indices[i]
+                    k = self._indices[i] if self._isCSR else major
+                    val = self._values[i]
+
+                    pIn = pOther + k * otherRowStride
+                    pOut = pRes + row * columns
+
+                    for c in range(columns):
+                        pOut.set(pOut.get() + val * pIn.get())
+                        pIn += otherColStride
+                        pOut += 1
+
+            return res
+
+        @Entrypoint
+        def parallelMatVec(self, x: Array(T)) -> Array(T):
+            """Compute 'self @ x', splitting the rows across the pmap worker threads.
+
+            CSC matrices are converted to CSR first, since scattering columns
+            in parallel would race on the output.
+            """
+            if not self._isCSR:
+                return self.toCSR().parallelMatVec(x)
+
+            if self._shape[1] != len(x):
+                raise Exception(f"Size mismatch: {self._shape[1]} != {len(x)}")
+
+            rowCount = self._shape[0]
+
+            out = ListOf(T)()
+            out.resize(rowCount, T())
+
+            blockStarts = ListOf(int)()
+            for rowStart in range(0, rowCount, PARALLEL_ROW_BLOCK):
+                blockStarts.append(rowStart)
+
+            def computeBlock(rowStart):
+                rowEnd = rowStart + PARALLEL_ROW_BLOCK
+                if rowEnd > rowCount:
+                    rowEnd = rowCount
+
+                self._rowsDot(rowStart, rowEnd, x, out)
+
+                return rowEnd - rowStart
+
+            pmap(blockStarts, computeBlock, int)
+
+            return Array(T)(out)
+
+        @NotCompiled
+        def __repr__(self):
+            return (
+                f"SparseMatrix({T.__name__})(shape={self._shape[0]}x{self._shape[1]}, "
+                f"nnz={len(self._values)}, {'CSR' if self._isCSR else 'CSC'})"
+            )
+
+        def __str__(self):
+            return repr(self)
+
+    return SparseMatrix_
+
+
+@TypeFunction
+def SparseMatrixBuilder(T):
+    class SparseMatrixBuilder_(Class, Final):
+        """Accumulates (row, column, value) triples, and then builds a SparseMatrix(T)."""
+        _rows = Member(ListOf(int))
+        _columns = Member(ListOf(int))
+        _values = Member(ListOf(T))
+        _shape = Member(Tuple(int, int))
+
+        def __init__(self, rowCount, columnCount):
+            if rowCount < 0 or columnCount < 0:
+                raise ValueError("Matrix dimensions can't be negative")
+
+            self._shape = Tuple(int, int)((rowCount, columnCount))
+
+        def add(self, row: int, column: int, value: T) -> None:
+            """Add 'value' to the entry at (row, column)."""
+            if row < 0 or row >= self._shape[0] or column < 0 or column >= self._shape[1]:
+                raise IndexError(f"Index ({row}, {column}) is out of bounds for shape {self._shape}")
+
+            self._rows.append(row)
+            self._columns.append(column)
+            self._values.append(value)
+
+        def __len__(self):
+            return len(self._values)
+
+        def build(self, isCSR=True):
+            return SparseMatrix(T).fromCOO(
+                self._rows, self._columns, self._values, self._shape[0], self._shape[1], isCSR
+            )
+
+    return SparseMatrixBuilder_
@@ -0,0 +1,126 @@
+#   Copyright 2017-2020 typed_python Authors
+#
+#   Licensed under the Apache License, Version 2.0 (the "License");
+#   you may not use this file except in compliance with the License.
+#   You may obtain a copy of the License at
+#
+#       http://www.apache.org/licenses/LICENSE-2.0
+#
+#   Unless required by applicable law or agreed to in writing, software
+#   distributed under the License is distributed on an "AS IS" BASIS,
+#   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#   See the License for the specific language governing permissions and
+#   limitations under the License.
+
+import numpy
+import pytest
+
+from typed_python import ListOf
+from typed_python.array.array import Array, Matrix
+from typed_python.array.sparse import SparseMatrix, SparseMatrixBuilder
+
+
+def randomSparse(rows, columns, density, seed):
+    state = numpy.random.RandomState(seed)
+    dense = state.rand(rows, columns)
+    dense[state.rand(rows, columns) > density] = 0.0
+    return dense
+
+
+def toNumpy(m):
+    return numpy.array(m.toList()).reshape(m.shape[0], m.shape[1])
+
+
+def test_builder_sums_duplicates():
+    builder = SparseMatrixBuilder(float)(3, 4)
+    builder.add(0, 1, 2.0)
+    builder.add(2, 3, 1.0)
+    builder.add(0, 1, 1.0)
+    builder.add(1, 0, 5.0)
+
+    for isCSR in [True, False]:
+        m = builder.build(isCSR)
+
+        assert m.isCSR == isCSR
+        assert m.nnz == 3
+        assert m.get(0, 1) == 3.0
+        assert m.get(1, 0) == 5.0
+        assert m.get(1, 1) == 0.0
+
+    with pytest.raises(IndexError):
+        builder.add(3, 0, 1.0)
+
+
+def test_from_coo_bounds_check():
+    with pytest.raises(IndexError):
+        SparseMatrix(float).fromCOO(
+            ListOf(int)([0]), ListOf(int)([5]), ListOf(float)([1.0]), 2, 2
+        )
+
+
+def test_from_coo_sorts_long_rows():
+    # one row with many shuffled entries, every column appearing twice
+    state = numpy.random.RandomState(0)
+    columns = numpy.concatenate([state.permutation(5000), state.permutation(5000)])
+
+    m = SparseMatrix(float).fromCOO(
+        ListOf(int)([0] * len(columns)), ListOf(int)(columns.tolist()),
+        ListOf(float)([1.0] * len(columns)), 2, 5000
+    )
+
+    assert m.nnz == 5000
+    assert all(m.get(0, c) == 2.0 for c in range(0, 5000, 97))
+    assert (toNumpy(m.toDense())[0] == 2.0).all()
+
+
+@pytest.mark.parametrize('isCSR', [True, False])
+def test_dense_roundtrip_and_transpose(isCSR):
+    dense = randomSparse(20, 13, 0.1, 1)
+    m = Matrix(float).make(20, 13, lambda r, c: dense[r][c])
+
+    s = SparseMatrix(float).fromDense(m, isCSR)
+
+    assert s.nnz == (dense != 0).sum()
+    assert numpy.array_equal(toNumpy(s.toDense()), dense)
+    assert numpy.array_equal(toNumpy(s.transpose().toDense()), dense.T)
+    assert numpy.array_equal(toNumpy(s.toCSR().toDense()), dense)
+    assert numpy.array_equal(toNumpy(s.toCSC().toDense()), dense)
+
+
+@pytest.mark.parametrize('isCSR', [True, False])
+def test_sparse_matvec_and_matmul(isCSR):
+    dense = randomSparse(30, 17, 0.2, 2)
+    other = numpy.random.RandomState(3).rand(17, 5)
+
+    s = SparseMatrix(float).fromDense(Matrix(float).make(30, 17, lambda r, c: dense[r][c]), isCSR)
+    x = Array(float)(list(other[:, 0]))
+    m = Matrix(float).make(17, 5, lambda r, c: other[r][c])
+
+    assert numpy.abs(numpy.array((s @ x).toList()) - dense @ other[:, 0]).max() < 1e-12
+    assert numpy.abs(numpy.array(s.parallelMatVec(x).toList()) - dense @ other[:, 0]).max() < 1e-12
+    assert numpy.abs(toNumpy(s @ m) - dense @ other).max() < 1e-12
+
+    # strided dense operands work too
+    mStrided = Matrix(float).make(5, 17, lambda r, c: other[c][r]).transpose()
+    assert numpy.abs(toNumpy(s @ mStrided) - dense @ other).max() < 1e-12
+
+
+def test_parallel_matvec_many_blocks():
+    rows = 20000
+    builder = SparseMatrixBuilder(float)(rows, 100)
+
+    for r in range(rows):
+        builder.add(r, r % 100, 1.0)
+        builder.add(r, (r * 7) % 100, 2.0)
+
+    s = builder.build()
+    x = Array(float)([float(i) for i in range(100)])
+
+    assert s.parallelMatVec(x).toList() == (s @ x).toList()
+
+
+def test_size_mismatch():
+    s = SparseMatrixBuilder(float)(3, 4).build()
+
+    with pytest.raises(Exception):
+        s @ Array(float)([1.0, 2.0])
@@ -0,0 +1,196 @@
+#   Copyright 2017-2020 typed_python Authors
+#
+#   Licensed under the Apache License, Version 2.0 (the "License");
+#   you may not use this file except in compliance with the License.
+#   You may obtain a copy of the License at
+#
+#       http://www.apache.org/licenses/LICENSE-2.0
+#
+#   Unless required by applicable law or agreed to in writing, software
+#   distributed under the License is distributed on an "AS IS" BASIS,
+#   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#   See the License for the specific language governing permissions and
+#   limitations under the License.
+
+"""A columnar ('struct of arrays') container for NamedTuple rows."""
+
+from typed_python import ListOf, NamedTuple
+from typed_python.macro import Macro
+
+# the generated table classes refer to these by name
+from typed_python import Class, Final, Member, Entrypoint, Dict, Tuple  # noqa: F401
+from typed_python import PointerTo, pointerTo, Generator  # noqa: F401
+from typed_python.lib.sorting import sort  # noqa: F401
+
+
+@Macro
+def Table(T):
+    """Produce a columnar table holding rows of the NamedTuple type 'T'.
+
+    Each field of 'T' is stored in its own ListOf, so loops over a single
+    field walk contiguous memory instead of striding over whole rows. The
+    columns are available as 'table.columns', a NamedTuple of ListOfs with the
+    same field names as 'T'. Indexing or iterating a table produces rows of
+    type 'T'.
+
+    Operations that select rows ('take', 'where', 'filter', 'sortBy' and
+    'groupBy') are compiled into one loop per column and return new tables.
+    """
+    if not getattr(T, '__typed_python_category__', None) == "NamedTuple":
+        raise TypeError(f"Table needs a NamedTuple row type, not {T}")
+
+    names = T.ElementNames
+
+    if not names:
+        raise TypeError("Table needs a row type with at least one field")
+
+    Columns = NamedTuple(**{name: ListOf(t) for name, t in zip(names, T.ElementTypes)})
+
+    def eachColumn(lineFormat):
+        return [lineFormat.format(name=name) for name in names]
+
+    output = []
+    output.append(f"class Table_(Class, Final, __name__='Table({T.__name__})'):")
+    output.append("    RowType = T")
+    output.append("    ColumnsType = Columns")
+    output.append("    columns = Member(Columns)")
+
+    output.append("    def __init__(self):")
+    output.append("        pass")
+
+    output.append("    def __init__(self, columns: Columns):")
+    output.append("        self.columns = columns")
+    for name in names[1:]:
+        output.append(f"        if len(columns.{name}) != len(columns.{names[0]}):")
+        output.append("            raise ValueError('Table columns must all have the same length')")
+
+    output.append("    @Entrypoint")
+    output.append("    def __len__(self) -> int:")
+    output.append(f"        return len(self.columns.{names[0]})")
+
+    output.append("    @Entrypoint")
+    output.append("    def __getitem__(self, i: int) -> T:")
+    output.append("        return T(")
+    output.extend(eachColumn("            {name}=self.columns.{name}[i],"))
+    output.append("        )")
+
+    output.append("    @Entrypoint")
+    output.append("    def __setitem__(self, i: int, row: T) -> None:")
+    output.extend(eachColumn("        self.columns.{name}[i] = row.{name}"))
+
+    output.append("    def __iter__(self):")
+    output.append("        return TableIterator_(table=self)")
+
+    output.append("    @Entrypoint")
+    output.append("    def append(self, row: T) -> None:")
+    output.extend(eachColumn("        self.columns.{name}.append(row.{name})"))
+
+    output.append("    @Entrypoint")
+    output.append("    def extend(self, rows) -> None:")
+    output.extend(eachColumn("        self.columns.{name}.reserve(len(self.columns.{name}) + len(rows))"))
+    output.append("        for row in rows:")
+    output.append("            self.append(row)")
+
+    output.append("    @Entrypoint")
+    output.append("    def toRows(self) -> ListOf(T):")
+    output.append("        res = ListOf(T)()")
+    output.append("        res.reserve(len(self))")
+    output.append("        for i in range(len(self)):")
+    output.append("            res.append(self[i])")
+    output.append("        return res")
+
+    output.append("    @Entrypoint")
+    output.append("    def take(self, indices: ListOf(int)):")
+    output.append("        \"\"\"Return a new table holding the rows at 'indices', in that order.\"\"\"")
+    output.append("        count = len(self)")
+    output.append("        for ix in indices:")
+    output.append("            if ix < 0 or ix >= count:")
+    output.append("                raise IndexError('Table index out of range')")
+    output.append("        res = Table_()")
+    for name in names:
+        output.append(f"        res.columns.{name}.reserve(len(indices))")
+        output.append("        for ix in indices:")
+        output.append(
+            f"            res.columns.{name}.append(self.columns.{name}._getItemUnsafe(ix))"
+        )
+    output.append("        return res")
+
+    output.append("    @Entrypoint")
+    output.append("    def where(self, mask: ListOf(bool)):")
+    output.append("        \"\"\"Return a new table holding the rows where 'mask' is True.\"\"\"")
+    output.append("        if len(mask) != len(self):")
+    output.append("            raise ValueError('Table mask must have one entry per row')")
+    output.append("        indices = ListOf(int)()")
+    output.append("        for i in range(len(mask)):")
+    output.append("            if mask[i]:")
+    output.append("                indices.append(i)")
+    output.append("        return self.take(indices)")
+
+    output.append("    @Entrypoint")
+    output.append("    def filter(self, predicate):")
+    output.append("        \"\"\"Return a new table holding the rows 'r' where 'predicate(r)' is true.\"\"\"")
+    output.append("        indices = ListOf(int)()")
+    output.append("        for i in range(len(self)):")
+    output.append("            if predicate(self[i]):")
+    output.append("                indices.append(i)")
+    output.append("        return self.take(indices)")
+
+    output.append("    @Entrypoint")
+    output.append("    def sortBy(self, keys):")
+    output.append("        \"\"\"Return a new table ordered by 'keys', which holds one sort key per row.")
+    output.append("")
+    output.append("        'keys' is usually one of our own columns. The sort is stable.")
+    output.append("        \"\"\"")
+    output.append("        if len(keys) != len(self):")
+    output.append("            raise ValueError('Table sort keys must have one entry per row')")
+    output.append("        KeyAndIndex = Tuple(type(keys).ElementType, int)")
+    output.append("        order = ListOf(KeyAndIndex)()")
+    output.append("        order.reserve(len(keys))")
+    output.append("        for i in range(len(keys)):")
+    output.append("            order.append(KeyAndIndex((keys[i], i)))")
+    output.append("        sort(order)")
+    output.append("        indices = ListOf(int)()")
+    output.append("        indices.reserve(len(order))")
+    output.append("        for keyAndIndex in order:")
+    output.append("            indices.append(keyAndIndex[1])")
+    output.append("        return self.take(indices)")
+
+    output.append("    @Entrypoint")
+    output.append("    def groupBy(self, keys):")
+    output.append("        \"\"\"Return a Dict from each distinct value in 'keys' to the table of its rows.")
+    output.append("")
+    output.append("        'keys' holds one group key per row, and is usually one of our own")
+    output.append("        columns. Rows keep their relative order within each group.")
+    output.append("        \"\"\"")
+    output.append("        if len(keys) != len(self):")
+    output.append("            raise ValueError('Table group keys must have one entry per row')")
+    output.append("        K = type(keys).ElementType")
+    output.append("        groups = Dict(K, ListOf(int))()")
+    output.append("        for i in range(len(keys)):")
+    output.append("            groups.setdefault(keys[i]).append(i)")
+    output.append("        res = Dict(K, Table_)()")
+    output.append("        for key, indices in groups.items():")
+    output.append("            res[key] = self.take(indices)")
+    output.append("        return res")
+
+    output.append("class TableIterator_(Generator(T), Final):")
+    output.append("    table = Member(Table_)")
+    output.append("    pos = Member(int)")
+    output.append("    row = Member(T)")
+    output.append("    def __init__(self, table: Table_):")
+    output.append("        self.table = table")
+    output.append("        self.pos = -1")
+    output.append("    @Entrypoint")
+    output.append("    def __fastnext__(self) -> PointerTo(T):")
+    output.append("        self.pos += 1")
+    output.append("        if self.pos < len(self.table):")
+    output.append("            self.row = self.table[self.pos]")
+    output.append("            return pointerTo(self).row")
+    output.append("        return PointerTo(T)()")
+
+    output.append("return Table_")
+
+    return {
+        "sourceText": output,
+        "locals": {"T": T, "Columns": Columns},
+    }
@@ -0,0 +1,151 @@
+#   Copyright 2017-2020 typed_python Authors
+#
+#   Licensed under the Apache License, Version 2.0 (the "License");
+#   you may not use this file except in compliance with the License.
+#   You may obtain a copy of the License at
+#
+#       http://www.apache.org/licenses/LICENSE-2.0
+#
+#   Unless required by applicable law or agreed to in writing, software
+#   distributed under the License is distributed on an "AS IS" BASIS,
+#   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#   See the License for the specific language governing permissions and
+#   limitations under the License.
+
+import time
+
+import pytest
+from flaky import flaky
+
+from typed_python import NamedTuple, ListOf, Dict, Entrypoint
+from typed_python.array.table import Table
+
+Trade = NamedTuple(sym=str, px=float, qty=int)
+Trades = Table(Trade)
+
+
+def makeTrades():
+    trades = Trades()
+    trades.extend([
+        Trade(sym="b", px=2.0, qty=1),
+        Trade(sym="a", px=1.0, qty=3),
+        Trade(sym="c", px=4.0, qty=2),
+        Trade(sym="a", px=0.5, qty=2),
+    ])
+    return trades
+
+
+def test_table_rows_and_columns():
+    trades = makeTrades()
+
+    assert Table(Trade) is Trades
+    assert len(trades) == 4
+    assert trades[1] == Trade(sym="a", px=1.0, qty=3)
+    assert trades.columns.px == [2.0, 1.0, 4.0, 0.5]
+    assert list(trades) == trades.toRows()
+
+    trades[1] = Trade(sym="d", px=3.0, qty=9)
+    assert trades.columns.sym == ["b", "d", "c", "a"]
+
+    with pytest.raises(IndexError):
+        trades[10]
+
+    copy = Trades(Trades.ColumnsType(sym=["x"], px=[1.0], qty=[2]))
+    assert copy.toRows() == [Trade(sym="x", px=1.0, qty=2)]
+
+    with pytest.raises(ValueError):
+        Trades(Trades.ColumnsType(sym=["x"], px=[], qty=[]))
+
+    with pytest.raises(TypeError):
+        Table(int)
+
+
+def test_table_selection():
+    trades = makeTrades()
+
+    assert trades.take(ListOf(int)([3, 0])).columns.sym == ["a", "b"]
+    assert trades.where(ListOf(bool)([True, False, False, True])).columns.qty == [1, 2]
+    assert trades.filter(lambda t: t.px > 1.5).columns.sym == ["b", "c"]
+
+    with pytest.raises(IndexError):
+        trades.take(ListOf(int)([4]))
+
+    with pytest.raises(ValueError):
+        trades.where(ListOf(bool)([True]))
+
+
+def test_table_sort_and_group():
+    trades = makeTrades()
+
+    # the sort is stable, so the two 'a' rows keep their order
+    assert trades.sortBy(trades.columns.sym).columns.px == [1.0, 0.5, 2.0, 4.0]
+    assert trades.sortBy(trades.columns.px).columns.sym == ["a", "a", "b", "c"]
+
+    groups = trades.groupBy(trades.columns.sym)
+
+    assert sorted(groups) == ["a", "b", "c"]
+    assert groups["a"].columns.qty == [3, 2]
+    assert groups["c"].toRows() == [Trade(sym="c", px=4.0, qty=2)]
+
+
+def test_table_in_compiled_code():
+    @Entrypoint
+    def notional(trades: Trades):
+        res = 0.0
+        for t in trades:
+            res += t.px * t.qty
+        return res
+
+    trades = makeTrades()
+
+    assert notional(trades) == 2.0 + 3.0 + 8.0 + 1.0
+
+    @Entrypoint
+    def bySymAfterFilter(trades: Trades, minQty: int):
+        big = trades.where(ListOf(bool)([q >= minQty for q in trades.columns.qty]))
+        res = Dict(str, float)()
+
+        for sym, group in big.groupBy(big.columns.sym).items():
+            res[sym] = notional(group)
+
+        return res
+
+    assert bySymAfterFilter(trades, 2) == {"a": 4.0, "c": 8.0}
+
+
+@flaky(max_runs=3, min_passes=1)
+def test_table_column_scan_perf():
+    rows = ListOf(Trade)()
+    for i in range(1000000):
+        rows.append(Trade(sym=str(i % 100), px=float(i), qty=i))
+
+    trades = Trades()
+    trades.extend(rows)
+
+    @Entrypoint
+    def sumRowPx(rows: ListOf(Trade)):
+        res = 0.0
+        for r in rows:
+            res += r.px
+        return res
+
+    @Entrypoint
+    def sumColumnPx(px: ListOf(float)):
+        res = 0.0
+        for p in px:
+            res += p
+        return res
+
+    assert sumRowPx(rows) == sumColumnPx(trades.columns.px)
+
+    t0 = time.time()
+    for _ in range(10):
+        sumRowPx(rows)
+    t1 = time.time()
+    for _ in range(10):
+        sumColumnPx(trades.columns.px)
+    t2 = time.time()
+
+    print("rows took", t1 - t0, "and columns took", t2 - t1)
+
+    assert t2 - t1 < t1 - t0
@@ -0,0 +1,184 @@
+#   Copyright 2017-2020 typed_python Authors
+#
+#   Licensed under the Apache License, Version 2.0 (the "License");
+#   you may not use this file except in compliance with the License.
+#   You may obtain a copy of the License at
+#
+#       http://www.apache.org/licenses/LICENSE-2.0
+#
+#   Unless required by applicable law or agreed to in writing, software
+#   distributed under the License is distributed on an "AS IS" BASIS,
+#   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#   See the License for the specific language governing permissions and
+#   limitations under the License.
+
+"""Conversion between typed containers and Apache Arrow's columnar format.
+
+A ListOf(NamedTuple(...)) becomes an Arrow table with one column per field,
+and a ListOf of a single column type becomes an Arrow array. Columns may be
+Bool, any integer or float type, str, bytes, or OneOf(None, T) of one of
+those, which maps to a nullable column.
+
+The conversion runs in C++ (see ArrowColumns.hpp): each column is gathered
+into Arrow's buffers (validity bitmap, offsets, data) directly, without making
+a Python object per element, and read back the same way. 'arrowSchema',
+'toArrowColumns' and 'fromArrowColumns' in typed_python._types expose those
+buffers directly. The functions here wrap them in pyarrow objects, so they
+need pyarrow to be installed.
+
+Example:
+
+    Trade = NamedTuple(symbol=str, price=float, size=int)
+
+    table = toArrow(ListOf(Trade), trades)
+    assert fromArrow(ListOf(Trade), table) == trades
+
+    with open("trades.arrow", "wb") as f:
+        writeArrowIPC(f, ListOf(Trade), trades)
+"""
+
+from typed_python._types import arrowSchema, toArrowColumns, fromArrowColumns
+
+
+def _pyarrow():
+    try:
+        import pyarrow
+    except ImportError:
+        raise ImportError("Arrow conversion requires the 'pyarrow' package.")
+
+    return pyarrow
+
+
+def _arrowType(pa, arrowTypeName):
+    return {
+        "bool": pa.bool_,
+        "int8": pa.int8,
+        "int16": pa.int16,
+        "int32": pa.int32,
+        "int64": pa.int64,
+        "uint8": pa.uint8,
+        "uint16": pa.uint16,
+        "uint32": pa.uint32,
+        "uint64": pa.uint64,
+        "float32": pa.float32,
+        "float64": pa.float64,
+        "utf8": pa.string,
+        "binary": pa.binary,
+    }[arrowTypeName]()
+
+
+def _isTable(T):
+    return getattr(T.ElementType, "__typed_python_category__", None) == "NamedTuple"
+
+
+def _columnBuffers(array):
+    buffers = array.buffers()
+
+    if len(buffers) == 2:
+        # fixed-width arrays have no offsets buffer
+        return (array.offset, buffers[0], None, buffers[1])
+
+    return (array.offset,) + tuple(buffers)
+
+
+def _combineChunks(pa, column):
+    if column.num_chunks == 1:
+        return column.chunk(0)
+
+    if column.num_chunks == 0:
+        return pa.array([], type=column.type)
+
+    return pa.concat_arrays(column.chunks)
+
+
+def toArrow(T, values):
+    """Convert 'values', a T (a ListOf or TupleOf), to a pyarrow.Table or pyarrow.Array.
+
+    A NamedTuple element type produces a Table with a column per field. Anything
+    else produces an Array.
+    """
+    pa = _pyarrow()
+
+    schema = arrowSchema(T)
+    arrays = []
+
+    for (name, typeName, nullable), (nullCount, validity, offsets, data) in zip(schema, toArrowColumns(T, values)):
+        buffers = [None if validity is None else pa.py_buffer(validity)]
+
+        if offsets is not None:
+            buffers.append(pa.py_buffer(offsets))
+
+        buffers.append(pa.py_buffer(data))
+
+        arrays.append(
+            pa.Array.from_buffers(_arrowType(pa, typeName), len(values), buffers, null_count=nullCount)
+        )
+
+    if not _isTable(T):
+        return arrays[0]
+
+    return pa.Table.from_arrays(
+        arrays,
+        schema=pa.schema([
+            pa.field(name, _arrowType(pa, typeName), nullable=nullable) for name, typeName, nullable in schema
+        ])
+    )
+
+
+def fromArrow(T, data):
+    """Convert Arrow data to a T (a ListOf or TupleOf).
+
+    Args:
+        T - the container type to produce.
+        data - a pyarrow Table or RecordBatch with a column for each field of
+            T's NamedTuple element type (matched by name, and any others are
+            ignored), or a pyarrow Array or ChunkedArray for any other
+            element type.
+    """
+    pa = _pyarrow()
+
+    schema = arrowSchema(T)
+
+    if isinstance(data, pa.Table):
+        # a table may be split into several record batches
+        data = data.combine_chunks()
+
+    if isinstance(data, (pa.Table, pa.RecordBatch)):
+        columns = [data.column(name) for name, _, _ in schema]
+    elif _isTable(T):
+        raise TypeError(f"Can't build a {T.__name__} out of a single Arrow array. Pass a Table.")
+    else:
+        columns = [data]
+
+    columns = [_combineChunks(pa, column) if isinstance(column, pa.ChunkedArray) else column for column in columns]
+
+    for (name, typeName, _), column in zip(schema, columns):
+        if not column.type.equals(_arrowType(pa, typeName)):
+            raise TypeError(f"Arrow column '{name}' has type {column.type}, but {T.__name__} needs {typeName}.")
+
+    return fromArrowColumns(T, len(columns[0]), [_columnBuffers(column) for column in columns])
+
+
+def writeArrowIPC(sink, T, values):
+    """Write 'values', a T, to 'sink' (a file or path) as an Arrow IPC stream."""
+    pa = _pyarrow()
+
+    table = toArrow(T, values)
+
+    if not isinstance(table, pa.Table):
+        table = pa.Table.from_arrays([table], names=["values"])
+
+    with pa.ipc.new_stream(sink, table.schema) as writer:
+        writer.write_table(table)
+
+
+def readArrowIPC(source, T):
+    """Read an Arrow IPC stream from 'source' (a file, path or buffer) as a T."""
+    pa = _pyarrow()
+
+    table = pa.ipc.open_stream(source).read_all()
+
+    if not _isTable(T):
+        return fromArrow(T, table.column("values"))
+
+    return fromArrow(T, table)
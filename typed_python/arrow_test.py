@@ -0,0 +1,165 @@
+#   Copyright 2017-2020 typed_python Authors
+#
+#   Licensed under the Apache License, Version 2.0 (the "License");
+#   you may not use this file except in compliance with the License.
+#   You may obtain a copy of the License at
+#
+#       http://www.apache.org/licenses/LICENSE-2.0
+#
+#   Unless required by applicable law or agreed to in writing, software
+#   distributed under the License is distributed on an "AS IS" BASIS,
+#   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#   See the License for the specific language governing permissions and
+#   limitations under the License.
+
+import io
+import struct
+
+import pytest
+
+from typed_python import NamedTuple, ListOf, TupleOf, OneOf, Float32, Int16, UInt8, Dict
+from typed_python._types import arrowSchema, toArrowColumns, fromArrowColumns
+from typed_python.arrow import toArrow, fromArrow, writeArrowIPC, readArrowIPC
+
+Row = NamedTuple(
+    name=str,
+    price=float,
+    size=int,
+    flag=bool,
+    small=Int16,
+    ratio=Float32,
+    payload=bytes,
+    comment=OneOf(None, str),
+    count=OneOf(None, UInt8),
+)
+
+
+def makeRows(count):
+    return ListOf(Row)([
+        Row(
+            name="row" + str(i) + ("ሴ" if i % 7 == 0 else ""),
+            price=i * 1.5,
+            size=i,
+            flag=i % 3 == 0,
+            small=-i,
+            ratio=i / 4,
+            payload=b"x" * (i % 4),
+            comment=None if i % 2 else "c" + str(i),
+            count=None if i % 5 == 0 else i % 256,
+        )
+        for i in range(count)
+    ])
+
+
+def test_arrow_schema():
+    assert arrowSchema(ListOf(Row)) == (
+        ("name", "utf8", False),
+        ("price", "float64", False),
+        ("size", "int64", False),
+        ("flag", "bool", False),
+        ("small", "int16", False),
+        ("ratio", "float32", False),
+        ("payload", "binary", False),
+        ("comment", "utf8", True),
+        ("count", "uint8", True),
+    )
+
+    assert arrowSchema(TupleOf(float)) == (("values", "float64", False),)
+
+    with pytest.raises(TypeError, match="as an Arrow column"):
+        arrowSchema(ListOf(NamedTuple(x=ListOf(int))))
+
+    with pytest.raises(TypeError):
+        arrowSchema(Dict(int, int))
+
+
+def test_arrow_column_buffers():
+    T = ListOf(NamedTuple(x=int, s=OneOf(None, str), b=bool))
+
+    ((xNulls, xValidity, xOffsets, xData), (sNulls, sValidity, sOffsets, sData), (_, _, _, bData)) = toArrowColumns(
+        T, [dict(x=1, s="hi", b=True), dict(x=2, s=None, b=False), dict(x=3, s="é", b=True)]
+    )
+
+    assert (xNulls, xValidity, xOffsets) == (0, None, None)
+    assert xData == struct.pack("3q", 1, 2, 3)
+
+    assert sNulls == 1
+    assert sValidity == bytes([0b101])
+    assert sOffsets == struct.pack("4i", 0, 2, 2, 4)
+    assert sData == "hié".encode("utf8")
+
+    assert bData == bytes([0b101])
+
+
+def test_arrow_columns_round_trip():
+    rows = makeRows(1000)
+
+    columns = toArrowColumns(ListOf(Row), rows)
+
+    # fromArrowColumns takes each column's offset instead of its null count
+    assert fromArrowColumns(ListOf(Row), len(rows), [(0,) + c[1:] for c in columns]) == rows
+    assert fromArrowColumns(TupleOf(Row), len(rows), [(0,) + c[1:] for c in columns]) == TupleOf(Row)(rows)
+
+    # read a slice of the buffers
+    assert fromArrowColumns(ListOf(Row), 10, [(500,) + c[1:] for c in columns]) == rows[500:510]
+
+    assert fromArrowColumns(ListOf(float), 0, [(0, None, None, b"")]) == ListOf(float)()
+
+
+def test_arrow_columns_are_validated():
+    T = ListOf(NamedTuple(x=int, s=str))
+
+    with pytest.raises(TypeError, match="data buffer is too short"):
+        fromArrowColumns(T, 2, [(0, None, None, struct.pack("q", 1)), (0, None, struct.pack("3i", 0, 1, 2), b"ab")])
+
+    with pytest.raises(TypeError, match="offsets are out of bounds"):
+        fromArrowColumns(T, 2, [(0, None, None, struct.pack("2q", 1, 2)), (0, None, struct.pack("3i", 0, 1, 3), b"ab")])
+
+    with pytest.raises(TypeError, match="can't hold None"):
+        fromArrowColumns(
+            T, 2, [(0, bytes([1]), None, struct.pack("2q", 1, 2)), (0, None, struct.pack("3i", 0, 1, 2), b"ab")]
+        )
+
+    with pytest.raises(TypeError, match="Expected 2 columns"):
+        fromArrowColumns(T, 2, [(0, None, None, struct.pack("2q", 1, 2))])
+
+
+def test_to_and_from_pyarrow():
+    pa = pytest.importorskip("pyarrow")
+
+    rows = makeRows(100)
+
+    table = toArrow(ListOf(Row), rows)
+
+    assert isinstance(table, pa.Table)
+    assert table.column("name").to_pylist() == [r.name for r in rows]
+    assert table.column("comment").to_pylist() == [r.comment for r in rows]
+    assert table.column("count").null_count == 20
+
+    assert fromArrow(ListOf(Row), table) == rows
+    assert fromArrow(ListOf(Row), table.slice(10, 20)) == rows[10:30]
+    assert fromArrow(ListOf(Row), pa.concat_tables([table, table])) == rows + rows
+
+    floats = ListOf(float)(range(10))
+
+    assert toArrow(ListOf(float), floats).to_pylist() == list(floats)
+    assert fromArrow(ListOf(float), pa.array([1.0, 2.0])) == [1.0, 2.0]
+
+    with pytest.raises(TypeError, match="needs float64"):
+        fromArrow(ListOf(float), pa.array([1, 2]))
+
+
+def test_arrow_ipc_round_trip():
+    pytest.importorskip("pyarrow")
+
+    rows = makeRows(100)
+
+    sink = io.BytesIO()
+    writeArrowIPC(sink, ListOf(Row), rows)
+
+    assert readArrowIPC(io.BytesIO(sink.getvalue()), ListOf(Row)) == rows
+
+    sink = io.BytesIO()
+    writeArrowIPC(sink, TupleOf(int), TupleOf(int)(range(10)))
+
+    assert readArrowIPC(io.BytesIO(sink.getvalue()), TupleOf(int)) == TupleOf(int)(range(10))
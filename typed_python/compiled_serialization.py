@@ -0,0 +1,1156 @@
+#   Copyright 2017-2020 typed_python Authors
+#
+#   Licensed under the Apache License, Version 2.0 (the "License");
+#   you may not use this file except in compliance with the License.
+#   You may obtain a copy of the License at
+#
+#       http://www.apache.org/licenses/LICENSE-2.0
+#
+#   Unless required by applicable law or agreed to in writing, software
+#   distributed under the License is distributed on an "AS IS" BASIS,
+#   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#   See the License for the specific language governing permissions and
+#   limitations under the License.
+
+"""Serializers compiled for one specific type.
+
+'serialize(T, x)' walks 'x' with the generic C++ serializer, which dispatches
+on the type of every field it visits. For message types whose shape is known
+up front, 'CompiledSerializer(T)' instead generates a serialize and a
+deserialize function for each type reachable from T and compiles them, so
+the whole walk is straight-line native code.
+
+The output is byte-for-byte what 'serialize(T, x)' produces without a
+SerializationContext, and 'deserialize(T, data)' reads it back (and vice
+versa).
+"""
+
+from typed_python import Class, Final, Member, ListOf, Dict, UInt8, UInt64, PointerTo, Entrypoint
+from typed_python.macro import Macro
+import typed_python._types as _types
+from typed_python.compiler.conversion_level import ConversionLevel
+from typed_python.compiler.type_wrappers.compilable_builtin import CompilableBuiltin
+from typed_python.compiler.type_wrappers.tuple_of_wrapper import PreReservedTupleOrList
+import typed_python.compiler.type_wrappers.runtime_functions as runtime_functions
+import typed_python.compiler.native_ast as native_ast
+import typed_python.compiler
+
+# the generated code refers to these by name
+from typed_python import OneOf, Float32  # noqa: F401
+
+typeWrapper = lambda t: typed_python.compiler.python_object_representation.typedPythonTypeToTypeWrapper(t)
+
+# the wire types of the serialization format. See 'WireType.hpp'.
+EMPTY = 0
+VARINT = 1
+BITS_32 = 2
+BITS_64 = 3
+BYTES = 4
+SINGLE = 5
+BEGIN_COMPOUND = 6
+END_COMPOUND = 7
+
+# the most bytes a varint (and so a tag) can take
+MAX_VARINT_BYTES = 10
+
+_SIGNED = ("Int8", "Int16", "Int32", "Int64")
+_UNSIGNED = ("UInt8", "UInt16", "UInt32", "UInt64")
+
+# the categories we write inline, and their wire types
+_SCALARS = dict(
+    [(category, VARINT) for category in _SIGNED + _UNSIGNED + ("Bool",)]
+    + [("Float32", BITS_32), ("Float64", BITS_64), ("None", EMPTY)]
+)
+
+_BUILTIN_CATEGORIES = {
+    int: "Int64",
+    float: "Float64",
+    bool: "Bool",
+    str: "String",
+    bytes: "Bytes",
+    type(None): "None",
+}
+
+
+class _RawMemory(CompilableBuiltin):
+    """The operations on raw memory that '_Writer' and '_Reader' are built on.
+
+    Each instance performs the operation named by 'op' when called from
+    compiled code:
+
+        dataPointer(b: bytes) -> PointerTo(UInt8): the start of b's data
+        identity(x: ListOf or Dict) -> int: the address of x's layout, which is
+            how the C++ serializer tells one list or dict from another
+        memcpy(dest, src, bytecount) -> None
+        bytesFrom(p, bytecount) -> bytes
+        utf8Bytecount(s: str) -> int: the length of s encoded as utf-8
+        encodeUtf8(s: str, p) -> None: write utf8Bytecount(s) bytes to p
+        decodeUtf8(p, bytecount) -> str
+        bytesFromInto(p, bytecount, out: PointerTo(bytes)) -> None
+        decodeUtf8Into(p, bytecount, out: PointerTo(str)) -> None
+
+    The 'Into' forms construct their result in the uninitialized memory
+    'out' points to, so moving it there needs no refcount change.
+    """
+    def __init__(self, op):
+        super().__init__()
+
+        assert op in self.OPS, op
+        self.op = op
+
+    def __eq__(self, other):
+        return isinstance(other, _RawMemory) and other.op == self.op
+
+    def __hash__(self):
+        return hash(("_RawMemory", self.op))
+
+    def __str__(self):
+        return f"_RawMemory({self.op!r})"
+
+    OPS = {
+        "dataPointer": (bytes,),
+        "identity": (None,),
+        "memcpy": (PointerTo(UInt8), PointerTo(UInt8), int),
+        "bytesFrom": (PointerTo(UInt8), int),
+        "utf8Bytecount": (str,),
+        "encodeUtf8": (str, PointerTo(UInt8)),
+        "decodeUtf8": (PointerTo(UInt8), int),
+        "bytesFromInto": (PointerTo(UInt8), int, PointerTo(bytes)),
+        "decodeUtf8Into": (PointerTo(UInt8), int, PointerTo(str)),
+    }
+
+    def convert_call(self, context, instance, args, kwargs):
+        argTypes = self.OPS[self.op]
+
+        if kwargs or len(args) != len(argTypes):
+            context.pushException(TypeError, f"{self} takes {len(argTypes)} arguments")
+            return None
+
+        args = [
+            arg if T is None else arg.convert_to_type(T, ConversionLevel.Signature)
+            for arg, T in zip(args, argTypes)
+        ]
+
+        if any(arg is None for arg in args):
+            return None
+
+        exprs = [arg.nonref_expr for arg in args]
+
+        if self.op == "dataPointer":
+            return context.pushPod(PointerTo(UInt8), exprs[0].ElementPtrIntegers(0, 3))
+
+        if self.op == "identity":
+            if _categoryOf(args[0].expr_type.typeRepresentation) not in ("ListOf", "Dict"):
+                context.pushException(TypeError, f"{self} takes a ListOf or a Dict")
+                return None
+
+            return context.pushPod(int, exprs[0].cast(native_ast.Int64))
+
+        if self.op == "memcpy":
+            context.pushEffect(runtime_functions.memcpy.call(*exprs))
+            return context.pushVoid()
+
+        if self.op == "utf8Bytecount":
+            return context.pushPod(int, runtime_functions.string_utf8_bytecount.call(exprs[0].cast(native_ast.VoidPtr)))
+
+        if self.op == "encodeUtf8":
+            context.pushEffect(runtime_functions.string_encode_utf8.call(exprs[0].cast(native_ast.VoidPtr), exprs[1]))
+            return context.pushVoid()
+
+        if self.op in ("bytesFrom", "bytesFromInto"):
+            resultType = bytes
+            layoutType = typeWrapper(bytes).getNativeLayoutType()
+
+            # the empty bytes is a null layout, but 'bytes_from_ptr_and_len'
+            # allocates one for an empty range
+            layout = native_ast.Expression.Branch(
+                cond=exprs[1].gt(native_ast.const_int_expr(0)),
+                true=runtime_functions.bytes_from_ptr_and_len.call(exprs[0], exprs[1]).cast(layoutType),
+                false=layoutType.zero()
+            )
+        else:
+            resultType = str
+            layout = runtime_functions.string_decode_utf8.call(exprs[0], exprs[1]).cast(
+                typeWrapper(str).getNativeLayoutType()
+            )
+
+        if self.op.endswith("Into"):
+            context.pushEffect(exprs[2].store(layout))
+            return context.pushVoid()
+
+        return context.push(resultType, lambda ref: ref.expr.store(layout))
+
+
+class _NewAlternative(CompilableBuiltin):
+    """Constructs an Alternative in place, without constructing its fields.
+
+    '_NewAlternative(T.Name)(out)' allocates a T.Name, stores it in the
+    uninitialized T that 'out' points to, and returns a pointer to its
+    fields, which the caller must then initialize.
+    """
+    def __init__(self, concreteType):
+        super().__init__()
+
+        self.concreteType = concreteType
+
+    def __eq__(self, other):
+        return isinstance(other, _NewAlternative) and other.concreteType == self.concreteType
+
+    def __hash__(self):
+        return hash(("_NewAlternative", self.concreteType))
+
+    def __str__(self):
+        return f"_NewAlternative({self.concreteType.__qualname__})"
+
+    def convert_call(self, context, instance, args, kwargs):
+        if kwargs or len(args) != 1:
+            context.pushException(TypeError, f"{self} takes 1 argument")
+            return None
+
+        out = args[0].convert_to_type(PointerTo(self.concreteType.Alternative), ConversionLevel.Signature)
+        if out is None:
+            return None
+
+        fieldsType = PointerTo(self.concreteType.ElementType)
+
+        # the layout is a refcount, then the index of the alternative, then the fields
+        layout = context.pushPod(
+            PointerTo(UInt8),
+            runtime_functions.malloc.call(
+                native_ast.const_int_expr(16 + typeWrapper(self.concreteType.ElementType).getBytecount())
+            ).cast(native_ast.UInt8Ptr)
+        )
+
+        context.pushEffect(
+            layout.nonref_expr.cast(native_ast.Int64.pointer()).store(native_ast.const_int_expr(1))
+            >> layout.nonref_expr.cast(native_ast.Int64.pointer()).ElementPtrIntegers(1).store(
+                native_ast.const_int_expr(self.concreteType.Index)
+            )
+            >> out.nonref_expr.cast(native_ast.UInt8Ptr.pointer()).store(layout.nonref_expr)
+        )
+
+        return context.pushPod(
+            fieldsType,
+            layout.nonref_expr.ElementPtrIntegers(16).cast(typeWrapper(fieldsType).getNativeLayoutType())
+        )
+
+
+class _ElementPointer(CompilableBuiltin):
+    """'_ElementPointer(k)(p)' is a pointer to element 'k' of the Tuple or NamedTuple 'p' points to."""
+    def __init__(self, index):
+        super().__init__()
+
+        self.index = index
+
+    def __eq__(self, other):
+        return isinstance(other, _ElementPointer) and other.index == self.index
+
+    def __hash__(self):
+        return hash(("_ElementPointer", self.index))
+
+    def __str__(self):
+        return f"_ElementPointer({self.index})"
+
+    def convert_call(self, context, instance, args, kwargs):
+        pointerType = args[0].expr_type.typeRepresentation if len(args) == 1 and not kwargs else None
+
+        if (
+            getattr(pointerType, "__typed_python_category__", None) != "PointerTo"
+            or _categoryOf(pointerType.ElementType) not in ("Tuple", "NamedTuple")
+            or self.index >= len(pointerType.ElementType.ElementTypes)
+        ):
+            context.pushException(TypeError, f"{self} takes a pointer to a Tuple with more than {self.index} elements")
+            return None
+
+        return typeWrapper(pointerType.ElementType).refAs(context, args[0].asReference(), self.index).asPointer()
+
+
+_dataPointer = _RawMemory("dataPointer")
+_identity = _RawMemory("identity")
+_memcpy = _RawMemory("memcpy")
+_bytesFrom = _RawMemory("bytesFrom")
+_utf8Bytecount = _RawMemory("utf8Bytecount")
+_encodeUtf8 = _RawMemory("encodeUtf8")
+_decodeUtf8 = _RawMemory("decodeUtf8")
+_bytesFromInto = _RawMemory("bytesFromInto")
+_decodeUtf8Into = _RawMemory("decodeUtf8Into")
+
+
+class _Writer(Class, Final):
+    """Holds the buffer the generated serializers write into."""
+    # we've written the bytes in 'buf' before 'pos'. 'end' is the end of the
+    # space reserved in 'buf'.
+    buf = Member(ListOf(UInt8))
+    pos = Member(PointerTo(UInt8))
+    end = Member(PointerTo(UInt8))
+
+    # the memo ids of the lists and dicts we've already written, by identity
+    memoIds = Member(Dict(int, int))
+    nextId = Member(int)
+
+    def __init__(self):
+        self.buf.reserve(256)
+        self.pos = self.buf.pointerUnsafe(0)
+        self.end = self.buf.pointerUnsafe(self.buf.reserved())
+
+    @Entrypoint
+    def ensure(self, bytecount: int) -> PointerTo(UInt8):
+        """Make room for 'bytecount' more bytes, and return where they go."""
+        if self.end - self.pos < bytecount:
+            self._grow(bytecount)
+
+        return self.pos
+
+    @Entrypoint
+    def _grow(self, bytecount: int) -> None:
+        size = self.pos - self.buf.pointerUnsafe(0)
+
+        self.buf.setSizeUnsafe(size)
+        self.buf.reserve(max(self.buf.reserved() * 2, size + bytecount))
+
+        self.pos = self.buf.pointerUnsafe(size)
+        self.end = self.buf.pointerUnsafe(self.buf.reserved())
+
+    @Entrypoint
+    def toBytes(self) -> bytes:
+        return _bytesFrom(self.buf.pointerUnsafe(0), self.pos - self.buf.pointerUnsafe(0))
+
+
+class _Reader(Class, Final):
+    """Holds the caller's bytes, which the generated deserializers read in place."""
+    data = Member(bytes)
+
+    # the next byte to read, and the end of 'data'
+    pos = Member(PointerTo(UInt8))
+    end = Member(PointerTo(UInt8))
+
+    def __init__(self, data: bytes):
+        self.data = data
+        self.pos = _dataPointer(data)
+        self.end = self.pos + len(data)
+
+    @Entrypoint
+    def _need(self, bytecount: int) -> None:
+        if bytecount < 0 or self.end - self.pos < bytecount:
+            raise TypeError("Corrupt data (ran out of bytes)")
+
+    @Entrypoint
+    def readVarint(self) -> UInt64:
+        # if there's room for the longest varint, we don't need to look for
+        # the end of the data as we go
+        if self.end - self.pos < MAX_VARINT_BYTES:
+            return self._readVarintNearEnd()
+
+        p = self.pos
+        res = UInt64(0)
+        shift = UInt64(0)
+
+        while shift < UInt64(MAX_VARINT_BYTES * 7):
+            byte = UInt64(p.get())
+            p += 1
+
+            res |= (byte & UInt64(127)) << shift
+            shift += UInt64(7)
+
+            if byte < UInt64(128):
+                self.pos = p
+                return res
+
+        raise TypeError("Corrupt data (varint is too long)")
+
+    @Entrypoint
+    def _readVarintNearEnd(self) -> UInt64:
+        res = UInt64(0)
+        shift = UInt64(0)
+
+        while self.pos < self.end:
+            byte = UInt64(self.pos.get())
+            self.pos += 1
+
+            res |= (byte & UInt64(127)) << shift
+            shift += UInt64(7)
+
+            if byte < UInt64(128):
+                return res
+
+        raise TypeError("Corrupt data (ran out of bytes)")
+
+    @Entrypoint
+    def readTag(self) -> int:
+        return int(self.readVarint())
+
+    @Entrypoint
+    def skip(self, wireType: int) -> None:
+        """Consume and discard a message whose tag had wire type 'wireType'."""
+        if wireType == VARINT:
+            self.readVarint()
+        elif wireType == BITS_32:
+            self._need(4)
+            self.pos += 4
+        elif wireType == BITS_64:
+            self._need(8)
+            self.pos += 8
+        elif wireType == BYTES:
+            bytecount = int(self.readVarint())
+            self._need(bytecount)
+            self.pos += bytecount
+        elif wireType == SINGLE:
+            self.skip(self.readTag() & 7)
+        elif wireType == BEGIN_COMPOUND:
+            tag = self.readTag()
+            while tag & 7 != END_COMPOUND:
+                self.skip(tag & 7)
+                tag = self.readTag()
+        elif wireType != EMPTY:
+            raise TypeError("Corrupt data (unexpected wire type)")
+
+
+def _varintBytes(value):
+    res = 1
+    while value >= 128:
+        value >>= 7
+        res += 1
+    return res
+
+
+def _categoryOf(T):
+    if T in _BUILTIN_CATEGORIES:
+        return _BUILTIN_CATEGORIES[T]
+
+    return getattr(T, "__typed_python_category__", None)
+
+
+def _subtypesOf(T):
+    category = _categoryOf(T)
+
+    if category in ("Tuple", "NamedTuple"):
+        return T.ElementTypes
+
+    if category in ("ListOf", "TupleOf"):
+        return (T.ElementType,)
+
+    if category == "Dict":
+        return (T.KeyType, T.ValueType)
+
+    if category == "OneOf":
+        return T.Types
+
+    if category == "Alternative":
+        return tuple(
+            t for alternative in T.__typed_python_alternatives__
+            for t in alternative.ElementType.ElementTypes
+        )
+
+    if category in _SIGNED + _UNSIGNED + ("Bool", "Float32", "Float64", "None", "String", "Bytes"):
+        return ()
+
+    raise TypeError(f"CompiledSerializer can't serialize {T.__name__}. Use 'serialize' instead.")
+
+
+def _reachableTypes(T):
+    types = []
+    indices = {}
+
+    def visit(t):
+        if t in indices:
+            return
+
+        indices[t] = len(types)
+        types.append(t)
+
+        for subtype in _subtypesOf(t):
+            visit(subtype)
+
+    visit(T)
+
+    return types, indices
+
+
+class _Generator:
+    """Writes the source of the serialize and deserialize functions for one type family.
+
+    Every type gets a '_serialize' and a '_deserialize' function, but scalars
+    (numbers, bools and None) inside other values are written and read inline
+    by the function for the value that holds them, through a local pointer
+    'p', since a call costs more than the scalar itself.
+
+    A serializer calls 'w.ensure' once for each run of scalars it writes
+    between calls to other serializers, and containers of scalars make room
+    for all of their elements at once. Around each call, the serializer hands
+    'p' back to the writer ('w.pos = p'), and deserializers do the same with
+    the reader.
+    """
+
+    def __init__(self, T):
+        self.types, self.indices = _reachableTypes(T)
+        self.lines = []
+        self.locals = {f"T{i}": t for i, t in enumerate(self.types)}
+
+    def emit(self, indent, line):
+        self.lines.append("    " * indent + line)
+
+    def typeName(self, t):
+        return f"T{self.indices[t]}"
+
+    def isScalar(self, t):
+        return _categoryOf(t) in _SCALARS
+
+    def defaultValue(self, t):
+        """Return an expression for the default value of 't' in compiled code, or None."""
+        category = _categoryOf(t)
+
+        if category == "Bytes":
+            return "b''"
+
+        # compiled code can't default-construct these directly, or, if they
+        # hold Alternatives, at all
+        if category == "Tuple":
+            elements = [self.defaultValue(e) for e in t.ElementTypes]
+            if None in elements:
+                return None
+            return f"{self.typeName(t)}(({''.join(e + ', ' for e in elements)}))"
+
+        if category == "NamedTuple":
+            elements = [self.defaultValue(e) for e in t.ElementTypes]
+            if None in elements:
+                return None
+            return f"{self.typeName(t)}({', '.join(f'{n}={e}' for n, e in zip(t.ElementNames, elements))})"
+
+        try:
+            default = t()
+        except Exception:
+            return None
+
+        if category == "Alternative":
+            name = f"D{self.indices[t]}"
+            self.locals[name] = default
+            return name
+
+        return f"{self.typeName(t)}()"
+
+    # writing
+
+    def tagBytes(self, fieldNumber, wireType):
+        """The most bytes a tag takes. 'fieldNumber' is an int, or an expression."""
+        if isinstance(fieldNumber, int):
+            return _varintBytes(fieldNumber * 8 + wireType)
+
+        return MAX_VARINT_BYTES
+
+    def scalarBytes(self, fieldNumber, t):
+        """The most bytes writing the scalar 't' as field 'fieldNumber' takes."""
+        category = _categoryOf(t)
+
+        return self.tagBytes(fieldNumber, _SCALARS[category]) + {
+            "Float64": 8, "Float32": 4, "None": 0, "Bool": 1
+        }.get(category, MAX_VARINT_BYTES)
+
+    def writeVarint(self, indent, value):
+        """Write the UInt64 expression 'value' at 'p'."""
+        self.emit(indent, f"v = {value}")
+        self.emit(indent, "while v >= UInt64(128):")
+        self.emit(indent + 1, "p.set(UInt8((v & UInt64(127)) | UInt64(128)))")
+        self.emit(indent + 1, "p += 1")
+        self.emit(indent + 1, "v >>= UInt64(7)")
+        self.emit(indent, "p.set(UInt8(v))")
+        self.emit(indent, "p += 1")
+
+    def writeTag(self, indent, fieldNumber, wireType):
+        if isinstance(fieldNumber, int) and fieldNumber * 8 + wireType < 128:
+            self.emit(indent, f"p.set(UInt8({fieldNumber * 8 + wireType}))")
+            self.emit(indent, "p += 1")
+        else:
+            self.writeVarint(indent, f"UInt64({fieldNumber} * 8 + {wireType})")
+
+    def writeVarintObject(self, indent, value):
+        self.writeTag(indent, 0, VARINT)
+        self.writeVarint(indent, f"UInt64({value})")
+
+    def writeScalar(self, indent, expr, t, fieldNumber):
+        """Write the scalar 'expr' of type 't' at 'p', which must have room for it."""
+        category = _categoryOf(t)
+
+        self.writeTag(indent, fieldNumber, _SCALARS[category])
+
+        if category in _SIGNED:
+            self.emit(indent, f"s = int({expr})")
+            self.writeVarint(indent, "(UInt64(s) << UInt64(1)) ^ UInt64(s >> 63)")
+        elif category in _UNSIGNED:
+            self.writeVarint(indent, f"UInt64({expr})")
+        elif category == "Bool":
+            self.emit(indent, f"p.set(UInt8(1) if {expr} else UInt8(0))")
+            self.emit(indent, "p += 1")
+        elif category == "Float64":
+            self.emit(indent, f"p.cast(float).set({expr})")
+            self.emit(indent, "p += 8")
+        elif category == "Float32":
+            self.emit(indent, f"p.cast(Float32).set({expr})")
+            self.emit(indent, "p += 4")
+
+    def leadingBytes(self, items, trailerBytes):
+        """The room needed for the scalars at the start of 'items', plus
+        'trailerBytes' if they're all scalars."""
+        res = 0
+
+        for expr, t, fieldNumber in items:
+            if not self.isScalar(t):
+                return res
+            res += self.scalarBytes(fieldNumber, t)
+
+        return res + trailerBytes
+
+    def serializeSequence(self, indent, items, trailerBytes):
+        """Write each (expr, type, fieldNumber) in 'items'.
+
+        'p' must have room for 'leadingBytes(items, trailerBytes)', and is
+        left with room for 'trailerBytes'.
+        """
+        for n, (expr, t, fieldNumber) in enumerate(items):
+            if self.isScalar(t):
+                self.writeScalar(indent, expr, t, fieldNumber)
+            elif _categoryOf(t) in ("String", "Bytes"):
+                isString = _categoryOf(t) == "String"
+                self.emit(indent, f"n = {'_utf8Bytecount' if isString else 'len'}({expr})")
+                self.emit(indent, "w.pos = p")
+                self.emit(
+                    indent,
+                    f"p = w.ensure({self.tagBytes(fieldNumber, BYTES) + MAX_VARINT_BYTES} + n + "
+                    f"{self.leadingBytes(items[n + 1:], trailerBytes)})"
+                )
+                self.writeTag(indent, fieldNumber, BYTES)
+                self.writeVarint(indent, "UInt64(n)")
+                if isString:
+                    self.emit(indent, f"_encodeUtf8({expr}, p)")
+                else:
+                    self.emit(indent, "if n:")
+                    self.emit(indent + 1, f"_memcpy(p, _dataPointer({expr}), n)")
+                self.emit(indent, "p += n")
+            else:
+                self.emit(indent, "w.pos = p")
+                self.emit(indent, f"_serialize{self.indices[t]}(w, {expr}, {fieldNumber})")
+                self.emit(indent, f"p = w.ensure({self.leadingBytes(items[n + 1:], trailerBytes)})")
+
+    def serializeFields(self, indent, fieldNumber, exprs, types, prefix=()):
+        """Write the tags in 'prefix', and then the fields of a tuple the way
+        'CompositeType::serialize' does."""
+        tags = list(prefix) + [
+            (fieldNumber, EMPTY if not types else SINGLE if len(types) == 1 else BEGIN_COMPOUND)
+        ]
+        items = list(zip(exprs, types, range(len(types))))
+        trailerBytes = self.tagBytes(0, END_COMPOUND) if len(types) > 1 else 0
+
+        self.emit(
+            indent,
+            f"p = w.ensure({sum(self.tagBytes(*tag) for tag in tags) + self.leadingBytes(items, trailerBytes)})"
+        )
+
+        for tag in tags:
+            self.writeTag(indent, *tag)
+
+        self.serializeSequence(indent, items, trailerBytes)
+
+        if len(types) > 1:
+            self.writeTag(indent, 0, END_COMPOUND)
+
+        self.emit(indent, "w.pos = p")
+
+    def serializeMemoized(self, indent):
+        """Write a reference to the list or dict 'x' and return if we've written
+        it already, or give it the next memo id, in 'memoId', if we haven't.
+
+        Like the C++ serializer, we memoize by identity, so aliased containers
+        stay aliased.
+        """
+        self.emit(indent, "ptr = _identity(x)")
+        self.emit(indent, "memoId = w.memoIds.get(ptr, -1)")
+        self.emit(indent, "if memoId >= 0:")
+        self.emit(indent + 1, f"p = w.ensure({self.tagBytes('fieldNumber', SINGLE) + 1 + MAX_VARINT_BYTES})")
+        self.writeTag(indent + 1, "fieldNumber", SINGLE)
+        self.writeVarintObject(indent + 1, "memoId")
+        self.emit(indent + 1, "w.pos = p")
+        self.emit(indent + 1, "return")
+        self.emit(indent, "memoId = w.nextId")
+        self.emit(indent, "w.nextId += 1")
+        self.emit(indent, "w.memoIds[ptr] = memoId")
+
+    def serializeElements(self, indent, memoId, loop, items):
+        """Write a container's header, then its elements, then its end.
+
+        'loop' iterates over the container 'x', binding the names used by
+        the expressions in 'items'.
+        """
+        headerBytes = self.tagBytes("fieldNumber", BEGIN_COMPOUND) + (1 + MAX_VARINT_BYTES) * (2 if memoId else 1)
+        endBytes = self.tagBytes(0, END_COMPOUND)
+        elementBytes = self.leadingBytes(items, 0)
+
+        if all(self.isScalar(t) for _, t, _ in items):
+            # make room for all of it up front
+            self.emit(indent, f"p = w.ensure({headerBytes + endBytes} + len(x) * {elementBytes})")
+            trailerBytes = 0
+        else:
+            # each element leaves room for the start of the next one or the end
+            self.emit(indent, f"p = w.ensure({headerBytes + elementBytes + endBytes})")
+            trailerBytes = elementBytes + endBytes
+
+        self.writeTag(indent, "fieldNumber", BEGIN_COMPOUND)
+        if memoId:
+            self.writeVarintObject(indent, memoId)
+        self.writeVarintObject(indent, "len(x)")
+
+        self.emit(indent, loop)
+        self.serializeSequence(indent + 1, items, trailerBytes)
+
+        self.writeTag(indent, 0, END_COMPOUND)
+        self.emit(indent, "w.pos = p")
+
+    def generateSerializer(self, i, T):
+        category = _categoryOf(T)
+
+        self.emit(0, f"def _serialize{i}(w, x: T{i}, fieldNumber: int):")
+
+        if category in _SCALARS:
+            self.emit(1, f"p = w.ensure({self.scalarBytes('fieldNumber', T)})")
+            self.writeScalar(1, "x", T, "fieldNumber")
+            self.emit(1, "w.pos = p")
+        elif category in ("String", "Bytes"):
+            self.emit(1, "p = w.pos")
+            self.serializeSequence(1, [("x", T, "fieldNumber")], 0)
+            self.emit(1, "w.pos = p")
+        elif category == "Tuple":
+            self.serializeFields(1, "fieldNumber", [f"x[{k}]" for k in range(len(T.ElementTypes))], T.ElementTypes)
+        elif category == "NamedTuple":
+            self.serializeFields(1, "fieldNumber", [f"x.{name}" for name in T.ElementNames], T.ElementTypes)
+        elif category == "ListOf":
+            self.serializeMemoized(1)
+            self.serializeElements(1, "memoId", "for e in x:", [("e", T.ElementType, 0)])
+        elif category == "TupleOf":
+            self.emit(1, "if not len(x):")
+            self.emit(2, f"p = w.ensure({self.tagBytes('fieldNumber', EMPTY)})")
+            self.writeTag(2, "fieldNumber", EMPTY)
+            self.emit(2, "w.pos = p")
+            self.emit(2, "return")
+            self.serializeElements(1, None, "for e in x:", [("e", T.ElementType, 0)])
+        elif category == "Dict":
+            self.serializeMemoized(1)
+            self.serializeElements(
+                1, "memoId", "for key, value in x.items():", [("key", T.KeyType, 0), ("value", T.ValueType, 0)]
+            )
+        elif category == "OneOf":
+            for which, t in enumerate(T.Types):
+                if t is type(None):  # noqa
+                    self.emit(1, "if x is None:")
+                else:
+                    self.emit(1, f"if isinstance(x, {self.typeName(t)}):")
+                if self.isScalar(t):
+                    self.emit(2, f"p = w.ensure({self.tagBytes('fieldNumber', SINGLE) + self.scalarBytes(which, t)})")
+                    self.writeTag(2, "fieldNumber", SINGLE)
+                    self.writeScalar(2, f"{self.typeName(t)}(x)", t, which)
+                    self.emit(2, "w.pos = p")
+                else:
+                    self.emit(2, f"p = w.ensure({self.tagBytes('fieldNumber', SINGLE)})")
+                    self.writeTag(2, "fieldNumber", SINGLE)
+                    self.emit(2, "w.pos = p")
+                    self.emit(2, f"_serialize{self.indices[t]}(w, x, {which})")
+                self.emit(2, "return")
+        elif category == "Alternative":
+            for which, alternative in enumerate(T.__typed_python_alternatives__):
+                fields = alternative.ElementType
+                self.emit(1, f"{'if' if which == 0 else 'elif'} x.matches.{alternative.Name}:")
+                self.serializeFields(
+                    2, which, [f"x.{name}" for name in fields.ElementNames], fields.ElementTypes,
+                    prefix=[("fieldNumber", SINGLE)]
+                )
+
+    # reading
+
+    def readVarint(self, indent, target):
+        """Read a varint at 'p' into the UInt64 variable 'target'."""
+        self.emit(indent, "if p < end and p.get() < UInt8(128):")
+        self.emit(indent + 1, f"{target} = UInt64(p.get())")
+        self.emit(indent + 1, "p += 1")
+        self.emit(indent, "else:")
+        self.emit(indent + 1, "r.pos = p")
+        self.emit(indent + 1, f"{target} = r.readVarint()")
+        self.emit(indent + 1, "p = r.pos")
+
+    def readTag(self, indent):
+        self.readVarint(indent, "v")
+        self.emit(indent, "tag = int(v)")
+
+    def readVarintObject(self, indent, target):
+        self.readTag(indent)
+        self.emit(indent, "if tag != VARINT:")
+        self.emit(indent + 1, "raise TypeError('Corrupt data (expected a varint)')")
+        self.readVarint(indent, "v")
+        self.emit(indent, f"{target} = int(v)")
+
+    def expectWireType(self, indent, wireType, expected):
+        self.emit(indent, f"if {wireType} != {expected}:")
+        self.emit(indent + 1, "raise TypeError('Corrupt data (unexpected wire type)')")
+
+    def need(self, indent, bytecount):
+        self.emit(indent, f"if end - p < {bytecount}:")
+        self.emit(indent + 1, "raise TypeError('Corrupt data (ran out of bytes)')")
+
+    def readScalar(self, indent, target, t, wireType):
+        """Read a scalar of type 't' whose tag had wire type 'wireType' into 'target'."""
+        category = _categoryOf(t)
+
+        self.expectWireType(indent, wireType, _SCALARS[category])
+
+        if category in _SIGNED:
+            self.readVarint(indent, "v")
+            self.emit(indent, f"{target} = {self.typeName(t)}(int(v >> UInt64(1)) ^ -int(v & UInt64(1)))")
+        elif category in _UNSIGNED:
+            self.readVarint(indent, "v")
+            self.emit(indent, f"{target} = {self.typeName(t)}(v)")
+        elif category == "Bool":
+            self.readVarint(indent, "v")
+            self.emit(indent, f"{target} = v != UInt64(0)")
+        elif category == "Float64":
+            self.need(indent, 8)
+            self.emit(indent, f"{target} = p.cast(float).get()")
+            self.emit(indent, "p += 8")
+        elif category == "Float32":
+            self.need(indent, 4)
+            self.emit(indent, f"{target} = p.cast(Float32).get()")
+            self.emit(indent, "p += 4")
+        elif category == "None":
+            self.emit(indent, f"{target} = None")
+
+    def readByteCount(self, indent, wireType):
+        """Read the length of a str or bytes whose tag had wire type 'wireType' into 'n'."""
+        self.expectWireType(indent, wireType, BYTES)
+        self.readVarint(indent, "v")
+        self.emit(indent, "n = int(v)")
+        self.emit(indent, "if n < 0 or end - p < n:")
+        self.emit(indent + 1, "raise TypeError('Corrupt data (ran out of bytes)')")
+
+    def readBytes(self, indent, target, t, wireType):
+        """Read a str or bytes whose tag had wire type 'wireType' into 'target'."""
+        self.readByteCount(indent, wireType)
+        self.emit(indent, f"{target} = {'_decodeUtf8' if _categoryOf(t) == 'String' else '_bytesFrom'}(p, n)")
+        self.emit(indent, "p += n")
+
+    def readValueInto(self, indent, target, t, wireType, local):
+        """Read a value of type 't' whose tag had wire type 'wireType' into
+        the uninitialized memory that 'target' points to, using the local
+        'local' for it if we can't construct it there directly."""
+        if self.isInPlace(t):
+            self.emit(indent, "r.pos = p")
+            self.emit(indent, f"_deserializeInto{self.indices[t]}(r, m, {wireType}, {target})")
+            self.emit(indent, "p = r.pos")
+        elif _categoryOf(t) in ("String", "Bytes"):
+            self.readByteCount(indent, wireType)
+            self.emit(indent, f"{'_decodeUtf8Into' if _categoryOf(t) == 'String' else '_bytesFromInto'}(p, n, {target})")
+            self.emit(indent, "p += n")
+        else:
+            self.readValue(indent, local, t, wireType)
+            self.emit(indent, f"{target}.initialize({local})")
+
+    def isInline(self, t):
+        """Is 't' read in place, rather than by calling its deserializer?"""
+        return self.isScalar(t) or _categoryOf(t) in ("String", "Bytes")
+
+    def readOneOf(self, indent, target, t, wireType):
+        """Read a OneOf whose tag had wire type 'wireType' into 'target'."""
+        self.expectWireType(indent, wireType, "SINGLE")
+        self.readTag(indent)
+        for which, e in enumerate(t.Types):
+            self.emit(indent, f"{'if' if which == 0 else 'elif'} tag >> 3 == {which}:")
+            self.readValue(indent + 1, f"{target}_{which}", e, "tag & 7")
+            self.emit(indent + 1, f"{target} = {self.typeName(t)}({target}_{which})")
+        self.emit(indent, "else:")
+        self.emit(indent + 1, "raise TypeError('Corrupt data (invalid OneOf index)')")
+
+    def readValue(self, indent, target, t, wireType):
+        """Read a value of type 't' whose tag had wire type 'wireType' into 'target'."""
+        if self.isScalar(t):
+            self.readScalar(indent, target, t, wireType)
+        elif _categoryOf(t) in ("String", "Bytes"):
+            self.readBytes(indent, target, t, wireType)
+        elif _categoryOf(t) == "OneOf" and all(self.isInline(e) for e in t.Types):
+            self.readOneOf(indent, target, t, wireType)
+        else:
+            self.emit(indent, "r.pos = p")
+            self.emit(indent, f"{target} = _deserialize{self.indices[t]}(r, m, {wireType})")
+            self.emit(indent, "p = r.pos")
+
+    def readEnd(self, indent, wireType):
+        """Consume the end of a message that began with 'wireType'."""
+        self.emit(indent, f"if {wireType} == BEGIN_COMPOUND:")
+        self.readTag(indent + 1)
+        self.emit(indent + 1, "if tag != END_COMPOUND:")
+        self.emit(indent + 2, "raise TypeError('Corrupt data (expected the end of a compound message)')")
+
+    def readCount(self, indent):
+        """Read an element count into 'count'."""
+        self.readVarintObject(indent, "count")
+
+        # every element takes at least a byte, so this guards against
+        # reserving room for a corrupt count
+        self.emit(indent, "if count < 0 or count > end - p:")
+        self.emit(indent + 1, "raise TypeError('Corrupt data (bad element count)')")
+
+    def isInPlace(self, t):
+        """Does 't' have a '_deserializeInto' that constructs it in place?
+
+        Reading a value into a local and then copying it into a list or a
+        tuple costs a refcount change for every object it holds, so tuples,
+        whose elements '_ElementPointer' reaches, and Alternatives, which
+        '_NewAlternative' can allocate without their fields, are read
+        straight into the memory they end up in.
+        """
+        category = _categoryOf(t)
+
+        return category in ("Tuple", "NamedTuple") or (
+            category == "Alternative" and not _types.all_alternatives_empty(t)
+        )
+
+    def elementPointer(self, target, k):
+        """An expression for a pointer to element 'k' of the tuple that 'target' points to."""
+        self.locals[f"F{k}"] = _ElementPointer(k)
+        return f"F{k}({target})"
+
+    def readFieldsInto(self, indent, wireType, target, types, local="e"):
+        """Read a tuple's fields, in any order, into the uninitialized one 'target' points to.
+
+        Like 'CompositeType::deserialize', we construct each field as we read
+        it and the ones that are missing at the end, so if the data is
+        corrupt, the fields we've read are leaked rather than destroyed.
+        """
+        for k in range(len(types)):
+            self.emit(indent, f"{local}{k}_have = False")
+
+        def dispatch(indent):
+            self.emit(indent, "field = tag >> 3")
+            for k, t in enumerate(types):
+                self.emit(indent, f"{'if' if k == 0 else 'elif'} field == {k}:")
+                if not self.isScalar(t):
+                    self.emit(indent + 1, f"if {local}{k}_have:")
+                    self.emit(indent + 2, f"{self.elementPointer(target, k)}.destroy()")
+                self.readValueInto(indent + 1, self.elementPointer(target, k), t, "tag & 7", f"{local}{k}")
+                self.emit(indent + 1, f"{local}{k}_have = True")
+            if types:
+                self.emit(indent, "else:")
+                indent += 1
+            self.skipField(indent)
+
+        self.readFields(indent, wireType, dispatch)
+
+        for k, t in enumerate(types):
+            self.emit(indent, f"if not {local}{k}_have:")
+            if self.defaultValue(t) is not None:
+                self.emit(indent + 1, f"{self.elementPointer(target, k)}.initialize({self.defaultValue(t)})")
+            else:
+                self.emit(indent + 1, "raise TypeError('Corrupt data (missing a field)')")
+
+    def skipField(self, indent):
+        """Skip the field whose tag we just read."""
+        self.emit(indent, "r.pos = p")
+        self.emit(indent, "r.skip(tag & 7)")
+        self.emit(indent, "p = r.pos")
+
+    def readFields(self, indent, wireType, dispatch):
+        """Read the fields of a tuple that began with 'wireType', calling
+        'dispatch(indent)' to emit the code that reads each one."""
+        self.emit(indent, f"if {wireType} == SINGLE:")
+        self.readTag(indent + 1)
+        dispatch(indent + 1)
+        self.emit(indent, f"elif {wireType} == BEGIN_COMPOUND:")
+        self.readTag(indent + 1)
+        self.emit(indent + 1, "while tag & 7 != END_COMPOUND:")
+        dispatch(indent + 2)
+        self.readTag(indent + 2)
+        self.emit(indent, f"elif {wireType} != EMPTY:")
+        self.emit(indent + 1, "raise TypeError('Corrupt data (expected a compound message)')")
+
+    def readElements(self, indent, elementType):
+        """Read 'count' elements into 'res', a list or tuple with room for them."""
+        self.emit(indent, "for k in range(count):")
+        self.readTag(indent + 1)
+        self.readValueInto(indent + 1, "res.pointerUnsafe(k)", elementType, "tag & 7", "e")
+        self.emit(indent + 1, "res.setSizeUnsafe(k + 1)")
+
+    def expectCompound(self, indent):
+        self.emit(indent, "if wireType != SINGLE and wireType != BEGIN_COMPOUND:")
+        self.emit(indent + 1, "raise TypeError('Corrupt data (expected a compound message)')")
+
+    def generateDeserializer(self, i, T):
+        category = _categoryOf(T)
+
+        self.emit(0, f"def _deserialize{i}(r, m, wireType: int) -> T{i}:")
+
+        self.emit(1, "p = r.pos")
+        self.emit(1, "end = r.end")
+
+        if category in _SCALARS or category in ("String", "Bytes"):
+            self.readValue(1, "res", T, "wireType")
+            self.emit(1, "r.pos = p")
+            self.emit(1, "return res")
+        elif self.isInPlace(T):
+            # we read it into a list of one, since we can only read it in place
+            self.locals[f"P{i}"] = PreReservedTupleOrList(ListOf(T))
+            self.emit(1, f"res = P{i}(1)")
+            self.emit(1, f"_deserializeInto{i}(r, m, wireType, res.pointerUnsafe(0))")
+            self.emit(1, "res.setSizeUnsafe(1)")
+            self.emit(1, "return res[0]")
+        elif category == "ListOf":
+            self.expectCompound(1)
+            self.readVarintObject(1, "memoId")
+            self.emit(1, f"ix = m.find{i}(memoId)")
+            self.emit(1, "if ix >= 0:")
+            self.readEnd(2, "wireType")
+            self.emit(2, "r.pos = p")
+            self.emit(2, f"return m.memo{i}[ix]")
+            self.readCount(1)
+            self.locals[f"P{i}"] = PreReservedTupleOrList(T)
+            self.emit(1, f"res = P{i}(count)")
+            self.emit(1, f"m.add{i}(memoId, res)")
+            self.readElements(1, T.ElementType)
+            self.readEnd(1, "wireType")
+            self.emit(1, "r.pos = p")
+            self.emit(1, "return res")
+        elif category == "TupleOf":
+            self.emit(1, "if wireType == EMPTY:")
+            self.emit(2, f"return T{i}()")
+            self.expectCompound(1)
+            self.readCount(1)
+            self.locals[f"P{i}"] = PreReservedTupleOrList(T)
+            self.emit(1, f"res = P{i}(count)")
+            self.readElements(1, T.ElementType)
+            self.readEnd(1, "wireType")
+            self.emit(1, "r.pos = p")
+            self.emit(1, "return res")
+        elif category == "Dict":
+            self.expectCompound(1)
+            self.readVarintObject(1, "memoId")
+            self.emit(1, "if wireType == SINGLE:")
+            self.emit(2, f"ix = m.find{i}(memoId)")
+            self.emit(2, "if ix < 0:")
+            self.emit(3, "raise TypeError('Corrupt data (unknown memo id)')")
+            self.emit(2, "r.pos = p")
+            self.emit(2, f"return m.memo{i}[ix]")
+            self.readCount(1)
+            self.emit(1, f"res = T{i}()")
+            self.emit(1, "res._reserveUnsafe(count)")
+            self.emit(1, f"m.add{i}(memoId, res)")
+            self.emit(1, "for _ in range(count):")
+            self.readTag(2)
+            self.readValue(2, "key", T.KeyType, "tag & 7")
+            self.readTag(2)
+            self.readValue(2, "value", T.ValueType, "tag & 7")
+            self.emit(2, "res[key] = value")
+            self.readEnd(1, "wireType")
+            self.emit(1, "r.pos = p")
+            self.emit(1, "return res")
+        elif category == "OneOf":
+            self.readOneOf(1, "res", T, "wireType")
+            self.emit(1, "r.pos = p")
+            self.emit(1, "return res")
+        elif category == "Alternative":
+            # all its alternatives are empty, so it's just an index
+            self.expectWireType(1, "wireType", "SINGLE")
+            self.readTag(1)
+            self.emit(1, "which = tag >> 3")
+            self.emit(1, "subWireType = tag & 7")
+            self.readFields(1, "subWireType", self.skipField)
+            self.emit(1, "r.pos = p")
+            for which, alternative in enumerate(T.__typed_python_alternatives__):
+                self.emit(1, f"if which == {which}:")
+                self.emit(2, f"return T{i}.{alternative.Name}()")
+            self.emit(1, "raise TypeError('Corrupt data (invalid Alternative index)')")
+
+        if self.isInPlace(T):
+            self.generateDeserializerInto(i, T)
+
+    def generateDeserializerInto(self, i, T):
+        """Write '_deserializeInto{i}', which reads a T{i} into the uninitialized one 'out' points to."""
+        self.emit(0, f"def _deserializeInto{i}(r, m, wireType: int, out: PointerTo(T{i})) -> None:")
+        self.emit(1, "p = r.pos")
+        self.emit(1, "end = r.end")
+
+        if _categoryOf(T) == "Alternative":
+            self.expectWireType(1, "wireType", "SINGLE")
+            self.readTag(1)
+            for which, alternative in enumerate(T.__typed_python_alternatives__):
+                self.locals[f"A{i}_{which}"] = _NewAlternative(alternative)
+                self.emit(1, f"if tag >> 3 == {which}:")
+                self.emit(2, "subWireType = tag & 7")
+                self.emit(2, f"fields{which} = A{i}_{which}(out)")
+                self.readFieldsInto(2, "subWireType", f"fields{which}", alternative.ElementType.ElementTypes, f"e{which}_")
+                self.emit(2, "r.pos = p")
+                self.emit(2, "return")
+            self.emit(1, "raise TypeError('Corrupt data (invalid Alternative index)')")
+        else:
+            self.readFieldsInto(1, "wireType", "out", T.ElementTypes)
+            self.emit(1, "r.pos = p")
+
+    def generate(self, name):
+        # the lists and dicts we've read, by memo id. Like the C++
+        # deserializer, we index them by id with a vector rather than a map:
+        # 'memo{i}[ids{i}[memoId]]' is the value with that id.
+        self.emit(0, "class Memo_(Class, Final):")
+        self.emit(1, "pass")
+        for i, t in enumerate(self.types):
+            if _categoryOf(t) in ("ListOf", "Dict"):
+                self.emit(1, f"memo{i} = Member(ListOf(T{i}))")
+                self.emit(1, f"ids{i} = Member(ListOf(int))")
+                self.emit(1, "@Entrypoint")
+                self.emit(1, f"def find{i}(self, memoId: int) -> int:")
+                self.emit(2, f"if memoId < 0 or memoId >= len(self.ids{i}):")
+                self.emit(3, "return -1")
+                self.emit(2, f"return self.ids{i}[memoId]")
+                self.emit(1, "@Entrypoint")
+                self.emit(1, f"def add{i}(self, memoId: int, value: T{i}) -> None:")
+                self.emit(2, f"if memoId < 0 or memoId > len(self.ids{i}) + 1000000:")
+                self.emit(3, "raise TypeError('Corrupt data (suspicious memo id)')")
+                self.emit(2, f"while len(self.ids{i}) <= memoId:")
+                self.emit(3, f"self.ids{i}.append(-1)")
+                self.emit(2, f"if self.ids{i}[memoId] >= 0:")
+                self.emit(3, "raise TypeError('Corrupt data (memo id used twice)')")
+                self.emit(2, f"self.ids{i}[memoId] = len(self.memo{i})")
+                self.emit(2, f"self.memo{i}.append(value)")
+
+        for i, t in enumerate(self.types):
+            self.generateSerializer(i, t)
+            self.generateDeserializer(i, t)
+
+        self.emit(0, f"class CompiledSerializer_(Class, Final, __name__={name!r}):")
+        self.emit(1, "ValueType = T0")
+        self.emit(1, "@Entrypoint")
+        self.emit(1, "@staticmethod")
+        self.emit(1, "def serialize(x: T0) -> bytes:")
+        self.emit(2, "w = _Writer()")
+        self.emit(2, "_serialize0(w, x, 0)")
+        self.emit(2, "return w.toBytes()")
+        self.emit(1, "@Entrypoint")
+        self.emit(1, "@staticmethod")
+        self.emit(1, "def deserialize(data: bytes) -> T0:")
+        self.emit(2, "r = _Reader(data)")
+        self.emit(2, "return _deserialize0(r, Memo_(), r.readTag() & 7)")
+        self.emit(0, "return CompiledSerializer_")
+
+        return {
+            "sourceText": self.lines,
+            "locals": self.locals,
+        }
+
+
+@Macro
+def CompiledSerializer(T):
+    """Produce a Class whose static methods serialize and deserialize values of type T.
+
+    'CompiledSerializer(T).serialize(x)' returns the same bytes as
+    'serialize(T, x)', and 'CompiledSerializer(T).deserialize(data)' reads
+    them back, but both are compiled specifically for T, so they don't
+    dispatch on the type of each field at runtime. Both can be called from
+    the interpreter or from compiled code.
+
+    T may be built from register types, None, str, bytes, Tuple,
+    NamedTuple, ListOf, TupleOf, Dict, OneOf and (possibly recursive)
+    Alternative types. Other types raise a TypeError. Aliased ListOfs and
+    Dicts are written once and referenced afterwards, like the generic
+    serializer does.
+    """
+    return _Generator(T).generate(f"CompiledSerializer({T.__name__})")
@@ -0,0 +1,198 @@
+#   Copyright 2017-2020 typed_python Authors
+#
+#   Licensed under the Apache License, Version 2.0 (the "License");
+#   you may not use this file except in compliance with the License.
+#   You may obtain a copy of the License at
+#
+#       http://www.apache.org/licenses/LICENSE-2.0
+#
+#   Unless required by applicable law or agreed to in writing, software
+#   distributed under the License is distributed on an "AS IS" BASIS,
+#   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#   See the License for the specific language governing permissions and
+#   limitations under the License.
+
+import time
+
+import pytest
+from flaky import flaky
+
+from typed_python import (
+    NamedTuple, Alternative, Forward, ListOf, TupleOf, Dict, OneOf, Tuple, Set,
+    Float32, UInt8, Int8, Entrypoint, serialize, deserialize
+)
+from typed_python.compiled_serialization import CompiledSerializer
+
+Tree = Forward("Tree")
+Tree = Tree.define(Alternative(
+    "Tree",
+    Leaf={'value': int},
+    Node={'left': Tree, 'right': Tree},
+    Empty={}
+))
+
+Message = NamedTuple(
+    i=int,
+    f=float,
+    s=str,
+    ints=ListOf(int),
+    strs=TupleOf(str),
+    d=Dict(str, float),
+    o=OneOf(None, int, str),
+    tree=Tree,
+    f32=Float32,
+    u8=UInt8,
+    i8=Int8,
+    b=bytes,
+    flag=bool,
+    pair=Tuple(int, str),
+)
+
+
+def makeMessage(i=0):
+    return Message(
+        i=-5 - i,
+        f=1.5,
+        s="héllo" + str(i),
+        ints=[1, 2, 300, i],
+        strs=("a", "b"),
+        d={"k": 2.0, str(i): float(i)},
+        o="x" if i % 2 else i,
+        tree=Tree.Node(left=Tree.Leaf(value=i), right=Tree.Empty()),
+        f32=2.5,
+        u8=200,
+        i8=-3,
+        b=b"\x00\x01",
+        flag=True,
+        pair=(i, "z"),
+    )
+
+
+def test_compiled_serializer_matches_serialize():
+    S = CompiledSerializer(Message)
+
+    for i in range(4):
+        m = makeMessage(i)
+
+        assert S.serialize(m) == serialize(Message, m)
+        assert S.deserialize(serialize(Message, m)) == m
+        assert deserialize(Message, S.serialize(m)) == m
+
+
+def test_compiled_serializer_handles_edge_cases():
+    Color = Alternative("Color", Red={}, Green={})
+    Inner = NamedTuple(x=str, y=ListOf(str))
+
+    cases = [
+        (ListOf(Color), [Color.Green(), Color.Red()]),
+        (ListOf(Tuple(str, bytes)), [("", b""), ("a", b"b")]),
+        (OneOf(None, Inner, int), Inner(x="z")),
+        (Dict(str, Tree), {"k": Tree.Node(left=Tree.Leaf(value=1), right=Tree.Empty())}),
+        (TupleOf(Tuple(str, Inner)), [("s", Inner(y=["w"]))]),
+    ]
+
+    for T, value in cases:
+        S = CompiledSerializer(T)
+        value = T(value)
+
+        assert S.serialize(value) == serialize(T, value)
+        assert S.deserialize(serialize(T, value)) == value
+
+    # fields we don't know about are skipped, and missing ones get defaults
+    Small = NamedTuple(a=int)
+    Big = NamedTuple(a=int, s=str, t=Tree, c=Color)
+
+    for T1, T2, value in [(Small, Big, Small(a=3)), (Big, Small, Big(a=4, s="x", t=Tree.Leaf(value=1)))]:
+        data = serialize(ListOf(T1), [value, value])
+
+        assert CompiledSerializer(ListOf(T2)).deserialize(data) == deserialize(ListOf(T2), data)
+
+
+def test_compiled_serializer_preserves_aliasing():
+    T = ListOf(ListOf(int))
+    S = CompiledSerializer(T)
+
+    inner = ListOf(int)([1, 2])
+    outer = T([inner, inner])
+
+    assert S.serialize(outer) == serialize(T, outer)
+
+    copy = S.deserialize(S.serialize(outer))
+    copy[0].append(3)
+
+    assert copy[1] == [1, 2, 3]
+
+    T = ListOf(Dict(str, int))
+    S = CompiledSerializer(T)
+
+    inner = Dict(str, int)({"a": 1})
+    outer = T([inner, inner])
+
+    assert S.serialize(outer) == serialize(T, outer)
+
+    copy = S.deserialize(S.serialize(outer))
+    copy[0]["b"] = 2
+
+    assert copy[1] == {"a": 1, "b": 2}
+
+
+def test_compiled_serializer_rejects_corrupt_data():
+    S = CompiledSerializer(Message)
+    data = S.serialize(makeMessage())
+
+    with pytest.raises(TypeError, match="Corrupt data"):
+        S.deserialize(data[:-3])
+
+    with pytest.raises(TypeError):
+        CompiledSerializer(Set(int))
+
+
+def test_compiled_serializer_from_compiled_code():
+    S = CompiledSerializer(Message)
+
+    @Entrypoint
+    def roundTrip(messages: ListOf(Message)):
+        res = ListOf(Message)()
+        for m in messages:
+            res.append(S.deserialize(S.serialize(m)))
+        return res
+
+    messages = ListOf(Message)([makeMessage(i) for i in range(10)])
+
+    assert roundTrip(messages) == messages
+
+
+@flaky(max_runs=3, min_passes=1)
+def test_compiled_serializer_perf():
+    T = ListOf(Message)
+    S = CompiledSerializer(T)
+
+    messages = T([makeMessage(i) for i in range(10000)])
+
+    # compile it
+    S.deserialize(S.serialize(T([makeMessage()])))
+
+    data = serialize(T, messages)
+    compiledData = S.serialize(messages)
+
+    assert data == compiledData
+
+    # alternate the two so that drift in the machine's speed hits both equally
+    times = {}
+    for _ in range(5):
+        for name, f, args in [
+            ("serialize", serialize, (T, messages)),
+            ("compiledSerialize", S.serialize, (messages,)),
+            ("deserialize", deserialize, (T, data)),
+            ("compiledDeserialize", S.deserialize, (compiledData,)),
+        ]:
+            t0 = time.time()
+            f(*args)
+            times[name] = min(times.get(name, 1e9), time.time() - t0)
+
+    print(f"serialize took {times['serialize']}, CompiledSerializer took {times['compiledSerialize']}")
+    print(f"deserialize took {times['deserialize']}, CompiledSerializer took {times['compiledDeserialize']}")
+
+    # compiling for a specific type should never lose to the generic serializer
+    assert times['compiledSerialize'] <= times['serialize']
+    assert times['compiledDeserialize'] <= times['deserialize']
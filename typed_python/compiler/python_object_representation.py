@@ -66,6 +66,7 @@ from typed_python.compiler.type_wrappers.python_object_of_type_wrapper import Py
 from typed_python.compiler.type_wrappers.abs_wrapper import AbsWrapper
 from typed_python.compiler.type_wrappers.min_max_wrapper import MinWrapper, MaxWrapper
 from typed_python.compiler.type_wrappers.repr_wrapper import ReprWrapper
+from typed_python.compiler.type_wrappers.serialize_wrapper import SerializeWrapper
 from types import ModuleType
 from typed_python._types import TypeFor, bytecount, prepareArgumentToBePassedToCompiler
 from typed_python import (
@@ -74,7 +75,9 @@ from typed_python import (
     ListOf, isCompiled,
     typeKnownToCompiler,
     localVariableTypesKnownToCompiler,
-    pointerTo
+    pointerTo,
+    serialize,
+    deserialize
 )
 
 # the type of bound C methods on types.
@@ -268,6 +271,9 @@ def pythonObjectRepresentation(context, f, owningGlobalScopeAndName=None):
     if f is pointerTo:
         return TypedExpression(context, native_ast.nullExpr, PointerToObjectWrapper(), False)
 
+    if f is serialize or f is deserialize:
+        return TypedExpression(context, native_ast.nullExpr, SerializeWrapper(f), False)
+
     if f is isCompiled:
         return TypedExpression(context, native_ast.nullExpr, IsCompiledWrapper(), False)
 
@@ -71,6 +71,15 @@ class TestAlternativeCompilation(unittest.TestCase):
         self.assertTrue(f().matches.X)
         self.assertEqual(f().x, 10)
 
+    def test_construct_alternative_without_fields(self):
+        A = Alternative("A", X={'x': int}, Y={})
+
+        @Compiled
+        def f():
+            return A.Y()
+
+        self.assertTrue(f().matches.Y)
+
     def test_alternative_matches(self):
         A = Alternative("A", X={'x': int}, Y={'x': int})
 
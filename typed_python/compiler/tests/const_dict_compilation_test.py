@@ -354,3 +354,56 @@ class TestConstDictCompilation(unittest.TestCase):
         # I get about 70x
         print("ConstDict iteration speedup is ", speedup)
         self.assertGreater(speedup, 2)
+
+    def test_const_dict_broken_into_subtrees(self):
+        T = ConstDict(int, TupleOf(int))
+
+        value = TupleOf(int)([1, 2])
+
+        # updating a large dict incrementally breaks it up into a tree of subtrees
+        aDict = T({k: value for k in range(0, 4000, 2)})
+        for k in range(1, 400, 2):
+            aDict = aDict + {k: TupleOf(int)([k])}
+        for k in range(0, 400, 4):
+            aDict = aDict - (k,)
+
+        pyDict = dict(aDict)
+
+        @Entrypoint
+        def lookupAll(d: T, lookups: ListOf(int)):
+            res = ListOf(int)()
+            for k in lookups:
+                if k in d:
+                    res.append(d[k][0])
+                else:
+                    res.append(d.get(k, value)[1] * -1)
+            return res
+
+        lookups = ListOf(int)(range(-10, 4010))
+
+        self.assertEqual(
+            lookupAll(aDict, lookups),
+            [pyDict[k][0] if k in pyDict else -2 for k in lookups]
+        )
+
+        @Entrypoint
+        def itemsOf(d: T):
+            res = ListOf(Tuple(int, TupleOf(int)))()
+            for k, v in d.items():
+                res.append((k, v))
+            return res
+
+        self.assertEqual(itemsOf(aDict), sorted(pyDict.items()))
+
+        @Entrypoint
+        def copyAndDrop(d: T):
+            x = d
+            return len(x)
+
+        refcount = _types.refcount(value)
+        self.assertEqual(copyAndDrop(aDict), len(pyDict))
+        self.assertEqual(_types.refcount(value), refcount)
+
+        pyDict = None
+        aDict = None
+        self.assertEqual(_types.refcount(value), 1)
@@ -794,6 +794,27 @@ class TestDictCompilation(unittest.TestCase):
             self.assertEqual(r2, True)
             self.assertEqual(r1, r2)
 
+    def test_dict_compiled_equality(self):
+        @Entrypoint
+        def compare(x, y):
+            return (x == y, x != y)
+
+        T = Dict(str, Dict(int, float))
+
+        cases = [
+            ({}, {}),
+            ({"a": {1: 2.0}}, {"a": {1: 2.0}}),
+            ({"a": {1: 2.0}}, {"a": {1: 3.0}}),
+            ({"a": {1: 2.0}}, {"b": {1: 2.0}}),
+            ({"a": {}}, {"a": {}, "b": {}}),
+        ]
+
+        for x, y in cases:
+            x = T({k: Dict(int, float)(v) for k, v in x.items()})
+            y = T({k: Dict(int, float)(v) for k, v in y.items()})
+
+            self.assertEqual(compare(x, y), (x == y, x != y))
+
     def test_dict_size_change_during_iteration_raises(self):
         @Entrypoint
         def checkIt():
@@ -805,3 +826,139 @@ class TestDictCompilation(unittest.TestCase):
 
         with self.assertRaisesRegex(RuntimeError, "dictionary size changed"):
             checkIt()
+
+    def test_dict_interleaved_compiled_and_interpreted_mutation(self):
+        # compiled and interpreted code share the same hash table, so
+        # exercise both on one dict, with enough deletions to recycle
+        # tombstones and to shrink the table.
+        @Entrypoint
+        def setCompiled(d: Dict(int, int), k: int, v: int):
+            d[k] = v
+
+        @Entrypoint
+        def delCompiled(d: Dict(int, int), k: int):
+            del d[k]
+
+        @Entrypoint
+        def getCompiled(d: Dict(int, int), k: int):
+            return d.get(k, -1)
+
+        @Entrypoint
+        def copyCompiled(d: Dict(int, int)):
+            return d.copy()
+
+        rng = numpy.random.RandomState(42)
+
+        d = Dict(int, int)()
+        mirror = {}
+
+        for i in range(20000):
+            # keys that only differ in their high bits
+            k = int(rng.randint(0, 500)) << 40
+            compiled = rng.randint(0, 2)
+            op = rng.randint(0, 3)
+
+            if op == 0 or len(mirror) < 50:
+                if compiled:
+                    setCompiled(d, k, i)
+                else:
+                    d[k] = i
+                mirror[k] = i
+            elif op == 1:
+                if k in mirror:
+                    if compiled:
+                        delCompiled(d, k)
+                    else:
+                        del d[k]
+                    del mirror[k]
+            else:
+                self.assertEqual(getCompiled(d, k) if compiled else d.get(k, -1), mirror.get(k, -1))
+
+        self.assertEqual(dict(d), mirror)
+        self.assertEqual(dict(copyCompiled(d)), mirror)
+
+        for k in list(mirror):
+            delCompiled(d, k)
+
+        self.assertEqual(len(d), 0)
+        setCompiled(d, 1, 2)
+        self.assertEqual(d, {1: 2})
+
+    def test_dict_bulk_operations(self):
+        @Entrypoint
+        def fromColumns(keys: ListOf(str), values: ListOf(int)):
+            return Dict(str, int).fromColumns(keys, values)
+
+        @Entrypoint
+        def getMany(d: Dict(str, int), keys: ListOf(str)):
+            return d.getMany(keys)
+
+        @Entrypoint
+        def containsMany(d: Dict(str, int), keys: ListOf(str)):
+            return d.containsMany(keys)
+
+        @Entrypoint
+        def setMany(d: Dict(str, int), keys: ListOf(str), values: ListOf(int)):
+            d.setMany(keys, values)
+
+        keys = ListOf(str)([str(i) for i in range(1000)])
+        values = ListOf(int)(range(1000))
+        probes = ListOf(str)([str(i) for i in range(-50, 1050, 3)])
+
+        for compiled in [True, False]:
+            if compiled:
+                d = fromColumns(keys, values)
+            else:
+                d = Dict(str, int).fromColumns(keys, values)
+
+            self.assertEqual(dict(d), {str(i): i for i in range(1000)})
+
+            res = getMany(d, probes) if compiled else d.getMany(probes)
+            self.assertEqual(type(res), ListOf(OneOf(None, int)))
+            self.assertEqual(res, [d.get(k) for k in probes])
+
+            res = containsMany(d, probes) if compiled else d.containsMany(probes)
+            self.assertEqual(type(res), ListOf(bool))
+            self.assertEqual(res, [k in d for k in probes])
+
+            # a mix of new and existing keys, including repeats
+            newKeys = ListOf(str)([str(i) for i in range(900, 1100)] + ["900"])
+            newValues = ListOf(int)([-i for i in range(len(newKeys))])
+
+            if compiled:
+                setMany(d, newKeys, newValues)
+            else:
+                d.setMany(newKeys, newValues)
+
+            expected = {str(i): i for i in range(1000)}
+            expected.update(zip(newKeys, newValues))
+            self.assertEqual(dict(d), expected)
+
+            with self.assertRaisesRegex(ValueError, "same number"):
+                if compiled:
+                    setMany(d, newKeys, ListOf(int)())
+                else:
+                    d.setMany(newKeys, [])
+
+    def test_dict_bulk_operations_refcounts(self):
+        @Entrypoint
+        def getMany(d: Dict(int, ListOf(int)), keys: ListOf(int)):
+            return d.getMany(keys)
+
+        @Entrypoint
+        def fromColumns(keys: ListOf(int), values: ListOf(ListOf(int))):
+            return Dict(int, ListOf(int)).fromColumns(keys, values)
+
+        aList = ListOf(int)([1, 2, 3])
+
+        d = fromColumns(ListOf(int)([1, 2, 1]), ListOf(ListOf(int))([aList, aList, aList]))
+        self.assertEqual(len(d), 2)
+        self.assertEqual(_types.refcount(aList), 3)
+
+        res = getMany(d, ListOf(int)([1, 5, 2]))
+        self.assertEqual(res, [aList, None, aList])
+        self.assertEqual(_types.refcount(aList), 5)
+
+        res = None
+        d = None
+        self.assertEqual(_types.refcount(aList), 1)
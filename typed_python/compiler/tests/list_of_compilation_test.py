@@ -787,3 +787,43 @@ class TestListOfCompilation(unittest.TestCase):
 
         with self.assertRaises(TypeError):
             aList[0] = "hi"
+
+    def test_short_lists_store_elements_inline(self):
+        @Entrypoint
+        def makeShortLists(count: int):
+            res = ListOf(ListOf(int))()
+            res.reserve(count)
+            for i in range(count):
+                res.append(ListOf(int)([i, i + 1, i + 2]))
+            return res
+
+        @Entrypoint
+        def growList(x: ListOf(int), count: int):
+            for i in range(count):
+                x.append(i)
+            return x
+
+        def inlineOffset(lists, i):
+            # how far the elements of 'lists[i]' sit from its layout
+            layout = lists.pointerUnsafe(i).cast(int).get()
+            return int(lists[i].pointerUnsafe(0)) - layout
+
+        # short lists are one allocation: the elements follow the layout
+        for makeLists in [
+            makeShortLists,
+            lambda count: ListOf(ListOf(int))([[i, i + 1, i + 2] for i in range(count)])
+        ]:
+            lists = makeLists(100)
+
+            assert lists[10] == [10, 11, 12]
+            assert lists[10].reserved() == 3
+            assert inlineOffset(lists, 10) == 40
+
+        # lists that outgrow their inline storage move it to the heap
+        for aList in [ListOf(int)(), ListOf(int)([1, 2]), makeShortLists(1)[0]]:
+            prefix = list(aList)
+            aList.reserve(0)
+            assert growList(aList, 100) == prefix + list(range(100))
+            aList.reserve(len(aList))
+            assert aList.reserved() == len(aList)
+            assert growList(ListOf(int)(aList), 1) == aList + [0]
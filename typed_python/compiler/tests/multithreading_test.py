@@ -19,7 +19,7 @@ import unittest
 from flaky import flaky
 from typed_python import (
     Class, Member, Alternative, TupleOf, ListOf, ConstDict, SerializationContext,
-    Entrypoint, Compiled, localVariableTypesKnownToCompiler
+    Entrypoint, Compiled, localVariableTypesKnownToCompiler, serialize, deserialize
 )
 
 import typed_python._types as _types
@@ -146,6 +146,36 @@ class TestMultithreading(unittest.TestCase):
         # expect the ratio to be close to 1, but have some error margin
         self.assertTrue(ratio >= .8 and ratio < 1.2, ratios)
 
+    @flaky(max_runs=3, min_passes=1)
+    def test_compiled_serialize_is_parallel(self):
+        if os.environ.get('TRAVIS_CI', None):
+            return
+
+        T = ListOf(int)
+
+        @Entrypoint
+        def f(x: T):
+            for i in range(10):
+                deserialize(T, serialize(T, x))
+
+        x = T()
+        x.resize(1000000)
+
+        ratios = []
+        for i in range(10):
+            t0 = time.time()
+            thread_apply(f, [(x,)])
+            t1 = time.time()
+            thread_apply(f, [(x,), (x,)])
+            t2 = time.time()
+
+            ratios.append((t2 - t1) / (t1 - t0))
+
+        ratios = sorted(ratios)
+
+        # compiled serialization never takes the GIL, so two threads take as long as one
+        self.assertTrue(ratios[5] >= .8 and ratios[5] < 1.2, ratios)
+
     def test_can_access_locks_in_compiler_with_locks_as_obj(self):
         lock = threading.Lock()
         recursiveLock = threading.RLock()
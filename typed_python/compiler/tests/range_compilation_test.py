@@ -115,6 +115,20 @@ class TestRangeCompilation(unittest.TestCase):
         ]:
             assert fCompiled(*args) == f(*args), args
 
+    def test_range_len(self):
+        @Entrypoint
+        def rangeLen(start: int, stop: int, step: int):
+            return len(range(start, stop, step))
+
+        @Entrypoint
+        def listFromRange(start: int, stop: int, step: int):
+            return ListOf(int)(range(start, stop, step))
+
+        for args in [(0, 10, 1), (0, 0, 1), (20, 10, 1), (-10, 10, 3), (10, -10, -3), (9, 10, -1)]:
+            assert rangeLen(*args) == len(range(*args)), args
+            assert listFromRange(*args) == list(range(*args)), args
+            assert listFromRange(*args).reserved() == len(range(*args)), args
+
     def test_range_perf(self):
         @Entrypoint
         def sumRangeAsInts(x):
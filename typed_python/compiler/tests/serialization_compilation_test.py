@@ -0,0 +1,88 @@
+#   Copyright 2017-2020 typed_python Authors
+#
+#   Licensed under the Apache License, Version 2.0 (the "License");
+#   you may not use this file except in compliance with the License.
+#   You may obtain a copy of the License at
+#
+#       http://www.apache.org/licenses/LICENSE-2.0
+#
+#   Unless required by applicable law or agreed to in writing, software
+#   distributed under the License is distributed on an "AS IS" BASIS,
+#   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#   See the License for the specific language governing permissions and
+#   limitations under the License.
+
+import pytest
+
+from typed_python import (
+    Alternative, ConstDict, Dict, Entrypoint, ListOf, NamedTuple, OneOf, Set, TupleOf,
+    SerializationContext, serialize, deserialize
+)
+from typed_python.compiler.type_wrappers.serialize_wrapper import serializesWithoutPython
+
+Shape = Alternative("Shape", Circle=dict(r=float), Box=dict(w=float, h=float, label=str))
+
+Record = NamedTuple(key=str, values=ListOf(float), extra=OneOf(None, int, bytes), tags=Set(str))
+
+
+def test_types_serializable_without_python():
+    for T in [int, float, str, bytes, type(None), ListOf(Record), Dict(int, ConstDict(str, TupleOf(Shape)))]:
+        assert serializesWithoutPython(T), T
+
+    for T in [object, ListOf(object), OneOf(None, object), NamedTuple(x=type)]:
+        assert not serializesWithoutPython(T), T
+
+
+def test_compiled_serialize_matches_interpreter():
+    @Entrypoint
+    def roundTrip(T, x):
+        return deserialize(T, serialize(T, x))
+
+    @Entrypoint
+    def serializeCompiled(T, x):
+        return serialize(T, x)
+
+    values = [
+        (int, 10),
+        (float, 1.5),
+        (str, "hi ሴ"),
+        (bytes, b"bytes"),
+        (ListOf(Record), [Record(key="a", values=[1.0, 2.0], extra=3, tags={"x"}), Record(extra=b"b")]),
+        (Dict(int, str), {1: "one", 2: "two"}),
+        (TupleOf(Shape), [Shape.Circle(r=1.0), Shape.Box(w=1.0, h=2.0, label="b")]),
+    ]
+
+    for T, x in values:
+        x = T(x)
+
+        assert serializeCompiled(T, x) == serialize(T, x)
+        assert roundTrip(T, x) == x
+
+
+def test_compiled_deserialize_raises_on_corrupt_data():
+    @Entrypoint
+    def deserializeCompiled(T, data):
+        return deserialize(T, data)
+
+    assert deserializeCompiled(ListOf(int), serialize(ListOf(int), [1, 2])) == [1, 2]
+
+    with pytest.raises(TypeError):
+        deserializeCompiled(ListOf(int), serialize(ListOf(int), [1, 2])[:-2])
+
+    with pytest.raises(TypeError):
+        deserializeCompiled(ListOf(int), b"")
+
+
+def test_compiled_serialize_falls_back_to_the_interpreter():
+    @Entrypoint
+    def roundTrip(x: ListOf(object), context: object):
+        return deserialize(ListOf(object), serialize(ListOf(object), x, context), context)
+
+    assert roundTrip(ListOf(object)([1, "2", None]), SerializationContext()) == [1, "2", None]
+
+    @Entrypoint
+    def serializeObject(x: ListOf(object)):
+        return serialize(ListOf(object), x)
+
+    with pytest.raises(TypeError, match="No serialization plugin"):
+        serializeObject(ListOf(object)([1]))
@@ -1152,3 +1152,31 @@ class TestSetCompilation(unittest.TestCase):
 
         with self.assertRaisesRegex(RuntimeError, "set size changed"):
             checkIt()
+
+    def test_set_bulk_operations(self):
+        @Entrypoint
+        def updateFrom(s: Set(int), items: ListOf(int)):
+            s.updateFrom(items)
+
+        @Entrypoint
+        def containsMany(s: Set(int), items: ListOf(int)):
+            return s.containsMany(items)
+
+        items = ListOf(int)([i * 7 for i in range(1000)] + [0, 7])
+        probes = ListOf(int)(range(-10, 7100, 5))
+
+        for compiled in [True, False]:
+            s = Set(int)()
+
+            if compiled:
+                updateFrom(s, items)
+                updateFrom(s, ListOf(int)(range(3)))
+            else:
+                s.updateFrom(items)
+                s.updateFrom([0, 1, 2])
+
+            self.assertEqual(set(s), set(items) | {1, 2})
+
+            res = containsMany(s, probes) if compiled else s.containsMany(probes)
+            self.assertEqual(type(res), ListOf(bool))
+            self.assertEqual(res, [p in s for p in probes])
@@ -100,6 +100,7 @@ class SimpleAlternativeWrapper(AlternativeWrapperMixin, Wrapper):
         super().__init__(t)
 
         self.layoutType = native_ast.UInt8
+        self.matcherType = typeWrapper(_types.AlternativeMatcher(self.typeRepresentation))
 
     def getNativeLayoutType(self):
         return self.layoutType
@@ -152,6 +153,7 @@ class ConcreteSimpleAlternativeWrapper(AlternativeWrapperMixin, Wrapper):
 
         self.layoutType = native_ast.UInt8
         self.alternativeType = t.Alternative
+        self.matcherType = typeWrapper(_types.AlternativeMatcher(self.typeRepresentation))
 
     def getNativeLayoutType(self):
         return self.layoutType
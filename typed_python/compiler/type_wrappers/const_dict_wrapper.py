@@ -20,7 +20,7 @@ from typed_python.compiler.type_wrappers.bound_method_wrapper import BoundMethod
 from typed_python.compiler.type_wrappers.util import min
 from typed_python.compiler.typed_expression import TypedExpression
 
-from typed_python import Tuple
+from typed_python import Tuple, PointerTo, UInt8
 
 import typed_python.compiler.native_ast as native_ast
 import typed_python.compiler
@@ -90,7 +90,42 @@ def const_dict_gte(left, right):
     return not const_dict_lt(left, right)
 
 
+def const_dict_leaf_for_key(constDict, key):
+    """Return the leaf of 'constDict' that would contain 'key'.
+
+    Large ConstDicts that have been updated incrementally are broken up into
+    a tree of subtrees, each keyed by its smallest key. Everything else is a
+    single leaf, which we return directly.
+    """
+    leaf = constDict
+
+    while leaf._is_tree_unsafe():
+        # find the last subtree whose smallest key is not greater than 'key'
+        lowIx = 0
+        highIx = leaf._subtree_count_unsafe()
+
+        while lowIx < highIx:
+            mid = (lowIx + highIx) >> 1
+
+            if key < leaf._get_subtree_key_unsafe(mid):
+                highIx = mid
+            else:
+                lowIx = mid + 1
+
+        if lowIx == 0:
+            # 'key' is smaller than anything in the dict, so it's not in the
+            # first leaf either.
+            lowIx = 1
+
+        leaf = leaf._get_subtree_unsafe(lowIx - 1)
+
+    return leaf
+
+
 def const_dict_getitem(constDict, key):
+    if constDict._is_tree_unsafe():
+        return const_dict_getitem(const_dict_leaf_for_key(constDict, key), key)
+
     # perform a binary search
     lowIx = 0
     highIx = len(constDict)
@@ -98,19 +133,22 @@ def const_dict_getitem(constDict, key):
     while lowIx < highIx:
         mid = (lowIx + highIx) >> 1
 
-        keyAtVal = constDict.get_key_by_index_unsafe(mid)
+        keyAtVal = constDict._get_leaf_key_unsafe(mid)
 
         if keyAtVal < key:
             lowIx = mid + 1
         elif key < keyAtVal:
             highIx = mid
         else:
-            return constDict.get_value_by_index_unsafe(mid)
+            return constDict._get_leaf_value_unsafe(mid)
 
     raise KeyError(key)
 
 
 def const_dict_get(constDict, key, default):
+    if constDict._is_tree_unsafe():
+        return const_dict_get(const_dict_leaf_for_key(constDict, key), key, default)
+
     # perform a binary search
     lowIx = 0
     highIx = len(constDict)
@@ -118,19 +156,22 @@ def const_dict_get(constDict, key, default):
     while lowIx < highIx:
         mid = (lowIx + highIx) >> 1
 
-        keyAtVal = constDict.get_key_by_index_unsafe(mid)
+        keyAtVal = constDict._get_leaf_key_unsafe(mid)
 
         if keyAtVal < key:
             lowIx = mid + 1
         elif key < keyAtVal:
             highIx = mid
         else:
-            return constDict.get_value_by_index_unsafe(mid)
+            return constDict._get_leaf_value_unsafe(mid)
 
     return default
 
 
 def const_dict_contains(constDict, key):
+    if constDict._is_tree_unsafe():
+        return const_dict_contains(const_dict_leaf_for_key(constDict, key), key)
+
     # perform a binary search
     lowIx = 0
     highIx = len(constDict)
@@ -138,7 +179,7 @@ def const_dict_contains(constDict, key):
     while lowIx < highIx:
         mid = (lowIx + highIx) >> 1
 
-        keyAtVal = constDict.get_key_by_index_unsafe(mid)
+        keyAtVal = constDict._get_leaf_key_unsafe(mid)
 
         if keyAtVal < key:
             lowIx = mid + 1
@@ -172,6 +213,9 @@ class ConstDictWrapperBase(RefcountedWrapper):
         self.kvBytecount = self.keyType.getBytecount() + self.valueType.getBytecount()
         self.keyBytecount = self.keyType.getBytecount()
 
+        # interior nodes of a tree hold (key, subtree) pairs
+        self.kdBytecount = self.keyType.getBytecount() + 8
+
         self.layoutType = native_ast.Type.Struct(element_types=(
             ('refcount', native_ast.Int64),
             ('hash_cache', native_ast.Int32),
@@ -183,39 +227,124 @@ class ConstDictWrapperBase(RefcountedWrapper):
     def getNativeLayoutType(self):
         return self.layoutType
 
+    def isTreeNative(self, expr):
+        """Is the (nonnull) ConstDict layout 'expr' an interior node of a tree?"""
+        return expr.ElementPtrIntegers(0, 3).load().neq(native_ast.const_int32_expr(0))
+
+    def leafPairPtrNative(self, expr, ix):
+        """A UInt8Ptr to the ix'th (key, value) pair of leaf 'expr'."""
+        return expr.ElementPtrIntegers(0, 4).elemPtr(ix.mul(native_ast.const_int_expr(self.kvBytecount)))
+
+    def pairPtrNative(self, context, expr, ix):
+        """A UInt8Ptr to the ix'th (key, value) pair of 'expr', which may be a tree.
+
+        Iterators compute this pointer before checking whether they're done, so
+        it has to be safe to compute (but not to use) for an empty dict.
+        """
+        return native_ast.Expression.Branch(
+            cond=expr,
+            true=native_ast.Expression.Branch(
+                cond=self.isTreeNative(expr),
+                true=runtime_functions.const_dict_kv_pair_ptr.call(
+                    expr.cast(native_ast.VoidPtr),
+                    context.getTypePointer(self.constDictType).cast(native_ast.VoidPtr),
+                    ix
+                ),
+                false=self.leafPairPtrNative(expr, ix)
+            ),
+            false=self.leafPairPtrNative(expr, ix)
+        )
+
     def on_refcount_zero(self, context, instance):
         assert instance.isReference
 
+        destructor = (
+            context.converter.defineNativeFunction(
+                "destructor_" + str(self.constDictType),
+                ('destructor', self),
+                [self],
+                typeWrapper(type(None)),
+                self.generateNativeDestructorFunction
+            )
+            .call(instance)
+        )
+
         if self.keyType.is_pod and self.valueType.is_pod:
-            return runtime_functions.free.call(instance.nonref_expr.cast(native_ast.UInt8Ptr))
-        else:
-            return (
-                context.converter.defineNativeFunction(
-                    "destructor_" + str(self.constDictType),
-                    ('destructor', self),
-                    [self],
-                    typeWrapper(type(None)),
-                    self.generateNativeDestructorFunction
-                )
-                .call(instance)
+            # leaves of POD pairs can just be freed, but trees still
+            # need to release their subtrees.
+            return native_ast.Expression.Branch(
+                cond=self.isTreeNative(instance.nonref_expr),
+                true=destructor,
+                false=runtime_functions.free.call(instance.nonref_expr.cast(native_ast.UInt8Ptr))
             )
 
+        return destructor
+
     def generateNativeDestructorFunction(self, context, out, inst):
-        with context.loop(inst.convert_len()) as i:
-            self.convert_getkey_by_index_unsafe(context, inst, i).convert_destroy()
-            self.convert_getvalue_by_index_unsafe(context, inst, i).convert_destroy()
+        with context.ifelse(self.isTreeNative(inst.nonref_expr)) as (ifTree, ifLeaf):
+            with ifTree:
+                subtreeCount = context.pushPod(
+                    int,
+                    inst.nonref_expr.ElementPtrIntegers(0, 3).load().cast(native_ast.Int64)
+                )
+
+                with context.loop(subtreeCount) as i:
+                    self.convert_subtree_key_unsafe(context, inst, i).convert_destroy()
+                    self.convert_subtree_unsafe(context, inst, i).convert_destroy()
+
+            with ifLeaf:
+                if not (self.keyType.is_pod and self.valueType.is_pod):
+                    pairCount = context.pushPod(
+                        int,
+                        inst.nonref_expr.ElementPtrIntegers(0, 2).load().cast(native_ast.Int64)
+                    )
+
+                    with context.loop(pairCount) as i:
+                        pairPtr = self.leafPairPtrNative(inst.nonref_expr, i.nonref_expr)
+
+                        context.pushReference(
+                            self.keyType,
+                            pairPtr.cast(self.keyType.getNativeLayoutType().pointer())
+                        ).convert_destroy()
+
+                        context.pushReference(
+                            self.valueType,
+                            pairPtr.elemPtr(native_ast.const_int_expr(self.keyBytecount))
+                            .cast(self.valueType.getNativeLayoutType().pointer())
+                        ).convert_destroy()
 
         context.pushEffect(
             runtime_functions.free.call(inst.nonref_expr.cast(native_ast.UInt8Ptr))
         )
 
+    def convert_subtree_key_unsafe(self, context, expr, ix):
+        return context.pushReference(
+            self.keyType,
+            expr.nonref_expr.ElementPtrIntegers(0, 4).elemPtr(
+                ix.nonref_expr.mul(native_ast.const_int_expr(self.kdBytecount))
+            ).cast(self.keyType.getNativeLayoutType().pointer())
+        )
+
+    def convert_subtree_unsafe(self, context, expr, ix):
+        return context.pushReference(
+            self.constDictType,
+            expr.nonref_expr.ElementPtrIntegers(0, 4).elemPtr(
+                ix.nonref_expr.mul(native_ast.const_int_expr(self.kdBytecount))
+                .add(native_ast.const_int_expr(self.keyBytecount))
+            ).cast(self.layoutType.pointer())
+        )
+
 
 class ConstDictWrapper(ConstDictWrapperBase):
     def __init__(self, constDictType):
         super().__init__(constDictType, None)
 
     def convert_attribute(self, context, instance, attr):
-        if attr in ("get_key_by_index_unsafe", "get_value_by_index_unsafe", "keys", "values", "items", "get"):
+        if attr in (
+            "get_key_by_index_unsafe", "get_value_by_index_unsafe", "keys", "values", "items", "get",
+            "_is_tree_unsafe", "_subtree_count_unsafe", "_get_subtree_key_unsafe", "_get_subtree_unsafe",
+            "_get_leaf_key_unsafe", "_get_leaf_value_unsafe"
+        ):
             return instance.changeType(BoundMethodWrapper.Make(self, attr))
 
         return super().convert_attribute(context, instance, attr)
@@ -226,6 +355,7 @@ class ConstDictWrapper(ConstDictWrapperBase):
                 ConstDictKeysIteratorWrapper(self.constDictType),
                 lambda instance:
                     instance.expr.ElementPtrIntegers(0, 0).store(-1)
+                    >> instance.expr.ElementPtrIntegers(0, 3).store(0)
                     # we initialize the dict pointer below, so technically
                     # if that were to throw, this would leak a bad value.
             )
@@ -255,6 +385,51 @@ class ConstDictWrapper(ConstDictWrapperBase):
         if kwargs:
             return super().convert_method_call(context, instance, methodname, args, kwargs)
 
+        if methodname == "_is_tree_unsafe" and not args:
+            return context.pushPod(
+                bool,
+                native_ast.Expression.Branch(
+                    cond=instance.nonref_expr,
+                    true=self.isTreeNative(instance.nonref_expr),
+                    false=native_ast.const_bool_expr(False)
+                )
+            )
+
+        if methodname == "_subtree_count_unsafe" and not args:
+            return context.pushPod(
+                int,
+                instance.nonref_expr.ElementPtrIntegers(0, 3).load().cast(native_ast.Int64)
+            )
+
+        if methodname in (
+            "_get_subtree_key_unsafe", "_get_subtree_unsafe", "_get_leaf_key_unsafe", "_get_leaf_value_unsafe"
+        ):
+            if len(args) == 1:
+                ix = args[0].toInt64()
+                if ix is None:
+                    return
+
+                if methodname == "_get_subtree_key_unsafe":
+                    return self.convert_subtree_key_unsafe(context, instance, ix)
+
+                if methodname == "_get_subtree_unsafe":
+                    return self.convert_subtree_unsafe(context, instance, ix)
+
+                # we know this dict is a single leaf, so we can skip checking
+                pairPtr = self.leafPairPtrNative(instance.nonref_expr, ix.nonref_expr)
+
+                if methodname == "_get_leaf_key_unsafe":
+                    return context.pushReference(
+                        self.keyType,
+                        pairPtr.cast(self.keyType.getNativeLayoutType().pointer())
+                    )
+
+                return context.pushReference(
+                    self.valueType,
+                    pairPtr.elemPtr(native_ast.const_int_expr(self.keyBytecount))
+                    .cast(self.valueType.getNativeLayoutType().pointer())
+                )
+
         if methodname == "get_key_by_index_unsafe":
             if len(args) == 1:
                 ix = args[0].toInt64()
@@ -276,26 +451,23 @@ class ConstDictWrapper(ConstDictWrapperBase):
     def convert_getkey_by_index_unsafe(self, context, expr, item):
         return context.pushReference(
             self.keyType,
-            expr.nonref_expr.ElementPtrIntegers(0, 4).elemPtr(
-                item.nonref_expr.mul(native_ast.const_int_expr(self.kvBytecount))
-            ).cast(self.keyType.getNativeLayoutType().pointer())
+            self.pairPtrNative(context, expr.nonref_expr, item.nonref_expr)
+            .cast(self.keyType.getNativeLayoutType().pointer())
         )
 
     def convert_getitem_by_index_unsafe(self, context, expr, item):
         return context.pushReference(
             self.itemType,
-            expr.nonref_expr.ElementPtrIntegers(0, 4).elemPtr(
-                item.nonref_expr.mul(native_ast.const_int_expr(self.kvBytecount))
-            ).cast(self.itemType.getNativeLayoutType().pointer())
+            self.pairPtrNative(context, expr.nonref_expr, item.nonref_expr)
+            .cast(self.itemType.getNativeLayoutType().pointer())
         )
 
     def convert_getvalue_by_index_unsafe(self, context, expr, item):
         return context.pushReference(
             self.valueType,
-            expr.nonref_expr.ElementPtrIntegers(0, 4).elemPtr(
-                item.nonref_expr.mul(native_ast.const_int_expr(self.kvBytecount))
-                .add(native_ast.const_int_expr(self.keyBytecount))
-            ).cast(self.valueType.getNativeLayoutType().pointer())
+            self.pairPtrNative(context, expr.nonref_expr, item.nonref_expr)
+            .elemPtr(native_ast.const_int_expr(self.keyBytecount))
+            .cast(self.valueType.getNativeLayoutType().pointer())
         )
 
     def convert_bin_op(self, context, left, op, right, inplace):
@@ -386,6 +558,7 @@ class ConstDictMakeIteratorWrapper(ConstDictWrapperBase):
                 self.iteratorType,
                 lambda instance:
                     instance.expr.ElementPtrIntegers(0, 0).store(-1)
+                    >> instance.expr.ElementPtrIntegers(0, 3).store(0)
             )
 
             context.pushReference(
@@ -417,6 +590,15 @@ class ConstDictItemsWrapper(ConstDictMakeIteratorWrapper):
 
 
 class ConstDictIteratorWrapper(Wrapper):
+    """Iterates over a ConstDict by index.
+
+    ConstDicts that are trees of subtrees don't hold their pairs in one
+    array, so rather than finding each pair from the top of the tree, we
+    remember the leaf holding the current index and only look up a new
+    leaf once we pass 'leafEnd'. 'leafBase' is offset so that the pair at
+    index 'pos' is at 'leafBase + pos * kvBytecount', as long as 'pos' is
+    in the current leaf.
+    """
     is_pod = False
     is_empty = False
     is_pass_by_ref = True
@@ -426,9 +608,19 @@ class ConstDictIteratorWrapper(Wrapper):
         self.iteratorType = iteratorType
         super().__init__((constDictType, "iterator", iteratorType))
 
+        self.kvBytecount = (
+            typeWrapper(constDictType.KeyType).getBytecount() + typeWrapper(constDictType.ValueType).getBytecount()
+        )
+        self.keyBytecount = typeWrapper(constDictType.KeyType).getBytecount()
+
     def getNativeLayoutType(self):
         return native_ast.Type.Struct(
-            element_types=(("pos", native_ast.Int64), ("dict", ConstDictWrapper(self.constDictType).getNativeLayoutType())),
+            element_types=(
+                ("pos", native_ast.Int64),
+                ("dict", ConstDictWrapper(self.constDictType).getNativeLayoutType()),
+                ("leafBase", native_ast.UInt8Ptr),
+                ("leafEnd", native_ast.Int64)
+            ),
             name="const_dict_iterator"
         )
 
@@ -444,9 +636,44 @@ class ConstDictIteratorWrapper(Wrapper):
             expr.expr.ElementPtrIntegers(0, 0).load().lt(self_len.nonref_expr)
         )
 
-        nextIx = context.pushReference(int, expr.expr.ElementPtrIntegers(0, 0))
+        pos = expr.expr.ElementPtrIntegers(0, 0).load()
+
+        # the runtime writes the leaf bounds into these rather than into the
+        # iterator itself, so that the iterator's address never escapes and
+        # its fields can live in registers.
+        leafStart = context.push(int, lambda x: x.expr.store(native_ast.const_int_expr(0)))
+        leafEnd = context.push(int, lambda x: x.expr.store(native_ast.const_int_expr(0)))
+
+        context.pushEffect(
+            native_ast.Expression.Branch(
+                cond=canContinue.nonref_expr,
+                true=native_ast.Expression.Branch(
+                    cond=pos.gte(expr.expr.ElementPtrIntegers(0, 3).load()),
+                    true=(
+                        expr.expr.ElementPtrIntegers(0, 2).store(
+                            runtime_functions.const_dict_leaf_for_index.call(
+                                expr.expr.ElementPtrIntegers(0, 1).load().cast(native_ast.VoidPtr),
+                                context.getTypePointer(self.constDictType).cast(native_ast.VoidPtr),
+                                pos,
+                                leafStart.expr,
+                                leafEnd.expr
+                            ).elemPtr(
+                                leafStart.expr.load().mul(native_ast.const_int_expr(-self.kvBytecount))
+                            )
+                        )
+                        >> expr.expr.ElementPtrIntegers(0, 3).store(leafEnd.expr.load())
+                    ),
+                    false=native_ast.nullExpr
+                ),
+                false=native_ast.nullExpr
+            )
+        )
+
+        pairPtr = expr.expr.ElementPtrIntegers(0, 2).load().elemPtr(
+            pos.mul(native_ast.const_int_expr(self.kvBytecount))
+        )
 
-        return self.iteratedItemForReference(context, expr, nextIx).asPointerIf(canContinue)
+        return self.iteratedItemForPairPtr(context, pairPtr).asPointerIf(canContinue)
 
     def refAs(self, context, expr, which):
         assert expr.expr_type == self
@@ -462,14 +689,20 @@ class ConstDictIteratorWrapper(Wrapper):
                     .cast(ConstDictWrapper(self.constDictType).getNativeLayoutType().pointer())
             )
 
+        if which == 2:
+            return context.pushReference(PointerTo(UInt8), expr.expr.ElementPtrIntegers(0, 2))
+
+        if which == 3:
+            return context.pushReference(int, expr.expr.ElementPtrIntegers(0, 3))
+
     def convert_assign(self, context, expr, other):
         assert expr.isReference
 
-        for i in range(2):
+        for i in range(4):
             self.refAs(context, expr, i).convert_assign(self.refAs(context, other, i))
 
     def convert_copy_initialize(self, context, expr, other):
-        for i in range(2):
+        for i in range(4):
             self.refAs(context, expr, i).convert_copy_initialize(self.refAs(context, other, i))
 
     def convert_destroy(self, context, expr):
@@ -480,11 +713,10 @@ class ConstDictKeysIteratorWrapper(ConstDictIteratorWrapper):
     def __init__(self, constDictType):
         super().__init__(constDictType, "keys")
 
-    def iteratedItemForReference(self, context, expr, ixExpr):
-        return ConstDictWrapper(self.constDictType).convert_getkey_by_index_unsafe(
-            context,
-            self.refAs(context, expr, 1),
-            ixExpr
+    def iteratedItemForPairPtr(self, context, pairPtr):
+        return context.pushReference(
+            self.constDictType.KeyType,
+            pairPtr.cast(typeWrapper(self.constDictType.KeyType).getNativeLayoutType().pointer())
         )
 
 
@@ -492,11 +724,12 @@ class ConstDictItemsIteratorWrapper(ConstDictIteratorWrapper):
     def __init__(self, constDictType):
         super().__init__(constDictType, "items")
 
-    def iteratedItemForReference(self, context, expr, ixExpr):
-        return ConstDictWrapper(self.constDictType).convert_getitem_by_index_unsafe(
-            context,
-            self.refAs(context, expr, 1),
-            ixExpr
+    def iteratedItemForPairPtr(self, context, pairPtr):
+        itemType = Tuple(self.constDictType.KeyType, self.constDictType.ValueType)
+
+        return context.pushReference(
+            itemType,
+            pairPtr.cast(typeWrapper(itemType).getNativeLayoutType().pointer())
         )
 
 
@@ -504,9 +737,9 @@ class ConstDictValuesIteratorWrapper(ConstDictIteratorWrapper):
     def __init__(self, constDictType):
         super().__init__(constDictType, "values")
 
-    def iteratedItemForReference(self, context, expr, ixExpr):
-        return ConstDictWrapper(self.constDictType).convert_getvalue_by_index_unsafe(
-            context,
-            self.refAs(context, expr, 1),
-            ixExpr
+    def iteratedItemForPairPtr(self, context, pairPtr):
+        return context.pushReference(
+            self.constDictType.ValueType,
+            pairPtr.elemPtr(native_ast.const_int_expr(self.keyBytecount))
+            .cast(typeWrapper(self.constDictType.ValueType).getNativeLayoutType().pointer())
         )
@@ -19,8 +19,9 @@ import typed_python.compiler.type_wrappers.runtime_functions as runtime_function
 from typed_python.compiler.type_wrappers.bound_method_wrapper import BoundMethodWrapper
 from typed_python.compiler.type_wrappers.wrapper import Wrapper
 from typed_python.compiler.type_wrappers.native_hash import table_next_slot, table_clear, table_contains, \
-    dict_delitem, dict_getitem, dict_get, dict_setitem
-from typed_python import Tuple, PointerTo, Int32, UInt8, Dict, ConstDict
+    table_contains_many, dict_delitem, dict_getitem, dict_get, dict_setitem, dict_get_many, dict_set_many, \
+    dict_from_columns
+from typed_python import Tuple, PointerTo, Int32, UInt8, Dict, ConstDict, ListOf, OneOf
 
 import typed_python.compiler.native_ast as native_ast
 import typed_python.compiler
@@ -108,6 +109,24 @@ def dict_duplicate(d):
     return out
 
 
+def dict_eq(l, r):
+    if len(l) != len(r):
+        return False
+
+    for k in l:
+        if k not in r:
+            return False
+
+        if l[k] != r[k]:
+            return False
+
+    return True
+
+
+def dict_neq(l, r):
+    return not dict_eq(l, r)
+
+
 class DictWrapperBase(RefcountedWrapper):
     is_pod = False
     is_empty = False
@@ -133,12 +152,12 @@ class DictWrapperBase(RefcountedWrapper):
             ('items_populated', native_ast.UInt8Ptr),
             ('items_reserved', native_ast.Int64),
             ('top_item_slot', native_ast.Int64),
-            ('hash_table_slots', native_ast.Int32Ptr),
-            ('hash_table_hashes', native_ast.Int32Ptr),
+            ('hash_table_slots', native_ast.Int64Ptr),
+            ('hash_table_ctrl', native_ast.UInt8Ptr),
             ('hash_table_size', native_ast.Int64),
             ('hash_table_count', native_ast.Int64),
             ('hash_table_empty_slots', native_ast.Int64),
-            ('setdefault', native_ast.Int64)
+            ('items_hashes', native_ast.Int32Ptr)
         ), name="DictWrapper").pointer()
 
     def on_refcount_zero(self, context, instance):
@@ -179,8 +198,8 @@ class DictWrapper(DictWrapperBase):
                 "getItemByIndexUnsafe", "getKeyByIndexUnsafe", "getValueByIndexUnsafe", "deleteItemByIndexUnsafe",
                 "initializeValueByIndexUnsafe", "assignValueByIndexUnsafe",
                 "initializeKeyByIndexUnsafe", "_allocateNewSlotUnsafe", "_resizeTableUnsafe",
-                "_top_item_slot", "_compressItemTableUnsafe", "get", "items", "keys", "values", "setdefault",
-                "pop", "clear", "copy", "update"):
+                "_top_item_slot", "_compressItemTableUnsafe", "_reserveUnsafe", "get", "items", "keys", "values",
+                "setdefault", "pop", "clear", "copy", "update", "getMany", "setMany", "containsMany"):
             return expr.changeType(BoundMethodWrapper.Make(self, attr))
 
         if attr == '_items_populated':
@@ -203,13 +222,13 @@ class DictWrapper(DictWrapperBase):
 
         if attr == '_hash_table_slots':
             return context.pushPod(
-                PointerTo(Int32),
+                PointerTo(int),
                 expr.nonref_expr.ElementPtrIntegers(0, 5).load()
             )
 
-        if attr == '_hash_table_hashes':
+        if attr == '_hash_table_ctrl':
             return context.pushPod(
-                PointerTo(Int32),
+                PointerTo(UInt8),
                 expr.nonref_expr.ElementPtrIntegers(0, 6).load()
             )
 
@@ -231,6 +250,12 @@ class DictWrapper(DictWrapperBase):
                 expr.nonref_expr.ElementPtrIntegers(0, 9).load()
             )
 
+        if attr == '_items_hashes':
+            return context.pushPod(
+                PointerTo(Int32),
+                expr.nonref_expr.ElementPtrIntegers(0, 10).load()
+            )
+
         return super().convert_attribute(context, expr, attr)
 
     @staticmethod
@@ -362,7 +387,7 @@ class DictWrapper(DictWrapperBase):
 
             if methodname == "_allocateNewSlotUnsafe":
                 return context.pushPod(
-                    Int32,
+                    int,
                     runtime_functions.table_allocate_new_slot.call(
                         instance.nonref_expr.cast(native_ast.VoidPtr),
                         context.constant(self.kvBytecount)
@@ -389,6 +414,45 @@ class DictWrapper(DictWrapperBase):
             if len(args) == 1:
                 return context.call_py_function(dict_update, (instance, args[0]), {})
 
+        if methodname in ("getMany", "containsMany") and len(args) == 1:
+            keys = args[0].convert_to_type(ListOf(self.dictType.KeyType), ConversionLevel.ImplicitContainers)
+            if keys is None:
+                return None
+
+            if methodname == "containsMany":
+                return context.call_py_function(table_contains_many, (instance, keys), {})
+
+            return context.call_py_function(
+                dict_get_many,
+                (instance, keys, context.constant(ListOf(OneOf(None, self.dictType.ValueType)))),
+                {}
+            )
+
+        if methodname == "setMany" and len(args) == 2:
+            keys = args[0].convert_to_type(ListOf(self.dictType.KeyType), ConversionLevel.ImplicitContainers)
+            if keys is None:
+                return None
+
+            values = args[1].convert_to_type(ListOf(self.dictType.ValueType), ConversionLevel.ImplicitContainers)
+            if values is None:
+                return None
+
+            return context.call_py_function(dict_set_many, (instance, keys, values), {})
+
+        if methodname == "_reserveUnsafe" and len(args) == 1:
+            count = args[0].toInt64()
+            if count is None:
+                return None
+
+            context.pushEffect(
+                runtime_functions.table_reserve.call(
+                    instance.nonref_expr.cast(native_ast.VoidPtr),
+                    context.constant(self.kvBytecount),
+                    count.nonref_expr
+                )
+            )
+            return context.pushVoid()
+
         if len(args) == 1:
             if methodname == "get":
                 return self.convert_get(context, instance, args[0], context.constant(None))
@@ -525,6 +589,15 @@ class DictWrapper(DictWrapperBase):
     def convert_len(self, context, expr):
         return context.pushPod(int, self.convert_len_native(expr))
 
+    def convert_bin_op(self, context, left, op, right, inplace):
+        if right.expr_type == left.expr_type:
+            if op.matches.Eq:
+                return context.call_py_function(dict_eq, (left, right), {})
+            if op.matches.NotEq:
+                return context.call_py_function(dict_neq, (left, right), {})
+
+        return super().convert_bin_op(context, left, op, right, inplace)
+
     def convert_bin_op_reverse(self, context, left, op, right, inplace):
         if op.matches.In:
             right = right.convert_to_type(self.keyType, ConversionLevel.UpcastContainers)
@@ -565,9 +638,30 @@ class DictWrapper(DictWrapperBase):
             runtime_functions.free.call(inst.nonref_expr.ElementPtrIntegers(0, 2).load().cast(native_ast.UInt8Ptr)) >>
             runtime_functions.free.call(inst.nonref_expr.ElementPtrIntegers(0, 5).load().cast(native_ast.UInt8Ptr)) >>
             runtime_functions.free.call(inst.nonref_expr.ElementPtrIntegers(0, 6).load().cast(native_ast.UInt8Ptr)) >>
+            runtime_functions.free.call(inst.nonref_expr.ElementPtrIntegers(0, 10).load().cast(native_ast.UInt8Ptr)) >>
             runtime_functions.free.call(inst.nonref_expr.cast(native_ast.UInt8Ptr))
         )
 
+    def convert_type_attribute(self, context, typeInst, attr):
+        if attr in ('fromColumns',):
+            return typeInst.changeType(BoundMethodWrapper.Make(typeInst.expr_type, attr))
+
+        return super().convert_type_attribute(context, typeInst, attr)
+
+    def convert_type_method_call(self, context, typeInst, methodname, args, kwargs):
+        if methodname == "fromColumns" and len(args) == 2 and not kwargs:
+            keys = args[0].convert_to_type(ListOf(self.dictType.KeyType), ConversionLevel.ImplicitContainers)
+            if keys is None:
+                return None
+
+            values = args[1].convert_to_type(ListOf(self.dictType.ValueType), ConversionLevel.ImplicitContainers)
+            if values is None:
+                return None
+
+            return context.call_py_function(dict_from_columns, (typeInst, keys, values), {})
+
+        return super().convert_type_method_call(context, typeInst, methodname, args, kwargs)
+
     def convert_type_call(self, context, typeInst, args, kwargs):
         if len(args) == 0 and not kwargs:
             return context.push(self, lambda x: x.convert_default_initialize())
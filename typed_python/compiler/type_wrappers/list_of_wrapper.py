@@ -13,7 +13,7 @@
 #   limitations under the License.
 
 from typed_python.compiler.typed_expression import TypedExpression
-from typed_python.compiler.type_wrappers.tuple_of_wrapper import TupleOrListOfWrapper
+from typed_python.compiler.type_wrappers.tuple_of_wrapper import TupleOrListOfWrapper, LAYOUT_BYTECOUNT
 from typed_python.compiler.type_wrappers.bound_method_wrapper import BoundMethodWrapper
 from typed_python.compiler.conversion_level import ConversionLevel
 import typed_python.compiler.type_wrappers.runtime_functions as runtime_functions
@@ -310,7 +310,7 @@ class ListOfWrapper(TupleOrListOfWrapper):
 
         context.pushEffect(
             inst.nonref_expr.ElementPtrIntegers(0, 2).store(
-                inst.nonref_expr.ElementPtrIntegers(0, 2).load().add(native_ast.const_int32_expr(-1))
+                inst.nonref_expr.ElementPtrIntegers(0, 2).load().add(native_ast.const_int_expr(-1))
             )
         )
 
@@ -357,7 +357,7 @@ class ListOfWrapper(TupleOrListOfWrapper):
                     listInst.convert_getitem_unsafe(i+countInst).convert_destroy()
 
         context.pushEffect(
-            listInst.nonref_expr.ElementPtrIntegers(0, 2).store(countInst.nonref_expr.cast(native_ast.Int32))
+            listInst.nonref_expr.ElementPtrIntegers(0, 2).store(countInst.nonref_expr.cast(native_ast.Int64))
         )
 
     def generateClear(self, context, out, listInst, arg=None):
@@ -365,7 +365,7 @@ class ListOfWrapper(TupleOrListOfWrapper):
             listInst.convert_getitem_unsafe(i).convert_destroy()
 
         context.pushEffect(
-            listInst.nonref_expr.ElementPtrIntegers(0, 2).store(native_ast.Int32.zero())
+            listInst.nonref_expr.ElementPtrIntegers(0, 2).store(native_ast.const_int_expr(0))
         )
 
     def generateAppend(self, context, out, listInst, arg):
@@ -376,7 +376,7 @@ class ListOfWrapper(TupleOrListOfWrapper):
         listInst.convert_getitem_unsafe(listInst.convert_len()).convert_copy_initialize(arg)
 
         context.pushEffect(
-            listInst.nonref_expr.ElementPtrIntegers(0, 2).store((listInst.convert_len()+1).nonref_expr.cast(native_ast.Int32))
+            listInst.nonref_expr.ElementPtrIntegers(0, 2).store((listInst.convert_len()+1).nonref_expr)
         )
 
     def generateCopy(self, context, out, listInst):
@@ -403,23 +403,13 @@ class ListOfWrapper(TupleOrListOfWrapper):
                 context.pushEffect(countInst.expr.store(listInst.convert_len().nonref_expr))
 
         context.pushEffect(
-            listInst.nonref_expr.ElementPtrIntegers(0, 4).store(
-                runtime_functions.realloc.call(
-                    listInst.nonref_expr.ElementPtrIntegers(0, 4).load(),
-                    # original bytecount
-                    listInst.nonref_expr.ElementPtrIntegers(0, 3).load().cast(native_ast.Int64).mul(
-                        self.underlyingWrapperType.getBytecount()
-                    ),
-                    # new bytecount
-                    countInst.nonref_expr.mul(self.underlyingWrapperType.getBytecount())
-                )
+            runtime_functions.list_or_tuple_of_reserve.call(
+                listInst.nonref_expr.cast(native_ast.VoidPtr),
+                self.underlyingWrapperType.getBytecount(),
+                countInst.nonref_expr
             )
         )
 
-        context.pushEffect(
-            listInst.nonref_expr.ElementPtrIntegers(0, 3).store(countInst.nonref_expr.cast(native_ast.Int32))
-        )
-
     def generateReserved(self, context, out, listInst):
         context.pushEffect(native_ast.Expression.Return(arg=listInst.convert_reserved().nonref_expr))
 
@@ -437,15 +427,17 @@ class ListOfWrapper(TupleOrListOfWrapper):
     def createEmptyList(self, context, out):
         context.pushEffect(
             out.expr.store(
-                runtime_functions.malloc.call(28).cast(self.getNativeLayoutType())
+                runtime_functions.malloc.call(
+                    LAYOUT_BYTECOUNT + self.underlyingWrapperType.getBytecount()
+                ).cast(self.getNativeLayoutType())
             )
             >> out.nonref_expr.ElementPtrIntegers(0, 0).store(native_ast.const_int_expr(1))  # refcount
             >> out.nonref_expr.ElementPtrIntegers(0, 1).store(native_ast.const_int32_expr(-1))  # hash cache
-            >> out.nonref_expr.ElementPtrIntegers(0, 2).store(native_ast.const_int32_expr(0))  # count
-            >> out.nonref_expr.ElementPtrIntegers(0, 3).store(native_ast.const_int32_expr(1))  # reserved
+            >> out.nonref_expr.ElementPtrIntegers(0, 2).store(native_ast.const_int_expr(0))  # count
+            >> out.nonref_expr.ElementPtrIntegers(0, 3).store(native_ast.const_int_expr(1))  # reserved
             >> out.nonref_expr.ElementPtrIntegers(0, 4).store(
-                runtime_functions.malloc.call(self.underlyingWrapperType.getBytecount())
-            )  # data
+                out.nonref_expr.cast(native_ast.UInt8Ptr).ElementPtrIntegers(LAYOUT_BYTECOUNT)
+            )  # data, which starts out inline
         )
 
     def convert_getslice(self, context, instance, lower, upper, step):
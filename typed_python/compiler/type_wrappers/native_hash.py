@@ -12,12 +12,25 @@
 #   See the License for the specific language governing permissions and
 #   limitations under the License.
 
-from typed_python import Int32
+from typed_python import Int32, UInt8, UInt64, ListOf
 from typed_python.compiler.type_wrappers.compilable_builtin import CompilableBuiltin
 import typed_python.compiler.native_ast as native_ast
+import typed_python.compiler.type_wrappers.runtime_functions as runtime_functions
 
-EMPTY = -1
-DELETED = -2
+# these mirror the table layout in hash_table_layout.hpp. Compiled code walks
+# the same linear probe sequence as the C++ code, one control byte at a time.
+CTRL_EMPTY = 0x80
+CTRL_DELETED = 0xFE
+GROUP_WIDTH = 16
+MIN_TABLE_SIZE = 16
+
+# 2**64 divided by the golden ratio. See 'hash_table_layout::probeStart'.
+FIBONACCI_MULTIPLIER = 0x9E3779B97F4A7C15
+
+# bulk operations hash this many keys, and prefetch the table positions they
+# land on, before probing for any of them. That way the cache misses for a
+# whole batch overlap instead of being paid one after another.
+BULK_BATCH_SIZE = 16
 
 
 class NativeHash(CompilableBuiltin):
@@ -44,85 +57,154 @@ class NativeHash(CompilableBuiltin):
         return super().convert_call(context, instance, args, kwargs)
 
 
-class CPlusPlusStyleMod(CompilableBuiltin):
+class TableProbeStart(CompilableBuiltin):
+    """Compute the table position where the probe sequence for a hash starts.
+
+    This has to match 'hash_table_layout::probeStart' exactly, and so works on
+    the unsigned 64 bit product of the hash and FIBONACCI_MULTIPLIER, rotated
+    by 32 bits.
+    """
     def __eq__(self, other):
-        return isinstance(other, CPlusPlusStyleMod)
+        return isinstance(other, TableProbeStart)
 
     def __hash__(self):
-        return hash("CPlusPlusStyleMod")
+        return hash("TableProbeStart")
 
     def convert_call(self, context, instance, args, kwargs):
         if len(args) == 2 and args[0].expr_type.typeRepresentation == Int32 and args[1].expr_type.typeRepresentation == int:
-            return context.pushPod(
-                int,
-                args[0].nonref_expr.cast(native_ast.Int64).mod(args[1].nonref_expr)
+            product = context.pushPod(
+                UInt64,
+                args[0].nonref_expr.cast(native_ast.UInt32).cast(native_ast.UInt64)
+                .mul(native_ast.const_uint64_expr(FIBONACCI_MULTIPLIER))
             )
 
-        if len(args) == 2 and args[0].expr_type.typeRepresentation == int and args[1].expr_type.typeRepresentation == int:
             return context.pushPod(
                 int,
-                args[0].nonref_expr.mod(args[1].nonref_expr)
+                product.nonref_expr.rshift(native_ast.const_uint64_expr(32))
+                .bitor(product.nonref_expr.lshift(native_ast.const_uint64_expr(32)))
+                .cast(native_ast.Int64)
+                .bitand(args[1].nonref_expr)
             )
 
         return super().convert_call(context, instance, args, kwargs)
 
 
+class Prefetch(CompilableBuiltin):
+    """Hint to the processor that we're about to read what a pointer points to.
+
+    Prefetching never faults, so it's fine to prefetch memory that we may not
+    end up reading.
+    """
+    def __eq__(self, other):
+        return isinstance(other, Prefetch)
+
+    def __hash__(self):
+        return hash("Prefetch")
+
+    def convert_call(self, context, instance, args, kwargs):
+        if len(args) == 1 and getattr(args[0].expr_type.typeRepresentation, '__typed_python_category__', None) == 'PointerTo':
+            context.pushEffect(
+                runtime_functions.prefetch.call(
+                    args[0].nonref_expr.cast(native_ast.UInt8Ptr),
+                    native_ast.const_int32_expr(0),
+                    native_ast.const_int32_expr(3),
+                    native_ast.const_int32_expr(1)
+                )
+            )
+            return context.pushVoid()
+
+        return super().convert_call(context, instance, args, kwargs)
+
+
+def table_set_ctrl(ctrl, tableSize, offset, value):
+    ctrl[offset] = UInt8(value)
+
+    # keep the cloned tail of the control bytes in sync
+    if offset < GROUP_WIDTH - 1:
+        ctrl[tableSize + offset] = UInt8(value)
+
+
 def table_add_slot(instance, itemHash, slot):
-    if (instance._hash_table_count * 2 + 1 > instance._hash_table_size or
-            instance._hash_table_empty_slots < (instance._hash_table_size >> 2) + 1):
+    if instance._hash_table_empty_slots < (instance._hash_table_size >> 2) + 1:
         instance._resizeTableUnsafe()
 
-    if itemHash < 0:
-        itemHash = -itemHash
-
-    offset = CPlusPlusStyleMod()(itemHash, instance._hash_table_size)
+    ctrl = instance._hash_table_ctrl
+    tableSize = instance._hash_table_size
+    mask = tableSize - 1
+    offset = TableProbeStart()(itemHash, mask)
 
     while True:
-        if instance._hash_table_slots[offset] == EMPTY or instance._hash_table_slots[offset] == DELETED:
-            if instance._hash_table_slots[offset] == EMPTY:
+        c = int(ctrl[offset])
+
+        # EMPTY and DELETED both have the high bit set
+        if c >= CTRL_EMPTY:
+            if c == CTRL_EMPTY:
                 instance._hash_table_empty_slots -= 1
 
+            table_set_ctrl(ctrl, tableSize, offset, int(itemHash) & 0x7F)
             instance._hash_table_slots[offset] = slot
-            instance._hash_table_hashes[offset] = itemHash
+            instance._items_hashes[slot] = itemHash
             instance._items_populated[slot] = 1
             instance._hash_table_count += 1
 
             return
 
-        offset += 1
-
-        if offset >= instance._hash_table_size:
-            offset = 0
+        offset = (offset + 1) & mask
 
 
-def table_slot_for_key(instance, itemHash, item):
+def table_offset_for_key(instance, itemHash, item):
+    """Return the table position holding 'item', or -1."""
     slots = instance._hash_table_slots
 
     if not slots:
         return -1
 
-    if itemHash < 0:
-        itemHash = -itemHash
+    ctrl = instance._hash_table_ctrl
+    mask = instance._hash_table_size - 1
+    tag = int(itemHash) & 0x7F
+    offset = TableProbeStart()(itemHash, mask)
+
+    while True:
+        c = int(ctrl[offset])
+
+        if c == tag:
+            if instance.getKeyByIndexUnsafe(int(slots[offset])) == item:
+                return offset
+        elif c == CTRL_EMPTY:
+            return -1
+
+        offset = (offset + 1) & mask
+
+    # not necessary, but currently we don't realize that the while loop
+    # never exits, and so we think there's a possibility we return None
+    return 0
+
 
-    modFun = CPlusPlusStyleMod()
+def table_slot_for_key(instance, itemHash, item):
+    slots = instance._hash_table_slots
 
-    offset = modFun(itemHash, instance._hash_table_size)
+    if not slots:
+        return -1
+
+    ctrl = instance._hash_table_ctrl
+    mask = instance._hash_table_size - 1
+    tag = int(itemHash) & 0x7F
+    offset = TableProbeStart()(itemHash, mask)
 
     assert instance._hash_table_empty_slots > 0
 
     while True:
-        slotIndex = int((slots + offset).get())
+        c = int(ctrl[offset])
 
-        if slotIndex == EMPTY:
-            return -1
+        if c == tag:
+            slotIndex = int(slots[offset])
 
-        if slotIndex != DELETED and (instance._hash_table_hashes + offset).get() == itemHash:
             if instance.getKeyByIndexUnsafe(slotIndex) == item:
                 return slotIndex
+        elif c == CTRL_EMPTY:
+            return -1
 
-        offset += 1
-        if offset >= instance._hash_table_size:
-            offset = 0
+        offset = (offset + 1) & mask
 
     # not necessary, but currently we don't realize that the while loop
     # never exits, and so we think there's a possibility we return None
@@ -140,52 +222,49 @@ def table_next_slot(instance, slotIx):
     return -1
 
 
+def table_erase_offset(instance, offset):
+    ctrl = instance._hash_table_ctrl
+    tableSize = instance._hash_table_size
+    mask = tableSize - 1
+
+    if int(ctrl[(offset + 1) & mask]) != CTRL_EMPTY:
+        table_set_ctrl(ctrl, tableSize, offset, CTRL_DELETED)
+        return
+
+    # no probe sequence continues past an EMPTY position, so this one and
+    # any tombstones directly before it can become EMPTY as well.
+    while True:
+        table_set_ctrl(ctrl, tableSize, offset, CTRL_EMPTY)
+        instance._hash_table_empty_slots += 1
+
+        offset = (offset - 1) & mask
+
+        if int(ctrl[offset]) != CTRL_DELETED:
+            return
+
+
 def table_remove_key(instance, item, itemHash, raises):
     if instance._items_reserved > (instance._hash_table_count + 2) * 4:
         instance._compressItemTableUnsafe()
 
-    if instance._hash_table_count < instance._hash_table_size >> 3:
+    if instance._hash_table_size > MIN_TABLE_SIZE and instance._hash_table_count < instance._hash_table_size >> 3:
         instance._resizeTableUnsafe()
 
-    slots = instance._hash_table_slots
+    offset = table_offset_for_key(instance, itemHash, item)
 
-    if not slots:
+    if offset == -1:
         if raises:
             raise KeyError(item)
         else:
             return 0
 
-    if itemHash < 0:
-        itemHash = -itemHash
-
-    offset = CPlusPlusStyleMod()(itemHash, instance._hash_table_size)
-
-    while True:
-        slotIndex = int((slots + offset).get())
-
-        if slotIndex == EMPTY:
-            if raises:
-                raise KeyError(item)
-            else:
-                return 0
+    slotIndex = int(instance._hash_table_slots[offset])
 
-        if slotIndex != DELETED and (instance._hash_table_hashes + offset).get() == itemHash:
-            if instance.getKeyByIndexUnsafe(slotIndex) == item:
-                instance._hash_table_hashes[offset] = -1
-                instance._hash_table_slots[offset] = DELETED
-                instance._hash_table_count -= 1
-                instance._items_populated[slotIndex] = 0
+    table_erase_offset(instance, offset)
+    instance._hash_table_count -= 1
+    instance._items_populated[slotIndex] = 0
 
-                instance.deleteItemByIndexUnsafe(slotIndex)
-                return
-
-        offset += 1
-        if offset >= instance._hash_table_size:
-            offset = 0
-
-    # not necessary, but currently we don't currently realize that the while loop
-    # never exits, and so we think there's a possibility we return None
-    return 0
+    instance.deleteItemByIndexUnsafe(slotIndex)
 
 
 def table_clear(instance):
@@ -198,15 +277,53 @@ def table_clear(instance):
 
         slotIx += 1
 
-    for i in range(instance._hash_table_size):
-        instance._hash_table_hashes[i] = EMPTY
-        instance._hash_table_slots[i] = -1
+    if instance._hash_table_ctrl:
+        for i in range(instance._hash_table_size + GROUP_WIDTH - 1):
+            instance._hash_table_ctrl[i] = CTRL_EMPTY
 
     instance._hash_table_count = 0
     instance._hash_table_empty_slots = instance._hash_table_size
     instance._top_item_slot = 0
 
 
+def table_hash_and_prefetch(instance, keys, start, count, hashes):
+    """Hash 'count' keys starting at 'start' into 'hashes', prefetching the
+    table positions where their probe sequences start."""
+    ctrl = instance._hash_table_ctrl
+    slots = instance._hash_table_slots
+    mask = instance._hash_table_size - 1
+
+    for i in range(count):
+        itemHash = NativeHash()(keys[start + i])
+        hashes[i] = itemHash
+
+        if slots:
+            offset = TableProbeStart()(itemHash, mask)
+            Prefetch()(ctrl + offset)
+            Prefetch()(slots + offset)
+
+
+def table_contains_many(instance, keys):
+    result = ListOf(bool)()
+    result.reserve(len(keys))
+
+    hashes = ListOf(Int32)()
+    hashes.resize(BULK_BATCH_SIZE)
+
+    start = 0
+    while start < len(keys):
+        count = min(BULK_BATCH_SIZE, len(keys) - start)
+
+        table_hash_and_prefetch(instance, keys, start, count, hashes.pointerUnsafe(0))
+
+        for i in range(count):
+            result.append(table_slot_for_key(instance, hashes[i], keys[start + i]) != -1)
+
+        start += count
+
+    return result
+
+
 def table_contains(instance, item):
     itemHash = NativeHash()(item)
 
@@ -260,6 +377,77 @@ def dict_setitem(instance, key, value):
         instance.assignValueByIndexUnsafe(slot, value)
 
 
+def dict_get_many(instance, keys, resultType):
+    result = resultType()
+    result.reserve(len(keys))
+
+    hashes = ListOf(Int32)()
+    hashes.resize(BULK_BATCH_SIZE)
+
+    start = 0
+    while start < len(keys):
+        count = min(BULK_BATCH_SIZE, len(keys) - start)
+
+        table_hash_and_prefetch(instance, keys, start, count, hashes.pointerUnsafe(0))
+
+        for i in range(count):
+            slot = table_slot_for_key(instance, hashes[i], keys[start + i])
+
+            if slot == -1:
+                result.append(None)
+            else:
+                result.append(instance.getValueByIndexUnsafe(slot))
+
+        start += count
+
+    return result
+
+
+def dict_set_many(instance, keys, values):
+    if len(keys) != len(values):
+        raise ValueError("setMany needs the same number of keys and values")
+
+    # an empty dict ends up with at least as many items as we have keys, so
+    # we can size it once up front. Otherwise some of the keys may already be
+    # present, and we only make room a batch at a time.
+    if not len(instance):
+        instance._reserveUnsafe(len(keys))
+
+    hashes = ListOf(Int32)()
+    hashes.resize(BULK_BATCH_SIZE)
+
+    start = 0
+    while start < len(keys):
+        count = min(BULK_BATCH_SIZE, len(keys) - start)
+
+        # this keeps the table from being rebuilt halfway through the batch,
+        # which would throw away what we prefetched.
+        instance._reserveUnsafe(count)
+
+        table_hash_and_prefetch(instance, keys, start, count, hashes.pointerUnsafe(0))
+
+        for i in range(count):
+            slot = table_slot_for_key(instance, hashes[i], keys[start + i])
+
+            if slot == -1:
+                newSlot = instance._allocateNewSlotUnsafe()
+                table_add_slot(instance, hashes[i], newSlot)
+                instance.initializeKeyByIndexUnsafe(newSlot, keys[start + i])
+                instance.initializeValueByIndexUnsafe(newSlot, values[start + i])
+            else:
+                instance.assignValueByIndexUnsafe(slot, values[start + i])
+
+        start += count
+
+
+def dict_from_columns(dictType, keys, values):
+    result = dictType()
+
+    dict_set_many(result, keys, values)
+
+    return result
+
+
 # Operations specific to sets that manipulate the fields directly:
 
 
@@ -274,6 +462,30 @@ def set_add(instance, key):
         instance.initializeKeyByIndexUnsafe(newSlot, key)
 
 
+def set_update_from(instance, keys):
+    if not len(instance):
+        instance._reserveUnsafe(len(keys))
+
+    hashes = ListOf(Int32)()
+    hashes.resize(BULK_BATCH_SIZE)
+
+    start = 0
+    while start < len(keys):
+        count = min(BULK_BATCH_SIZE, len(keys) - start)
+
+        instance._reserveUnsafe(count)
+
+        table_hash_and_prefetch(instance, keys, start, count, hashes.pointerUnsafe(0))
+
+        for i in range(count):
+            if table_slot_for_key(instance, hashes[i], keys[start + i]) == -1:
+                newSlot = instance._allocateNewSlotUnsafe()
+                table_add_slot(instance, hashes[i], newSlot)
+                instance.initializeKeyByIndexUnsafe(newSlot, keys[start + i])
+
+        start += count
+
+
 def set_add_or_remove(instance, key):
     itemHash = NativeHash()(key)
 
@@ -18,7 +18,7 @@ from typed_python.compiler.type_wrappers.refcounted_wrapper import RefcountedWra
 from typed_python.compiler.type_wrappers.bound_method_wrapper import BoundMethodWrapper
 from typed_python.compiler.conversion_level import ConversionLevel
 from typed_python.compiler.typed_expression import TypedExpression
-from typed_python import OneOf
+from typed_python import OneOf, Arena
 import typed_python.compiler.native_ast as native_ast
 from typed_python.compiler.native_ast import VoidPtr, UInt64
 import typed_python
@@ -93,6 +93,9 @@ class PythonObjectOfTypeWrapper(RefcountedWrapper):
         if self.typeRepresentation in (_thread.LockType, _thread.RLock) and attr in ('acquire', 'release', "__enter__", "__exit__"):
             return instance.changeType(BoundMethodWrapper.Make(self, attr))
 
+        if self.typeRepresentation is Arena and attr in ("__enter__", "__exit__"):
+            return instance.changeType(BoundMethodWrapper.Make(self, attr))
+
         assert isinstance(attr, str)
 
         return context.push(
@@ -403,6 +406,13 @@ class PythonObjectOfTypeWrapper(RefcountedWrapper):
 
             return context.pushPod(bool, nativeFun.call(instance.nonref_expr.cast(VoidPtr)))
 
+        if self.typeRepresentation is Arena and methodname == "__enter__" and len(args) == 0:
+            context.pushEffect(runtime_functions.pyobj_arena_enter.call(instance.nonref_expr.cast(VoidPtr)))
+            return instance
+
+        if self.typeRepresentation is Arena and methodname == "__exit__" and len(args) == 3:
+            return context.pushPod(bool, runtime_functions.pyobj_arena_exit.call(instance.nonref_expr.cast(VoidPtr)))
+
         method = self.convert_attribute(context, instance, methodname)
         if method is None:
             return None
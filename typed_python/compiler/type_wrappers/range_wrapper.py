@@ -46,6 +46,9 @@ class RangeCls(NamedTuple(start=int, stop=int, step=int)):
 
         return f"range({self.start}, {self.stop}, {self.step})"
 
+    def __len__(self):
+        return max(0, self.__typed_python_int_iter_size__())
+
     def __iter__(self):
         return RangeIterator(start=self.start - self.step, stop=self.stop, step=self.step)
 
@@ -120,6 +120,9 @@ realloc = externalCallTarget("tp_realloc", UInt8Ptr, UInt8Ptr, Int64, Int64)
 memcpy = externalCallTarget("memcpy", UInt8Ptr, UInt8Ptr, UInt8Ptr, Int64)
 memmove = externalCallTarget("memmove", UInt8Ptr, UInt8Ptr, UInt8Ptr, Int64)
 
+# address, read (0) or write (1), temporal locality (0 to 3), data (1) or instruction (0) cache
+prefetch = externalCallTarget("llvm.prefetch", Void, UInt8Ptr, Int32, Int32, Int32, intrinsic=True)
+
 acos64 = externalCallTarget("np_acos_float64", Float64, Float64)
 
 acosh64 = externalCallTarget("np_acosh_float64", Float64, Float64)
@@ -554,6 +557,24 @@ string_from_utf8_and_len = externalCallTarget(
     UInt8Ptr, Int64
 )
 
+string_utf8_bytecount = externalCallTarget(
+    "nativepython_runtime_string_utf8_bytecount",
+    Int64,
+    Void.pointer()
+)
+
+string_encode_utf8 = externalCallTarget(
+    "nativepython_runtime_string_encode_utf8",
+    Void,
+    Void.pointer(), UInt8Ptr
+)
+
+string_decode_utf8 = externalCallTarget(
+    "nativepython_runtime_string_decode_utf8",
+    Void.pointer(),
+    UInt8Ptr, Int64
+)
+
 string_strip = externalCallTarget(
     "nativepython_runtime_string_strip",
     Void.pointer(),
@@ -928,7 +949,7 @@ table_create = externalCallTarget(
 
 table_allocate_new_slot = externalCallTarget(
     "nativepython_tableAllocateNewSlot",
-    Int32,
+    Int64,
     Void.pointer(), Int64
 )
 
@@ -951,6 +972,24 @@ table_compress = externalCallTarget(
     Void.pointer(), Int64
 )
 
+table_reserve = externalCallTarget(
+    "nativepython_tableReserve",
+    Void,
+    Void.pointer(), Int64, Int64
+)
+
+const_dict_kv_pair_ptr = externalCallTarget(
+    "nativepython_constDictKvPairPtr",
+    UInt8Ptr,
+    Void.pointer(), Void.pointer(), Int64
+)
+
+const_dict_leaf_for_index = externalCallTarget(
+    "nativepython_constDictLeafForIndex",
+    UInt8Ptr,
+    Void.pointer(), Void.pointer(), Int64, Int64.pointer(), Int64.pointer()
+)
+
 hash_float32 = externalCallTarget(
     "nativepython_hash_float32",
     Int32,
@@ -987,6 +1026,18 @@ hash_bytes = externalCallTarget(
     Void.pointer()
 )
 
+hash64_string = externalCallTarget(
+    "nativepython_hash64_string",
+    UInt64,
+    Void.pointer()
+)
+
+hash64_bytes = externalCallTarget(
+    "nativepython_hash64_bytes",
+    UInt64,
+    Void.pointer()
+)
+
 hash_alternative = externalCallTarget(
     "nativepython_hash_alternative",
     Int32,
@@ -1069,6 +1120,20 @@ pyobj_locktype_lock = externalCallTarget(
     Void.pointer()
 )
 
+pyobj_arena_enter = externalCallTarget(
+    "np_pyobj_arena_enter",
+    Void,
+    Void.pointer(),
+    canThrow=True
+)
+
+pyobj_arena_exit = externalCallTarget(
+    "np_pyobj_arena_exit",
+    Bool,
+    Void.pointer(),
+    canThrow=True
+)
+
 pyobj_iter_next = externalCallTarget(
     "np_pyobj_iter_next",
     Void.pointer(),
@@ -1125,6 +1190,37 @@ list_or_tuple_of_from_bytes = externalCallTarget(
     Void.pointer()   # and a Type*
 )
 
+list_or_tuple_of_free = externalCallTarget(
+    "tp_list_or_tuple_of_free",
+    Void,
+    Void.pointer()  # accepts a TupleOrListOfType::layout_type*
+)
+
+list_or_tuple_of_reserve = externalCallTarget(
+    "tp_list_or_tuple_of_reserve",
+    Void,
+    Void.pointer(),  # accepts a TupleOrListOfType::layout_type*
+    Int64,  # the bytecount of an element
+    Int64  # and the number of elements to make room for
+)
+
+serialize_no_gil = externalCallTarget(
+    "np_serialize_no_gil",
+    Void.pointer(),  # returns a BytesType::layout*
+    Void.pointer(),  # accepts an instance_ptr to the value
+    Void.pointer(),  # and a Type*
+    canThrow=True
+)
+
+deserialize_no_gil = externalCallTarget(
+    "np_deserialize_no_gil",
+    Void,
+    Void.pointer(),  # accepts a BytesType::layout*
+    Void.pointer(),  # a Type*
+    Void.pointer(),  # and an uninitialized instance_ptr to deserialize into
+    canThrow=True
+)
+
 str_to_int64 = externalCallTarget(
     "np_str_to_int64",
     Int64,
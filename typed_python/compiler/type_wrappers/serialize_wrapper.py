@@ -0,0 +1,143 @@
+#   Copyright 2017-2020 typed_python Authors
+#
+#   Licensed under the Apache License, Version 2.0 (the "License");
+#   you may not use this file except in compliance with the License.
+#   You may obtain a copy of the License at
+#
+#       http://www.apache.org/licenses/LICENSE-2.0
+#
+#   Unless required by applicable law or agreed to in writing, software
+#   distributed under the License is distributed on an "AS IS" BASIS,
+#   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#   See the License for the specific language governing permissions and
+#   limitations under the License.
+
+from typed_python import serialize, deserialize
+from typed_python.compiler.conversion_level import ConversionLevel
+from typed_python.compiler.type_wrappers.wrapper import Wrapper
+from typed_python.compiler.type_wrappers.python_type_object_wrapper import PythonTypeObjectWrapper
+import typed_python.compiler.type_wrappers.runtime_functions as runtime_functions
+import typed_python.compiler.native_ast as native_ast
+
+# type categories whose values we can serialize without touching the interpreter,
+# as long as the types they contain can be too.
+_PYTHON_FREE_CATEGORIES = {
+    "None", "Bool", "Int8", "Int16", "Int32", "Int64", "UInt8", "UInt16", "UInt32", "UInt64",
+    "Float32", "Float64", "String", "Bytes", "OneOf", "TupleOf", "ListOf", "NamedTuple",
+    "Tuple", "Dict", "ConstDict", "Set", "Alternative", "ConcreteAlternative",
+}
+
+
+def _containedTypes(T):
+    category = T.__typed_python_category__
+
+    if category in ("TupleOf", "ListOf", "Set"):
+        return [T.ElementType]
+    if category in ("Dict", "ConstDict"):
+        return [T.KeyType, T.ValueType]
+    if category == "OneOf":
+        return T.Types
+    if category in ("NamedTuple", "Tuple"):
+        return T.ElementTypes
+    if category == "Alternative":
+        return [a.ElementType for a in T.__typed_python_alternatives__]
+    if category == "ConcreteAlternative":
+        return [T.Alternative]
+    return []
+
+
+def serializesWithoutPython(T):
+    """Can we serialize and deserialize every value of type T without the interpreter?
+
+    True if no value of type T can hold a python object (or anything else,
+    like a Class instance, that needs a SerializationContext to serialize).
+    """
+    seen = set()
+    toCheck = [T]
+
+    while toCheck:
+        T = toCheck.pop()
+
+        if T in seen:
+            continue
+        seen.add(T)
+
+        if T is type(None):  # noqa
+            continue
+
+        if T in (bool, int, float, str, bytes):
+            continue
+
+        if getattr(T, '__typed_python_category__', None) not in _PYTHON_FREE_CATEGORIES:
+            return False
+
+        toCheck.extend(_containedTypes(T))
+
+    return True
+
+
+class SerializeWrapper(Wrapper):
+    """Compiles 'serialize(T, value)' and 'deserialize(T, data)'.
+
+    When T is known at compile time and can't hold python objects, we call into
+    the runtime directly, which never needs the GIL. Otherwise we call the
+    interpreter's version of the function.
+    """
+    is_pod = True
+    is_empty = False
+    is_pass_by_ref = False
+
+    def __init__(self, f):
+        assert f in (serialize, deserialize)
+        super().__init__(f)
+
+    def getNativeLayoutType(self):
+        return native_ast.Type.Void()
+
+    def convert_call(self, context, expr, args, kwargs):
+        if (
+            len(args) == 2
+            and not kwargs
+            and isinstance(args[0].expr_type, PythonTypeObjectWrapper)
+            and serializesWithoutPython(args[0].expr_type.typeRepresentation.Value)
+        ):
+            T = args[0].expr_type.typeRepresentation.Value
+
+            if self.typeRepresentation is serialize:
+                return self.convert_serialize(context, T, args[1])
+            else:
+                return self.convert_deserialize(context, T, args[1])
+
+        return context.constantPyObject(self.typeRepresentation).convert_call(args, kwargs)
+
+    def convert_serialize(self, context, T, value):
+        value = value.convert_to_type(T, ConversionLevel.New)
+        if value is None:
+            return None
+
+        if not value.isReference:
+            value = context.pushMove(value)
+
+        return context.push(
+            bytes,
+            lambda bytesRef: bytesRef.expr.store(
+                runtime_functions.serialize_no_gil.call(
+                    value.expr.cast(native_ast.VoidPtr),
+                    context.getTypePointer(T).cast(native_ast.VoidPtr)
+                ).cast(bytesRef.expr_type.layoutType)
+            )
+        )
+
+    def convert_deserialize(self, context, T, data):
+        data = data.convert_to_type(bytes, ConversionLevel.Signature)
+        if data is None:
+            return None
+
+        return context.push(
+            T,
+            lambda out: runtime_functions.deserialize_no_gil.call(
+                data.nonref_expr.cast(native_ast.VoidPtr),
+                context.getTypePointer(T).cast(native_ast.VoidPtr),
+                out.expr.cast(native_ast.VoidPtr)
+            )
+        )
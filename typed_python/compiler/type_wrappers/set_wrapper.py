@@ -19,7 +19,8 @@ from typed_python.compiler.type_wrappers.bound_method_wrapper import BoundMethod
 from typed_python.compiler.type_wrappers.wrapper import Wrapper
 from typed_python.compiler.conversion_level import ConversionLevel
 from typed_python.compiler.type_wrappers.native_hash import table_next_slot, table_clear, \
-    table_contains, set_add, set_add_or_remove, set_remove, set_discard, set_pop
+    table_contains, table_contains_many, set_add, set_add_or_remove, set_remove, set_discard, set_pop, \
+    set_update_from
 from typed_python import PointerTo, Int32, UInt8, ListOf, TupleOf, Set, Tuple, NamedTuple, Dict, ConstDict
 
 import typed_python.compiler.native_ast as native_ast
@@ -306,12 +307,12 @@ class SetWrapperBase(RefcountedWrapper):
             ('items_populated', native_ast.UInt8Ptr),
             ('items_reserved', native_ast.Int64),
             ('top_item_slot', native_ast.Int64),
-            ('hash_table_slots', native_ast.Int32Ptr),
-            ('hash_table_hashes', native_ast.Int32Ptr),
+            ('hash_table_slots', native_ast.Int64Ptr),
+            ('hash_table_ctrl', native_ast.UInt8Ptr),
             ('hash_table_size', native_ast.Int64),
             ('hash_table_count', native_ast.Int64),
             ('hash_table_empty_slots', native_ast.Int64),
-            ('reserved', native_ast.Int64)  # not used
+            ('items_hashes', native_ast.Int32Ptr)
         ), name="SetWrapper").pointer()
 
     def on_refcount_zero(self, context, instance):
@@ -351,8 +352,8 @@ class SetWrapper(SetWrapperBase):
         if attr in (
                 "getKeyByIndexUnsafe", "deleteItemByIndexUnsafe",
                 "initializeKeyByIndexUnsafe", "_allocateNewSlotUnsafe", "_resizeTableUnsafe",
-                "_compressItemTableUnsafe",
-                "add", "remove", "discard", "pop", "clear", "copy", "log",
+                "_compressItemTableUnsafe", "_reserveUnsafe",
+                "add", "remove", "discard", "pop", "clear", "copy", "log", "updateFrom", "containsMany",
                 "union", "intersection", "difference", "symmetric_difference",
                 "update", "intersection_update", "difference_update", "symmetric_difference_update",
                 "issubset", "issuperset", "isdisjoint"):
@@ -384,13 +385,13 @@ class SetWrapper(SetWrapperBase):
 
         if attr == '_hash_table_slots':
             return context.pushPod(
-                PointerTo(Int32),
+                PointerTo(int),
                 expr.nonref_expr.ElementPtrIntegers(0, 5).load()
             )
 
-        if attr == '_hash_table_hashes':
+        if attr == '_hash_table_ctrl':
             return context.pushPod(
-                PointerTo(Int32),
+                PointerTo(UInt8),
                 expr.nonref_expr.ElementPtrIntegers(0, 6).load()
             )
 
@@ -412,6 +413,12 @@ class SetWrapper(SetWrapperBase):
                 expr.nonref_expr.ElementPtrIntegers(0, 9).load()
             )
 
+        if attr == '_items_hashes':
+            return context.pushPod(
+                PointerTo(Int32),
+                expr.nonref_expr.ElementPtrIntegers(0, 10).load()
+            )
+
         return super().convert_attribute(context, expr, attr)
 
     def convert_set_attribute(self, context, instance, attr, expr):
@@ -553,7 +560,7 @@ class SetWrapper(SetWrapperBase):
 
             if methodname == "_allocateNewSlotUnsafe":
                 return context.pushPod(
-                    Int32,
+                    int,
                     runtime_functions.table_allocate_new_slot.call(
                         instance.nonref_expr.cast(native_ast.VoidPtr),
                         context.constant(self.keyBytecount)
@@ -561,6 +568,30 @@ class SetWrapper(SetWrapperBase):
                 )
 
         if len(args) == 1:
+            if methodname in ("updateFrom", "containsMany"):
+                keys = args[0].convert_to_type(ListOf(self.setType.ElementType), ConversionLevel.ImplicitContainers)
+                if keys is None:
+                    return None
+
+                if methodname == "containsMany":
+                    return context.call_py_function(table_contains_many, (instance, keys), {})
+
+                return context.call_py_function(set_update_from, (instance, keys), {})
+
+            if methodname == "_reserveUnsafe":
+                count = args[0].toInt64()
+                if count is None:
+                    return None
+
+                context.pushEffect(
+                    runtime_functions.table_reserve.call(
+                        instance.nonref_expr.cast(native_ast.VoidPtr),
+                        context.constant(self.keyBytecount),
+                        count.nonref_expr
+                    )
+                )
+                return context.pushVoid()
+
             if methodname == "isdisjoint":
                 return context.call_py_function(set_disjoint, (instance, args[0]), {})
             if methodname == "issubset":
@@ -705,6 +736,7 @@ class SetWrapper(SetWrapperBase):
             runtime_functions.free.call(inst.nonref_expr.ElementPtrIntegers(0, 2).load().cast(native_ast.UInt8Ptr)) >>
             runtime_functions.free.call(inst.nonref_expr.ElementPtrIntegers(0, 5).load().cast(native_ast.UInt8Ptr)) >>
             runtime_functions.free.call(inst.nonref_expr.ElementPtrIntegers(0, 6).load().cast(native_ast.UInt8Ptr)) >>
+            runtime_functions.free.call(inst.nonref_expr.ElementPtrIntegers(0, 10).load().cast(native_ast.UInt8Ptr)) >>
             runtime_functions.free.call(inst.nonref_expr.cast(native_ast.UInt8Ptr))
         )
 
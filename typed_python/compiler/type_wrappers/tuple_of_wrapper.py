@@ -34,6 +34,10 @@ import typed_python.compiler
 
 typeWrapper = lambda t: typed_python.compiler.python_object_representation.typedPythonTypeToTypeWrapper(t)
 
+# the size of a TupleOrListOfType::layout. Containers created with a known size
+# keep their elements inline, directly after the layout.
+LAYOUT_BYTECOUNT = 40
+
 
 def tuple_or_list_contains(tup, elt):
     for x in tup:
@@ -157,21 +161,22 @@ class PreReservedTupleOrList(CompilableBuiltin):
         return super().convert_call(context, instance, args, kwargs)
 
     def initializeEmptyListExpr(self, out, length):
+        # the elements live in the same allocation, right after the layout
         return (
             out.expr.store(
-                runtime_functions.malloc.call(native_ast.const_int_expr(28))
-                    .cast(self.tupleTypeWrapper.getNativeLayoutType())
-            ) >>
-            out.expr.load().ElementPtrIntegers(0, 4).store(
                 runtime_functions.malloc.call(
                     length.nonref_expr
                     .mul(native_ast.const_int_expr(self.underlyingWrapperType.getBytecount()))
-                ).cast(native_ast.UInt8Ptr)
+                    .add(native_ast.const_int_expr(LAYOUT_BYTECOUNT))
+                ).cast(self.tupleTypeWrapper.getNativeLayoutType())
+            ) >>
+            out.expr.load().ElementPtrIntegers(0, 4).store(
+                out.expr.load().cast(native_ast.UInt8Ptr).ElementPtrIntegers(LAYOUT_BYTECOUNT)
             ) >>
             out.expr.load().ElementPtrIntegers(0, 0).store(native_ast.const_int_expr(1)) >>
             out.expr.load().ElementPtrIntegers(0, 1).store(native_ast.const_int32_expr(-1)) >>
-            out.expr.load().ElementPtrIntegers(0, 2).store(native_ast.const_int32_expr(0)) >>
-            out.expr.load().ElementPtrIntegers(0, 3).store(length.nonref_expr.cast(native_ast.Int32))
+            out.expr.load().ElementPtrIntegers(0, 2).store(native_ast.const_int_expr(0)) >>
+            out.expr.load().ElementPtrIntegers(0, 3).store(length.nonref_expr.cast(native_ast.Int64))
         )
 
 
@@ -226,8 +231,8 @@ class TupleOrListOfWrapper(RefcountedWrapper):
         self.layoutType = native_ast.Type.Struct(element_types=(
             ('refcount', native_ast.Int64),
             ('hash_cache', native_ast.Int32),
-            ('count', native_ast.Int32),
-            ('reserved', native_ast.Int32),
+            ('count', native_ast.Int64),
+            ('reserved', native_ast.Int64),
             ('data', native_ast.UInt8Ptr)
         ), name='TupleOfLayout' if self.is_tuple else 'ListOfLayout').pointer()
 
@@ -254,10 +259,7 @@ class TupleOrListOfWrapper(RefcountedWrapper):
                 inst.convert_getitem_unsafe(i).convert_destroy()
 
         context.pushEffect(
-            runtime_functions.free.call(inst.nonref_expr.ElementPtrIntegers(0, 4).load())
-        )
-        context.pushEffect(
-            runtime_functions.free.call(inst.nonref_expr.cast(native_ast.UInt8Ptr))
+            runtime_functions.list_or_tuple_of_free.call(inst.nonref_expr.cast(native_ast.VoidPtr))
         )
 
     def convert_bin_op(self, context, left, op, right, inplace):
@@ -442,7 +444,7 @@ class TupleOrListOfWrapper(RefcountedWrapper):
                 context.pushEffect(
                     instance.nonref_expr
                     .ElementPtrIntegers(0, 2)
-                    .store(count.nonref_expr.cast(native_ast.Int32))
+                    .store(count.nonref_expr)
                 )
 
                 return context.pushVoid()
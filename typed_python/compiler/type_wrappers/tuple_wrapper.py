@@ -215,7 +215,7 @@ class TupleWrapper(Wrapper):
         return self.layoutType
 
     def convert_initialize_from_args(self, context, target, *args):
-        assert len(args) == len(self.byteOffsets)
+        assert len(args) == len(self.subTypeWrappers)
         for i in range(len(args)):
             self.refAs(context, target, i).convert_copy_initialize(args[i])
 
@@ -604,6 +604,12 @@ class NamedTupleWrapper(TupleWrapper):
             "'%s' object has no attribute '%s'" % (str(self.typeRepresentation), attribute)
         )
 
+    def convert_len(self, context, instance):
+        if self.isSubclassOfNamedTuple and self.hasMethod("__len__"):
+            return self.convert_method_call(context, instance, "__len__", [], {})
+
+        return super().convert_len(context, instance)
+
     def convert_fastnext(self, context, instance):
         if self.isSubclassOfNamedTuple:
             return self.convert_method_call(context, instance, "__fastnext__", [], {})
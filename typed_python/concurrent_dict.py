@@ -0,0 +1,164 @@
+#   Copyright 2017-2020 typed_python Authors
+#
+#   Licensed under the Apache License, Version 2.0 (the "License");
+#   you may not use this file except in compliance with the License.
+#   You may obtain a copy of the License at
+#
+#       http://www.apache.org/licenses/LICENSE-2.0
+#
+#   Unless required by applicable law or agreed to in writing, software
+#   distributed under the License is distributed on an "AS IS" BASIS,
+#   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#   See the License for the specific language governing permissions and
+#   limitations under the License.
+
+from typed_python import Class, Final, Member, TypeFunction, ListOf, Dict, Entrypoint
+
+from threading import Lock
+
+
+@TypeFunction
+def ConcurrentDict(K, V, shards):
+    """Create a Dict(K, V) that many threads may read and modify at once.
+
+    Keys are spread over 'shards' separate Dict(K, V) instances by their hash,
+    each with its own lock, so threads working on different keys rarely wait
+    on each other. Every method is compiled and holds at most one shard's lock,
+    so compiled code running without the GIL (for instance, inside a 'pmap')
+    can write into the same table from every core.
+
+    The functions passed to 'getOrInsert' and 'updateWith' run while the
+    key's shard is locked, so they must not use the same ConcurrentDict.
+    """
+    if shards < 1:
+        raise ValueError("ConcurrentDict needs at least one shard")
+
+    class ConcurrentDict(Class, Final):
+        KeyType = K
+        ValueType = V
+        ShardCount = shards
+
+        _shards = Member(ListOf(Dict(K, V)))
+        _locks = Member(ListOf(Lock))
+
+        def __init__(self):
+            self._shards = ListOf(Dict(K, V))()
+            self._locks = ListOf(Lock)()
+
+            for _ in range(shards):
+                self._shards.append(Dict(K, V)())
+                self._locks.append(Lock())
+
+        @Entrypoint
+        def _shardFor(self, key: K) -> int:
+            return hash(key) % shards
+
+        @Entrypoint
+        def __getitem__(self, key: K) -> V:
+            shard = self._shardFor(key)
+
+            with self._locks[shard]:
+                return self._shards[shard][key]
+
+        @Entrypoint
+        def __setitem__(self, key: K, value: V) -> None:
+            shard = self._shardFor(key)
+
+            with self._locks[shard]:
+                self._shards[shard][key] = value
+
+        @Entrypoint
+        def __contains__(self, key: K) -> bool:
+            shard = self._shardFor(key)
+
+            with self._locks[shard]:
+                return key in self._shards[shard]
+
+        @Entrypoint
+        def __len__(self) -> int:
+            res = 0
+
+            for shard in range(shards):
+                with self._locks[shard]:
+                    res += len(self._shards[shard])
+
+            return res
+
+        @Entrypoint
+        def get(self, key: K, default: V) -> V:
+            shard = self._shardFor(key)
+
+            with self._locks[shard]:
+                return self._shards[shard].get(key, default)
+
+        @Entrypoint
+        def pop(self, key: K, default: V) -> V:
+            shard = self._shardFor(key)
+
+            with self._locks[shard]:
+                return self._shards[shard].pop(key, default)
+
+        @Entrypoint
+        def setdefault(self, key: K, default: V) -> V:
+            """Atomically insert 'default' if 'key' is missing. Return the value at 'key'."""
+            shard = self._shardFor(key)
+
+            with self._locks[shard]:
+                return self._shards[shard].setdefault(key, default)
+
+        @Entrypoint
+        def getOrInsert(self, key: K, makeValue) -> V:
+            """Return the value at 'key', inserting 'makeValue()' first if it's missing.
+
+            'makeValue' is called at most once, and only by the thread that
+            inserts the key.
+            """
+            shard = self._shardFor(key)
+
+            with self._locks[shard]:
+                d = self._shards[shard]
+
+                if key not in d:
+                    d[key] = makeValue()
+
+                return d[key]
+
+        @Entrypoint
+        def updateWith(self, key: K, f, default: V) -> V:
+            """Atomically replace the value at 'key' with 'f' of its current value.
+
+            If 'key' is missing, 'f' is applied to 'default' instead. Returns
+            the new value.
+            """
+            shard = self._shardFor(key)
+
+            with self._locks[shard]:
+                d = self._shards[shard]
+
+                d[key] = f(d.get(key, default))
+
+                return d[key]
+
+        @Entrypoint
+        def clear(self) -> None:
+            for shard in range(shards):
+                with self._locks[shard]:
+                    self._shards[shard].clear()
+
+        @Entrypoint
+        def toDict(self) -> Dict(K, V):
+            """Return a copy of the contents as a regular Dict(K, V).
+
+            Shards are copied one at a time, so concurrent writers may make
+            this a mix of states rather than a single snapshot.
+            """
+            res = Dict(K, V)()
+
+            for shard in range(shards):
+                with self._locks[shard]:
+                    for k, v in self._shards[shard].items():
+                        res[k] = v
+
+            return res
+
+    return ConcurrentDict
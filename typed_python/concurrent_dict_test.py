@@ -0,0 +1,92 @@
+#   Copyright 2017-2020 typed_python Authors
+#
+#   Licensed under the Apache License, Version 2.0 (the "License");
+#   you may not use this file except in compliance with the License.
+#   You may obtain a copy of the License at
+#
+#       http://www.apache.org/licenses/LICENSE-2.0
+#
+#   Unless required by applicable law or agreed to in writing, software
+#   distributed under the License is distributed on an "AS IS" BASIS,
+#   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#   See the License for the specific language governing permissions and
+#   limitations under the License.
+
+import threading
+
+import pytest
+
+from typed_python import ListOf, Entrypoint, pmap
+from typed_python.concurrent_dict import ConcurrentDict
+
+
+def test_concurrent_dict_basic():
+    d = ConcurrentDict(str, int, 4)()
+
+    d["a"] = 1
+    d["b"] = 2
+
+    assert d["a"] == 1
+    assert "b" in d
+    assert "c" not in d
+    assert len(d) == 2
+    assert d.get("c", -1) == -1
+
+    with pytest.raises(KeyError):
+        d["c"]
+
+    # a failed lookup mustn't leave its shard locked
+    d["c"] = 3
+    assert d["c"] == 3
+
+    assert d.setdefault("a", 10) == 1
+    assert d.setdefault("d", 10) == 10
+    assert d.getOrInsert("e", lambda: 5) == 5
+    assert d.getOrInsert("e", lambda: 6) == 5
+    assert d.updateWith("a", lambda x: x + 100, 0) == 101
+    assert d.updateWith("f", lambda x: x + 100, 0) == 100
+
+    assert d.pop("f", -1) == 100
+    assert d.pop("e", -1) == 5
+    assert d.pop("e", -1) == -1
+
+    assert d.toDict() == {"a": 101, "b": 2, "c": 3, "d": 10}
+
+    d.clear()
+    assert len(d) == 0
+
+
+def test_concurrent_dict_counts_across_threads():
+    CD = ConcurrentDict(int, int, 16)
+    counts = CD()
+
+    @Entrypoint
+    def countInto(counts: CD, keys: ListOf(int)):
+        for k in keys:
+            counts.updateWith(k, lambda x: x + 1, 0)
+
+    keys = ListOf(int)([i % 1000 for i in range(100000)])
+
+    threads = [threading.Thread(target=countInto, args=(counts, keys)) for _ in range(4)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    assert counts.toDict() == {i: 400 for i in range(1000)}
+
+
+def test_concurrent_dict_from_pmap():
+    CD = ConcurrentDict(int, int, 16)
+    sums = CD()
+
+    @Entrypoint
+    def sumByGroup(sums: CD, values: ListOf(int)):
+        def addOne(x: int) -> int:
+            return sums.updateWith(x % 10, lambda s: s + x, 0)
+
+        pmap(values, addOne, int)
+
+    sumByGroup(sums, ListOf(int)(range(10000)))
+
+    assert sums.toDict() == {k: sum(range(k, 10000, 10)) for k in range(10)}
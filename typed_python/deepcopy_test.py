@@ -340,6 +340,34 @@ def test_see_slabs():
         assert slab.allocCount()
 
 
+def test_deepcopy_contiguous_large_graph():
+    initSlabBytes = totalBytesAllocatedInSlabs()
+
+    shared = ListOf(int)(range(100))
+    d = Dict(str, ListOf(int))()
+
+    for i in range(10000):
+        d[str(i)] = shared if i % 2 else ListOf(int)(range(i % 50))
+
+    d2 = deepcopyContiguous(d)
+
+    assert d2 == d
+
+    bytecount, slabs = deepBytecountAndSlabs(d2)
+    assert len(slabs) == 1
+
+    # the slab grows as it fills up, but shouldn't overshoot by much
+    assert slabs[0].bytecount() < 2 * deepBytecountAndSlabs(deepcopy(d))[0] + 4096
+    slabs = None
+
+    # objects referenced twice are still copied once
+    assert refcount(d2["1"]) == 5001
+
+    d2 = None
+
+    assert totalBytesAllocatedInSlabs() == initSlabBytes
+
+
 def test_deepcopy_class_with_dual_references():
     class C(Class):
         x = Member(Dict(int, int))
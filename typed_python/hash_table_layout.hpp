@@ -16,10 +16,29 @@
 
 #pragma once
 
+#include <algorithm>
 #include <cstring>
 
-// for Dict, items would be key, value pairs
-// for Set, items would be keys
+#if defined(__SSE2__)
+#include <emmintrin.h>
+#endif
+
+// An open-addressed hash table of indices into a packed array of items.
+// For Dict, items would be key, value pairs; for Set, items would be keys.
+//
+// The table has a power-of-two size. Each position holds an int64 index into
+// 'items' and a one-byte control code: CTRL_EMPTY, CTRL_DELETED, or the low
+// seven bits of the hash of the item it points to. Lookups scan the control
+// bytes a group of GROUP_WIDTH at a time and only compare keys whose tag
+// matches. The control array carries a copy of its first GROUP_WIDTH - 1 bytes
+// past its end, so a group can be loaded starting at any position without
+// wrapping around.
+//
+// Probing is linear, so compiled code (see native_hash.py) walks exactly the
+// same sequence of positions one control byte at a time.
+//
+// Full item hashes live in 'items_hashes', indexed by item slot rather than by
+// table position, so that the table can be rebuilt without rehashing keys.
 class hash_table_layout {
   public:
     hash_table_layout()
@@ -29,90 +48,224 @@ class hash_table_layout {
         , items_reserved(0)
         , top_item_slot(0)
         , hash_table_slots(nullptr)
-        , hash_table_hashes(nullptr)
+        , hash_table_ctrl(nullptr)
         , hash_table_size(0)
         , hash_table_count(0)
-        , hash_table_empty_slots(0) {}
+        , hash_table_empty_slots(0)
+        , items_hashes(nullptr) {}
 
-    enum { EMPTY = -1, DELETED = -2 };
+    enum { GROUP_WIDTH = 16, MIN_TABLE_SIZE = 16 };
 
-    void setTo(int32_t* ptr, int32_t value, size_t count) {
-        for (size_t k = 0; k < count; k++) {
-            *(ptr++) = value;
+    // how many items 'findMany' hashes and prefetches ahead of probing.
+    // This matches BULK_BATCH_SIZE in native_hash.py.
+    enum { BULK_BATCH_SIZE = 16 };
+
+    // control bytes for unpopulated positions. Both have the high bit set,
+    // and tags of populated positions never do.
+    enum : uint8_t { CTRL_EMPTY = 0x80, CTRL_DELETED = 0xFE };
+
+    static uint8_t hashTag(typed_python_hash_type hash) {
+        return hash & 0x7F;
+    }
+
+    // the table position where the probe sequence for 'hash' starts. We mix
+    // the hash with a multiplicative (Fibonacci) hash, since masking it to a
+    // power of two directly would discard all of its high bits. The product is
+    // rotated so that its best-mixed upper half lands in the low bits, and
+    // tables with more than 2^32 positions still use all of it.
+    size_t probeStart(typed_python_hash_type hash) const {
+        uint64_t product = (uint64_t)(uint32_t)hash * 0x9E3779B97F4A7C15ULL;
+
+        return ((product >> 32) | (product << 32)) & (hash_table_size - 1);
+    }
+
+    // set the control byte at 'offset', keeping the cloned tail in sync.
+    void setCtrl(size_t offset, uint8_t value) {
+        hash_table_ctrl[offset] = value;
+
+        if (offset < GROUP_WIDTH - 1) {
+            hash_table_ctrl[hash_table_size + offset] = value;
         }
     }
 
-    // return the index of the object indexed by 'hash', or -1
-    template <class eq_func>
-    int32_t find(int32_t item_size, typed_python_hash_type hash, const eq_func& compare) {
-        if (!hash_table_slots) {
-            return -1;
+    size_t ctrlBytecount() const {
+        return hash_table_size + GROUP_WIDTH - 1;
+    }
+
+    // bitmasks over the GROUP_WIDTH control bytes starting at 'offset'.
+#if defined(__SSE2__)
+    uint32_t groupMatching(size_t offset, uint8_t value) const {
+        __m128i group = _mm_loadu_si128((const __m128i*)(hash_table_ctrl + offset));
+        return _mm_movemask_epi8(_mm_cmpeq_epi8(group, _mm_set1_epi8((char)value)));
+    }
+
+    uint32_t groupAvailable(size_t offset) const {
+        return _mm_movemask_epi8(_mm_loadu_si128((const __m128i*)(hash_table_ctrl + offset)));
+    }
+#else
+    uint32_t groupMatching(size_t offset, uint8_t value) const {
+        uint32_t res = 0;
+        for (long k = 0; k < GROUP_WIDTH; k++) {
+            if (hash_table_ctrl[offset + k] == value) {
+                res |= 1 << k;
+            }
         }
+        return res;
+    }
 
-        // because typed_python has to use python's mod, which is
-        // different than c++'s mod for negative numbers, we just map
-        // negatives to positives.
-        if (hash < 0) {
-            hash = -hash;
+    uint32_t groupAvailable(size_t offset) const {
+        uint32_t res = 0;
+        for (long k = 0; k < GROUP_WIDTH; k++) {
+            if (hash_table_ctrl[offset + k] & 0x80) {
+                res |= 1 << k;
+            }
         }
+        return res;
+    }
+#endif
 
-        int32_t offset = hash % hash_table_size;
+    // return the table position holding the item indexed by 'hash', or -1
+    template <class eq_func>
+    int64_t findOffset(size_t item_size, typed_python_hash_type hash, const eq_func& compare) const {
+        size_t mask = hash_table_size - 1;
+        size_t offset = probeStart(hash);
+        uint8_t tag = hashTag(hash);
 
         while (true) {
-            // slot is empty
-            int32_t slot = hash_table_slots[offset];
+            uint32_t empties = groupMatching(offset, CTRL_EMPTY);
+            uint32_t matches = groupMatching(offset, tag);
 
-            if (slot == EMPTY) {
-                return -1;
+            if (empties) {
+                // nothing gets placed past the first empty position in its
+                // probe sequence, so later matches belong to other items.
+                matches &= (empties & -empties) - 1;
+            }
+
+            while (matches) {
+                size_t candidate = (offset + __builtin_ctz(matches)) & mask;
+
+                if (compare(items + item_size * hash_table_slots[candidate])) {
+                    return candidate;
+                }
+
+                matches &= matches - 1;
             }
 
-            if (slot != DELETED && hash_table_hashes[offset] == hash
-                && compare(items + item_size * slot)) {
-                return slot;
+            if (empties) {
+                return -1;
             }
 
-            offset = nextOffset(offset);
+            offset = (offset + GROUP_WIDTH) & mask;
         }
     }
 
-    // linear search
-    int32_t nextOffset(int32_t offset) const {
-        offset += 1;
-        if (offset >= hash_table_size) {
-            offset = 0;
+    // return the index of the object indexed by 'hash', or -1
+    template <class eq_func>
+    int64_t find(size_t item_size, typed_python_hash_type hash, const eq_func& compare) {
+        if (!hash_table_slots) {
+            return -1;
         }
-        return offset;
-    }
 
-    // add an item to the hash table
-    void add(typed_python_hash_type hash, int32_t slot) {
-        if (hash_table_count * 2 + 1 > hash_table_size
-            || hash_table_empty_slots < hash_table_size / 4 + 1) {
-            resizeTable();
+        int64_t offset = findOffset(item_size, hash, compare);
+
+        if (offset < 0) {
+            return -1;
         }
 
-        // because typed_python has to use python's mod, which is
-        // different than c++'s mod for negative numbers, we just map
-        // negatives to positives.
-        if (hash < 0) {
-            hash = -hash;
+        return hash_table_slots[offset];
+    }
+
+    // find the slots of 'count' items at once, writing each one's slot (or
+    // -1) into 'outSlots'. We hash a batch of items and prefetch where their
+    // probes start before running any of them, so that the cache misses for
+    // the batch overlap. 'hashAt(k)' hashes item 'k', and 'compareAt(k, ptr)'
+    // checks it against the item at 'ptr'.
+    template <class hash_func, class eq_func>
+    void findMany(size_t item_size, size_t count, const hash_func& hashAt, const eq_func& compareAt, int64_t* outSlots) {
+        typed_python_hash_type hashes[BULK_BATCH_SIZE];
+
+        for (size_t start = 0; start < count; start += BULK_BATCH_SIZE) {
+            size_t batch = std::min<size_t>(BULK_BATCH_SIZE, count - start);
+
+            for (size_t k = 0; k < batch; k++) {
+                hashes[k] = hashAt(start + k);
+
+                if (hash_table_slots) {
+                    size_t offset = probeStart(hashes[k]);
+                    __builtin_prefetch(hash_table_ctrl + offset);
+                    __builtin_prefetch(hash_table_slots + offset);
+                }
+            }
+
+            for (size_t k = 0; k < batch; k++) {
+                outSlots[start + k] = find(item_size, hashes[k], [&](instance_ptr ptr) {
+                    return compareAt(start + k, ptr);
+                });
+            }
         }
+    }
+
+    // put 'slot' in the first unpopulated position of the probe sequence for
+    // 'hash'. Doesn't check whether the table needs to grow.
+    void placeInTable(typed_python_hash_type hash, int64_t slot) {
+        size_t mask = hash_table_size - 1;
+        size_t offset = probeStart(hash);
 
-        int32_t offset = hash % hash_table_size;
         while (true) {
-            if (hash_table_slots[offset] == EMPTY || hash_table_slots[offset] == DELETED) {
-                if (hash_table_slots[offset] == EMPTY) {
+            uint32_t available = groupAvailable(offset);
+
+            if (available) {
+                offset = (offset + __builtin_ctz(available)) & mask;
+
+                if (hash_table_ctrl[offset] == CTRL_EMPTY) {
                     hash_table_empty_slots--;
                 }
 
+                setCtrl(offset, hashTag(hash));
                 hash_table_slots[offset] = slot;
-                hash_table_hashes[offset] = hash;
-                items_populated[slot] = 1;
-                hash_table_count++;
                 return;
             }
 
-            offset = nextOffset(offset);
+            offset = (offset + GROUP_WIDTH) & mask;
+        }
+    }
+
+    // add an item to the hash table
+    void add(typed_python_hash_type hash, int64_t slot) {
+        // keep at least a quarter of the table EMPTY, counting tombstones as
+        // occupied, so that probe sequences stay short and always terminate.
+        if (hash_table_empty_slots < hash_table_size / 4 + 1) {
+            resizeTable();
+        }
+
+        placeInTable(hash, slot);
+
+        items_hashes[slot] = hash;
+        items_populated[slot] = 1;
+        hash_table_count++;
+    }
+
+    // mark the table position at 'offset' as unpopulated.
+    void eraseOffset(size_t offset) {
+        size_t mask = hash_table_size - 1;
+
+        if (hash_table_ctrl[(offset + 1) & mask] != CTRL_EMPTY) {
+            setCtrl(offset, CTRL_DELETED);
+            return;
+        }
+
+        // no probe sequence continues past an EMPTY position, so if the next
+        // position is EMPTY, this one and any tombstones directly before it
+        // can become EMPTY too, rather than accumulating until a resize.
+        while (true) {
+            setCtrl(offset, CTRL_EMPTY);
+            hash_table_empty_slots++;
+
+            offset = (offset - 1) & mask;
+
+            if (hash_table_ctrl[offset] != CTRL_DELETED) {
+                return;
+            }
         }
     }
 
@@ -120,7 +273,7 @@ class hash_table_layout {
     // lived.
     //-1 if not found
     template <class eq_func>
-    int32_t remove(int32_t item_size, typed_python_hash_type hash, const eq_func& compare) {
+    int64_t remove(size_t item_size, typed_python_hash_type hash, const eq_func& compare) {
         if (!hash_table_slots) {
             return -1;
         }
@@ -130,44 +283,29 @@ class hash_table_layout {
         }
 
         // compress the hashtable if it's really empty
-        if (hash_table_count < hash_table_size / 8) {
+        if (hash_table_size > MIN_TABLE_SIZE && hash_table_count < hash_table_size / 8) {
             resizeTable();
         }
 
-        // because typed_python has to use python's mod, which is
-        // different than c++'s mod for negative numbers, we just map
-        // negatives to positives.
-        if (hash < 0) {
-            hash = -hash;
-        }
+        int64_t offset = findOffset(item_size, hash, compare);
 
-        int32_t offset = hash % hash_table_size;
-
-        while (true) {
-            int32_t slot = hash_table_slots[offset];
-
-            if (slot == EMPTY) {
-                // we never found the item
-                return -1;
-            }
-
-            if (slot != DELETED && compare(items + item_size * slot)) {
-                items_populated[slot] = 0;
+        if (offset < 0) {
+            // we never found the item
+            return -1;
+        }
 
-                hash_table_slots[offset] = DELETED;
-                hash_table_hashes[offset] = -1;
-                hash_table_count -= 1;
+        int64_t slot = hash_table_slots[offset];
 
-                return slot;
-            }
+        items_populated[slot] = 0;
+        hash_table_count -= 1;
+        eraseOffset(offset);
 
-            offset = nextOffset(offset);
-        }
+        return slot;
     }
 
     void compressItemTable(size_t item_size) {
-        std::vector<int32_t> newItemPositions;
-        int32_t count_so_far = 0;
+        std::vector<int64_t> newItemPositions;
+        int64_t count_so_far = 0;
 
         for (long k = 0; k < items_reserved; k++) {
             if (items_populated[k]) {
@@ -176,6 +314,7 @@ class hash_table_layout {
                 if (k != count_so_far) {
                     items_populated[count_so_far] = 1;
                     items_populated[k] = 0;
+                    items_hashes[count_so_far] = items_hashes[k];
 
                     memcpy(items + item_size * count_so_far, items + item_size * k,
                            item_size);
@@ -189,93 +328,111 @@ class hash_table_layout {
 
         items_populated = (uint8_t*)tp_realloc(items_populated, items_reserved, count_so_far);
         items = (uint8_t*)tp_realloc(items, items_reserved * item_size, count_so_far * item_size);
+        items_hashes = (typed_python_hash_type*)tp_realloc(
+            items_hashes,
+            items_reserved * sizeof(typed_python_hash_type),
+            count_so_far * sizeof(typed_python_hash_type)
+        );
 
         items_reserved = count_so_far;
         top_item_slot = items_reserved;
 
         for (long k = 0; k < hash_table_size; k++) {
-            if (hash_table_slots[k] >= 0) {
+            if (!(hash_table_ctrl[k] & 0x80)) {
                 if (hash_table_slots[k] >= newItemPositions.size()) {
                     throw std::runtime_error("corrupt slot");
                 }
 
                 hash_table_slots[k] = newItemPositions[hash_table_slots[k]];
 
-                if (hash_table_slots[k] < 0) {
-                    throw std::runtime_error("invalid slot");
+                if (hash_table_slots[k] < 0 || hash_table_slots[k] >= items_reserved) {
+                    throw std::runtime_error("failed during compression");
                 }
             }
         }
+    }
 
-        for (long k = 0; k < hash_table_size; k++) {
-            if (hash_table_slots[k] >= 0) {
-                if (hash_table_slots[k] >= items_reserved) {
-                    throw std::runtime_error("failed during compression");
-                }
-            }
+    int64_t allocateNewSlot(size_t item_size) {
+        if (!items) {
+            reserveItems(item_size, 4);
         }
+
+        while (top_item_slot >= items_reserved) {
+            reserveItems(item_size, items_reserved * 1.25 + 1);
+        }
+
+        return top_item_slot++;
     }
 
-    int32_t allocateNewSlot(size_t item_size) {
+    // grow the item arrays so they hold at least 'count' items.
+    void reserveItems(size_t item_size, size_t count) {
         if (!items) {
-            items_reserved = 4;
+            items_reserved = count;
             items = (uint8_t*)tp_malloc(items_reserved * item_size);
             std::memset(items, 0, items_reserved * item_size);
             items_populated = (uint8_t*)tp_malloc(items_reserved);
             std::memset(items_populated, 0, items_reserved);
+            items_hashes = (typed_python_hash_type*)tp_malloc(items_reserved * sizeof(typed_python_hash_type));
             top_item_slot = 0;
-            for (long k = 0; k < items_reserved; k++) {
-                items_populated[k] = 0;
-            }
+            return;
         }
 
-        while (top_item_slot >= items_reserved) {
-            size_t old_reserved = items_reserved;
-            items_reserved = items_reserved * 1.25 + 1;
-            items = (uint8_t*)tp_realloc(items, item_size * old_reserved, item_size * items_reserved);
-            items_populated = (uint8_t*)tp_realloc(items_populated, old_reserved, items_reserved);
-
-            for (long k = old_reserved; k < items_reserved; k++) {
-                items_populated[k] = 0;
-            }
+        if (count <= items_reserved) {
+            return;
         }
 
-        return top_item_slot++;
+        size_t old_reserved = items_reserved;
+        items_reserved = count;
+        items = (uint8_t*)tp_realloc(items, item_size * old_reserved, item_size * items_reserved);
+        items_populated = (uint8_t*)tp_realloc(items_populated, old_reserved, items_reserved);
+        items_hashes = (typed_python_hash_type*)tp_realloc(
+            items_hashes,
+            old_reserved * sizeof(typed_python_hash_type),
+            items_reserved * sizeof(typed_python_hash_type)
+        );
+
+        for (long k = old_reserved; k < items_reserved; k++) {
+            items_populated[k] = 0;
+        }
     }
 
-    int32_t computeNextPrime(int32_t p) {
-        static std::vector<int32_t> primes;
-        if (!primes.size()) {
-            primes.push_back(2);
+    // make room for 'extra' more items, so that adding them neither grows
+    // the item arrays nor rebuilds the table along the way.
+    void reserve(size_t item_size, size_t extra) {
+        size_t itemsNeeded = std::max<size_t>(top_item_slot + extra, 4);
+
+        if (items && itemsNeeded > items_reserved) {
+            // grow geometrically, so that reserving a little at a time
+            // doesn't degrade into reallocating on every call.
+            itemsNeeded = std::max<size_t>(itemsNeeded, items_reserved * 1.25 + 1);
         }
 
-        auto isprime = [&](int32_t candidate) {
-            for (auto d : primes) {
-                if (candidate % d == 0) {
-                    return false;
-                }
-                if (d * d > candidate) {
-                    return true;
-                }
-            }
-            throw std::logic_error("Expected to clear the primes list.");
-        };
+        reserveItems(item_size, itemsNeeded);
 
-        while (true) {
-            while (primes.back() * primes.back() < p) {
-                int32_t cur = primes.back() + 1;
-                while (!isprime(cur)) {
-                    cur++;
-                }
-                primes.push_back(cur);
-            }
+        // this is the condition under which 'add' would rebuild the table.
+        if (hash_table_empty_slots < extra + hash_table_size / 4 + 1) {
+            rebuildTable(tableSizeFor(hash_table_count + extra));
+        }
+    }
 
-            if (isprime(p)) {
-                return p;
-            }
+    // the smallest table that holds 'count' items at most half full.
+    static size_t tableSizeFor(size_t count) {
+        size_t size = MIN_TABLE_SIZE;
 
-            p++;
+        while (size < count * 2 + 2) {
+            size *= 2;
         }
+
+        return size;
+    }
+
+    // allocate an empty table of 'size' positions, which must be a power of two.
+    void allocateTable(size_t size) {
+        hash_table_size = size;
+        hash_table_slots = (int64_t*)tp_malloc(hash_table_size * sizeof(int64_t));
+        hash_table_ctrl = (uint8_t*)tp_malloc(ctrlBytecount());
+        std::memset(hash_table_ctrl, CTRL_EMPTY, ctrlBytecount());
+        hash_table_empty_slots = hash_table_size;
     }
 
     // called after we have deleted everything that's populated, and need to
@@ -289,8 +446,7 @@ class hash_table_layout {
         top_item_slot = 0;
         hash_table_empty_slots = hash_table_size;
 
-        setTo(hash_table_slots, EMPTY, hash_table_size);
-        setTo(hash_table_hashes, EMPTY, hash_table_size);
+        std::memset(hash_table_ctrl, CTRL_EMPTY, ctrlBytecount());
         std::memset(items_populated, 0, items_reserved);
     }
 
@@ -324,57 +480,48 @@ class hash_table_layout {
         result->items_populated = (uint8_t*)tp_malloc(items_reserved);
         memcpy(result->items_populated, items_populated, items_reserved);
 
-        result->hash_table_slots = (int32_t*)tp_malloc(hash_table_size * sizeof(int32_t));
-        memcpy(result->hash_table_slots, hash_table_slots, hash_table_size * sizeof(int32_t));
+        result->items_hashes = (typed_python_hash_type*)tp_malloc(items_reserved * sizeof(typed_python_hash_type));
+        memcpy(result->items_hashes, items_hashes, items_reserved * sizeof(typed_python_hash_type));
+
+        if (hash_table_slots) {
+            result->hash_table_slots = (int64_t*)tp_malloc(hash_table_size * sizeof(int64_t));
+            memcpy(result->hash_table_slots, hash_table_slots, hash_table_size * sizeof(int64_t));
+
+            result->hash_table_ctrl = (uint8_t*)tp_malloc(ctrlBytecount());
+            memcpy(result->hash_table_ctrl, hash_table_ctrl, ctrlBytecount());
+        }
 
-        result->hash_table_hashes = (typed_python_hash_type*)tp_malloc(hash_table_size * sizeof(typed_python_hash_type));
-        memcpy(result->hash_table_hashes, hash_table_hashes, hash_table_size * sizeof(typed_python_hash_type));
         return result;
     }
 
+    // rebuild the table at a size appropriate for the current item count,
+    // which also clears out any tombstones.
     void resizeTable() {
-        if (!hash_table_slots) {
-            // experiment with pre-allocation, but didn't detect performance improvement
-            if (!hash_table_count) {
-                hash_table_size = computeNextPrime(hash_table_count * 4 + 7);
-            }
-            else
-                hash_table_size = 7;
-            hash_table_slots = (int32_t*)tp_malloc(hash_table_size * sizeof(int32_t));
-            setTo(hash_table_slots, EMPTY, hash_table_size);
-            hash_table_hashes = (typed_python_hash_type*)tp_malloc(hash_table_size * sizeof(typed_python_hash_type));
-            setTo(hash_table_hashes, EMPTY, hash_table_size);
-            hash_table_count = 0;
-            hash_table_empty_slots = hash_table_size;
+        rebuildTable(tableSizeFor(hash_table_count));
+    }
 
-        } else {
-            int32_t oldSize = hash_table_size;
-            int32_t* oldSlots = hash_table_slots;
-            typed_python_hash_type* oldHashes = hash_table_hashes;
-
-            // make sure the table's not too small
-            hash_table_size = computeNextPrime(hash_table_count * 4 + 7);
-
-            hash_table_slots = (int32_t*)tp_malloc(hash_table_size * sizeof(int32_t));
-            setTo(hash_table_slots, EMPTY, hash_table_size);
-            hash_table_hashes =
-              (typed_python_hash_type*)tp_malloc(hash_table_size * sizeof(typed_python_hash_type));
-            setTo(hash_table_hashes, EMPTY, hash_table_size);
-            hash_table_count = 0;
-            hash_table_empty_slots = hash_table_size;
-
-            for (long k = 0; k < oldSize; k++) {
-                if (oldSlots[k] != EMPTY && oldSlots[k] != DELETED) {
-                    add(oldHashes[k], oldSlots[k]);
-                }
+    // rebuild the table with 'size' positions, which must be a power of two
+    // large enough to hold all the items.
+    void rebuildTable(size_t size) {
+        size_t oldSize = hash_table_size;
+        int64_t* oldSlots = hash_table_slots;
+        uint8_t* oldCtrl = hash_table_ctrl;
+
+        allocateTable(size);
+
+        for (long k = 0; k < oldSize; k++) {
+            if (!(oldCtrl[k] & 0x80)) {
+                placeInTable(items_hashes[oldSlots[k]], oldSlots[k]);
             }
+        }
 
+        if (oldSlots) {
             tp_free(oldSlots);
-            tp_free(oldHashes);
+            tp_free(oldCtrl);
         }
     }
 
-    void prepareForDeserialization(uint32_t slotCount, size_t item_size) {
+    void prepareForDeserialization(size_t slotCount, size_t item_size) {
         if (hash_table_size) {
             throw std::runtime_error("deserialization prepare should only be called on "
                                      "empty tables");
@@ -383,6 +530,7 @@ class hash_table_layout {
         items_reserved = slotCount;
         items_populated = (uint8_t*)tp_malloc(slotCount);
         items = (uint8_t*)tp_malloc(slotCount * item_size);
+        items_hashes = (typed_python_hash_type*)tp_malloc(slotCount * sizeof(typed_python_hash_type));
 
         for (long k = 0; k < items_reserved; k++) {
             items_populated[k] = true;
@@ -393,25 +541,20 @@ class hash_table_layout {
 
     template <class hash_fun_type>
     void buildHashTableAfterDeserialization(size_t item_size, const hash_fun_type& hash_fun) {
-        hash_table_size = computeNextPrime(items_reserved * 2.5 + 7);
-        hash_table_slots = (int32_t*)tp_malloc(hash_table_size * sizeof(int32_t));
-        hash_table_hashes =
-          (typed_python_hash_type*)tp_malloc(hash_table_size * sizeof(typed_python_hash_type));
+        allocateTable(tableSizeFor(items_reserved));
         hash_table_count = 0;
-        hash_table_empty_slots = hash_table_size;
-
-        for (long k = 0; k < hash_table_size; k++) {
-            hash_table_slots[k] = EMPTY;
-            hash_table_hashes[k] = -1;
-        }
 
         for (long k = 0; k < items_reserved; k++) {
-            add(hash_fun(items + item_size * k), k);
+            typed_python_hash_type hash = hash_fun(items + item_size * k);
+
+            items_hashes[k] = hash;
+            placeInTable(hash, k);
+            hash_table_count++;
         }
     }
 
     hash_table_layout* deepcopy(
-        std::unordered_map<instance_ptr, instance_ptr>& alreadyAllocated,
+        DeepcopyMap& alreadyAllocated,
         Slab* slab,
         Type* dictOrSetType,
         Type* keyType,
@@ -467,6 +610,16 @@ class hash_table_layout {
             this->items_reserved
         );
 
+        dest->items_hashes = (typed_python_hash_type*)slab->allocate(
+            sizeof(typed_python_hash_type) * this->items_reserved,
+            nullptr
+        );
+        memcpy(
+            dest->items_hashes,
+            this->items_hashes,
+            sizeof(typed_python_hash_type) * this->items_reserved
+        );
+
         dest->items_reserved = this->items_reserved;
 
         dest->top_item_slot = this->top_item_slot;
@@ -475,22 +628,21 @@ class hash_table_layout {
         dest->hash_table_size = this->hash_table_size;
         dest->hash_table_empty_slots = this->hash_table_empty_slots;
 
-        dest->hash_table_slots = (int32_t*)slab->allocate(sizeof(int32_t) * this->hash_table_size, nullptr);
-        memcpy(
-            dest->hash_table_slots,
-            this->hash_table_slots,
-            sizeof(int32_t) * this->hash_table_size
-        );
+        if (this->hash_table_slots) {
+            dest->hash_table_slots = (int64_t*)slab->allocate(sizeof(int64_t) * this->hash_table_size, nullptr);
+            memcpy(
+                dest->hash_table_slots,
+                this->hash_table_slots,
+                sizeof(int64_t) * this->hash_table_size
+            );
 
-        dest->hash_table_hashes = (typed_python_hash_type*)slab->allocate(
-            sizeof(typed_python_hash_type) * this->hash_table_size,
-            nullptr
-        );
-        memcpy(
-            dest->hash_table_hashes,
-            this->hash_table_hashes,
-            sizeof(typed_python_hash_type) * this->hash_table_size
-        );
+            dest->hash_table_ctrl = (uint8_t*)slab->allocate(this->ctrlBytecount(), nullptr);
+            memcpy(
+                dest->hash_table_ctrl,
+                this->hash_table_ctrl,
+                this->ctrlBytecount()
+            );
+        }
 
         return dest;
     }
@@ -516,15 +668,23 @@ class hash_table_layout {
                                        "hashtable count");
         }
 
+        if (hash_table_size & (hash_table_size - 1)) {
+            throw std::runtime_error(reason + ": hash table size is not a power of two");
+        }
+
         int64_t filledSlots = 0;
         int64_t deletedSlots = 0;
         for (long k = 0; k < hash_table_size; k++) {
-            if (hash_table_slots[k] == DELETED) {
+            if (k < GROUP_WIDTH - 1 && hash_table_ctrl[hash_table_size + k] != hash_table_ctrl[k]) {
+                throw std::runtime_error(reason + ": cloned control bytes are out of sync");
+            }
+
+            if (hash_table_ctrl[k] == CTRL_DELETED) {
                 deletedSlots++;
-            } else if (hash_table_slots[k] != EMPTY) {
+            } else if (hash_table_ctrl[k] != CTRL_EMPTY) {
                 filledSlots++;
 
-                if (hash_table_slots[k] >= items_reserved) {
+                if (hash_table_slots[k] < 0 || hash_table_slots[k] >= items_reserved) {
                     throw std::runtime_error(reason
                                              + ": hash table has slot entry out "
                                                "of bounds with item list");
@@ -535,6 +695,10 @@ class hash_table_layout {
                                              + ": hash table points to unmarked "
                                                "slot");
                 }
+
+                if (hash_table_ctrl[k] != hashTag(items_hashes[hash_table_slots[k]])) {
+                    throw std::runtime_error(reason + ": control byte doesn't match the item's hash");
+                }
             }
         }
 
@@ -551,7 +715,7 @@ class hash_table_layout {
     }
 
     bool empty() const { return hash_table_count == 0; }
-    int32_t size() const { return hash_table_count; }
+    int64_t size() const { return hash_table_count; }
 
     std::atomic<int64_t> refcount;
 
@@ -560,17 +724,19 @@ class hash_table_layout {
     size_t items_reserved; // count of items reserved
     size_t top_item_slot; // index of the next item slot to use
 
-    int32_t* hash_table_slots; // a hashtable. each actual object hash to
-                               // the slot index it holds. -1 if not
-                               // populated.
-    typed_python_hash_type* hash_table_hashes; // a hashtable. each actual object hash to
-                                               // the hash in that part of the table. -1 if
-                                               // not populated.
-    size_t hash_table_size; // size of the table
+    int64_t* hash_table_slots; // for each table position, the index of the
+                               // item it holds. Only meaningful where the
+                               // control byte is a tag.
+    uint8_t* hash_table_ctrl; // for each table position, CTRL_EMPTY,
+                              // CTRL_DELETED, or the tag of the item's hash,
+                              // followed by GROUP_WIDTH - 1 cloned bytes.
+    size_t hash_table_size; // size of the table. Always a power of two.
     size_t hash_table_count; // populated count of the table
-    size_t hash_table_empty_slots; // slots that are not empty in the
+    size_t hash_table_empty_slots; // slots that are empty in the
                                    // table. Recall that some slots are
                                    // 'deleted'
+    typed_python_hash_type* items_hashes; // the full hash of each populated item,
+                                          // indexed like 'items'.
 };
 
 
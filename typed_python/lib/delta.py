@@ -0,0 +1,272 @@
+#   Copyright 2017-2020 typed_python Authors
+#
+#   Licensed under the Apache License, Version 2.0 (the "License");
+#   you may not use this file except in compliance with the License.
+#   You may obtain a copy of the License at
+#
+#       http://www.apache.org/licenses/LICENSE-2.0
+#
+#   Unless required by applicable law or agreed to in writing, software
+#   distributed under the License is distributed on an "AS IS" BASIS,
+#   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#   See the License for the specific language governing permissions and
+#   limitations under the License.
+
+"""Structural deltas between two values of the same typed container type.
+
+'diff(T, old, new)' produces a 'Delta(T)' describing how to turn 'old' into
+'new', and 'patch(T, old, delta)' applies it. Deltas are ordinary typed_python
+values, so 'serializeDelta' and 'applyDelta' just send them through the normal
+wire format.
+
+Dict, ConstDict and Set deltas list the keys that were removed and the entries
+that were added or replaced. When a Dict or ConstDict holds values that are
+themselves diffable, entries present on both sides carry a nested delta
+instead of a whole new value. ListOf and TupleOf deltas hold the new length and
+the runs of indices whose values changed. Any other type is replaced wholesale.
+
+The scans over the two values are compiled, so diffing a large Dict where
+little has changed costs a pass over its keys, and the delta only holds what
+changed.
+
+Example:
+
+    State = Dict(str, Quote)
+
+    data = serializeDelta(State, lastState, state)
+
+    # on the other side
+    state = applyDelta(State, lastState, data)
+"""
+
+from typed_python import (
+    TypeFunction, NamedTuple, ListOf, TupleOf, Dict, Entrypoint, serialize, deserialize
+)
+
+
+def _category(T):
+    return getattr(T, "__typed_python_category__", None)
+
+
+def _asType(T, value):
+    """Return 'value' as a T, converting it only if it isn't one already."""
+    return value if type(value) is T else T(value)
+
+
+def _isDiffable(T):
+    return _category(T) in ("Dict", "ConstDict", "Set", "ListOf", "TupleOf")
+
+
+@TypeFunction
+def Delta(T):
+    """The type of a delta between two values of type T."""
+    category = _category(T)
+
+    if category in ("Dict", "ConstDict"):
+        return NamedTuple(
+            removed=ListOf(T.KeyType),
+            replaced=Dict(T.KeyType, T.ValueType),
+            patched=Dict(T.KeyType, Delta(T.ValueType)),
+        )
+
+    if category == "Set":
+        return NamedTuple(removed=ListOf(T.ElementType), added=ListOf(T.ElementType))
+
+    if category in ("ListOf", "TupleOf"):
+        return NamedTuple(
+            length=int,
+            ranges=ListOf(NamedTuple(start=int, values=ListOf(T.ElementType))),
+        )
+
+    return T
+
+
+@Entrypoint
+def _keyChanges(old, new, removed, added, changed):
+    for k in old:
+        if k not in new:
+            removed.append(k)
+
+    for k in new:
+        if k not in old:
+            added.append(k)
+        elif old[k] != new[k]:
+            changed.append(k)
+
+
+@Entrypoint
+def _setChanges(old, new, removed, added):
+    for k in old:
+        if k not in new:
+            removed.append(k)
+
+    for k in new:
+        if k not in old:
+            added.append(k)
+
+
+@Entrypoint
+def _changedRanges(old, new, starts, stops):
+    count = min(len(old), len(new))
+
+    i = 0
+    while i < count:
+        if old[i] != new[i]:
+            j = i + 1
+            while j < count and old[j] != new[j]:
+                j += 1
+
+            starts.append(i)
+            stops.append(j)
+            i = j
+        else:
+            i += 1
+
+    if len(new) > len(old):
+        if len(stops) and stops[-1] == len(old):
+            stops[-1] = len(new)
+        else:
+            starts.append(len(old))
+            stops.append(len(new))
+
+
+@Entrypoint
+def _patchedList(old, length, ranges, result):
+    result.reserve(length)
+
+    for i in range(min(len(old), length)):
+        result.append(old[i])
+
+    for r in ranges:
+        if r.start < 0 or r.start > len(result) or r.start + len(r.values) > length:
+            raise IndexError("List delta range is out of bounds")
+
+        for i in range(len(r.values)):
+            if r.start + i < len(result):
+                result[r.start + i] = r.values[i]
+            else:
+                result.append(r.values[i])
+
+    if len(result) != length:
+        raise IndexError("List delta doesn't cover the end of the list")
+
+
+def diff(T, old, new):
+    """Compute the Delta(T) that turns 'old' into 'new', both of type T."""
+    old = _asType(T, old)
+    new = _asType(T, new)
+
+    category = _category(T)
+
+    if category in ("Dict", "ConstDict"):
+        K, V = T.KeyType, T.ValueType
+
+        removed, added, changed = ListOf(K)(), ListOf(K)(), ListOf(K)()
+        _keyChanges(old, new, removed, added, changed)
+
+        replaced = Dict(K, V)()
+        patched = Dict(K, Delta(V))()
+
+        for k in added:
+            replaced[k] = new[k]
+
+        for k in changed:
+            if _isDiffable(V):
+                patched[k] = diff(V, old[k], new[k])
+            else:
+                replaced[k] = new[k]
+
+        return Delta(T)(removed=removed, replaced=replaced, patched=patched)
+
+    if category == "Set":
+        removed, added = ListOf(T.ElementType)(), ListOf(T.ElementType)()
+        _setChanges(old, new, removed, added)
+
+        return Delta(T)(removed=removed, added=added)
+
+    if category in ("ListOf", "TupleOf"):
+        starts, stops = ListOf(int)(), ListOf(int)()
+        _changedRanges(old, new, starts, stops)
+
+        RangeT = Delta(T).ElementTypes[1].ElementType
+
+        return Delta(T)(
+            length=len(new),
+            ranges=[RangeT(start=start, values=new[start:stop]) for start, stop in zip(starts, stops)]
+        )
+
+    return new
+
+
+def patch(T, old, delta):
+    """Apply 'delta', a Delta(T), to 'old', returning a new T.
+
+    'old' itself is left unmodified.
+    """
+    old = _asType(T, old)
+    delta = _asType(Delta(T), delta)
+
+    category = _category(T)
+
+    if category == "ConstDict":
+        K, V = T.KeyType, T.ValueType
+
+        for k in delta.removed:
+            if k not in old:
+                raise KeyError(k)
+
+        updates = Dict(K, V)(delta.replaced)
+
+        for k, valueDelta in delta.patched.items():
+            updates[k] = patch(V, old[k], valueDelta)
+
+        return old - TupleOf(K)(delta.removed) + T(updates)
+
+    if category == "Dict":
+        result = T(old)
+
+        for k in delta.removed:
+            del result[k]
+
+        for k, v in delta.replaced.items():
+            result[k] = v
+
+        for k, valueDelta in delta.patched.items():
+            result[k] = patch(T.ValueType, old[k], valueDelta)
+
+        return result
+
+    if category == "Set":
+        result = T(old)
+
+        for k in delta.removed:
+            result.remove(k)
+
+        for k in delta.added:
+            result.add(k)
+
+        return result
+
+    if category in ("ListOf", "TupleOf"):
+        result = ListOf(T.ElementType)()
+        _patchedList(old, delta.length, delta.ranges, result)
+
+        return result if category == "ListOf" else T(result)
+
+    return delta
+
+
+def serializeDelta(T, old, new, serializationContext=None):
+    """Serialize the changes between 'old' and 'new', two values of type T.
+
+    Pass the result, along with 'old', to 'applyDelta' to get 'new' back.
+    """
+    return serialize(Delta(T), diff(T, old, new), serializationContext)
+
+
+def applyDelta(T, old, data, serializationContext=None):
+    """Rebuild a T from 'old' and bytes produced by 'serializeDelta'.
+
+    Returns a new value. 'old' is left unmodified.
+    """
+    return patch(T, old, deserialize(Delta(T), data, serializationContext))
@@ -0,0 +1,125 @@
+#   Copyright 2017-2020 typed_python Authors
+#
+#   Licensed under the Apache License, Version 2.0 (the "License");
+#   you may not use this file except in compliance with the License.
+#   You may obtain a copy of the License at
+#
+#       http://www.apache.org/licenses/LICENSE-2.0
+#
+#   Unless required by applicable law or agreed to in writing, software
+#   distributed under the License is distributed on an "AS IS" BASIS,
+#   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#   See the License for the specific language governing permissions and
+#   limitations under the License.
+
+import pytest
+
+from typed_python import (
+    NamedTuple, Dict, ConstDict, ListOf, TupleOf, Set, OneOf, serialize, serializeDelta, applyDelta
+)
+from typed_python.lib.delta import Delta, diff, patch
+
+Quote = NamedTuple(bid=float, ask=float, size=int)
+
+
+def test_delta_types():
+    assert Delta(int) is int
+    assert Delta(Quote) is Quote
+    assert Delta(Dict(str, int)).ElementNames == ("removed", "replaced", "patched")
+    assert Delta(ListOf(str)).ElementNames == ("length", "ranges")
+    assert Delta(Set(int)).ElementNames == ("removed", "added")
+
+
+def test_dict_delta_is_small():
+    State = Dict(str, Quote)
+
+    old = State({"sym" + str(i): Quote(bid=i, ask=i + 1, size=i) for i in range(10000)})
+    new = State(old)
+
+    for i in range(0, 10000, 100):
+        new["sym" + str(i)] = Quote(bid=i, ask=i + 2, size=i)
+
+    del new["sym1"]
+    new["new"] = Quote(bid=1.0)
+
+    data = serializeDelta(State, old, new)
+
+    assert len(data) * 50 < len(serialize(State, new))
+    assert applyDelta(State, old, data) == new
+
+    assert diff(State, old, old) == Delta(State)()
+
+
+def test_apply_delta_leaves_old_alone():
+    for T, old, new in [
+        (Dict(int, ListOf(int)), {1: [1, 2], 2: [3]}, {1: [1, 3], 3: []}),
+        (ListOf(int), [1, 2, 3], [1, 5]),
+        (Set(str), {"a", "b"}, {"b", "c"}),
+    ]:
+        old = T(old)
+        oldCopy = serialize(T, old)
+
+        assert applyDelta(T, old, serializeDelta(T, old, new)) == T(new)
+        assert serialize(T, old) == oldCopy
+
+
+def test_nested_deltas():
+    Inner = Dict(str, ListOf(float))
+    T = Dict(str, ConstDict(int, Inner))
+
+    old = T({"a": {1: Inner({"x": [1.0, 2.0, 3.0]}), 2: Inner()}, "b": {}})
+    new = T({"a": {1: Inner({"x": [1.0, 2.5, 3.0, 4.0], "y": []}), 3: Inner()}, "c": {5: Inner()}})
+
+    delta = diff(T, old, new)
+
+    assert delta.removed == ["b"]
+    assert list(delta.replaced) == ["c"]
+    assert delta.patched["a"].removed == [2]
+    assert delta.patched["a"].patched[1].patched["x"].ranges[0].start == 1
+
+    assert patch(T, old, delta) == new
+    assert applyDelta(T, old, serializeDelta(T, old, new)) == new
+
+
+def test_list_deltas():
+    for T in [ListOf(int), TupleOf(int)]:
+        old = T(range(100))
+
+        for new in [
+            T(range(100)),
+            T(range(50)),
+            T(range(200)),
+            T([-1] + list(range(1, 99)) + [-1]),
+            T([x if x % 10 else -x for x in range(120)]),
+            T(),
+        ]:
+            delta = diff(T, old, new)
+
+            assert patch(T, old, delta) == new
+            assert type(patch(T, old, delta)) is T
+
+        assert diff(T, old, T(range(100))).ranges == []
+        assert [(r.start, len(r.values)) for r in diff(T, old, T(range(110))).ranges] == [(100, 10)]
+
+    T = ListOf(OneOf(None, str))
+    old = T(["a", None, "b"])
+    new = T(["a", "c", "b", None])
+
+    assert [(r.start, r.values) for r in diff(T, old, new).ranges] == [(1, ["c"]), (3, [None])]
+
+
+def test_bad_deltas_raise():
+    T = ListOf(int)
+    delta = Delta(T)(length=2, ranges=[dict(start=5, values=[1])])
+
+    with pytest.raises(IndexError):
+        patch(T, T([1, 2]), delta)
+
+    with pytest.raises(IndexError):
+        patch(T, T([1, 2]), Delta(T)(length=4))
+
+    with pytest.raises(KeyError):
+        patch(Dict(int, int), {1: 2}, Delta(Dict(int, int))(removed=[3]))
+
+    with pytest.raises(KeyError):
+        patch(ConstDict(int, int), {1: 2}, Delta(ConstDict(int, int))(removed=[3]))
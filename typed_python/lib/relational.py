@@ -0,0 +1,251 @@
+#   Copyright 2017-2020 typed_python Authors
+#
+#   Licensed under the Apache License, Version 2.0 (the "License");
+#   you may not use this file except in compliance with the License.
+#   You may obtain a copy of the License at
+#
+#       http://www.apache.org/licenses/LICENSE-2.0
+#
+#   Unless required by applicable law or agreed to in writing, software
+#   distributed under the License is distributed on an "AS IS" BASIS,
+#   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#   See the License for the specific language governing permissions and
+#   limitations under the License.
+
+"""
+Compiled group-by and hash-join over ListOf containers.
+
+Both operations compute the key of every row, split the rows into partitions
+by the high bits of the key's hash, and then process each partition with its
+own hash table in parallel using 'pmap'. Each table only ever sees the keys of
+one partition, so it stays small enough to be cache friendly, and no two
+threads ever touch the same table.
+"""
+
+import os
+
+from typed_python import ListOf, Dict, NamedTuple, Tuple, UInt64, Entrypoint
+from typed_python.lib.pmap import pmap
+
+# inputs smaller than this aren't worth partitioning or farming out to threads
+_MIN_PARALLEL_ROWS = 100000
+
+# the largest number of partitions we'll ever split the input into
+_MAX_PARTITION_BITS = 8
+
+
+@Entrypoint
+def _partitionBitsFor(rowCount: int) -> int:
+    if rowCount < _MIN_PARALLEL_ROWS:
+        return 0
+
+    # aim for several partitions per thread, so that uneven partitions
+    # still keep every thread busy
+    bits = 0
+    while (1 << bits) < int(os.cpu_count()) * 4 and bits < _MAX_PARTITION_BITS:
+        bits += 1
+
+    return bits
+
+
+@Entrypoint
+def _partitionOf(key, bits: int) -> int:
+    if bits == 0:
+        return 0
+
+    # Partition on the top bits of a Fibonacci-scrambled hash. Dict places
+    # items using bits 32 and up of the same product formed from its own hash
+    # (see 'hash_table_layout::probeStart'), so the keys in one partition still
+    # spread over their whole table unless it has more than 2 ** (32 - bits)
+    # positions.
+    return int((UInt64(hash(key)) * UInt64(0x9E3779B97F4A7C15)) >> UInt64(64 - bits))
+
+
+@Entrypoint
+def _keysOf(rows, keyFn, KeyType, bits: int):
+    if bits == 0:
+        keys = ListOf(KeyType)()
+        keys.reserve(len(rows))
+        for row in rows:
+            keys.append(keyFn(row))
+        return keys
+
+    return pmap(rows, keyFn, KeyType)
+
+
+@Entrypoint
+def _radixPartition(keys, bits: int):
+    """Group the indices of 'keys' by partition.
+
+    Returns a pair (order, offsets), where the indices of the rows in partition
+    'p' are 'order[offsets[p]:offsets[p + 1]]', in increasing order.
+    """
+    partitionCount = 1 << bits
+
+    partitions = ListOf(int)()
+    partitions.resize(len(keys))
+
+    offsets = ListOf(int)()
+    offsets.resize(partitionCount + 1)
+
+    for i in range(len(keys)):
+        p = _partitionOf(keys[i], bits)
+        partitions[i] = p
+        offsets[p + 1] += 1
+
+    for p in range(partitionCount):
+        offsets[p + 1] += offsets[p]
+
+    cursors = ListOf(int)(offsets)
+    order = ListOf(int)()
+    order.resize(len(keys))
+
+    for i in range(len(keys)):
+        p = partitions[i]
+        order[cursors[p]] = i
+        cursors[p] += 1
+
+    return Tuple(ListOf(int), ListOf(int))((order, offsets))
+
+
+def _groupPartition(rows, keys, order, start, stop, valueFn, combine, groups):
+    for i in range(start, stop):
+        ix = order[i]
+        key = keys[ix]
+
+        if key in groups:
+            groups[key] = combine(groups[key], valueFn(rows[ix]))
+        else:
+            groups[key] = valueFn(rows[ix])
+
+    return len(groups)
+
+
+@Entrypoint
+def groupBy(rows, keyFn, valueFn, combine, KeyType, ValueType):
+    """Aggregate the rows of 'rows' that share a key.
+
+    Args:
+        rows - a ListOf of any type, typically a NamedTuple
+        keyFn - a function from a row to its key, of type KeyType
+        valueFn - a function from a row to the value it contributes to its
+            group, of type ValueType
+        combine - a function taking two ValueTypes and returning their
+            aggregate. It must be associative, since values are combined in
+            whatever order the partitions happen to be processed. Use a
+            NamedTuple ValueType to compute several aggregates at once.
+        KeyType - the type of the keys
+        ValueType - the type of the aggregated values
+
+    Returns:
+        a ListOf(NamedTuple(key=KeyType, value=ValueType)) with one entry
+        per distinct key, in no particular order.
+    """
+    GroupType = NamedTuple(key=KeyType, value=ValueType)
+
+    bits = _partitionBitsFor(len(rows))
+    keys = _keysOf(rows, keyFn, KeyType, bits)
+    order, offsets = _radixPartition(keys, bits)
+
+    # make the output tables up front, so the closure we hand to the worker
+    # threads only holds typed values
+    partitionGroups = ListOf(Dict(KeyType, ValueType))()
+    partitionGroups.resize(len(offsets) - 1)
+
+    def groupPartition(p):
+        return _groupPartition(
+            rows, keys, order, offsets[p], offsets[p + 1], valueFn, combine, partitionGroups[p]
+        )
+
+    if bits == 0:
+        groupPartition(0)
+    else:
+        pmap(ListOf(int)(range(len(partitionGroups))), groupPartition, int)
+
+    groupCount = 0
+    for groups in partitionGroups:
+        groupCount += len(groups)
+
+    res = ListOf(GroupType)()
+    res.reserve(groupCount)
+
+    for groups in partitionGroups:
+        for key, value in groups.items():
+            res.append(GroupType(key=key, value=value))
+
+    return res
+
+
+def _joinPartition(left, right, leftKeys, rightKeys, leftOrder, leftOffsets,
+                   rightOrder, rightOffsets, p, pairs):
+    PairType = type(pairs).ElementType
+
+    # index the rows of the right-hand side by key...
+    rightRows = Dict(type(rightKeys).ElementType, ListOf(int))()
+
+    for i in range(rightOffsets[p], rightOffsets[p + 1]):
+        ix = rightOrder[i]
+        rightRows.setdefault(rightKeys[ix]).append(ix)
+
+    # ...and probe it with the rows of the left-hand side
+    for i in range(leftOffsets[p], leftOffsets[p + 1]):
+        leftIx = leftOrder[i]
+        matches = rightRows.get(leftKeys[leftIx])
+
+        if matches is not None:
+            for rightIx in matches:
+                pairs.append(PairType((left[leftIx], right[rightIx])))
+
+    return len(pairs)
+
+
+@Entrypoint
+def hashJoin(left, right, leftKey, rightKey, KeyType):
+    """Compute the inner join of two ListOfs on equal keys.
+
+    Args:
+        left - a ListOf of any type, typically a NamedTuple
+        right - a ListOf of any type
+        leftKey - a function from a row of 'left' to its key, of type KeyType
+        rightKey - a function from a row of 'right' to its key
+        KeyType - the type of the keys
+
+    Returns:
+        a ListOf(Tuple(left.ElementType, right.ElementType)) holding every
+        pair of rows whose keys are equal, in no particular order.
+    """
+    PairType = Tuple(left.ElementType, right.ElementType)
+
+    bits = _partitionBitsFor(max(len(left), len(right)))
+
+    leftKeys = _keysOf(left, leftKey, KeyType, bits)
+    rightKeys = _keysOf(right, rightKey, KeyType, bits)
+
+    leftOrder, leftOffsets = _radixPartition(leftKeys, bits)
+    rightOrder, rightOffsets = _radixPartition(rightKeys, bits)
+
+    partitionPairs = ListOf(ListOf(PairType))()
+    partitionPairs.resize(len(leftOffsets) - 1)
+
+    def joinPartition(p):
+        return _joinPartition(
+            left, right, leftKeys, rightKeys, leftOrder, leftOffsets,
+            rightOrder, rightOffsets, p, partitionPairs[p]
+        )
+
+    if bits == 0:
+        joinPartition(0)
+    else:
+        pmap(ListOf(int)(range(len(partitionPairs))), joinPartition, int)
+
+    pairCount = 0
+    for pairs in partitionPairs:
+        pairCount += len(pairs)
+
+    res = ListOf(PairType)()
+    res.reserve(pairCount)
+
+    for pairs in partitionPairs:
+        res.extend(pairs)
+
+    return res
@@ -0,0 +1,101 @@
+#   Copyright 2017-2020 typed_python Authors
+#
+#   Licensed under the Apache License, Version 2.0 (the "License");
+#   you may not use this file except in compliance with the License.
+#   You may obtain a copy of the License at
+#
+#       http://www.apache.org/licenses/LICENSE-2.0
+#
+#   Unless required by applicable law or agreed to in writing, software
+#   distributed under the License is distributed on an "AS IS" BASIS,
+#   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#   See the License for the specific language governing permissions and
+#   limitations under the License.
+
+from typed_python import ListOf, NamedTuple, Entrypoint
+from typed_python.lib.relational import groupBy, hashJoin
+
+Trade = NamedTuple(sym=str, px=float, qty=int)
+Quote = NamedTuple(sym=str, bid=float)
+Stats = NamedTuple(count=int, notional=float, maxPx=float)
+
+
+def makeTrades(count):
+    return ListOf(Trade)([
+        Trade(sym="S%d" % (i % 37), px=float(i % 101), qty=i % 7)
+        for i in range(count)
+    ])
+
+
+def expectedStats(trades):
+    res = {}
+    for t in trades:
+        count, notional, maxPx = res.get(t.sym, (0, 0.0, 0.0))
+        res[t.sym] = (count + 1, notional + t.px * t.qty, max(maxPx, t.px))
+    return res
+
+
+@Entrypoint
+def tradeStats(trades: ListOf(Trade)):
+    return groupBy(
+        trades,
+        lambda t: t.sym,
+        lambda t: Stats(count=1, notional=t.px * t.qty, maxPx=t.px),
+        lambda a, b: Stats(
+            count=a.count + b.count,
+            notional=a.notional + b.notional,
+            maxPx=max(a.maxPx, b.maxPx)
+        ),
+        str,
+        Stats
+    )
+
+
+def test_group_by():
+    assert groupBy(ListOf(int)(), lambda x: x, lambda x: x, lambda a, b: a + b, int, int) == []
+
+    # small enough to run in one partition, and big enough to use several
+    for count in [1000, 300000]:
+        trades = makeTrades(count)
+
+        groups = tradeStats(trades)
+
+        assert len(groups) == 37
+        assert {g.key: tuple(g.value) for g in groups} == expectedStats(trades)
+
+
+def test_group_by_int_keys():
+    values = ListOf(int)(range(200000))
+
+    groups = groupBy(values, lambda x: x % 1000, lambda x: 1, lambda a, b: a + b, int, int)
+
+    assert sorted((g.key, g.value) for g in groups) == [(k, 200) for k in range(1000)]
+
+
+def test_hash_join():
+    for count in [100, 200000]:
+        trades = makeTrades(count)
+
+        # no quote for S0, and two for S1
+        quotes = ListOf(Quote)(
+            [Quote(sym="S%d" % i, bid=float(i)) for i in range(1, 37)] + [Quote(sym="S1", bid=-1.0)]
+        )
+
+        pairs = hashJoin(trades, quotes, lambda t: t.sym, lambda q: q.sym, str)
+
+        expected = sorted(
+            (t, q) for t in trades for q in quotes if t.sym == q.sym
+        ) if count < 1000 else None
+
+        assert all(t.sym == q.sym for t, q in pairs)
+
+        tradesPerSym = {}
+        for t in trades:
+            tradesPerSym[t.sym] = tradesPerSym.get(t.sym, 0) + 1
+
+        assert len(pairs) == sum(tradesPerSym.values()) - tradesPerSym["S0"] + tradesPerSym["S1"]
+
+        if expected is not None:
+            assert sorted(pairs) == expected
+
+    assert hashJoin(ListOf(int)(), ListOf(int)([1]), lambda x: x, lambda x: x, int) == []
@@ -0,0 +1,254 @@
+#   Copyright 2017-2020 typed_python Authors
+#
+#   Licensed under the Apache License, Version 2.0 (the "License");
+#   you may not use this file except in compliance with the License.
+#   You may obtain a copy of the License at
+#
+#       http://www.apache.org/licenses/LICENSE-2.0
+#
+#   Unless required by applicable law or agreed to in writing, software
+#   distributed under the License is distributed on an "AS IS" BASIS,
+#   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#   See the License for the specific language governing permissions and
+#   limitations under the License.
+
+"""Compact probabilistic summaries of large collections of keys.
+
+Both structures hash each key once to 64 bits, stretch that into two 64 bit
+hashes, and combine them to pick as many positions as they need ('double
+hashing'). Their state is a single ListOf(UInt64), so two summaries built
+with the same parameters (for instance, by different 'pmap' workers) merge
+with one pass over that list, and they serialize like any other Class.
+
+Integers, bools and floats are hashed by their value bits, and str and bytes
+by a 64 bit hash of their contents combined with the hash that Dict and Set
+use internally. Other key types only have that internal hash, which has 32
+bits, so keys that collide there are indistinguishable: that puts a floor of
+about n / 2**32 under a BloomFilter's false positive rate, and adds at most
+that many spurious counts to a CountMinSketch estimate.
+"""
+
+import math
+
+from typed_python import (
+    Class, Final, Member, TypeFunction, ListOf, Int8, Int16, Int32, UInt8, UInt16, UInt32, UInt64, Float32, Entrypoint
+)
+from typed_python.compiler.type_wrappers.compilable_builtin import CompilableBuiltin
+import typed_python.compiler.native_ast as native_ast
+import typed_python.compiler.type_wrappers.runtime_functions as runtime_functions
+
+_INTEGER_TYPES = (bool, int, Int8, Int16, Int32, UInt8, UInt16, UInt32, UInt64)
+
+
+class _Hash64(CompilableBuiltin):
+    """Hash a typed python value to a UInt64 for use as a sketch key.
+
+    Register types use their value bits, so distinct keys never collide.
+    str and bytes combine a 64 bit hash of their contents with their native
+    hash, and anything else falls back to its native (32 bit) hash.
+    """
+    def __eq__(self, other):
+        return isinstance(other, _Hash64)
+
+    def __hash__(self):
+        return hash("_Hash64")
+
+    def convert_call(self, context, instance, args, kwargs):
+        if len(args) != 1 or kwargs:
+            return super().convert_call(context, instance, args, kwargs)
+
+        arg = args[0]
+        T = arg.expr_type.typeRepresentation
+
+        if T in _INTEGER_TYPES:
+            return context.pushPod(UInt64, arg.nonref_expr.cast(native_ast.UInt64))
+
+        if T in (float, Float32):
+            # adding zero maps -0.0 to 0.0, which compares equal to it
+            if T is float:
+                bitsT, zero = native_ast.UInt64, native_ast.const_float_expr(0.0)
+            else:
+                bitsT, zero = native_ast.UInt32, native_ast.const_float32_expr(0.0)
+
+            slot = context.allocateUninitializedSlot(T)
+            context.pushEffect(slot.expr.store(arg.nonref_expr.add(zero)))
+
+            return context.pushPod(
+                UInt64,
+                slot.expr.cast(bitsT.pointer()).load().cast(native_ast.UInt64)
+            )
+
+        nativeHash = arg.convert_hash()
+
+        if nativeHash is None:
+            return None
+
+        nativeBits = nativeHash.nonref_expr.cast(native_ast.UInt32).cast(native_ast.UInt64)
+
+        if T in (str, bytes):
+            contentHash = runtime_functions.hash64_string if T is str else runtime_functions.hash64_bytes
+
+            return context.pushPod(
+                UInt64,
+                contentHash.call(arg.nonref_expr.cast(native_ast.VoidPtr)).bitxor(nativeBits)
+            )
+
+        return context.pushPod(UInt64, nativeBits)
+
+
+@Entrypoint
+def _mix(h: UInt64) -> UInt64:
+    """The 'splitmix64' finalizer, which spreads every input bit over the output."""
+    h += UInt64(0x9E3779B97F4A7C15)
+    h = (h ^ (h >> UInt64(30))) * UInt64(0xBF58476D1CE4E5B9)
+    h = (h ^ (h >> UInt64(27))) * UInt64(0x94D049BB133111EB)
+    return h ^ (h >> UInt64(31))
+
+
+@TypeFunction
+def BloomFilter(T):
+    """Create a set-like filter of T that answers membership with false positives.
+
+    A BloomFilter(T)(capacity, falsePositiveRate) holding up to 'capacity'
+    items reports an item that was never added with probability about
+    'falsePositiveRate', and never misses an item that was. It takes about
+    1.44 * log2(1 / falsePositiveRate) bits per item, whatever T is.
+
+    Filters with the same capacity and rate can be combined with 'merge'.
+    """
+    class BloomFilter(Class, Final):
+        ElementType = T
+
+        bits = Member(ListOf(UInt64))
+        hashCount = Member(int)
+
+        def __init__(self, capacity: int, falsePositiveRate: float):
+            if capacity < 1:
+                raise ValueError("BloomFilter capacity must be positive")
+
+            if not 0.0 < falsePositiveRate < 1.0:
+                raise ValueError("BloomFilter falsePositiveRate must be between 0 and 1")
+
+            bitCount = -capacity * math.log(falsePositiveRate) / (math.log(2) ** 2)
+            wordCount = max(1, int(math.ceil(bitCount / 64)))
+
+            self.bits = ListOf(UInt64)()
+            self.bits.resize(wordCount)
+            self.hashCount = max(1, int(round(wordCount * 64 / capacity * math.log(2))))
+
+        @Entrypoint
+        def add(self, item: T) -> None:
+            bitCount = UInt64(len(self.bits) * 64)
+            h1 = _mix(_Hash64()(item))
+            h2 = _mix(h1) | UInt64(1)
+
+            for i in range(self.hashCount):
+                bit = (h1 + UInt64(i) * h2) % bitCount
+                self.bits[int(bit >> UInt64(6))] |= UInt64(1) << (bit & UInt64(63))
+
+        @Entrypoint
+        def addAll(self, items) -> None:
+            for item in items:
+                self.add(item)
+
+        @Entrypoint
+        def __contains__(self, item: T) -> bool:
+            bitCount = UInt64(len(self.bits) * 64)
+            h1 = _mix(_Hash64()(item))
+            h2 = _mix(h1) | UInt64(1)
+
+            for i in range(self.hashCount):
+                bit = (h1 + UInt64(i) * h2) % bitCount
+                if not (self.bits[int(bit >> UInt64(6))] >> (bit & UInt64(63))) & UInt64(1):
+                    return False
+
+            return True
+
+        @Entrypoint
+        def merge(self, other) -> None:
+            """Add every item in 'other', which must have been built with our parameters."""
+            if len(other.bits) != len(self.bits) or other.hashCount != self.hashCount:
+                raise ValueError("Can't merge BloomFilters with different parameters")
+
+            for i in range(len(self.bits)):
+                self.bits[i] |= other.bits[i]
+
+    return BloomFilter
+
+
+@TypeFunction
+def CountMinSketch(T):
+    """Create a frequency table of T that never undercounts.
+
+    A CountMinSketch(T)(width, depth) keeps 'depth' rows of 'width'
+    counters. 'estimate(item)' is at least the number of times 'item' was
+    added, and exceeds it by more than 'e / width' times the total count
+    with probability at most 'exp(-depth)'.
+
+    Sketches with the same width and depth can be combined with 'merge'.
+    """
+    class CountMinSketch(Class, Final):
+        ElementType = T
+
+        counts = Member(ListOf(UInt64))
+        width = Member(int)
+        depth = Member(int)
+        total = Member(int)
+
+        def __init__(self, width: int, depth: int):
+            if width < 1 or depth < 1:
+                raise ValueError("CountMinSketch width and depth must be positive")
+
+            self.counts = ListOf(UInt64)()
+            self.counts.resize(width * depth)
+            self.width = width
+            self.depth = depth
+
+        @Entrypoint
+        def add(self, item: T) -> None:
+            self.add(item, 1)
+
+        @Entrypoint  # noqa: F811
+        def add(self, item: T, count: int) -> None:
+            width = UInt64(self.width)
+            h1 = _mix(_Hash64()(item))
+            h2 = _mix(h1) | UInt64(1)
+
+            for row in range(self.depth):
+                col = (h1 + UInt64(row) * h2) % width
+                self.counts[row * self.width + int(col)] += UInt64(count)
+
+            self.total += count
+
+        @Entrypoint
+        def addAll(self, items) -> None:
+            for item in items:
+                self.add(item, 1)
+
+        @Entrypoint
+        def estimate(self, item: T) -> int:
+            """Return an upper bound on the number of times 'item' was added."""
+            width = UInt64(self.width)
+            h1 = _mix(_Hash64()(item))
+            h2 = _mix(h1) | UInt64(1)
+
+            res = self.counts[int(h1 % width)]
+
+            for row in range(1, self.depth):
+                col = (h1 + UInt64(row) * h2) % width
+                res = min(res, self.counts[row * self.width + int(col)])
+
+            return int(res)
+
+        @Entrypoint
+        def merge(self, other) -> None:
+            """Add the counts in 'other', which must have our width and depth."""
+            if other.width != self.width or other.depth != self.depth:
+                raise ValueError("Can't merge CountMinSketches with different parameters")
+
+            for i in range(len(self.counts)):
+                self.counts[i] += other.counts[i]
+
+            self.total += other.total
+
+    return CountMinSketch
@@ -0,0 +1,106 @@
+#   Copyright 2017-2020 typed_python Authors
+#
+#   Licensed under the Apache License, Version 2.0 (the "License");
+#   you may not use this file except in compliance with the License.
+#   You may obtain a copy of the License at
+#
+#       http://www.apache.org/licenses/LICENSE-2.0
+#
+#   Unless required by applicable law or agreed to in writing, software
+#   distributed under the License is distributed on an "AS IS" BASIS,
+#   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#   See the License for the specific language governing permissions and
+#   limitations under the License.
+
+import pytest
+
+from typed_python import ListOf, Entrypoint, serialize, deserialize
+from typed_python.lib.pmap import pmap
+from typed_python.lib.sketches import BloomFilter, CountMinSketch
+
+
+def test_bloom_filter_has_no_false_negatives():
+    f = BloomFilter(int)(10000, 0.01)
+    f.addAll(ListOf(int)(range(0, 20000, 2)))
+
+    assert all(i in f for i in range(0, 20000, 2))
+
+    falsePositives = sum(i in f for i in range(1, 20000, 2))
+
+    # we expect about 100
+    assert falsePositives < 200
+
+    with pytest.raises(ValueError):
+        BloomFilter(int)(10, 1.5)
+
+
+def test_bloom_filter_merge_and_serialize():
+    BF = BloomFilter(str)
+
+    @Entrypoint
+    def fillInParallel(filters: ListOf(BF), keys: ListOf(str)):
+        def fill(i):
+            for k in range(i, len(keys), len(filters)):
+                filters[i].add(keys[k])
+            return i
+
+        pmap(ListOf(int)(range(len(filters))), fill, int)
+
+    keys = ListOf(str)(["key_" + str(i) for i in range(5000)])
+    filters = ListOf(BF)([BF(5000, 0.001) for _ in range(4)])
+
+    fillInParallel(filters, keys)
+
+    merged = BF(5000, 0.001)
+    for f in filters:
+        merged.merge(f)
+
+    copy = deserialize(BF, serialize(BF, merged))
+
+    assert all(k in copy for k in keys)
+    assert sum(("other_" + str(i)) in copy for i in range(5000)) < 50
+
+    with pytest.raises(ValueError):
+        merged.merge(BF(10, 0.001))
+
+
+def test_count_min_sketch():
+    CMS = CountMinSketch(int)
+
+    sketch = CMS(2000, 5)
+    other = CMS(2000, 5)
+
+    for i in range(1000):
+        sketch.add(i, i)
+
+    other.addAll(ListOf(int)([7] * 100))
+    sketch.merge(other)
+
+    copy = deserialize(CMS, serialize(CMS, sketch))
+
+    assert copy.total == sum(range(1000)) + 100
+    assert copy.estimate(7) >= 107
+    assert copy.estimate(999) >= 999
+
+    # the error bound is e / width * total, about 680, with high probability
+    assert sum(copy.estimate(i) - i for i in range(1000)) < 1000 * 680
+
+    with pytest.raises(ValueError):
+        sketch.merge(CMS(10, 5))
+
+
+def test_sketches_hash_every_key_type_to_64_bits():
+    floats = BloomFilter(float)(1000, 0.001)
+    floats.addAll(ListOf(float)([i / 7.0 for i in range(1000)] + [0.0]))
+
+    assert all(i / 7.0 in floats for i in range(1000))
+    assert -0.0 in floats
+    assert sum((i + 0.5) / 7.0 in floats for i in range(1000)) < 20
+
+    blobs = CountMinSketch(bytes)(1000, 4)
+
+    for i in range(100):
+        blobs.add(b"x" * i, i)
+
+    assert all(blobs.estimate(b"x" * i) >= i for i in range(100))
+    assert blobs.estimate(b"") == 0
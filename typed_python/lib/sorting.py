@@ -80,3 +80,40 @@ def sorted(values, key=None):
     valuesCopy = ListOf(type(values).ElementType)(values)
     sort(valuesCopy, key)
     return valuesCopy
+
+
+@Entrypoint
+def bisectLeft(values, key):
+    """Return the index at which 'key' would be inserted into the sorted 'values'.
+
+    If 'key' is already present, the index of its first occurrence is returned.
+    """
+    lo = 0
+    hi = len(values)
+
+    while lo < hi:
+        mid = (lo + hi) // 2
+
+        if values[mid] < key:
+            lo = mid + 1
+        else:
+            hi = mid
+
+    return lo
+
+
+@Entrypoint
+def bisectRight(values, key):
+    """Return the index just past any occurrences of 'key' in the sorted 'values'."""
+    lo = 0
+    hi = len(values)
+
+    while lo < hi:
+        mid = (lo + hi) // 2
+
+        if key < values[mid]:
+            hi = mid
+        else:
+            lo = mid + 1
+
+    return lo
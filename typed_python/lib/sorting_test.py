@@ -12,6 +12,7 @@
 #   See the License for the specific language governing permissions and
 #   limitations under the License.
 
+import bisect
 import numpy
 import time
 import typed_python.lib.sorting as sorting
@@ -117,3 +118,12 @@ class TestSorting(unittest.TestCase):
             sorting.sorted(x, key=lambda x: Tuple(int, int)((x % 10, x))),
             sorted(x, key=lambda x: (x % 10, x))
         )
+
+    def test_bisect(self):
+        x = ListOf(int)([1, 3, 3, 3, 7])
+
+        for key in range(9):
+            self.assertEqual(sorting.bisectLeft(x, key), bisect.bisect_left(x, key))
+            self.assertEqual(sorting.bisectRight(x, key), bisect.bisect_right(x, key))
+
+        self.assertEqual(sorting.bisectLeft(ListOf(str)(), "a"), 0)
@@ -0,0 +1,113 @@
+#   Copyright 2017-2021 typed_python Authors
+#
+#   Licensed under the Apache License, Version 2.0 (the "License");
+#   you may not use this file except in compliance with the License.
+#   You may obtain a copy of the License at
+#
+#       http://www.apache.org/licenses/LICENSE-2.0
+#
+#   Unless required by applicable law or agreed to in writing, software
+#   distributed under the License is distributed on an "AS IS" BASIS,
+#   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#   See the License for the specific language governing permissions and
+#   limitations under the License.
+
+import ctypes
+import threading
+
+from typed_python import ListOf, totalBytesAllocatedOnFreeStore
+from typed_python.test_util import currentMemUsageMb, callFunctionInFreshProcess
+
+
+def mallocTrim():
+    # ask glibc to hand free memory back to the system, so that RSS reflects
+    # what's actually in use rather than what malloc is holding onto.
+    try:
+        ctypes.CDLL("libc.so.6").malloc_trim(0)
+    except (OSError, AttributeError):
+        pass
+
+
+def freeStoreBytecountsAcrossThreads():
+    bytecount0 = totalBytesAllocatedOnFreeStore()
+
+    lists = []
+
+    def allocate():
+        # small strings come from the thread's pool, the lists' data from malloc
+        lists.append(ListOf(str)(["s" * (i % 600) for i in range(10000)]))
+
+    threads = [threading.Thread(target=allocate) for _ in range(4)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    bytecount1 = totalBytesAllocatedOnFreeStore()
+
+    lists = None
+
+    return bytecount0, bytecount1, totalBytesAllocatedOnFreeStore()
+
+
+def test_bytes_on_free_store_across_threads():
+    # the count is process-wide, so measure it in a process where nothing
+    # else is allocating.
+    bytecount0, bytecount1, bytecount2 = callFunctionInFreshProcess(freeStoreBytecountsAcrossThreads, ())
+
+    # the threads have exited, but what they allocated is still alive
+    assert bytecount1 > bytecount0 + 4 * 10000 * 32
+
+    # and freeing it from this thread balances the count
+    assert bytecount2 == bytecount0
+
+
+def memUsageAfterRepeatedAllocations():
+    usage0 = currentMemUsageMb()
+
+    for _ in range(20):
+        x = ListOf(str)(["s" * (i % 100) for i in range(100000)])
+        x = None  # noqa
+
+    return currentMemUsageMb() - usage0
+
+
+def test_free_store_reuses_small_allocations():
+    assert callFunctionInFreshProcess(memUsageAfterRepeatedAllocations, ()) < 50
+
+
+def memUsageAfterExitedThreadsAllocate():
+    mallocTrim()
+    usage0 = currentMemUsageMb()
+
+    lists = []
+
+    def allocate():
+        lists.append(ListOf(str)(["s" * (i % 200) for i in range(200000)]))
+
+    for _ in range(4):
+        threads = [threading.Thread(target=allocate) for _ in range(4)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+
+    usage1 = currentMemUsageMb()
+
+    lists = None
+    mallocTrim()
+
+    return usage1 - usage0, currentMemUsageMb() - usage0
+
+
+def test_small_allocations_from_exited_threads_are_released():
+    # RSS depends on everything else the process has done, so measure it in
+    # a fresh one.
+    grownBy, remaining = callFunctionInFreshProcess(memUsageAfterExitedThreadsAllocate, ())
+
+    assert grownBy > 100
+
+    # the threads are gone, and freeing their strings here pushes the blocks
+    # through this thread's cache into the shared pool, which keeps only a
+    # bounded number of them.
+    assert remaining < 30
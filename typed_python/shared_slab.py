@@ -0,0 +1,62 @@
+#   Copyright 2017-2020 typed_python Authors
+#
+#   Licensed under the Apache License, Version 2.0 (the "License");
+#   you may not use this file except in compliance with the License.
+#   You may obtain a copy of the License at
+#
+#       http://www.apache.org/licenses/LICENSE-2.0
+#
+#   Unless required by applicable law or agreed to in writing, software
+#   distributed under the License is distributed on an "AS IS" BASIS,
+#   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#   See the License for the specific language governing permissions and
+#   limitations under the License.
+
+"""Object graphs that many processes can map and use without deserializing.
+
+'saveShared' deepcopies a value into a Slab built inside a file, including
+the Slab object itself, at an address chosen to be free in most processes.
+'openShared' maps the file at that same address, so every pointer inside the
+graph is already valid, and returns the value. Opening is O(1) no matter how
+big the value is: pages fault in as they're touched, and processes that open
+the same file share the physical pages.
+
+Put the file in /dev/shm to keep it in POSIX shared memory rather than on
+disk, e.g. to build a large reference dataset once and open it in every
+worker process on the host:
+
+    saveShared("/dev/shm/prices", Dict(str, ListOf(float)), prices)
+
+    # in each worker
+    prices = openShared("/dev/shm/prices", Dict(str, ListOf(float)))
+
+The file is mapped copy-on-write. Using a value changes refcounts inside it,
+and modifying it writes to it, so the pages involved become private to the
+process. The file never changes, and other processes never see the changes.
+The mapping stays open for the life of the process, and opening the same
+file again reuses it.
+
+Only types whose instances don't refer to anything outside the graph can be
+shared: numbers, strings, bytes, and the containers, Tuples, NamedTuples,
+OneOfs, and Alternatives built from them. Opening fails if the address the
+file was built at is already in use in the process.
+"""
+
+from typed_python._types import writeSharedSlab, attachSharedSlab
+
+MAGIC = b'TPSHARE1'
+
+
+def saveShared(path, T, value):
+    """Write 'value' as a T to 'path' in a form that 'openShared' can map back in."""
+    with open(path, 'wb+') as f:
+        writeSharedSlab(T, value, f.fileno())
+
+
+def openShared(path, T):
+    """Map the T written to 'path' by 'saveShared' into this process and return it."""
+    with open(path, 'rb') as f:
+        if f.read(len(MAGIC)) != MAGIC:
+            raise ValueError("File is not a shared Slab.")
+
+        return attachSharedSlab(T, f.fileno())
@@ -0,0 +1,145 @@
+#   Copyright 2017-2020 typed_python Authors
+#
+#   Licensed under the Apache License, Version 2.0 (the "License");
+#   you may not use this file except in compliance with the License.
+#   You may obtain a copy of the License at
+#
+#       http://www.apache.org/licenses/LICENSE-2.0
+#
+#   Unless required by applicable law or agreed to in writing, software
+#   distributed under the License is distributed on an "AS IS" BASIS,
+#   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#   See the License for the specific language governing permissions and
+#   limitations under the License.
+
+import os
+import subprocess
+import sys
+import tempfile
+import textwrap
+
+import pytest
+
+from typed_python import (
+    Alternative, Class, ConstDict, Dict, ListOf, Member, NamedTuple, OneOf, Set, TupleOf,
+    deepBytecountAndSlabs, refcount
+)
+from typed_python.shared_slab import saveShared, openShared
+
+Quote = NamedTuple(symbol=str, prices=ListOf(float), tags=Set(str))
+
+Tree = Alternative(
+    "Tree",
+    Leaf=dict(value=OneOf(None, int, str)),
+    Node=dict(children=TupleOf(ConstDict(str, float))),
+)
+
+Dataset = Dict(str, ListOf(Quote))
+
+
+def makeDataset():
+    prices = ListOf(float)(range(100))
+
+    d = Dataset()
+
+    for i in range(1000):
+        d[str(i)] = [
+            Quote(symbol=str(i), prices=prices, tags={"a", str(i % 7)}),
+            Quote(symbol="x" * (i % 50), prices=ListOf(float)(range(i % 10)), tags=()),
+        ]
+
+    return d
+
+
+@pytest.fixture
+def sharedPath():
+    with tempfile.TemporaryDirectory() as tempDir:
+        yield os.path.join(tempDir, "shared")
+
+
+def test_shared_slab_round_trip(sharedPath):
+    d = makeDataset()
+
+    saveShared(sharedPath, Dataset, d)
+
+    d2 = openShared(sharedPath, Dataset)
+
+    assert d2 == d
+    assert d2["10"][0].tags == Set(str)({"a", "3"})
+
+    # the whole graph lives in one slab, and sharing is preserved
+    assert len(deepBytecountAndSlabs(d2)[1]) == 1
+    assert refcount(d2["1"][0].prices) == refcount(d["1"][0].prices)
+
+    # opening it again reuses the mapping
+    d3 = openShared(sharedPath, Dataset)
+    assert d3 == d
+    assert len(deepBytecountAndSlabs([d2, d3])[1]) == 1
+
+
+def test_shared_slab_alternatives(sharedPath):
+    tree = Tree.Node(children=(
+        {"a": 1.0},
+        ConstDict(str, float)(),
+    ))
+
+    saveShared(sharedPath, ListOf(Tree), [tree, Tree.Leaf(value="hi"), Tree.Leaf(value=None)])
+
+    trees = openShared(sharedPath, ListOf(Tree))
+
+    assert trees[0] == tree
+    assert trees[1].value == "hi"
+    assert trees[2].value is None
+
+
+def test_shared_slab_is_usable_from_another_process(sharedPath):
+    saveShared(sharedPath, Dataset, makeDataset())
+
+    # writing in this process doesn't change the file
+    d = openShared(sharedPath, Dataset)
+    d["10"][0].prices[0] = 123.0
+    del d["20"]
+
+    script = textwrap.dedent("""
+        import sys
+        from typed_python import Dict, ListOf, NamedTuple, Set
+        from typed_python.shared_slab import openShared
+
+        Quote = NamedTuple(symbol=str, prices=ListOf(float), tags=Set(str))
+
+        d = openShared(sys.argv[1], Dict(str, ListOf(Quote)))
+
+        assert len(d) == 1000
+        assert d["10"][0].prices[0] == 0.0
+        assert d["999"][1].symbol == "x" * 49
+        print("OK")
+    """)
+
+    output = subprocess.check_output(
+        [sys.executable, "-c", script, sharedPath],
+        env=dict(os.environ, PYTHONPATH=os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+    )
+
+    assert output.strip() == b"OK"
+
+
+def test_shared_slab_checks_types(sharedPath):
+    class C(Class):
+        x = Member(int)
+
+    with pytest.raises(TypeError, match="Can't put instances"):
+        saveShared(sharedPath, ListOf(C), [])
+
+    with pytest.raises(TypeError, match="Can't put instances"):
+        saveShared(sharedPath, ListOf(object), [])
+
+    saveShared(sharedPath, ListOf(int), [1, 2, 3])
+
+    with pytest.raises(TypeError, match="doesn't hold an instance"):
+        openShared(sharedPath, ListOf(float))
+
+    with open(sharedPath, "wb") as f:
+        f.write(b"not a shared slab")
+
+    with pytest.raises(ValueError, match="not a shared Slab"):
+        openShared(sharedPath, ListOf(int))
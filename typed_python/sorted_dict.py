@@ -0,0 +1,582 @@
+#   Copyright 2017-2020 typed_python Authors
+#
+#   Licensed under the Apache License, Version 2.0 (the "License");
+#   you may not use this file except in compliance with the License.
+#   You may obtain a copy of the License at
+#
+#       http://www.apache.org/licenses/LICENSE-2.0
+#
+#   Unless required by applicable law or agreed to in writing, software
+#   distributed under the License is distributed on an "AS IS" BASIS,
+#   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#   See the License for the specific language governing permissions and
+#   limitations under the License.
+
+"""Ordered dictionaries and sets with compiled range queries.
+
+Keys are kept in sorted 'leaves' of at most 2 * _LEAF_SIZE keys each, along
+with a list of the largest key in each leaf. This is a B+tree with two levels:
+finding a key is a binary search over the leaf maxima followed by one within a
+leaf, and inserting or removing one only moves the keys of a single leaf.
+Leaves split when they get too big and merge with a neighbor when they get too
+small. A Fenwick tree over the leaf sizes maps between keys and their
+positions in sorted order in O(log n).
+"""
+
+from typed_python import (
+    Class, Final, Member, TypeFunction, ListOf, Tuple, OneOf, Entrypoint,
+    Generator, PointerTo
+)
+from typed_python.lib.sorting import bisectLeft, bisectRight
+
+# leaves split in two once they hold more than twice this many keys
+_LEAF_SIZE = 256
+
+
+def _insertAt(values, ix, value):
+    values.append(value)
+
+    i = len(values) - 1
+    while i > ix:
+        values[i] = values[i - 1]
+        i -= 1
+
+    values[ix] = value
+
+
+def _removeAt(values, ix):
+    for i in range(ix, len(values) - 1):
+        values[i] = values[i + 1]
+
+    values.pop()
+
+
+@TypeFunction
+def SortedDict(K, V):
+    """Create a dictionary from K to V that keeps its keys in sorted order.
+
+    Iterating a SortedDict (or calling 'keys', 'values' or 'items') visits
+    keys in increasing order. In addition to the usual dict methods, keys can
+    be looked up by their position in that order ('keyAt', 'itemAt'), by
+    binary search ('bisectLeft', 'bisectRight'), by their nearest neighbor
+    ('floorKey', 'ceilingKey'), or by range ('irange', 'irangeItems').
+    Inserting and removing keys takes O(log n) comparisons.
+
+    Keys are removed with 'remove' or 'pop', since Class doesn't dispatch
+    'del d[key]'. K must be totally ordered by '<'. Don't modify a
+    SortedDict while iterating over it.
+    """
+    class SortedDict(Class, Final):
+        KeyType = K
+        ValueType = V
+
+        # the keys in each leaf, and their values
+        _keys = Member(ListOf(ListOf(K)))
+        _values = Member(ListOf(ListOf(V)))
+
+        # the largest key in each leaf
+        _maxes = Member(ListOf(K))
+
+        # a Fenwick tree over the sizes of the leaves
+        _index = Member(ListOf(int))
+
+        _len = Member(int)
+
+        @Entrypoint
+        def __len__(self) -> int:
+            return self._len
+
+        @Entrypoint
+        def __contains__(self, key: K) -> bool:
+            leaf = bisectLeft(self._maxes, key)
+
+            if leaf == len(self._maxes):
+                return False
+
+            keys = self._keys[leaf]
+
+            return keys[bisectLeft(keys, key)] == key
+
+        @Entrypoint
+        def __getitem__(self, key: K) -> V:
+            leaf = bisectLeft(self._maxes, key)
+
+            if leaf < len(self._maxes):
+                keys = self._keys[leaf]
+                i = bisectLeft(keys, key)
+
+                if keys[i] == key:
+                    return self._values[leaf][i]
+
+            raise KeyError(key)
+
+        @Entrypoint
+        def __setitem__(self, key: K, value: V) -> None:
+            if not self._keys:
+                self._keys.append(ListOf(K)([key]))
+                self._values.append(ListOf(V)([value]))
+                self._maxes.append(key)
+                self._len = 1
+                self._rebuildIndex()
+                return
+
+            leaf = bisectLeft(self._maxes, key)
+
+            # keys beyond the largest one we have go in the last leaf
+            if leaf == len(self._maxes):
+                leaf -= 1
+
+            keys = self._keys[leaf]
+            i = bisectLeft(keys, key)
+
+            if i < len(keys) and keys[i] == key:
+                self._values[leaf][i] = value
+                return
+
+            _insertAt(keys, i, key)
+            _insertAt(self._values[leaf], i, value)
+
+            self._maxes[leaf] = keys[len(keys) - 1]
+            self._len += 1
+
+            if len(keys) > 2 * _LEAF_SIZE:
+                self._split(leaf)
+            else:
+                self._addToIndex(leaf, 1)
+
+        @Entrypoint
+        def remove(self, key: K) -> None:
+            """Remove 'key', raising KeyError if it's missing."""
+            leaf = bisectLeft(self._maxes, key)
+
+            if leaf < len(self._maxes):
+                i = bisectLeft(self._keys[leaf], key)
+
+                if self._keys[leaf][i] == key:
+                    self._removeFromLeaf(leaf, i)
+                    return
+
+            raise KeyError(key)
+
+        def __iter__(self):
+            return SortedDictIterator(sortedDict=self)
+
+        @Entrypoint
+        def get(self, key: K, default: V) -> V:
+            leaf = bisectLeft(self._maxes, key)
+
+            if leaf < len(self._maxes):
+                keys = self._keys[leaf]
+                i = bisectLeft(keys, key)
+
+                if keys[i] == key:
+                    return self._values[leaf][i]
+
+            return default
+
+        @Entrypoint
+        def pop(self, key: K, default: V) -> V:
+            """Remove 'key' and return its value, or return 'default' if it's missing."""
+            leaf = bisectLeft(self._maxes, key)
+
+            if leaf < len(self._maxes):
+                i = bisectLeft(self._keys[leaf], key)
+
+                if self._keys[leaf][i] == key:
+                    res = self._values[leaf][i]
+                    self._removeFromLeaf(leaf, i)
+                    return res
+
+            return default
+
+        @Entrypoint
+        def setdefault(self, key: K, default: V) -> V:
+            """Insert 'default' if 'key' is missing. Return the value at 'key'."""
+            if key not in self:
+                self[key] = default
+
+            return self[key]
+
+        @Entrypoint
+        def clear(self) -> None:
+            self._keys.clear()
+            self._values.clear()
+            self._maxes.clear()
+            self._index.clear()
+            self._len = 0
+
+        @Entrypoint
+        def bisectLeft(self, key: K) -> int:
+            """Return the position of the first key that's not less than 'key'."""
+            leaf = bisectLeft(self._maxes, key)
+
+            if leaf == len(self._maxes):
+                return self._len
+
+            return self._keysBefore(leaf) + bisectLeft(self._keys[leaf], key)
+
+        @Entrypoint
+        def bisectRight(self, key: K) -> int:
+            """Return the position of the first key that's greater than 'key'."""
+            leaf = bisectRight(self._maxes, key)
+
+            if leaf == len(self._maxes):
+                return self._len
+
+            return self._keysBefore(leaf) + bisectRight(self._keys[leaf], key)
+
+        @Entrypoint
+        def keyAt(self, pos: int) -> K:
+            """Return the key at position 'pos' in sorted order.
+
+            Negative positions count back from the end, as they do for lists.
+            """
+            leaf, i = self._locate(pos)
+
+            return self._keys[leaf][i]
+
+        @Entrypoint
+        def itemAt(self, pos: int) -> Tuple(K, V):
+            """Return the (key, value) pair at position 'pos' in sorted order."""
+            leaf, i = self._locate(pos)
+
+            return Tuple(K, V)((self._keys[leaf][i], self._values[leaf][i]))
+
+        @Entrypoint
+        def floorKey(self, key: K) -> OneOf(None, K):
+            """Return the largest key that's less than or equal to 'key', or None."""
+            pos = self.bisectRight(key)
+
+            if pos == 0:
+                return None
+
+            return self.keyAt(pos - 1)
+
+        @Entrypoint
+        def ceilingKey(self, key: K) -> OneOf(None, K):
+            """Return the smallest key that's greater than or equal to 'key', or None."""
+            pos = self.bisectLeft(key)
+
+            if pos == self._len:
+                return None
+
+            return self.keyAt(pos)
+
+        @Entrypoint
+        def irange(self, lo: K, hi: K) -> ListOf(K):
+            """Return the keys 'k' with 'lo <= k <= hi', in increasing order."""
+            res = ListOf(K)()
+
+            leaf = bisectLeft(self._maxes, lo)
+
+            if leaf == len(self._maxes):
+                return res
+
+            i = bisectLeft(self._keys[leaf], lo)
+
+            while leaf < len(self._keys):
+                keys = self._keys[leaf]
+
+                while i < len(keys):
+                    if hi < keys[i]:
+                        return res
+
+                    res.append(keys[i])
+                    i += 1
+
+                leaf += 1
+                i = 0
+
+            return res
+
+        @Entrypoint
+        def irangeItems(self, lo: K, hi: K) -> ListOf(Tuple(K, V)):
+            """Return the (key, value) pairs with 'lo <= key <= hi', in key order."""
+            res = ListOf(Tuple(K, V))()
+
+            leaf = bisectLeft(self._maxes, lo)
+
+            if leaf == len(self._maxes):
+                return res
+
+            i = bisectLeft(self._keys[leaf], lo)
+
+            while leaf < len(self._keys):
+                keys = self._keys[leaf]
+                values = self._values[leaf]
+
+                while i < len(keys):
+                    if hi < keys[i]:
+                        return res
+
+                    res.append(Tuple(K, V)((keys[i], values[i])))
+                    i += 1
+
+                leaf += 1
+                i = 0
+
+            return res
+
+        @Entrypoint
+        def keys(self) -> ListOf(K):
+            res = ListOf(K)()
+            res.reserve(self._len)
+
+            for keys in self._keys:
+                res.extend(keys)
+
+            return res
+
+        @Entrypoint
+        def values(self) -> ListOf(V):
+            res = ListOf(V)()
+            res.reserve(self._len)
+
+            for values in self._values:
+                res.extend(values)
+
+            return res
+
+        @Entrypoint
+        def items(self) -> ListOf(Tuple(K, V)):
+            res = ListOf(Tuple(K, V))()
+            res.reserve(self._len)
+
+            for leaf in range(len(self._keys)):
+                keys = self._keys[leaf]
+                values = self._values[leaf]
+
+                for i in range(len(keys)):
+                    res.append(Tuple(K, V)((keys[i], values[i])))
+
+            return res
+
+        @Entrypoint
+        def _removeFromLeaf(self, leaf: int, i: int) -> None:
+            keys = self._keys[leaf]
+            values = self._values[leaf]
+
+            _removeAt(keys, i)
+            _removeAt(values, i)
+            self._len -= 1
+
+            if not keys:
+                _removeAt(self._keys, leaf)
+                _removeAt(self._values, leaf)
+                _removeAt(self._maxes, leaf)
+                self._rebuildIndex()
+                return
+
+            self._maxes[leaf] = keys[len(keys) - 1]
+
+            if len(keys) >= _LEAF_SIZE // 2 or len(self._keys) == 1:
+                self._addToIndex(leaf, -1)
+                return
+
+            # fold the leaf into a neighbor, and split the result again if
+            # it ends up too big
+            if leaf == 0:
+                leaf = 1
+
+            self._keys[leaf - 1].extend(self._keys[leaf])
+            self._values[leaf - 1].extend(self._values[leaf])
+            self._maxes[leaf - 1] = self._maxes[leaf]
+
+            _removeAt(self._keys, leaf)
+            _removeAt(self._values, leaf)
+            _removeAt(self._maxes, leaf)
+
+            if len(self._keys[leaf - 1]) > 2 * _LEAF_SIZE:
+                self._split(leaf - 1)
+            else:
+                self._rebuildIndex()
+
+        @Entrypoint
+        def _split(self, leaf: int) -> None:
+            keys = self._keys[leaf]
+            values = self._values[leaf]
+
+            newKeys = keys[_LEAF_SIZE:]
+            newValues = values[_LEAF_SIZE:]
+
+            while len(keys) > _LEAF_SIZE:
+                keys.pop()
+                values.pop()
+
+            _insertAt(self._keys, leaf + 1, newKeys)
+            _insertAt(self._values, leaf + 1, newValues)
+
+            self._maxes[leaf] = keys[len(keys) - 1]
+            _insertAt(self._maxes, leaf + 1, newKeys[len(newKeys) - 1])
+
+            self._rebuildIndex()
+
+        @Entrypoint
+        def _rebuildIndex(self) -> None:
+            leafCount = len(self._keys)
+
+            self._index.clear()
+            self._index.resize(leafCount + 1)
+
+            for i in range(1, leafCount + 1):
+                self._index[i] += len(self._keys[i - 1])
+
+                parent = i + (i & -i)
+                if parent <= leafCount:
+                    self._index[parent] += self._index[i]
+
+        @Entrypoint
+        def _addToIndex(self, leaf: int, delta: int) -> None:
+            i = leaf + 1
+
+            while i < len(self._index):
+                self._index[i] += delta
+                i += i & -i
+
+        @Entrypoint
+        def _keysBefore(self, leaf: int) -> int:
+            """Return the number of keys in the leaves before 'leaf'."""
+            res = 0
+            i = leaf
+
+            while i > 0:
+                res += self._index[i]
+                i -= i & -i
+
+            return res
+
+        @Entrypoint
+        def _locate(self, pos: int) -> Tuple(int, int):
+            """Return the leaf holding the key at position 'pos', and its index there."""
+            if pos < 0:
+                pos += self._len
+
+            if pos < 0 or pos >= self._len:
+                raise IndexError("SortedDict index out of range")
+
+            leaf = 0
+            step = 1
+            while step * 2 < len(self._index):
+                step *= 2
+
+            while step > 0:
+                if leaf + step < len(self._index) and self._index[leaf + step] <= pos:
+                    leaf += step
+                    pos -= self._index[leaf]
+                step //= 2
+
+            return Tuple(int, int)((leaf, pos))
+
+    class SortedDictIterator(Generator(K), Final):
+        sortedDict = Member(SortedDict)
+        leaf = Member(int)
+        pos = Member(int)
+
+        def __init__(self, sortedDict: SortedDict):
+            self.sortedDict = sortedDict
+            self.pos = -1
+
+        @Entrypoint
+        def __fastnext__(self) -> PointerTo(K):
+            leaves = self.sortedDict._keys
+
+            if self.leaf >= len(leaves):
+                return PointerTo(K)()
+
+            self.pos += 1
+
+            if self.pos >= len(leaves[self.leaf]):
+                self.leaf += 1
+                self.pos = 0
+
+                if self.leaf >= len(leaves):
+                    return PointerTo(K)()
+
+            return leaves[self.leaf].pointerUnsafe(self.pos)
+
+    return SortedDict
+
+
+@TypeFunction
+def SortedSet(T):
+    """Create a set of T that keeps its elements in sorted order.
+
+    SortedSet supports the same ordered queries as SortedDict: lookups by
+    position ('at'), binary search ('bisectLeft', 'bisectRight'), nearest
+    neighbors ('floor', 'ceiling') and ranges ('irange').
+    """
+    class SortedSet(Class, Final):
+        ElementType = T
+
+        _items = Member(SortedDict(T, None))
+
+        def __init__(self):
+            self._items = SortedDict(T, None)()
+
+        def __init__(self, elements):  # noqa: F811
+            self._items = SortedDict(T, None)()
+
+            for e in elements:
+                self.add(e)
+
+        @Entrypoint
+        def __len__(self) -> int:
+            return len(self._items)
+
+        @Entrypoint
+        def __contains__(self, element: T) -> bool:
+            return element in self._items
+
+        def __iter__(self):
+            return self._items.__iter__()
+
+        @Entrypoint
+        def add(self, element: T) -> None:
+            self._items[element] = None
+
+        @Entrypoint
+        def remove(self, element: T) -> None:
+            self._items.remove(element)
+
+        @Entrypoint
+        def discard(self, element: T) -> None:
+            if element in self._items:
+                self._items.remove(element)
+
+        @Entrypoint
+        def clear(self) -> None:
+            self._items.clear()
+
+        @Entrypoint
+        def bisectLeft(self, element: T) -> int:
+            return self._items.bisectLeft(element)
+
+        @Entrypoint
+        def bisectRight(self, element: T) -> int:
+            return self._items.bisectRight(element)
+
+        @Entrypoint
+        def at(self, pos: int) -> T:
+            """Return the element at position 'pos' in sorted order."""
+            return self._items.keyAt(pos)
+
+        @Entrypoint
+        def floor(self, element: T) -> OneOf(None, T):
+            """Return the largest element less than or equal to 'element', or None."""
+            return self._items.floorKey(element)
+
+        @Entrypoint
+        def ceiling(self, element: T) -> OneOf(None, T):
+            """Return the smallest element greater than or equal to 'element', or None."""
+            return self._items.ceilingKey(element)
+
+        @Entrypoint
+        def irange(self, lo: T, hi: T) -> ListOf(T):
+            """Return the elements 'e' with 'lo <= e <= hi', in increasing order."""
+            return self._items.irange(lo, hi)
+
+        @Entrypoint
+        def toList(self) -> ListOf(T):
+            return self._items.keys()
+
+    return SortedSet
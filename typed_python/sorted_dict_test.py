@@ -0,0 +1,185 @@
+#   Copyright 2017-2020 typed_python Authors
+#
+#   Licensed under the Apache License, Version 2.0 (the "License");
+#   you may not use this file except in compliance with the License.
+#   You may obtain a copy of the License at
+#
+#       http://www.apache.org/licenses/LICENSE-2.0
+#
+#   Unless required by applicable law or agreed to in writing, software
+#   distributed under the License is distributed on an "AS IS" BASIS,
+#   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#   See the License for the specific language governing permissions and
+#   limitations under the License.
+
+import bisect
+import random
+
+import pytest
+
+from typed_python import NamedTuple, Entrypoint, SerializationContext
+from typed_python.sorted_dict import SortedDict, SortedSet
+
+
+def test_sorted_dict_basic():
+    d = SortedDict(str, int)()
+
+    d["b"] = 2
+    d["a"] = 1
+    d["c"] = 3
+    d["b"] = 20
+
+    assert len(d) == 3
+    assert list(d) == ["a", "b", "c"]
+    assert d.values() == [1, 20, 3]
+    assert d.items() == [("a", 1), ("b", 20), ("c", 3)]
+    assert d["b"] == 20
+    assert "c" in d and "d" not in d
+    assert d.get("d", -1) == -1
+
+    with pytest.raises(KeyError):
+        d["d"]
+
+    with pytest.raises(KeyError):
+        d.remove("d")
+
+    assert d.setdefault("d", 4) == 4
+    assert d.pop("a", -1) == 1
+    assert d.pop("a", -1) == -1
+
+    d.remove("c")
+    assert d.keys() == ["b", "d"]
+
+    d.clear()
+    assert len(d) == 0
+    assert list(d) == []
+    assert d.floorKey("a") is None
+
+
+def test_sorted_dict_ordered_queries():
+    d = SortedDict(int, str)()
+
+    for k in [50, 10, 40, 20, 30]:
+        d[k] = str(k)
+
+    assert d.bisectLeft(30) == 2
+    assert d.bisectRight(30) == 3
+    assert d.keyAt(0) == 10
+    assert d.keyAt(-1) == 50
+    assert d.itemAt(1) == (20, "20")
+    assert d.floorKey(35) == 30
+    assert d.floorKey(30) == 30
+    assert d.floorKey(5) is None
+    assert d.ceilingKey(35) == 40
+    assert d.ceilingKey(55) is None
+    assert d.irange(15, 40) == [20, 30, 40]
+    assert d.irange(60, 70) == []
+    assert d.irangeItems(0, 20) == [(10, "10"), (20, "20")]
+
+    with pytest.raises(IndexError):
+        d.keyAt(5)
+
+
+def test_sorted_dict_matches_dict_across_many_leaves():
+    d = SortedDict(int, int)()
+    reference = {}
+
+    random.seed(42)
+
+    for _ in range(20000):
+        k = random.randint(0, 5000)
+
+        if random.random() < 0.6:
+            d[k] = k * 2
+            reference[k] = k * 2
+        else:
+            assert d.pop(k, -1) == reference.pop(k, -1)
+
+    keys = sorted(reference)
+
+    assert len(d) == len(keys)
+    assert d.keys() == keys
+    assert d.values() == [reference[k] for k in keys]
+
+    for k in range(0, 5000, 37):
+        assert d.bisectLeft(k) == bisect.bisect_left(keys, k)
+        assert d.bisectRight(k) == bisect.bisect_right(keys, k)
+        assert d.keyAt(d.bisectLeft(k)) == keys[bisect.bisect_left(keys, k)]
+        assert d.irange(k, k + 100) == [x for x in keys if k <= x <= k + 100]
+
+    # removing everything merges leaves back together
+    for k in keys:
+        d.remove(k)
+
+    assert len(d) == 0
+    assert d.keys() == []
+
+
+def test_sorted_set():
+    s = SortedSet(float)([3.0, 1.0, 2.0, 1.0])
+
+    assert len(s) == 3
+    assert list(s) == [1.0, 2.0, 3.0]
+    assert s.toList() == [1.0, 2.0, 3.0]
+    assert 2.0 in s
+    assert s.at(-1) == 3.0
+    assert s.floor(2.5) == 2.0
+    assert s.ceiling(2.5) == 3.0
+    assert s.irange(1.5, 3.0) == [2.0, 3.0]
+
+    s.discard(2.0)
+    s.discard(2.0)
+
+    with pytest.raises(KeyError):
+        s.remove(2.0)
+
+    assert s.toList() == [1.0, 3.0]
+
+
+def test_sorted_dict_in_compiled_code():
+    Prices = SortedDict(int, float)
+
+    @Entrypoint
+    def fill(d: Prices, count: int):
+        for t in range(count):
+            d[(t * 7919) % count] = float(t)
+
+    @Entrypoint
+    def sumRange(d: Prices, lo: int, hi: int):
+        res = 0.0
+        for t in d.irange(lo, hi):
+            res += d[t]
+        return res
+
+    @Entrypoint
+    def sumKeys(d: Prices):
+        res = 0
+        for t in d:
+            res += t
+        return res
+
+    d = Prices()
+    fill(d, 10000)
+
+    assert len(d) == 10000
+    assert sumKeys(d) == sum(range(10000))
+    assert sumRange(d, 100, 200) == sum(d[t] for t in range(100, 201))
+
+
+def test_sorted_containers_as_members_and_serialized():
+    Index = NamedTuple(name=str, times=SortedSet(int), values=SortedDict(int, str))
+
+    times = SortedSet(int)([3, 1, 2])
+    values = SortedDict(int, str)()
+    values[2] = "two"
+    values[1] = "one"
+
+    index = Index(name="x", times=times, values=values)
+
+    context = SerializationContext()
+    copy = context.deserialize(context.serialize(index, Index), Index)
+
+    assert copy.name == "x"
+    assert copy.times.toList() == [1, 2, 3]
+    assert copy.values.items() == [(1, "one"), (2, "two")]
+    assert copy.values.floorKey(5) == 2
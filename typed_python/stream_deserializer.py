@@ -0,0 +1,159 @@
+#   Copyright 2017-2020 typed_python Authors
+#
+#   Licensed under the Apache License, Version 2.0 (the "License");
+#   you may not use this file except in compliance with the License.
+#   You may obtain a copy of the License at
+#
+#       http://www.apache.org/licenses/LICENSE-2.0
+#
+#   Unless required by applicable law or agreed to in writing, software
+#   distributed under the License is distributed on an "AS IS" BASIS,
+#   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#   See the License for the specific language governing permissions and
+#   limitations under the License.
+
+import os
+import struct
+
+from typed_python._types import TupleOf, DeserializationStream, completeMessagesBytecount
+
+# partial values bigger than this get rescanned when their size doubles,
+# rather than on every chunk.
+_RESCAN_DOUBLING_THRESHOLD = 1024 * 1024
+
+
+class Deserializer:
+    """Decode a stream of serialized values of type T incrementally, as its bytes arrive.
+
+    The stream is what 'serializeStream(T, ...)' wrote. Hand it bytes in
+    chunks of any size with 'feed', which returns the values the new bytes
+    completed, or let 'readFrom' pull them from a file, file descriptor, or
+    socket.
+
+    Values in a stream can refer back to objects (lists, dicts, Classes,
+    python objects) written earlier in it, so we decode the whole stream with
+    one memo, which keeps those objects alive as long as the Deserializer.
+    For the same reason, separately written streams (or 'serialize(T, x)'
+    calls) appended together can only be read as one stream if their values
+    hold none of those objects, since each numbers its memo from zero.
+
+    Apart from the memo, we only hold the bytes of values we haven't finished
+    yet. To avoid rescanning a large (over 1mb) partial value on every chunk, we wait
+    until its bytes have doubled before looking for its end again, so values
+    that big may be returned a few chunks late.
+
+    Example:
+
+        d = Deserializer(T)
+        for value in d.readFrom(open("records.log", "rb")):
+            ...
+    """
+
+    def __init__(self, T, context=None):
+        self.T = T
+        self.context = context
+
+        # the context to decode the decompressed messages with
+        self._messageContext = (
+            context._uncompressed() if context is not None and context.compressionEnabled else context
+        )
+
+        # bytes of compressed blocks we haven't seen the end of
+        self._compressed = bytearray()
+
+        # decompressed bytes of values we haven't decoded
+        self._pending = bytearray()
+
+        self._scanWhenPendingReaches = 1
+
+        self._stream = DeserializationStream(T, self._messageContext)
+
+    def feed(self, data):
+        """Add the next chunk of the stream and return a TupleOf(T) of the values it completed."""
+        if self._messageContext is not self.context:
+            self._compressed += data
+            self._decompressCompleteBlocks()
+        else:
+            self._pending += data
+
+        if len(self._pending) < self._scanWhenPendingReaches:
+            return TupleOf(self.T)()
+
+        bytecount = completeMessagesBytecount(self._pending)
+
+        if bytecount:
+            values = self._stream.read(memoryview(self._pending)[:bytecount])
+            del self._pending[:bytecount]
+        else:
+            values = TupleOf(self.T)()
+
+        if len(self._pending) > _RESCAN_DOUBLING_THRESHOLD:
+            self._scanWhenPendingReaches = len(self._pending) * 2
+        else:
+            self._scanWhenPendingReaches = 1
+
+        return values
+
+    def readFrom(self, source, chunkSize=1024 * 1024 * 16):
+        """Read 'source' to its end, yielding each value as soon as it's complete.
+
+        Args:
+            source - a file descriptor, a socket, or a file-like object
+                with a 'read' method.
+            chunkSize - how many bytes to ask for at a time.
+        """
+        if isinstance(source, int):
+            def read():
+                return os.read(source, chunkSize)
+        elif hasattr(source, 'recv'):
+            def read():
+                return source.recv(chunkSize)
+        else:
+            def read():
+                return source.read(chunkSize)
+
+        while True:
+            chunk = read()
+
+            if not chunk:
+                break
+
+            # don't hold onto the chunk while the caller processes values
+            values = self.feed(chunk)
+            del chunk
+
+            yield from values
+
+        yield from self.finish()
+
+    def finish(self):
+        """Mark the end of the stream, and return a TupleOf(T) of any values not yet returned.
+
+        Raises a TypeError if the stream ended partway through a value.
+        """
+        self._scanWhenPendingReaches = 1
+
+        values = self.feed(b"")
+
+        if self._pending or self._compressed:
+            raise TypeError(
+                f"Stream ended with {len(self._pending) + len(self._compressed)} bytes of an incomplete value."
+            )
+
+        return values
+
+    def _decompressCompleteBlocks(self):
+        # compressed streams are a sequence of blocks, each a 4 byte length
+        # followed by that many bytes of compressed data. See SerializationBuffer.
+        pos = 0
+
+        while pos + 4 <= len(self._compressed):
+            blockBytecount = struct.unpack_from("=I", self._compressed, pos)[0]
+
+            if pos + 4 + blockBytecount > len(self._compressed):
+                break
+
+            self._pending += self.context.decompress(bytes(self._compressed[pos + 4:pos + 4 + blockBytecount]))
+            pos += 4 + blockBytecount
+
+        del self._compressed[:pos]
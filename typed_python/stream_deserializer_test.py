@@ -0,0 +1,155 @@
+#   Copyright 2017-2020 typed_python Authors
+#
+#   Licensed under the Apache License, Version 2.0 (the "License");
+#   you may not use this file except in compliance with the License.
+#   You may obtain a copy of the License at
+#
+#       http://www.apache.org/licenses/LICENSE-2.0
+#
+#   Unless required by applicable law or agreed to in writing, software
+#   distributed under the License is distributed on an "AS IS" BASIS,
+#   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#   See the License for the specific language governing permissions and
+#   limitations under the License.
+
+import os
+import random
+import socket
+import tempfile
+import threading
+
+import pytest
+
+from typed_python import (
+    NamedTuple, ListOf, OneOf, Deserializer, SerializationContext, serialize, serializeStream
+)
+
+Record = NamedTuple(key=str, values=ListOf(float), extra=OneOf(None, int, str))
+
+
+def makeRecords(count):
+    return ListOf(Record)([
+        Record(key="k" + str(i), values=[float(j) for j in range(i % 50)], extra=i if i % 2 else None)
+        for i in range(count)
+    ])
+
+
+def test_deserializer_with_arbitrary_chunks():
+    records = makeRecords(500)
+    data = serializeStream(Record, records)
+
+    random.seed(1)
+
+    for maxChunk in [1, 7, 1000, len(data)]:
+        d = Deserializer(Record)
+        res = []
+        pos = 0
+
+        while pos < len(data):
+            chunk = random.randint(1, maxChunk)
+            res.extend(d.feed(data[pos:pos + chunk]))
+            pos += chunk
+
+        res.extend(d.finish())
+
+        assert res == list(records)
+
+
+def test_deserializer_keeps_the_memo_across_chunks():
+    T = ListOf(int)
+    x = T([1, 2, 3])
+
+    # the later values are references to the first
+    data = serializeStream(T, [x, x, x])
+
+    d = Deserializer(T)
+    res = []
+
+    for i in range(len(data)):
+        res.extend(d.feed(data[i:i + 1]))
+
+    res.extend(d.finish())
+
+    assert res == [x] * 3
+
+    # and they all share one list
+    res[0].append(4)
+
+    assert res[2] == [1, 2, 3, 4]
+
+
+def test_deserializer_returns_values_as_soon_as_complete():
+    data = serializeStream(Record, [Record(key="a"), Record(key="b")])
+    split = len(serialize(Record, Record(key="a")))
+
+    d = Deserializer(Record)
+
+    assert d.feed(data[:split - 1]) == ()
+    assert d.feed(data[split - 1:split + 1]) == (Record(key="a"),)
+    assert d.feed(data[split + 1:]) == (Record(key="b"),)
+    assert d.finish() == ()
+
+
+def test_deserializer_rejects_truncated_and_corrupt_streams():
+    data = serializeStream(Record, makeRecords(3))
+
+    d = Deserializer(Record)
+    d.feed(data[:-2])
+
+    with pytest.raises(TypeError, match="incomplete value"):
+        d.finish()
+
+    # a complete message that isn't a Record
+    with pytest.raises(Exception):
+        Deserializer(Record).feed(serialize(int, 10))
+
+
+def test_deserializer_with_compressed_stream():
+    context = SerializationContext()
+    records = makeRecords(2000)
+
+    data = serializeStream(Record, records, context)
+
+    d = Deserializer(Record, context)
+    res = []
+
+    for i in range(0, len(data), 999):
+        res.extend(d.feed(data[i:i + 999]))
+
+    res.extend(d.finish())
+
+    assert res == list(records)
+
+
+def test_deserializer_reads_files_and_sockets():
+    records = makeRecords(1000)
+    data = serializeStream(Record, records)
+
+    with tempfile.TemporaryDirectory() as tf:
+        path = os.path.join(tf, "log")
+
+        with open(path, "wb") as f:
+            f.write(data)
+
+        with open(path, "rb") as f:
+            assert list(Deserializer(Record).readFrom(f, chunkSize=4096)) == list(records)
+
+        fd = os.open(path, os.O_RDONLY)
+        try:
+            assert list(Deserializer(Record).readFrom(fd)) == list(records)
+        finally:
+            os.close(fd)
+
+    left, right = socket.socketpair()
+
+    def write():
+        with left:
+            left.sendall(data)
+
+    writer = threading.Thread(target=write)
+    writer.start()
+
+    with right:
+        assert list(Deserializer(Record).readFrom(right, chunkSize=1000)) == list(records)
+
+    writer.join()
@@ -565,6 +565,96 @@ class TypesSerializationTest(unittest.TestCase):
 
         self.assertTrue(sizeNotCompressed > sizeCompressed * 2, (sizeNotCompressed, sizeCompressed))
 
+    def test_serialize_with_parallel_block_compression(self):
+        T = ListOf(float)
+
+        # big enough for several 10mb blocks
+        x = T(numpy.arange(4000000) % 1000)
+
+        ts = SerializationContext()
+        parallel = ts.withCompressionCodec("lz4", threads=4)
+
+        data = parallel.serialize(x, T)
+
+        # the framing is the same, so either context reads what the other wrote
+        self.assertEqual(ts.deserialize(data, T), x)
+        self.assertEqual(parallel.deserialize(data, T), x)
+        self.assertEqual(parallel.deserialize(ts.serialize(x, T), T), x)
+
+        self.assertLess(len(data), len(ts.withoutCompression().serialize(x, T)) / 2)
+
+        with self.assertRaisesRegex(ValueError, "Unknown compression codec"):
+            ts.withCompressionCodec("snappy")
+
+    def test_module_level_serialize_compresses_in_parallel(self):
+        T = ListOf(float)
+
+        x = T(numpy.arange(4000000) % 1000)
+
+        parallel = SerializationContext().withCompressionCodec("lz4", threads=4)
+
+        data = serialize(T, x, parallel)
+
+        self.assertEqual(data, parallel.serialize(x, T))
+        self.assertEqual(deserialize(T, data, parallel), x)
+        self.assertEqual(deserialize(T, parallel.serialize(x, T), parallel), x)
+
+    def test_serialize_with_zstd(self):
+        pytest.importorskip("zstandard")
+
+        x = ListOf(int)(range(100000))
+
+        for threads in [1, 2]:
+            ts = SerializationContext().withCompressionCodec("zstd", level=10, threads=threads)
+            self.assertEqual(ts.deserialize(ts.serialize(x, ListOf(int)), ListOf(int)), x)
+
+    def test_serialize_with_dedup(self):
+        T = ListOf(NamedTuple(name=str, kind=str, payload=bytes, tags=TupleOf(str)))
+
+        tags = TupleOf(str)(["a", "b"])
+        x = T([
+            dict(name="row" + str(i), kind="a long repeated string " * 4, payload=b"some bytes", tags=tags)
+            for i in range(1000)
+        ])
+
+        ts = SerializationContext().withoutCompression()
+        dedup = ts.withDedup()
+
+        self.assertTrue(dedup.dedupEnabled)
+        self.assertIs(dedup.withDedup(), dedup)
+
+        data = dedup.serialize(x, T)
+
+        self.assertLess(len(data), len(ts.serialize(x, T)) / 4)
+
+        # the format is self-describing, so a context without dedup can read it
+        self.assertEqual(ts.deserialize(data, T), x)
+
+        compressed = dedup.withCompression()
+        self.assertEqual(compressed.deserialize(compressed.serialize(x, T), T), x)
+
+        x2 = dedup.deserialize(data, T)
+
+        # repeated values share a single copy
+        self.assertEqual(refcount(x2[0].tags), len(x2) + 1)
+
+    def test_serialize_with_dedup_of_mixed_values(self):
+        T = ListOf(OneOf(None, str, bytes, ConstDict(str, int), TupleOf(int)))
+
+        d = ConstDict(str, int)({"hi": 1})
+        t = TupleOf(int)([1, 2, 3])
+
+        # strings and bytes with the same contents are different values, and
+        # empty values have nothing to share
+        x = T(["abcd", b"abcd", "abcd", b"abcd", d, t, d, t, "", b"", ConstDict(str, int)(), None, "\u1234abcd"] * 3)
+
+        dedup = SerializationContext().withDedup()
+
+        x2 = dedup.deserialize(dedup.serialize(x, T), T)
+
+        self.assertEqual(x2, x)
+        self.assertEqual([type(v) for v in x2], [type(v) for v in x])
+
     def test_serialize_and_numpy_with_dicts(self):
         x = numpy.ones(10000)
 
@@ -31,7 +31,7 @@ from typed_python import (
     Float32,
     TupleOf, ListOf, OneOf, Tuple, NamedTuple, Dict,
     ConstDict, Alternative, serialize, deserialize, Class,
-    TypeFilter, Function, Forward, Set, PointerTo, Entrypoint
+    TypeFilter, Function, Forward, Set, PointerTo, Entrypoint, deepcopy
 )
 from typed_python.type_promotion import (
     computeArithmeticBinaryResultType, floatness, bitness, isSignedInt
@@ -1042,6 +1042,69 @@ class NativeTypesTests(unittest.TestCase):
             self.assertTrue(k in d)
             self.assertTrue(d[k] == k)
 
+    def test_const_dict_incremental_updates(self):
+        t = ConstDict(int, TupleOf(int))
+        numpy.random.seed(42)
+
+        aDict = t({k: (k,) for k in range(0, 2000, 2)})
+        pyDict = {k: (k,) for k in range(0, 2000, 2)}
+        snapshots = []
+
+        for i in range(3000):
+            k = int(numpy.random.randint(-100, 2100))
+
+            if numpy.random.rand() < 0.6:
+                aDict = aDict + {k: (k, i)}
+                pyDict[k] = (k, i)
+            else:
+                aDict = aDict - (k,)
+                pyDict.pop(k, None)
+
+            if i % 500 == 0:
+                snapshots.append((aDict, dict(pyDict)))
+
+        snapshots.append((aDict, dict(pyDict)))
+
+        # earlier versions are unaffected by later updates
+        for snapshot, pySnapshot in snapshots:
+            self.assertEqual(len(snapshot), len(pySnapshot))
+            self.assertEqual(list(snapshot), sorted(pySnapshot))
+            self.assertEqual(list(snapshot.values()), [pySnapshot[k] for k in sorted(pySnapshot)])
+            self.assertEqual(snapshot, t(pySnapshot))
+            self.assertEqual(hash(snapshot), hash(t(pySnapshot)))
+            self.assertEqual(str(snapshot), str(t(pySnapshot)))
+
+            for k in range(-101, 2101):
+                self.assertEqual(k in snapshot, k in pySnapshot)
+                self.assertEqual(snapshot.get(k), pySnapshot.get(k))
+
+            self.assertEqual(deserialize(t, serialize(t, snapshot)), snapshot)
+            self.assertEqual(deepcopy(snapshot), snapshot)
+
+        # removing everything leaves an empty dict
+        for k in list(pyDict):
+            aDict = aDict - (k,)
+
+        self.assertEqual(aDict, t())
+        self.assertEqual(len(aDict), 0)
+
+    def test_const_dict_incremental_updates_release_values(self):
+        t = ConstDict(int, TupleOf(int))
+
+        value = TupleOf(int)([1, 2, 3])
+
+        aDict = t({k: value for k in range(1000)})
+        for k in range(1000, 1200):
+            aDict = aDict + {k: value}
+        for k in range(0, 1200, 3):
+            aDict = aDict - (k,)
+
+        self.assertEqual(_types.refcount(value), 1 + 800)
+
+        aDict = None
+
+        self.assertEqual(_types.refcount(value), 1)
+
     def test_const_dict_of_dict(self):
         int_dict = ConstDict(int, int)
         int_dict_2 = ConstDict(int_dict, int_dict)
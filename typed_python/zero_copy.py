@@ -0,0 +1,124 @@
+#   Copyright 2017-2020 typed_python Authors
+#
+#   Licensed under the Apache License, Version 2.0 (the "License");
+#   you may not use this file except in compliance with the License.
+#   You may obtain a copy of the License at
+#
+#       http://www.apache.org/licenses/LICENSE-2.0
+#
+#   Unless required by applicable law or agreed to in writing, software
+#   distributed under the License is distributed on an "AS IS" BASIS,
+#   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#   See the License for the specific language governing permissions and
+#   limitations under the License.
+
+"""Serialization that reads POD containers in place instead of copying them.
+
+'deserialize' decodes every element of a ListOf(float) or TupleOf(int) out of
+the byte stream into freshly allocated memory. 'serializeZeroCopy' instead
+writes the element data of every container of POD values into a separate,
+aligned region after the stream, and 'deserializeZeroCopy' builds those
+containers pointing straight at that region. The region belongs to a Slab
+that keeps the source buffer alive for as long as any container uses it.
+
+'saveZeroCopy' and 'openZeroCopy' do the same through a file, which is mapped
+copy-on-write, so loading a large object costs page faults rather than a
+memcpy, and processes loading the same file share its physical pages.
+
+The layout is a fixed-size header, the serialized stream, and the element
+data, starting at a 64 byte boundary:
+
+    magic            8 bytes   b'TPZCOPY1'
+    streamBytecount  uint64
+    podOffset        uint64    byte offset of the element data
+    stream           streamBytecount bytes, starting at byte 24
+    elementData      starting at podOffset, through the end of the data
+
+Containers read this way behave normally. Writing to an element writes into
+the source buffer (or, for a file, to this process's private copy of the
+page), and growing a ListOf copies its elements out first.
+"""
+
+import mmap
+import struct
+
+from typed_python._types import serializeWithPodBuffer, deserializeWithPodBuffer
+
+MAGIC = b'TPZCOPY1'
+
+_HEADER = struct.Struct('<8sQQ')
+
+_POD_ALIGNMENT = 64
+
+
+def serializeZeroCopy(T, value, context=None):
+    """Serialize 'value' as a T into bytes that 'deserializeZeroCopy' can read in place."""
+    stream, pod = serializeWithPodBuffer(T, value, context)
+
+    podOffset = _HEADER.size + len(stream)
+    podOffset += -podOffset % _POD_ALIGNMENT
+
+    return b"".join([
+        _HEADER.pack(MAGIC, len(stream), podOffset),
+        stream,
+        b"\0" * (podOffset - _HEADER.size - len(stream)),
+        pod
+    ])
+
+
+def deserializeZeroCopy(T, data, context=None):
+    """Deserialize a T written by 'serializeZeroCopy' out of 'data'.
+
+    Args:
+        T - the type that was serialized.
+        data - a buffer (bytes, bytearray, mmap, ...) holding the serialized
+            data. If it's writable, containers of POD values in the result
+            point into it and keep it alive, and it can't be deserialized
+            again until they're all released. Otherwise, we copy their element
+            data out of it once, in bulk.
+        context - the SerializationContext the data was written with, if any.
+    """
+    view = memoryview(data).cast('B')
+
+    if len(view) < _HEADER.size:
+        raise ValueError("Data is too short to be a zero-copy serialized object.")
+
+    magic, streamBytecount, podOffset = _HEADER.unpack_from(view)
+
+    if magic != MAGIC:
+        raise ValueError("Data is not a zero-copy serialized object.")
+
+    if _HEADER.size + streamBytecount > podOffset or podOffset > len(view):
+        raise ValueError("Zero-copy serialized object is truncated.")
+
+    stream = bytes(view[_HEADER.size:_HEADER.size + streamBytecount])
+
+    pod = view[podOffset:]
+
+    if pod.readonly:
+        pod = bytearray(pod)
+
+    return deserializeWithPodBuffer(T, stream, pod, context)
+
+
+def saveZeroCopy(path, T, value, context=None):
+    """Write 'value' as a T to 'path' in a form that 'openZeroCopy' can map back in."""
+    with open(path, 'wb') as f:
+        f.write(serializeZeroCopy(T, value, context))
+
+
+def openZeroCopy(path, T, context=None):
+    """Map a T written by 'saveZeroCopy' back into memory.
+
+    The file is mapped copy-on-write: containers of POD values in the result
+    point into the mapping, their pages are faulted in as they're touched, and
+    modifying them never changes the file. The mapping stays open until the
+    last container using it is released.
+    """
+    with open(path, 'rb') as f:
+        if f.read(len(MAGIC)) != MAGIC:
+            raise ValueError("File is not a zero-copy serialized object.")
+
+        mapping = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_COPY)
+
+    return deserializeZeroCopy(T, mapping, context)
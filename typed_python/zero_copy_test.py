@@ -0,0 +1,165 @@
+#   Copyright 2017-2020 typed_python Authors
+#
+#   Licensed under the Apache License, Version 2.0 (the "License");
+#   you may not use this file except in compliance with the License.
+#   You may obtain a copy of the License at
+#
+#       http://www.apache.org/licenses/LICENSE-2.0
+#
+#   Unless required by applicable law or agreed to in writing, software
+#   distributed under the License is distributed on an "AS IS" BASIS,
+#   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+#   See the License for the specific language governing permissions and
+#   limitations under the License.
+
+import ctypes
+import gc
+import os
+import tempfile
+
+import pytest
+
+from typed_python import (
+    NamedTuple, ListOf, TupleOf, Float32, Entrypoint, SerializationContext, serialize, deserialize
+)
+from typed_python._types import serializeWithPodBuffer, deserializeWithPodBuffer
+from typed_python.zero_copy import serializeZeroCopy, deserializeZeroCopy, saveZeroCopy, openZeroCopy
+
+Model = NamedTuple(
+    name=str,
+    weights=ListOf(float),
+    shape=TupleOf(int),
+    layers=ListOf(ListOf(Float32)),
+    tags=ListOf(str),
+)
+
+
+def makeModel():
+    layer = ListOf(Float32)([1.0, 2.0, 3.0])
+
+    return Model(
+        name="m",
+        weights=ListOf(float)(range(1000)),
+        shape=(10, 100),
+        layers=[layer, layer, ListOf(Float32)()],
+        tags=["a", "b"],
+    )
+
+
+def bufferAddress(buf):
+    return ctypes.addressof(ctypes.c_char.from_buffer(buf))
+
+
+def test_zero_copy_round_trip_points_into_the_buffer():
+    model = makeModel()
+
+    data = bytearray(serializeZeroCopy(Model, model))
+    copy = deserializeZeroCopy(Model, data)
+
+    assert copy == model
+
+    # the POD element data lives inside 'data'
+    lo, hi = bufferAddress(data), bufferAddress(data) + len(data)
+
+    assert lo <= int(copy.weights.pointerUnsafe(0)) < hi
+    assert lo <= int(copy.shape.pointerUnsafe(0)) < hi
+    assert lo <= int(copy.layers[0].pointerUnsafe(0)) < hi
+    assert int(copy.weights.pointerUnsafe(0)) % 8 == 0
+
+    # aliased lists are still aliased
+    copy.layers[0][0] = 10.0
+    assert copy.layers[1][0] == 10.0
+
+    # and writes go to the buffer
+    del copy
+    gc.collect()
+
+    assert deserializeZeroCopy(Model, data).layers[1][0] == 10.0
+
+
+def test_zero_copy_containers_keep_the_buffer_alive():
+    data = bytearray(serializeZeroCopy(ListOf(float), ListOf(float)(range(100000))))
+    weights = deserializeZeroCopy(ListOf(float), data)
+
+    with pytest.raises(BufferError):
+        # the slab holds an export of the buffer
+        data.extend(b"1234")
+
+    del data
+    gc.collect()
+
+    assert weights[99999] == 99999.0
+    assert weights == ListOf(float)(range(100000))
+
+    # growing the list copies it out of the buffer
+    weights.append(1.0)
+    assert len(weights) == 100001
+    assert weights[50000] == 50000.0
+
+
+def test_zero_copy_buffer_cant_be_read_twice_at_once():
+    data = bytearray(serializeZeroCopy(ListOf(float), ListOf(float)(range(1000))))
+    weights = deserializeZeroCopy(ListOf(float), data)
+
+    with pytest.raises(TypeError, match="already in use"):
+        deserializeZeroCopy(ListOf(float), data)
+
+    assert weights == ListOf(float)(range(1000))
+
+    # once nothing points into the buffer, it can be read again
+    del weights
+    gc.collect()
+
+    assert deserializeZeroCopy(ListOf(float), data) == ListOf(float)(range(1000))
+
+
+def test_zero_copy_from_readonly_bytes():
+    model = makeModel()
+    assert deserializeZeroCopy(Model, serializeZeroCopy(Model, model)) == model
+
+    with pytest.raises(TypeError):
+        deserializeWithPodBuffer(Model, *serializeWithPodBuffer(Model, model))
+
+    with pytest.raises(ValueError):
+        deserializeZeroCopy(Model, serialize(Model, model))
+
+
+def test_zero_copy_stream_is_normal_serialization_for_non_pod_data():
+    T = ListOf(str)
+    value = T(["hi", "there"])
+
+    stream, pod = serializeWithPodBuffer(T, value)
+
+    assert pod == b""
+    assert deserialize(T, stream) == value
+
+
+def test_zero_copy_with_context_and_compression():
+    context = SerializationContext()
+    model = makeModel()
+
+    assert deserializeZeroCopy(Model, bytearray(serializeZeroCopy(Model, model, context)), context) == model
+
+
+def test_zero_copy_file_is_mapped_copy_on_write():
+    model = makeModel()
+
+    with tempfile.TemporaryDirectory() as tf:
+        path = os.path.join(tf, "model")
+        saveZeroCopy(path, Model, model)
+
+        copy = openZeroCopy(path, Model)
+        assert copy == model
+
+        @Entrypoint
+        def total(x: ListOf(float)):
+            res = 0.0
+            for v in x:
+                res += v
+            return res
+
+        assert total(copy.weights) == sum(range(1000))
+
+        copy.weights[0] = 123.0
+
+        assert openZeroCopy(path, Model).weights[0] == 0.0